@@ -1,5 +1,11 @@
 from django.contrib import admin
-from .models import CalendarEvent, MeetingRequest, MeetingTranscription
+from .models import CalendarEvent, EventOccurrenceException, MeetingRequest, MeetingTranscription
+
+
+class EventOccurrenceExceptionInline(admin.TabularInline):
+    model = EventOccurrenceException
+    extra = 0
+    fields = ['original_start', 'is_cancelled', 'start', 'end', 'title']
 
 
 @admin.register(CalendarEvent)
@@ -10,6 +16,7 @@ class CalendarEventAdmin(admin.ModelAdmin):
     raw_id_fields = ['owner']
     filter_horizontal = ['participants']
     date_hierarchy = 'start'
+    inlines = [EventOccurrenceExceptionInline]
 
 
 @admin.register(MeetingRequest)
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0010_meetingtranscription_shared_with_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarevent',
+            name='rrule',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Regra (RRULE)'),
+        ),
+        migrations.AddField(
+            model_name='calendarevent',
+            name='series_end',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Fim da última ocorrência; calculado a partir da regra', null=True, verbose_name='Fim da série'),
+        ),
+        migrations.CreateModel(
+            name='EventOccurrenceException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_start', models.DateTimeField(verbose_name='Início original')),
+                ('is_cancelled', models.BooleanField(default=False, verbose_name='Cancelada')),
+                ('start', models.DateTimeField(blank=True, null=True, verbose_name='Novo início')),
+                ('end', models.DateTimeField(blank=True, null=True, verbose_name='Novo fim')),
+                ('title', models.CharField(blank=True, max_length=255, verbose_name='Título')),
+                ('description', models.TextField(blank=True, verbose_name='Descrição')),
+                ('location', models.CharField(blank=True, max_length=255, verbose_name='Local')),
+                ('link', models.URLField(blank=True, max_length=500, verbose_name='Link')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrence_exceptions', to='agenda.calendarevent', verbose_name='Série')),
+            ],
+            options={
+                'verbose_name': 'Exceção de Ocorrência',
+                'verbose_name_plural': 'Exceções de Ocorrência',
+                'indexes': [models.Index(fields=['event', 'start', 'end'], name='agenda_even_event_i_0e19dd_idx')],
+                'unique_together': {('event', 'original_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agenda', '0011_event_series_and_occurrence_exceptions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptionChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField(verbose_name='Ordem')),
+                ('kind', models.CharField(choices=[('time', 'Trecho de tempo'), ('bytes', 'Trecho de bytes')], default='time', max_length=10, verbose_name='Tipo')),
+                ('offset', models.FloatField(help_text='Segundos (tempo) ou bytes (bytes)', verbose_name='Início')),
+                ('length', models.FloatField(help_text='Segundos (tempo) ou bytes (bytes)', verbose_name='Tamanho')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('done', 'Concluída'), ('error', 'Erro')], default='pending', max_length=10, verbose_name='Status')),
+                ('text', models.TextField(blank=True, verbose_name='Texto')),
+                ('error_message', models.CharField(blank=True, max_length=255, verbose_name='Erro')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('transcription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='agenda.meetingtranscription', verbose_name='Transcrição')),
+            ],
+            options={
+                'verbose_name': 'Parte de Transcrição',
+                'verbose_name_plural': 'Partes de Transcrição',
+                'ordering': ['transcription', 'index'],
+                'unique_together': {('transcription', 'index')},
+            },
+        ),
+    ]
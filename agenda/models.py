@@ -150,6 +150,17 @@ class CalendarEvent(models.Model):
         related_name='recurrence_children',
         verbose_name='Evento pai (recorrência)',
     )
+    # Série virtual: a regra fica só no evento e as ocorrências são expandidas
+    # na janela consultada (agenda/recurrence.py). Séries antigas, com filhos
+    # materializados via recurrence_parent, ficam com a regra vazia.
+    rrule = models.CharField(max_length=255, blank=True, verbose_name='Regra (RRULE)')
+    series_end = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name='Fim da série',
+        help_text='Fim da última ocorrência; calculado a partir da regra',
+    )
 
     # Metadados
     created_at = models.DateTimeField(auto_now_add=True)
@@ -167,6 +178,16 @@ class CalendarEvent(models.Model):
     def __str__(self):
         return f'{self.title} ({self.start:%d/%m/%Y %H:%M})'
 
+    def save(self, *args, **kwargs):
+        if self.rrule or (self._state.adding and self.recurrence_rule != 'none' and not self.recurrence_parent_id):
+            from .recurrence import prepare_series
+            prepare_series(self)
+        super().save(*args, **kwargs)
+
+    @property
+    def is_series(self):
+        return bool(self.rrule)
+
     @property
     def duration_minutes(self):
         return int((self.end - self.start).total_seconds() / 60)
@@ -176,6 +197,41 @@ class CalendarEvent(models.Model):
         return self.start < other_end and self.end > other_start
 
 
+class EventOccurrenceException(models.Model):
+    """Exceção de uma ocorrência da série: cancelada ou com campos sobrescritos.
+
+    Só existe linha para a ocorrência que fugiu da regra; campos vazios herdam
+    do evento da série.
+    """
+    event = models.ForeignKey(
+        CalendarEvent,
+        on_delete=models.CASCADE,
+        related_name='occurrence_exceptions',
+        verbose_name='Série',
+    )
+    original_start = models.DateTimeField(verbose_name='Início original')
+    is_cancelled = models.BooleanField(default=False, verbose_name='Cancelada')
+    start = models.DateTimeField(null=True, blank=True, verbose_name='Novo início')
+    end = models.DateTimeField(null=True, blank=True, verbose_name='Novo fim')
+    title = models.CharField(max_length=255, blank=True, verbose_name='Título')
+    description = models.TextField(blank=True, verbose_name='Descrição')
+    location = models.CharField(max_length=255, blank=True, verbose_name='Local')
+    link = models.URLField(max_length=500, blank=True, verbose_name='Link')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Exceção de Ocorrência'
+        verbose_name_plural = 'Exceções de Ocorrência'
+        unique_together = ['event', 'original_start']
+        indexes = [
+            models.Index(fields=['event', 'start', 'end']),
+        ]
+
+    def __str__(self):
+        return f'{self.event.title} ({self.original_start:%d/%m/%Y %H:%M})'
+
+
 class MeetingRequest(models.Model):
     """Solicitação de encontro/chamada/horário entre usuários"""
     STATUS_CHOICES = [
@@ -415,3 +471,46 @@ class MeetingTranscription(models.Model):
 
     def __str__(self):
         return f'{self.title} ({self.created_at:%d/%m/%Y %H:%M})'
+
+
+class TranscriptionChunk(models.Model):
+    """Parte de um áudio longo transcrita de forma independente.
+
+    O resultado de cada parte fica salvo: se o processo cair no meio, a
+    retomada só transcreve o que ainda não terminou (ver
+    agenda/transcription_pipeline.py).
+    """
+    KIND_CHOICES = [
+        ('time', 'Trecho de tempo'),
+        ('bytes', 'Trecho de bytes'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pendente'),
+        ('done', 'Concluída'),
+        ('error', 'Erro'),
+    ]
+
+    transcription = models.ForeignKey(
+        MeetingTranscription,
+        on_delete=models.CASCADE,
+        related_name='chunks',
+        verbose_name='Transcrição',
+    )
+    index = models.PositiveIntegerField(verbose_name='Ordem')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='time', verbose_name='Tipo')
+    offset = models.FloatField(verbose_name='Início', help_text='Segundos (tempo) ou bytes (bytes)')
+    length = models.FloatField(verbose_name='Tamanho', help_text='Segundos (tempo) ou bytes (bytes)')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name='Status')
+    text = models.TextField(blank=True, verbose_name='Texto')
+    error_message = models.CharField(max_length=255, blank=True, verbose_name='Erro')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Parte de Transcrição'
+        verbose_name_plural = 'Partes de Transcrição'
+        ordering = ['transcription', 'index']
+        unique_together = ['transcription', 'index']
+
+    def __str__(self):
+        return f'{self.transcription_id} #{self.index} ({self.get_status_display()})'
@@ -0,0 +1,238 @@
+"""Recorrência virtual dos eventos da agenda e livre/ocupado por intervalos.
+
+A série semanal era materializada: um ``CalendarEvent`` por semana (90 dias
+por padrão) e um ``EventParticipant`` por convidado em cada um. Editar ou
+excluir a série tocava todas as linhas, e o calendário carregava todas elas.
+
+Aqui a série é **uma** linha com a regra em ``rrule`` (RFC 5545, expandida
+pelo ``dateutil``). As ocorrências só existem na janela [início, fim) que o
+FullCalendar pede. O que foge da regra vira uma linha esparsa de
+``EventOccurrenceException``: ocorrência cancelada ou com início, fim ou
+textos sobrescritos. Editar a série é salvar uma linha só.
+
+``series_end`` (fim da última ocorrência) deixa o banco descartar as séries
+que já terminaram antes da janela, sem expandir nada.
+
+Para livre/ocupado os intervalos de vários usuários vêm numa consulta. Eles
+são mesclados (ordena e funde sobreposições) e os horários livres saem de
+uma varredura linear sobre os intervalos mesclados.
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from dateutil.rrule import rrulestr
+from django.db.models import F, Q
+from django.utils import timezone
+
+# Série sem data limite: mesmo horizonte de quando as ocorrências eram criadas.
+DEFAULT_HORIZON_DAYS = 90
+
+RULES = {
+    'weekly': 'FREQ=WEEKLY',
+}
+
+Interval = Tuple[datetime, datetime]
+
+
+# ─── Série ───────────────────────────────────────────────────────────────────
+
+def _effective_until(event):
+    if event.recurrence_until:
+        return event.recurrence_until
+    return (timezone.localtime(event.start) + timedelta(days=DEFAULT_HORIZON_DAYS)).date()
+
+
+def prepare_series(event) -> None:
+    """Monta ``rrule`` e ``series_end`` a partir dos campos do evento (antes do save)."""
+    base = RULES.get(event.recurrence_rule)
+    if not base:
+        event.rrule, event.series_end = '', None
+        return
+    last_moment = timezone.make_aware(datetime.combine(_effective_until(event), time(23, 59, 59)))
+    until_utc = last_moment.astimezone(dt_timezone.utc)
+    event.rrule = f'{base};UNTIL={until_utc:%Y%m%dT%H%M%SZ}'
+    event.series_end = last_moment + (event.end - event.start)
+
+
+def _rule(event):
+    # Expande no fuso local: "toda segunda às 9h" continua às 9h mesmo se o
+    # deslocamento UTC mudar no meio da série.
+    return rrulestr(event.rrule, dtstart=timezone.localtime(event.start))
+
+
+def shift_exceptions(event, delta: timedelta) -> None:
+    """Acompanha a série quando o horário dela muda: as exceções são chaveadas
+    pelo início original da ocorrência."""
+    if delta:
+        event.occurrence_exceptions.update(original_start=F('original_start') + delta)
+
+
+def is_occurrence(event, original_start: datetime) -> bool:
+    if not event.rrule:
+        return False
+    moment = timezone.localtime(original_start)
+    return _rule(event).between(moment - timedelta(seconds=1), moment + timedelta(seconds=1)) != []
+
+
+# ─── Ocorrências ─────────────────────────────────────────────────────────────
+
+class Occurrence:
+    """Uma ocorrência expandida (ou o próprio evento, se não for série)."""
+
+    __slots__ = ('event', 'original_start', 'start', 'end', 'exception')
+
+    def __init__(self, event, original_start, start, end, exception=None):
+        self.event = event
+        self.original_start = original_start
+        self.start = start
+        self.end = end
+        self.exception = exception
+
+    def _field(self, name):
+        value = getattr(self.exception, name, '') if self.exception else ''
+        return value or getattr(self.event, name)
+
+    @property
+    def title(self):
+        return self._field('title')
+
+    @property
+    def description(self):
+        return self._field('description')
+
+    @property
+    def location(self):
+        return self._field('location')
+
+    @property
+    def link(self):
+        return self._field('link')
+
+
+def window_filter(start: datetime, end: datetime) -> Q:
+    """Eventos simples que cruzam a janela + séries que podem ter ocorrência nela."""
+    single = Q(rrule='', start__lt=end, end__gt=start)
+    series = ~Q(rrule='') & Q(start__lt=end) & (Q(series_end__isnull=True) | Q(series_end__gt=start))
+    return single | series
+
+
+def _exceptions_for(series, start: datetime, end: datetime) -> Dict[int, Dict[datetime, object]]:
+    from .models import EventOccurrenceException
+
+    if not series:
+        return {}
+    longest = max(ev.end - ev.start for ev in series)
+    rows = EventOccurrenceException.objects.filter(event_id__in=[ev.pk for ev in series]).filter(
+        Q(original_start__lt=end, original_start__gt=start - longest) | Q(start__lt=end, end__gt=start)
+    )
+    by_event: Dict[int, Dict[datetime, object]] = {}
+    for row in rows:
+        by_event.setdefault(row.event_id, {})[row.original_start] = row
+    return by_event
+
+
+def expand(events: Iterable, start: datetime, end: datetime) -> List[Occurrence]:
+    """Ocorrências dos eventos dentro de [start, end), ordenadas pelo início.
+
+    ``events`` deve vir filtrado por ``window_filter``; as exceções de todas as
+    séries vêm numa consulta só.
+    """
+    events = list(events)
+    series = [ev for ev in events if ev.rrule]
+    exceptions = _exceptions_for(series, start, end)
+
+    occurrences = []
+    for ev in events:
+        if not ev.rrule:
+            occurrences.append(Occurrence(ev, None, ev.start, ev.end))
+            continue
+        duration = ev.end - ev.start
+        overrides = exceptions.get(ev.pk, {})
+        seen = set()
+        # between(a, b) é exclusivo nas pontas: início > start - duração
+        # (ainda não acabou) e < end (já começou antes do fim da janela).
+        for moment in _rule(ev).between(timezone.localtime(start) - duration, timezone.localtime(end)):
+            original = moment.astimezone(dt_timezone.utc)
+            seen.add(original)
+            exception = overrides.get(original)
+            if exception is None:
+                occurrences.append(Occurrence(ev, original, original, original + duration))
+            elif not exception.is_cancelled:
+                occurrence = _overridden(ev, original, duration, exception)
+                if occurrence.start < end and occurrence.end > start:
+                    occurrences.append(occurrence)
+        # Ocorrências remarcadas para dentro da janela a partir de fora dela.
+        for original, exception in overrides.items():
+            if original in seen or exception.is_cancelled or not exception.start:
+                continue
+            occurrence = _overridden(ev, original, duration, exception)
+            if occurrence.start < end and occurrence.end > start:
+                occurrences.append(occurrence)
+
+    occurrences.sort(key=lambda o: (o.start, o.end))
+    return occurrences
+
+
+def _overridden(event, original, duration, exception) -> Occurrence:
+    new_start = exception.start or original
+    new_end = exception.end or (new_start + duration)
+    return Occurrence(event, original, new_start, new_end, exception)
+
+
+def occurrence_of(event, original_start: datetime) -> Optional[Occurrence]:
+    """A ocorrência da série que começaria em ``original_start`` (None se cancelada)."""
+    exception = event.occurrence_exceptions.filter(original_start=original_start).first()
+    if exception is None:
+        return Occurrence(event, original_start, original_start, original_start + (event.end - event.start))
+    if exception.is_cancelled:
+        return None
+    return _overridden(event, original_start, event.end - event.start, exception)
+
+
+# ─── Livre/ocupado ───────────────────────────────────────────────────────────
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Ordena e funde intervalos que se sobrepõem ou se encostam."""
+    merged: List[List[datetime]] = []
+    for s, e in sorted(intervals):
+        if merged and s <= merged[-1][1]:
+            if e > merged[-1][1]:
+                merged[-1][1] = e
+        else:
+            merged.append([s, e])
+    return [(s, e) for s, e in merged]
+
+
+def busy_intervals(user_ids: Sequence[int], start: datetime, end: datetime) -> Dict[int, List[Interval]]:
+    """{usuário: intervalos ocupados mesclados} dos eventos próprios, numa consulta."""
+    from .models import CalendarEvent
+
+    busy: Dict[int, List[Interval]] = {uid: [] for uid in user_ids}
+    events = CalendarEvent.objects.filter(window_filter(start, end), owner_id__in=list(user_ids)).only(
+        'id', 'owner_id', 'start', 'end', 'rrule', 'series_end',
+    )
+    for occurrence in expand(events, start, end):
+        busy[occurrence.event.owner_id].append(
+            (max(occurrence.start, start), min(occurrence.end, end))
+        )
+    return {uid: merge_intervals(intervals) for uid, intervals in busy.items()}
+
+
+def free_slots(busy: Sequence[Interval], start: datetime, end: datetime,
+               slot: timedelta) -> List[Dict[str, datetime]]:
+    """Horários livres de duração ``slot`` em [start, end), dado o ocupado mesclado."""
+    slots = []
+    current = start
+    for busy_start, busy_end in list(busy) + [(end, end)]:
+        while current + slot <= busy_start:
+            slots.append({'start': current, 'end': current + slot})
+            current += slot
+        current = max(current, busy_end)
+    return slots
+
+
+def common_free_slots(user_ids: Sequence[int], start: datetime, end: datetime,
+                      slot: timedelta) -> List[Dict[str, datetime]]:
+    """Horários em que todos os usuários estão livres ao mesmo tempo."""
+    busy = busy_intervals(user_ids, start, end)
+    return free_slots(merge_intervals(i for intervals in busy.values() for i in intervals), start, end, slot)
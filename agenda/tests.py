@@ -1,11 +1,18 @@
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
 from users.models import User
 
-from .models import MeetingTranscription
+from . import recurrence, transcription_pipeline
+from .models import CalendarEvent, EventParticipant, MeetingTranscription, TranscriptionChunk
 
 
 class TranscriptionVisibilityTests(TestCase):
@@ -141,3 +148,156 @@ class TranscriptionVisibilityTests(TestCase):
 
         titles = [item.title for item in response.context['transcriptions']]
         self.assertEqual(titles[0], self.private_transcription.title)
+
+
+class RecurrenceTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass123', hierarchy='PADRAO',
+        )
+        self.guest = User.objects.create_user(
+            username='guest', email='guest@example.com', password='pass123', hierarchy='PADRAO',
+        )
+        self.monday = timezone.make_aware(datetime(2026, 3, 2, 9, 0))
+        self.client.force_login(self.owner)
+
+    def _events(self, start, end):
+        response = self.client.get(reverse('agenda:api_events'), {
+            'start': start.isoformat(), 'end': end.isoformat(),
+        })
+        return response.json()
+
+    def test_weekly_series_is_stored_once_and_expanded_in_window(self):
+        response = self.client.post(reverse('agenda:api_event_create'), data=json.dumps({
+            'title': 'Daily do time',
+            'start': self.monday.isoformat(),
+            'end': (self.monday + timedelta(hours=1)).isoformat(),
+            'recurrence': 'weekly',
+            'recurrence_until': '2026-03-31',
+            'participants': [self.guest.pk],
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(CalendarEvent.objects.count(), 1)
+        self.assertEqual(EventParticipant.objects.count(), 1)
+        event = CalendarEvent.objects.get()
+
+        window = (self.monday - timedelta(days=1), self.monday + timedelta(days=60))
+        occurrences = self._events(*window)
+        self.assertEqual(len(occurrences), 5)  # 2, 9, 16, 23 e 30 de março
+
+        second = occurrences[1]['extendedProps']['occurrence']
+        self.client.post(reverse('agenda:api_event_delete', args=[event.pk]),
+                         data=json.dumps({'occurrence': second}), content_type='application/json')
+        third = occurrences[2]['extendedProps']['occurrence']
+        moved = self.monday + timedelta(days=16, hours=5)
+        self.client.post(reverse('agenda:api_event_update', args=[event.pk]), data=json.dumps({
+            'occurrence': third, 'start': moved.isoformat(), 'end': (moved + timedelta(hours=1)).isoformat(),
+        }), content_type='application/json')
+
+        occurrences = self._events(*window)
+        self.assertEqual(len(occurrences), 4)
+        self.assertIn(moved, [datetime.fromisoformat(o['start']) for o in occurrences])
+        self.assertTrue(CalendarEvent.objects.filter(pk=event.pk).exists())
+
+    def test_series_move_accepts_naive_datetimes_from_the_calendar(self):
+        event = CalendarEvent.objects.create(
+            owner=self.owner, title='Daily', start=self.monday, end=self.monday + timedelta(hours=1),
+            recurrence_rule='weekly', recurrence_until=date(2026, 3, 31),
+        )
+        occurrence = self._events(self.monday - timedelta(days=1), self.monday + timedelta(days=10))[1]
+        naive = timezone.make_naive(self.monday + timedelta(days=7, hours=2))
+
+        response = self.client.post(reverse('agenda:api_event_update', args=[event.pk]), data=json.dumps({
+            'occurrence': occurrence['extendedProps']['occurrence'], 'scope': 'series',
+            'start': naive.isoformat(), 'end': (naive + timedelta(hours=1)).isoformat(),
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        event.refresh_from_db()
+        self.assertEqual(event.start, self.monday + timedelta(hours=2))
+
+        response = self.client.post(reverse('agenda:api_event_update', args=[event.pk]), data=json.dumps({
+            'start': naive.isoformat(), 'end': 'ontem',
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_free_busy_merges_intervals_across_users(self):
+        def at(hour, minute=0):
+            return self.monday.replace(hour=hour, minute=minute)
+
+        CalendarEvent.objects.create(owner=self.owner, title='A', start=at(9), end=at(10))
+        CalendarEvent.objects.create(owner=self.owner, title='B', start=at(9, 30), end=at(11))
+        CalendarEvent.objects.create(owner=self.guest, title='C', start=at(14), end=at(15),
+                                     recurrence_rule='weekly')
+
+        busy = recurrence.busy_intervals([self.owner.pk, self.guest.pk], at(8), at(18))
+        self.assertEqual(busy[self.owner.pk], [(at(9), at(11))])
+        self.assertEqual(busy[self.guest.pk], [(at(14), at(15))])
+
+        slots = recurrence.common_free_slots([self.owner.pk, self.guest.pk], at(8), at(18), timedelta(hours=1))
+        self.assertEqual([timezone.localtime(s['start']).hour for s in slots], [8, 11, 12, 13, 15, 16, 17])
+
+
+class StubTranscriber:
+    """Backend local: devolve o conteúdo da parte como texto."""
+    calls = []
+    fail_on = set()
+    lock = threading.Lock()
+
+    def __init__(self, client):
+        self.client = client
+
+    def transcribe(self, path):
+        with open(path, 'rb') as fh:
+            text = fh.read().decode().strip()
+        with self.lock:
+            self.calls.append(text)
+        if text in self.fail_on:
+            raise RuntimeError('modelo fora do ar')
+        return text
+
+
+@override_settings(TRANSCRIPTION_BACKEND='agenda.tests.StubTranscriber', TRANSCRIPTION_CHUNK_WORKERS=3)
+class TranscriptionPipelineTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass123', hierarchy='PADRAO',
+        )
+        self.transcription = MeetingTranscription.objects.create(owner=owner, title='Reunião longa')
+        StubTranscriber.calls, StubTranscriber.fail_on = [], set()
+        fd, self.path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'w') as fh:
+            # Quatro partes de até 12 bytes (46 bytes ÷ 4 = fatias de 12).
+            fh.write('alfa one    beta two    gama three  delta four')
+        self.addCleanup(os.unlink, self.path)
+
+    def _run(self):
+        transcriber = transcription_pipeline.get_transcriber(client=None)
+        return transcription_pipeline.transcribe_by_bytes(
+            self.path, transcriber, transcription=self.transcription, max_bytes=12,
+        )
+
+    def test_failed_chunk_is_retried_alone_on_resume(self):
+        StubTranscriber.fail_on = {'gama three'}
+        text = self._run()
+        self.assertIn('[Chunk 2 não processado]', text)
+        self.assertEqual(
+            list(TranscriptionChunk.objects.filter(transcription=self.transcription)
+                 .values_list('status', flat=True)),
+            ['done', 'done', 'error', 'done'],
+        )
+
+        StubTranscriber.calls, StubTranscriber.fail_on = [], set()
+        text = self._run()
+        self.assertEqual(StubTranscriber.calls, ['gama three'])
+        self.assertEqual(text, 'alfa one\n\nbeta two\n\ngama three\n\ndelta four')
+
+    def test_stitch_drops_words_repeated_by_overlap(self):
+        stitched = transcription_pipeline.stitch([
+            'vamos fechar o orçamento do trimestre até sexta feira',
+            'stre até sexta feira, e depois revisamos as metas',
+        ])
+        self.assertEqual(stitched, 'vamos fechar o orçamento do trimestre até sexta feira\n\ne depois revisamos as metas')
+
+    def test_time_plan_overlaps_consecutive_chunks(self):
+        specs = transcription_pipeline.plan_time_chunks(1500, segment_seconds=720)
+        self.assertEqual([(s.offset, s.length) for s in specs], [(0, 723), (720, 723), (1440, 60)])
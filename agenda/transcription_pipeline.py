@@ -0,0 +1,313 @@
+"""Transcrição de áudios longos em partes paralelas e retomáveis.
+
+O fluxo antigo cortava a reunião com ffmpeg e mandava as partes ao Whisper
+uma depois da outra: duas horas de áudio eram dez chamadas em série, e uma
+queda do processo (deploy, OOM) jogava fora tudo o que já tinha voltado.
+
+Aqui:
+
+* o áudio é dividido num **plano** determinístico de partes (tempo ou bytes);
+  as partes de tempo se sobrepõem em ``OVERLAP_SECONDS`` para não perder a
+  palavra que cai no corte;
+* cada parte é um trabalho independente, rodado num pool limitado
+  (``TRANSCRIPTION_CHUNK_WORKERS``) — o total fica perto da parte mais lenta;
+* o texto de cada parte é gravado em ``TranscriptionChunk`` assim que volta.
+  A retomada (``_prioritize_processing_transcriptions`` → reprocessamento)
+  refaz só as partes pendentes ou com erro;
+* ``stitch`` junta os textos removendo o trecho repetido pela sobreposição.
+
+O modelo é plugável: ``TRANSCRIPTION_BACKEND`` aponta para uma classe que
+recebe o client e expõe ``transcribe(caminho) -> texto`` (os testes usam
+um stub local).
+"""
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'agenda.transcription_pipeline.WhisperTranscriber'
+
+SEGMENT_SECONDS = 720
+LONG_AUDIO_SEGMENT_SECONDS = 900     # gravações de 6h+: menos partes
+LONG_AUDIO_SECONDS = 6 * 3600
+OVERLAP_SECONDS = 3
+WHISPER_MAX_BYTES = 24 * 1024 * 1024
+
+# Quantas palavras do fim de uma parte são comparadas com o início da seguinte.
+STITCH_WINDOW_WORDS = 40
+STITCH_MIN_WORDS = 3
+
+
+def chunk_workers() -> int:
+    return max(1, getattr(settings, 'TRANSCRIPTION_CHUNK_WORKERS', 4))
+
+
+def analysis_workers() -> int:
+    return max(1, getattr(settings, 'TRANSCRIPTION_ANALYSIS_WORKERS', 3))
+
+
+# ─── Backend do modelo ───────────────────────────────────────────────────────
+
+class WhisperTranscriber:
+    """Backend padrão: Whisper da OpenAI, com retry e backoff exponencial."""
+
+    def __init__(self, client, max_retries=3):
+        self.client = client
+        self.max_retries = max_retries
+
+    def transcribe(self, path: str) -> str:
+        for attempt in range(self.max_retries):
+            try:
+                with open(path, 'rb') as audio_stream:
+                    response = self.client.audio.transcriptions.create(
+                        model='whisper-1',
+                        file=audio_stream,
+                        language='pt',
+                        response_format='text',
+                    )
+                text = response if isinstance(response, str) else getattr(response, 'text', str(response))
+                return (text or '').strip()
+            except Exception:
+                if attempt == self.max_retries - 1:
+                    raise
+                time.sleep(2 ** attempt)
+        return ''
+
+
+def get_transcriber(client):
+    backend = getattr(settings, 'TRANSCRIPTION_BACKEND', DEFAULT_BACKEND) or DEFAULT_BACKEND
+    return import_string(backend)(client)
+
+
+# ─── Plano de partes ─────────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class ChunkSpec:
+    index: int
+    kind: str        # 'time' (segundos) ou 'bytes'
+    offset: float
+    length: float
+
+
+def plan_time_chunks(total_seconds: float, segment_seconds: Optional[int] = None) -> List[ChunkSpec]:
+    """Partes de ``segment_seconds`` que avançam sem buraco, cada uma esticada
+    em ``OVERLAP_SECONDS`` sobre a seguinte."""
+    total_seconds = float(total_seconds)
+    if segment_seconds is None:
+        segment_seconds = LONG_AUDIO_SEGMENT_SECONDS if total_seconds >= LONG_AUDIO_SECONDS else SEGMENT_SECONDS
+    specs = []
+    start = 0.0
+    while start < total_seconds:
+        length = min(segment_seconds + OVERLAP_SECONDS, max(1.0, total_seconds - start))
+        specs.append(ChunkSpec(len(specs), 'time', start, length))
+        start += segment_seconds
+    return specs
+
+
+def plan_byte_chunks(size: int, max_bytes: int = WHISPER_MAX_BYTES) -> List[ChunkSpec]:
+    """Fatias de bytes do arquivo original (reserva quando o ffmpeg não funciona)."""
+    count = size // max_bytes + 1
+    chunk = size // count + 1
+    return [
+        ChunkSpec(i, 'bytes', float(offset), float(min(chunk, size - offset)))
+        for i, offset in enumerate(range(0, size, chunk))
+    ]
+
+
+def _cut(source_path: str, spec: ChunkSpec, tmp_dir: str) -> str:
+    if spec.kind == 'bytes':
+        path = os.path.join(tmp_dir, f'chunk_{spec.index:04d}{os.path.splitext(source_path)[1] or ".webm"}')
+        with open(source_path, 'rb') as src, open(path, 'wb') as dst:
+            src.seek(int(spec.offset))
+            dst.write(src.read(int(spec.length)))
+        return path
+
+    path = os.path.join(tmp_dir, f'seg_{spec.index:04d}.mp3')
+    subprocess.run(
+        [
+            'ffmpeg', '-y', '-ss', str(spec.offset), '-t', str(spec.length), '-i', source_path,
+            '-vn', '-acodec', 'libmp3lame', '-ab', '64k', '-ar', '16000', '-ac', '1', path,
+        ],
+        capture_output=True,
+        timeout=max(300, int(spec.length * 3)),
+        check=True,
+    )
+    return path
+
+
+def _transcribe_spec(source_path: str, spec: ChunkSpec, tmp_dir: str, transcriber) -> str:
+    path = _cut(source_path, spec, tmp_dir)
+    try:
+        return transcriber.transcribe(path)
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+# ─── Estado das partes ───────────────────────────────────────────────────────
+
+def _placeholder(spec: ChunkSpec, error: str) -> str:
+    if spec.kind == 'bytes':
+        return f'[Chunk {spec.index} não processado]'
+    return f'[Segmento não transcrito: {error[:80]}]'
+
+
+class _ChunkStore:
+    """Textos por parte; gravados em ``TranscriptionChunk`` quando há transcrição."""
+
+    def __init__(self, specs: Sequence[ChunkSpec], transcription=None):
+        self.specs = list(specs)
+        self.transcription = transcription
+        self.texts: Dict[int, str] = {}
+        self.errors: Dict[int, str] = {}
+        if transcription is not None:
+            self._load()
+
+    def _load(self):
+        from .models import TranscriptionChunk
+
+        rows = {row.index: row for row in TranscriptionChunk.objects.filter(transcription=self.transcription)}
+        same_plan = len(rows) == len(self.specs) and all(
+            (rows[s.index].kind, rows[s.index].offset, rows[s.index].length) == (s.kind, s.offset, s.length)
+            for s in self.specs if s.index in rows
+        )
+        if rows and not same_plan:
+            # Outro plano (arquivo diferente, duração lida de outro jeito): recomeça.
+            TranscriptionChunk.objects.filter(transcription=self.transcription).delete()
+            rows = {}
+        if not rows:
+            TranscriptionChunk.objects.bulk_create([
+                TranscriptionChunk(transcription=self.transcription, index=s.index, kind=s.kind,
+                                   offset=s.offset, length=s.length)
+                for s in self.specs
+            ])
+            return
+        for index, row in rows.items():
+            if row.status == 'done':
+                self.texts[index] = row.text
+
+    def pending(self) -> List[ChunkSpec]:
+        return [s for s in self.specs if s.index not in self.texts]
+
+    def _save(self, spec: ChunkSpec, **fields):
+        if self.transcription is None:
+            return
+        from django.db.models import F
+
+        from .models import TranscriptionChunk
+
+        TranscriptionChunk.objects.filter(transcription=self.transcription, index=spec.index).update(
+            attempts=F('attempts') + 1, **fields,
+        )
+
+    def done(self, spec: ChunkSpec, text: str):
+        self.texts[spec.index] = text
+        self._save(spec, status='done', text=text, error_message='')
+
+    def failed(self, spec: ChunkSpec, err: Exception):
+        self.errors[spec.index] = str(err)
+        self._save(spec, status='error', error_message=str(err)[:255])
+
+    def ordered_texts(self) -> List[str]:
+        return [
+            self.texts[s.index] if s.index in self.texts else _placeholder(s, self.errors.get(s.index, ''))
+            for s in self.specs
+        ]
+
+
+# ─── Costura ─────────────────────────────────────────────────────────────────
+
+_NON_WORD = re.compile(r'[^\w]+', re.UNICODE)
+
+
+def _norm(word: str) -> str:
+    return _NON_WORD.sub('', word.lower())
+
+
+def _overlap_length(previous: List[str], following: List[str]) -> int:
+    """Quantas palavras do início de ``following`` repetem o fim de ``previous``.
+
+    Aceita até duas palavras soltas antes do trecho repetido (o corte pode
+    pegar meia palavra no começo da parte seguinte).
+    """
+    tail = [_norm(w) for w in previous[-STITCH_WINDOW_WORDS:]]
+    head = [_norm(w) for w in following[:STITCH_WINDOW_WORDS + 2]]
+    for skip in range(3):
+        for size in range(min(len(tail), len(head) - skip), STITCH_MIN_WORDS - 1, -1):
+            if tail[-size:] == head[skip:skip + size]:
+                return skip + size
+    return 0
+
+
+def stitch(texts: Sequence[str]) -> str:
+    """Junta os textos das partes na ordem, sem repetir o trecho sobreposto."""
+    parts: List[str] = []
+    previous_words: List[str] = []
+    for text in texts:
+        words = (text or '').split()
+        if not words:
+            continue
+        cut = _overlap_length(previous_words, words) if previous_words else 0
+        kept = words[cut:]
+        if kept:
+            parts.append(' '.join(kept))
+        previous_words = words
+    return '\n\n'.join(parts).strip()
+
+
+# ─── Pipeline ────────────────────────────────────────────────────────────────
+
+def transcribe_chunks(source_path: str, specs: Sequence[ChunkSpec], transcriber,
+                      transcription=None, workers: Optional[int] = None) -> str:
+    """Transcreve as partes pendentes em paralelo e devolve o texto costurado.
+
+    Os trabalhadores só cortam e chamam o modelo; a gravação de cada parte
+    acontece nesta thread, conforme as respostas chegam.
+    """
+    store = _ChunkStore(specs, transcription)
+    todo = store.pending()
+    if todo:
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            with ThreadPoolExecutor(max_workers=min(workers or chunk_workers(), len(todo)),
+                                    thread_name_prefix='transcription-chunk') as pool:
+                futures = {pool.submit(_transcribe_spec, source_path, spec, tmp_dir, transcriber): spec
+                           for spec in todo}
+                for future in as_completed(futures):
+                    spec = futures[future]
+                    try:
+                        store.done(spec, future.result())
+                    except Exception as err:
+                        logger.warning('Parte %s da transcrição falhou: %s', spec.index, err)
+                        store.failed(spec, err)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return stitch(store.ordered_texts())
+
+
+def transcribe_by_time(source_path: str, total_seconds: float, transcriber, transcription=None) -> str:
+    return transcribe_chunks(source_path, plan_time_chunks(total_seconds), transcriber, transcription)
+
+
+def transcribe_by_bytes(source_path: str, transcriber, transcription=None,
+                        max_bytes: int = WHISPER_MAX_BYTES) -> str:
+    specs = plan_byte_chunks(os.path.getsize(source_path), max_bytes)
+    return transcribe_chunks(source_path, specs, transcriber, transcription)
+
+
+def forget_chunks(transcription) -> None:
+    """Descarta as partes depois que a transcrição completa foi gravada."""
+    from .models import TranscriptionChunk
+
+    TranscriptionChunk.objects.filter(transcription=transcription).delete()
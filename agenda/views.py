@@ -5,6 +5,7 @@ import subprocess
 import tempfile
 import threading
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, time, date as date_type
 
 from django.contrib import messages
@@ -19,8 +20,10 @@ from django.utils import timezone
 from django.views.decorators.http import require_POST
 
 from users.models import User, Sector
+from core.polling import conditional_poll, since_param
 from core.storage import get_media_storage
-from .models import CalendarEvent, MeetingRequest, EventParticipant, MeetingTranscription
+from . import recurrence, transcription_pipeline
+from .models import CalendarEvent, EventOccurrenceException, EventParticipant, MeetingRequest, MeetingTranscription
 
 try:
     from core.models import NotificationMixin
@@ -140,39 +143,18 @@ def _manageable_transcriptions_for_user(user):
 
 
 def _get_busy_slots(user, start_date, end_date):
-    """Retorna lista de slots ocupados (sem detalhes) de um usuário"""
-    events = CalendarEvent.objects.filter(
-        owner=user, start__lt=end_date, end__gt=start_date
-    ).values_list('start', 'end')
-    return [{'start': s.isoformat(), 'end': e.isoformat()} for s, e in events]
+    """Retorna lista de slots ocupados (sem detalhes) de um usuário, já mesclados"""
+    busy = recurrence.busy_intervals([user.pk], start_date, end_date)[user.pk]
+    return [{'start': s.isoformat(), 'end': e.isoformat()} for s, e in busy]
 
 
 def _get_available_slots(user, date, slot_duration_min=30):
     """Calcula horários disponíveis de um usuário em um dia"""
     day_start = timezone.make_aware(datetime.combine(date, time(8, 0)))
     day_end = timezone.make_aware(datetime.combine(date, time(18, 0)))
-
-    events = CalendarEvent.objects.filter(
-        owner=user, start__lt=day_end, end__gt=day_start
-    ).order_by('start')
-
-    busy = [(max(e.start, day_start), min(e.end, day_end)) for e in events]
-
-    slots = []
-    current = day_start
-    for busy_start, busy_end in busy:
-        while current + timedelta(minutes=slot_duration_min) <= busy_start:
-            slot_end = current + timedelta(minutes=slot_duration_min)
-            slots.append({'start': current, 'end': slot_end})
-            current = slot_end
-        current = max(current, busy_end)
-
-    while current + timedelta(minutes=slot_duration_min) <= day_end:
-        slot_end = current + timedelta(minutes=slot_duration_min)
-        slots.append({'start': current, 'end': slot_end})
-        current = slot_end
-
-    return slots
+    return recurrence.common_free_slots(
+        [user.pk], day_start, day_end, timedelta(minutes=slot_duration_min)
+    )
 
 
 def _extract_json_payload(text):
@@ -618,27 +600,28 @@ def _generate_transcription_analysis(client, meeting_title, source_text, analysi
         return _generate_transcription_analysis_single(client, meeting_title, source_text, analysis_context=analysis_context)
 
     chunks = _split_text_for_analysis(source_text, max_chars=100000)
-    analyses = []
-    for chunk in chunks:
+
+    def _analyse(chunk):
         try:
-            analyses.append(
-                _generate_transcription_analysis_single(client, meeting_title, chunk, analysis_context=analysis_context)
-            )
+            return _generate_transcription_analysis_single(client, meeting_title, chunk, analysis_context=analysis_context)
         except Exception:
-            analyses.append(
-                {
-                    'formatted_transcription': chunk,
-                    'summary': '',
-                    'sections': [],
-                    'key_decisions': [],
-                    'action_items': [],
-                    'participants_identified': [],
-                    'sentiment': 'neutral',
-                    'meeting_type_detected': 'general',
-                    'tags': [],
-                    'suggested_events': [],
-                }
-            )
+            return {
+                'formatted_transcription': chunk,
+                'summary': '',
+                'sections': [],
+                'key_decisions': [],
+                'action_items': [],
+                'participants_identified': [],
+                'sentiment': 'neutral',
+                'meeting_type_detected': 'general',
+                'tags': [],
+                'suggested_events': [],
+            }
+
+    # Partes independentes: analisadas em paralelo, na ordem original.
+    workers = min(len(chunks), transcription_pipeline.analysis_workers())
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='transcription-analysis') as pool:
+        analyses = list(pool.map(_analyse, chunks))
 
     return _merge_transcription_analyses(client, meeting_title, analyses, source_text)
 
@@ -689,45 +672,36 @@ def _parse_recurrence_until(value):
         return None
 
 
-def _create_weekly_occurrences(parent_event, invited_users):
-    """Cria ocorrências semanais a partir do evento pai."""
-    until = parent_event.recurrence_until
-    if not until:
-        # Padrão: 3 meses
-        until = (parent_event.start + timedelta(days=90)).date()
-
-    duration = parent_event.end - parent_event.start
-    current_start = parent_event.start + timedelta(weeks=1)
-    max_date = datetime.combine(until, time(23, 59, 59))
-    if current_start.tzinfo and not max_date.tzinfo:
-        from django.utils import timezone as tz
-        max_date = tz.make_aware(max_date)
-
-    while current_start <= max_date:
-        child = CalendarEvent.objects.create(
-            owner=parent_event.owner,
-            title=parent_event.title,
-            description=parent_event.description,
-            event_type=parent_event.event_type,
-            color=parent_event.color,
-            start=current_start,
-            end=current_start + duration,
-            all_day=parent_event.all_day,
-            location=parent_event.location,
-            link=parent_event.link,
-            is_private=parent_event.is_private,
-            recurrence_rule='weekly',
-            recurrence_until=parent_event.recurrence_until,
-            recurrence_parent=parent_event,
-        )
-        # Copiar convites de participantes
-        for user in invited_users:
-            EventParticipant.objects.create(
-                event=child,
-                user=user,
-                status='pending',
-            )
-        current_start += timedelta(weeks=1)
+def _parse_occurrence(value):
+    """Data/hora ISO vinda do FullCalendar, sempre com fuso (ingênua = fuso local)."""
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _parse_moments(data):
+    """``start``/``end`` do corpo já com fuso; ``None`` se algum for inválido."""
+    moments = {}
+    for key in ('start', 'end'):
+        if key in data:
+            moments[key] = _parse_occurrence(data[key])
+            if moments[key] is None:
+                return None
+    return moments
+
+
+def _series_occurrence(event, value):
+    """Ocorrência da série indicada por ``value``, se ``value`` apontar para uma."""
+    original = _parse_occurrence(value)
+    if original is None or not recurrence.is_occurrence(event, original):
+        return None
+    return original
 
 
 # =========================================================================
@@ -759,38 +733,38 @@ def api_events(request):
 
         if _can_view_full_calendar(request.user, target):
             events = CalendarEvent.objects.filter(
-                owner=target, start__lt=end, end__gt=start
-            )
+                recurrence.window_filter(start, end), owner=target,
+            ).select_related('owner')
         else:
             # Apenas mostra slots ocupados (sem detalhes)
             busy = _get_busy_slots(target, start, end)
             return JsonResponse(busy, safe=False)
     else:
         # Meus eventos + eventos onde sou participante
-        from django.db.models import Q
         events = CalendarEvent.objects.filter(
             Q(owner=request.user) | Q(participants=request.user),
-            start__lt=end,
-            end__gt=start,
-        ).distinct()
+            recurrence.window_filter(start, end),
+        ).select_related('owner').distinct()
 
     data = []
-    for ev in events:
+    for occ in recurrence.expand(events, start, end):
+        ev = occ.event
         data.append({
             'id': ev.pk,
-            'title': ev.title,
-            'start': ev.start.isoformat(),
-            'end': ev.end.isoformat(),
+            'title': occ.title,
+            'start': occ.start.isoformat(),
+            'end': occ.end.isoformat(),
             'allDay': ev.all_day,
             'color': ev.color,
             'extendedProps': {
-                'description': ev.description,
-                'location': ev.location,
-                'link': ev.link,
+                'description': occ.description,
+                'location': occ.location,
+                'link': occ.link,
                 'event_type': ev.event_type,
                 'type_display': ev.get_event_type_display(),
                 'is_owner': ev.owner_id == request.user.pk,
                 'owner_name': ev.owner.full_name,
+                'occurrence': occ.original_start.isoformat() if occ.original_start else None,
             }
         })
     return JsonResponse(data, safe=False)
@@ -815,19 +789,25 @@ def api_event_detail(request, pk):
             'status': ep.status,
             'status_display': ep.get_status_display(),
         })
-    
+
+    # Ocorrência de uma série: horário e textos dela (com as exceções aplicadas).
+    original = _series_occurrence(event, request.GET.get('occurrence'))
+    occ = recurrence.occurrence_of(event, original) if original else None
+    if occ is None:
+        occ = recurrence.Occurrence(event, None, event.start, event.end)
+
     return JsonResponse({
         'id': event.pk,
-        'title': event.title,
-        'description': event.description,
+        'title': occ.title,
+        'description': occ.description,
         'event_type': event.event_type,
         'type_display': event.get_event_type_display(),
         'color': event.color,
-        'start': event.start.isoformat(),
-        'end': event.end.isoformat(),
+        'start': occ.start.isoformat(),
+        'end': occ.end.isoformat(),
         'all_day': event.all_day,
-        'location': event.location,
-        'link': event.link,
+        'location': occ.location,
+        'link': occ.link,
         'is_private': event.is_private,
         'is_owner': event.owner_id == request.user.pk,
         'owner_name': event.owner.full_name,
@@ -835,6 +815,7 @@ def api_event_detail(request, pk):
         'recurrence': event.recurrence_rule,
         'recurrence_until': event.recurrence_until.isoformat() if event.recurrence_until else None,
         'recurrence_parent_id': event.recurrence_parent_id,
+        'occurrence': occ.original_start.isoformat() if occ.original_start else None,
     })
 
 
@@ -902,10 +883,6 @@ def api_event_create(request):
                 action_url='/agenda/',
             )
 
-    # Gerar ocorrências recorrentes (semanal)
-    if event.recurrence_rule == 'weekly':
-        _create_weekly_occurrences(event, invited_users)
-
     return JsonResponse({
         'id': event.pk,
         'title': event.title,
@@ -928,14 +905,31 @@ def api_event_update(request, pk):
     except json.JSONDecodeError:
         return JsonResponse({'error': 'JSON inválido'}, status=400)
 
+    # O calendário manda horário sem fuso; comparar com o do banco exige fuso.
+    moments = _parse_moments(data)
+    if moments is None:
+        return JsonResponse({'error': 'Data inválida'}, status=400)
+
+    original = _series_occurrence(event, data.get('occurrence'))
+    if original is not None and data.get('scope') != 'series':
+        return _update_occurrence(request, event, original, data, moments)
+
+    if original is not None and moments:
+        # Editado a partir de uma ocorrência: a série anda o mesmo tanto que ela.
+        new_start = moments.get('start', original)
+        new_end = moments.get('end', new_start + (event.end - event.start))
+        event.start = event.start + (new_start - original)
+        event.end = event.start + (new_end - new_start)
+        moments = {}
+
     if 'title' in data:
         event.title = data['title']
     if 'description' in data:
         event.description = data['description']
-    if 'start' in data:
-        event.start = datetime.fromisoformat(data['start'])
-    if 'end' in data:
-        event.end = datetime.fromisoformat(data['end'])
+    if 'start' in moments:
+        event.start = moments['start']
+    if 'end' in moments:
+        event.end = moments['end']
     if 'all_day' in data:
         event.all_day = data['all_day']
     if 'color' in data:
@@ -950,6 +944,8 @@ def api_event_update(request, pk):
         event.is_private = data['is_private']
 
     event.save()
+    if event.rrule:
+        recurrence.shift_exceptions(event, event.start - old_start)
 
     if 'participants' in data:
         new_participant_ids = set(data['participants'])
@@ -992,6 +988,34 @@ def api_event_update(request, pk):
     return JsonResponse({'ok': True})
 
 
+def _update_occurrence(request, event, original, data, moments):
+    """Edita só uma ocorrência da série: grava (ou atualiza) a exceção dela."""
+    exception, _ = EventOccurrenceException.objects.get_or_create(event=event, original_start=original)
+    old_start = exception.start or original
+
+    for field in ('title', 'description', 'location', 'link'):
+        if field in data:
+            # Igual ao da série: volta a herdar.
+            value = data[field] or ''
+            setattr(exception, field, '' if value == getattr(event, field) else value)
+    if 'start' in moments:
+        exception.start = moments['start']
+    if 'end' in moments:
+        exception.end = moments['end']
+    exception.is_cancelled = False
+    exception.save()
+
+    if exception.start and exception.start != old_start:
+        _notify_agenda_users(
+            event.participants.exclude(pk=request.user.pk),
+            'Evento remarcado',
+            f'{request.user.full_name} remarcou "{event.title}" de {_format_event_datetime(old_start)} '
+            f'para {_format_event_datetime(exception.start)}.',
+            action_url='/agenda/',
+        )
+    return JsonResponse({'ok': True})
+
+
 @login_required
 @require_POST
 def api_event_delete(request, pk):
@@ -1004,8 +1028,14 @@ def api_event_delete(request, pk):
         data = {}
 
     delete_all = data.get('delete_all_recurrences', False)
+    original = _series_occurrence(event, data.get('occurrence'))
 
-    if delete_all and event.recurrence_rule != 'none':
+    if original is not None and not delete_all:
+        # Só esta ocorrência: exceção cancelada, a série continua.
+        EventOccurrenceException.objects.update_or_create(
+            event=event, original_start=original, defaults={'is_cancelled': True},
+        )
+    elif delete_all and event.recurrence_rule != 'none':
         # Excluir todos da série
         if event.recurrence_parent_id:
             parent = event.recurrence_parent
@@ -1021,11 +1051,15 @@ def api_event_delete(request, pk):
 
 
 @login_required
+@conditional_poll(lambda request: [('agenda_invites', request.user.pk)])
 def api_event_invitations(request):
-    """Lista convites pendentes para eventos"""
+    """Lista convites pendentes para eventos (``?since=<id>`` traz só os novos)"""
     invitations = EventParticipant.objects.filter(
         user=request.user, status='pending'
     ).select_related('event', 'event__owner').order_by('-invited_at')
+    since = since_param(request)
+    if since is not None:
+        invitations = invitations.filter(pk__gt=since)
     
     data = []
     for inv in invitations:
@@ -1696,14 +1730,15 @@ def _extract_whisper_text_and_duration(whisper_response):
     return raw_text.strip(), duration
 
 
-def _transcribe_audio_from_storage(client, field_file, duration_hint=0):
+def _transcribe_audio_from_storage(client, field_file, duration_hint=0, transcription=None):
     """Transcreve um áudio armazenado no storage (S3/local) com uso seguro de memória."""
     temp_source_path = _copy_storage_file_to_temp(field_file)
     original_name = os.path.basename(getattr(field_file, 'name', '') or 'audio.webm')
 
     try:
         return _transcribe_audio_path(
-            client, temp_source_path, original_name, duration_hint=duration_hint
+            client, temp_source_path, original_name, duration_hint=duration_hint,
+            transcription=transcription,
         )
     finally:
         if os.path.exists(temp_source_path):
@@ -1727,8 +1762,12 @@ def _probe_audio_duration_seconds(file_path):
         return None
 
 
-def _transcribe_audio_path(client, source_path, original_filename, duration_hint=0):
-    """Converte para mp3 quando possível, divide em partes se necessário e transcreve com retry."""
+def _transcribe_audio_path(client, source_path, original_filename, duration_hint=0, transcription=None):
+    """Converte para mp3 quando possível, divide em partes se necessário e transcreve com retry.
+
+    Com ``transcription``, as partes de áudios longos ficam gravadas e uma
+    nova chamada retoma só o que faltou.
+    """
     whisper_max_size = 24 * 1024 * 1024  # 24MB
     long_audio_seconds = 1500  # acima de ~25min, segmentar para mais robustez
 
@@ -1744,7 +1783,7 @@ def _transcribe_audio_path(client, source_path, original_filename, duration_hint
     if duration_seconds and duration_seconds >= long_audio_seconds:
         try:
             raw_text = _split_and_transcribe(
-                client, source_path, total_duration_hint=duration_seconds
+                client, source_path, total_duration_hint=duration_seconds, transcription=transcription
             )
             return raw_text, int(duration_seconds)
         except Exception:
@@ -1770,7 +1809,8 @@ def _transcribe_audio_path(client, source_path, original_filename, duration_hint
 
             # Se ainda for grande, divide em segmentos
             raw_text = _split_and_transcribe(
-                client, mp3_path, total_duration_hint=duration_seconds or duration_hint
+                client, mp3_path, total_duration_hint=duration_seconds or duration_hint,
+                transcription=transcription,
             )
             return raw_text, duration_seconds
         finally:
@@ -1781,7 +1821,7 @@ def _transcribe_audio_path(client, source_path, original_filename, duration_hint
     try:
         if os.path.getsize(source_path) > whisper_max_size:
             # Tenta dividir o arquivo original sem converter
-            raw_text = _split_and_transcribe_raw(client, source_path)
+            raw_text = _split_and_transcribe_raw(client, source_path, transcription=transcription)
             return raw_text, duration_seconds
     except Exception:
         pass
@@ -1817,123 +1857,28 @@ def _try_transcribe_file(client, file_path, is_converted=False, max_retries=2, r
             raise
 
 
-def _split_and_transcribe(client, mp3_path, total_duration_hint=0):
-    """Divide áudio grande em segmentos de tempo e concatena as transcrições com retry."""
+def _split_and_transcribe(client, mp3_path, total_duration_hint=0, transcription=None):
+    """Divide áudio grande em segmentos de tempo transcritos em paralelo (ver transcription_pipeline)."""
     # Fallback para o hint (cronômetro do cliente) quando o ffprobe não consegue
     # ler a duração — sem isso, gravações longas seriam truncadas em 1h.
     total_duration = _probe_audio_duration_seconds(mp3_path) or int(total_duration_hint or 0) or 3600
-
-    if total_duration >= 6 * 3600:
-        segment_seconds = 900
-    else:
-        segment_seconds = 720
-
-    tmp_dir = tempfile.mkdtemp()
-    all_text_parts = []
-
-    try:
-        start = 0.0
-        segment_index = 0
-        while start < total_duration:
-            seg_duration = min(segment_seconds, max(1, total_duration - start))
-            seg_path = os.path.join(tmp_dir, f'seg_{segment_index:04d}.mp3')
-            timeout = max(300, int(seg_duration * 3))
-
-            try:
-                subprocess.run(
-                    [
-                        'ffmpeg', '-y', '-ss', str(start), '-t', str(seg_duration), '-i', mp3_path,
-                        '-vn', '-acodec', 'libmp3lame', '-ab', '64k', '-ar', '16000', '-ac', '1', seg_path,
-                    ],
-                    capture_output=True,
-                    timeout=timeout,
-                    check=True,
-                )
-
-                text, _ = _try_transcribe_file(
-                    client,
-                    seg_path,
-                    is_converted=True,
-                    max_retries=3,
-                    response_format='text',
-                )
-                if text:
-                    all_text_parts.append(text.strip())
-            except Exception as err:
-                all_text_parts.append(f'[Segmento não transcrito: {str(err)[:80]}]')
-            finally:
-                if os.path.exists(seg_path):
-                    os.unlink(seg_path)
-
-            start += seg_duration
-            segment_index += 1
-
-        return '\n\n'.join([p for p in all_text_parts if p]).strip()
-    finally:
-        for name in os.listdir(tmp_dir):
-            file_path = os.path.join(tmp_dir, name)
-            if os.path.isfile(file_path):
-                os.unlink(file_path)
-        os.rmdir(tmp_dir)
+    return transcription_pipeline.transcribe_by_time(
+        mp3_path,
+        total_duration,
+        transcription_pipeline.get_transcriber(client),
+        transcription=transcription,
+    )
 
 
-def _split_and_transcribe_raw(client, source_path):
+def _split_and_transcribe_raw(client, source_path, transcription=None):
     """Divide arquivo de áudio SEM converter para MP3, segmentando por tamanho (backup)."""
-    whisper_max_size = 24 * 1024 * 1024  # 24MB
-    file_size = os.path.getsize(source_path)
-    
-    # Calcula quantos chunks são necessários
-    num_chunks = (file_size // whisper_max_size) + 1
-    if num_chunks <= 1:
+    if os.path.getsize(source_path) <= transcription_pipeline.WHISPER_MAX_BYTES:
         return _try_transcribe_file(client, source_path, is_converted=False, max_retries=2)[0]
-    
-    # Divide o arquivo em chunks
-    tmp_dir = tempfile.mkdtemp()
-    chunk_size = file_size // num_chunks + 1
-    all_text_parts = []
-    
-    try:
-        chunk_index = 0
-        with open(source_path, 'rb') as f:
-            while True:
-                chunk_data = f.read(chunk_size)
-                if not chunk_data:
-                    break
-                
-                chunk_path = os.path.join(tmp_dir, f'chunk_{chunk_index:03d}.webm')
-                with open(chunk_path, 'wb') as chunk_file:
-                    chunk_file.write(chunk_data)
-                
-                # Transcreve cada chunk
-                for attempt in range(2):
-                    try:
-                        with open(chunk_path, 'rb') as audio_stream:
-                            whisper_response = client.audio.transcriptions.create(
-                                model='whisper-1',
-                                file=audio_stream,
-                                language='pt',
-                                response_format='text',
-                            )
-                        text = whisper_response if isinstance(whisper_response, str) else str(whisper_response)
-                        if text and text.strip():
-                            all_text_parts.append(text.strip())
-                        break
-                    except Exception:
-                        if attempt < 1:
-                            import time
-                            time.sleep(2)
-                        else:
-                            all_text_parts.append(f'[Chunk {chunk_index} não processado]')
-                
-                chunk_index += 1
-        
-        return '\n\n'.join(all_text_parts).strip()
-    finally:
-        for name in os.listdir(tmp_dir):
-            file_path = os.path.join(tmp_dir, name)
-            if os.path.isfile(file_path):
-                os.unlink(file_path)
-        os.rmdir(tmp_dir)
+    return transcription_pipeline.transcribe_by_bytes(
+        source_path,
+        transcription_pipeline.get_transcriber(client),
+        transcription=transcription,
+    )
 
 
 def _ensure_transcription_calendar_event(transcription, user):
@@ -2006,13 +1951,15 @@ def _process_transcription_upload_job(
                 temp_path,
                 original_audio_name or os.path.basename(temp_path) or 'audio.webm',
                 duration_hint=duration_hint,
+                transcription=transcription,
             )
         else:
             if not transcription.audio_file:
                 raise ValueError('Arquivo de áudio não encontrado para processamento.')
 
             raw_text, duration = _transcribe_audio_from_storage(
-                client, transcription.audio_file, duration_hint=duration_hint
+                client, transcription.audio_file, duration_hint=duration_hint,
+                transcription=transcription,
             )
 
         if not raw_text:
@@ -2045,6 +1992,7 @@ def _process_transcription_upload_job(
         transcription.status = 'completed'
         transcription.error_message = ''
         transcription.save()
+        transcription_pipeline.forget_chunks(transcription)
 
         _ensure_transcription_calendar_event(transcription, transcription.owner)
         transcription.tasks_created.clear()
@@ -2083,6 +2031,7 @@ def _process_transcription_reprocess_job(transcription_id, client, options=None)
             client,
             transcription.audio_file,
             duration_hint=int(getattr(transcription, 'duration_seconds', 0) or 0),
+            transcription=transcription,
         )
         if duration:
             transcription.duration_seconds = duration
@@ -2117,6 +2066,7 @@ def _process_transcription_reprocess_job(transcription_id, client, options=None)
     transcription.status = 'completed'
     transcription.error_message = ''
     transcription.save()
+    transcription_pipeline.forget_chunks(transcription)
 
     _ensure_transcription_calendar_event(transcription, transcription.owner)
     transcription.tasks_created.clear()
@@ -166,6 +166,10 @@ class Product(models.Model):
     @property
     def primary_image(self):
         """Retorna a imagem principal do produto"""
+        if 'media' in getattr(self, '_prefetched_objects_cache', {}):
+            # Listagens com prefetch_related('media'): sem consulta por produto.
+            images = [m for m in self.media.all() if m.media_type == 'image']
+            return next((m for m in images if m.is_primary), images[0] if images else None)
         media = self.media.filter(media_type='image', is_primary=True).first()
         if not media:
             media = self.media.filter(media_type='image').first()
@@ -7,9 +7,6 @@ from django.http import HttpResponse, JsonResponse
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 from functools import wraps
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils import get_column_letter
 from datetime import timedelta
 
 from .models import (
@@ -24,8 +21,16 @@ from .forms import (
     ItemRequestCounterProposalForm, ItemRequestCounterProposalResponseForm
 )
 from users.models import User, Sector
+from core.images import prefetch_variants
+from core.lazy import lazy_attr, lazy_import
 from core.middleware import log_action
 
+openpyxl = lazy_import('openpyxl')
+Font = lazy_attr('openpyxl.styles', 'Font')
+Alignment = lazy_attr('openpyxl.styles', 'Alignment')
+PatternFill = lazy_attr('openpyxl.styles', 'PatternFill')
+get_column_letter = lazy_attr('openpyxl.utils', 'get_column_letter')
+
 
 # ============================================================================
 # DECORADORES E PERMISSÕES
@@ -224,6 +229,13 @@ def category_delete(request, pk):
 # PRODUTOS
 # ============================================================================
 
+def _prefetch_primary_image_variants(page_obj):
+    """Uma consulta para as miniaturas de todos os produtos da página."""
+    prefetch_variants(
+        product.primary_image.file for product in page_obj if product.primary_image
+    )
+
+
 @login_required
 def product_list(request):
     """Lista todos os produtos"""
@@ -231,7 +243,7 @@ def product_list(request):
     category_filter = request.GET.get('category', '')
     status_filter = request.GET.get('status', '')
     
-    products = Product.objects.filter(is_active=True).select_related('category')
+    products = Product.objects.filter(is_active=True).select_related('category').prefetch_related('media')
     
     if query:
         products = products.filter(
@@ -252,6 +264,7 @@ def product_list(request):
     paginator = Paginator(products, 20)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    _prefetch_primary_image_variants(page_obj)
     
     categories = InventoryCategory.objects.filter(is_active=True)
     
@@ -1384,6 +1397,7 @@ def store_catalog(request):
     # Paginação
     paginator = Paginator(products, 12)
     page_obj = paginator.get_page(request.GET.get('page'))
+    _prefetch_primary_image_variants(page_obj)
     
     # Minhas solicitações recentes
     my_recent_requests = ItemRequest.objects.filter(
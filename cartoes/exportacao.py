@@ -95,6 +95,7 @@ def conciliacao_excel(cartao, relatorio, referencia=None):
         ('Diferença', float(relatorio['diferenca_total'])),
         ('', ''),
         ('Lançamentos conferidos', len(relatorio['conferidos'])),
+        ('Conferidos só pelo valor (conferir)', relatorio['qualidade']['fraca']),
         ('Divergências de valor', len(relatorio['divergentes'])),
         ('Na fatura e não lançados', len(relatorio['so_na_fatura'])),
         ('Lançados e ausentes da fatura', len(relatorio['so_no_extrato'])),
@@ -147,7 +148,7 @@ def conciliacao_excel(cartao, relatorio, referencia=None):
     aba = livro.create_sheet('Conferidos')
     _estilizar_cabecalho(aba, [
         ('Data na fatura', 14), ('Estabelecimento', 40), ('Valor (R$)', 16),
-        ('Data no portal', 14), ('Lançado por', 26)])
+        ('Data no portal', 14), ('Lançado por', 26), ('Casamento', 12)])
     for i, item in enumerate(relatorio['conferidos'], start=2):
         f, g = item['fatura'], item['gasto']
         aba.cell(row=i, column=1, value=f['data']).number_format = DATA_BR
@@ -156,6 +157,7 @@ def conciliacao_excel(cartao, relatorio, referencia=None):
         aba.cell(row=i, column=4, value=g.data_gasto).number_format = DATA_BR
         aba.cell(row=i, column=5,
                  value=getattr(g.criado_por, 'full_name', '') or '')
+        aba.cell(row=i, column=6, value=item['qualidade'])
 
     marca = f"_{referencia:%Y%m}" if referencia else ''
     return _resposta(livro, f'conciliacao_cartao_{cartao.last4}{marca}.xlsx')
@@ -23,6 +23,8 @@ import unicodedata
 from datetime import date
 from decimal import Decimal, InvalidOperation
 
+from core.reconciliation import Reconciler, match_grade, merchant_key
+
 logger = logging.getLogger(__name__)
 
 ZERO = Decimal('0.00')
@@ -252,25 +254,6 @@ def ler_fatura(arquivo, referencia=None):
 TOLERANCIA_DIAS = 3
 
 
-def _chave_estabelecimento(texto):
-    """Nome comparável: sem acento, sem pontuação, sem espaço, em maiúsculas.
-
-    A fatura vem sem espaços ('PADARIANOVAREPUBLICA') e o portal, com eles.
-    Comparar sem separador algum é o que faz os dois se encontrarem.
-    """
-    return re.sub(r'[^A-Z0-9]', '', _sem_acento(texto).upper())
-
-
-def _parecidos(a, b):
-    """Um nome contém o outro — suficiente para 'PADARIA NOVA REPUBLICA'
-    casar com 'PADARIANOVAREPUBLICA*SP'."""
-    ka, kb = _chave_estabelecimento(a), _chave_estabelecimento(b)
-    if not ka or not kb:
-        return False
-    menor, maior = sorted((ka, kb), key=len)
-    return len(menor) >= 5 and menor in maior
-
-
 def conciliar(lancamentos_fatura, gastos):
     """Cruza a fatura com os gastos lançados no portal.
 
@@ -280,45 +263,42 @@ def conciliar(lancamentos_fatura, gastos):
     conciliar por nome parecido com valor diferente esconderia justamente o
     erro que se quer achar.
 
+    Os gastos ficam indexados por (valor, dia) e por trigramas do nome
+    (``core.reconciliation``): cada linha da fatura consulta só os seus
+    candidatos, em vez de varrer todos os pendentes.
+
     Devolve quatro listas:
 
-    * ``conferidos``     — bateram valor e data
+    * ``conferidos``     — bateram valor e data (com a ``qualidade`` do casamento)
     * ``divergentes``    — mesmo estabelecimento e data próxima, valor diferente
     * ``so_na_fatura``   — cobrado e não lançado no portal
     * ``so_no_extrato``  — lançado no portal e ausente da fatura
     """
-    from datetime import timedelta
-
-    pendentes = list(gastos)
+    gastos = list(gastos)
+    motor = Reconciler(
+        gastos,
+        amount=lambda g: g.valor,
+        when=lambda g: g.data_gasto,
+        name=lambda g: g.estabelecimento,
+        tolerance_days=TOLERANCIA_DIAS,
+    )
     conferidos, divergentes, so_na_fatura = [], [], []
+    qualidade = {'exata': 0, 'forte': 0, 'fraca': 0}
 
     for item in lancamentos_fatura:
-        candidatos = [
-            g for g in pendentes
-            if g.valor == item['valor']
-            and abs((g.data_gasto - item['data']).days) <= TOLERANCIA_DIAS
-        ]
-        if candidatos:
-            candidatos.sort(key=lambda g: (
-                not _parecidos(g.estabelecimento, item['estabelecimento']),
-                abs((g.data_gasto - item['data']).days),
-            ))
-            escolhido = candidatos[0]
-            pendentes.remove(escolhido)
-            conferidos.append({'fatura': item, 'gasto': escolhido})
+        chave = merchant_key(item['estabelecimento'])
+        achado = motor.best_same_amount(item['valor'], item['data'], chave)
+        if achado:
+            escolhido, parecido, dias = achado
+            nota = match_grade(parecido, dias)
+            qualidade[nota] += 1
+            conferidos.append({'fatura': item, 'gasto': escolhido, 'qualidade': nota})
             continue
 
         # Sem valor igual: procura o mesmo estabelecimento por perto. Se achar,
         # é divergência de valor — o caso que mais interessa ao financeiro.
-        perto = [
-            g for g in pendentes
-            if abs((g.data_gasto - item['data']).days) <= TOLERANCIA_DIAS
-            and _parecidos(g.estabelecimento, item['estabelecimento'])
-        ]
-        if perto:
-            perto.sort(key=lambda g: abs((g.data_gasto - item['data']).days))
-            escolhido = perto[0]
-            pendentes.remove(escolhido)
+        escolhido = motor.best_similar(item['data'], chave)
+        if escolhido is not None:
             divergentes.append({
                 'fatura': item, 'gasto': escolhido,
                 'diferenca': item['valor'] - escolhido.valor,
@@ -327,14 +307,18 @@ def conciliar(lancamentos_fatura, gastos):
 
         so_na_fatura.append(item)
 
+    pendentes = motor.remaining()
     total_fatura = sum((i['valor'] for i in lancamentos_fatura), ZERO)
     total_extrato = sum((g.valor for g in gastos), ZERO)
+    linhas = len(lancamentos_fatura)
+    qualidade['taxa'] = round(100 * len(conferidos) / linhas, 1) if linhas else 0.0
 
     return {
         'conferidos': conferidos,
         'divergentes': divergentes,
         'so_na_fatura': so_na_fatura,
         'so_no_extrato': sorted(pendentes, key=lambda g: g.data_gasto),
+        'qualidade': qualidade,
         'total_fatura': total_fatura,
         'total_extrato': total_extrato,
         'diferenca_total': total_fatura - total_extrato,
@@ -0,0 +1,155 @@
+"""
+Mede a conciliação da fatura (cartoes.fatura.conciliar) numa fatura sintética.
+
+Gera N linhas de fatura e os gastos do portal correspondentes, com os
+desvios do dia a dia:
+
+* data um a três dias antes;
+* nome com espaços e acentos ('PADARIA NOVA REPÚBLICA' × 'PADARIANOVAREPUBLICA');
+* valor digitado errado;
+* gasto não lançado e gasto lançado sem cobrança;
+* várias compras de mesmo valor no mesmo dia.
+
+Como o gabarito é conhecido, além do tempo o comando mostra a qualidade:
+quantos conferidos casaram com o gasto certo e quantas divergências foram
+achadas. ``--referencia`` roda também a varredura quadrática antiga e confere
+que as duas chegam ao mesmo resultado (use com N menor).
+
+    python manage.py benchmark_conciliacao --linhas 20000
+"""
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from cartoes.fatura import TOLERANCIA_DIAS, conciliar
+from core.reconciliation import merchant_key, similar_keys
+
+BAIRROS = [
+    'Centro', 'Moema', 'Pinheiros', 'Tatuape', 'Lapa', 'Butanta', 'Mooca', 'Santana', 'Ipiranga',
+    'Perdizes', 'Vila Mariana', 'Jabaquara', 'Penha', 'Brooklin', 'Saude', 'Aclimacao',
+    'Liberdade', 'Bela Vista', 'Consolacao', 'Higienopolis', 'Barra Funda', 'Casa Verde',
+    'Tucuruvi', 'Campo Belo', 'Itaim', 'Morumbi', 'Jardins', 'Freguesia', 'Pirituba', 'Vila Prudente',
+]
+ESTABELECIMENTOS = [
+    'Padaria Nova República', 'Posto Ipiranga Centro', 'Drogaria São Paulo', 'Vivo Fibra',
+    'Kalunga Papelaria', 'Restaurante Sabor & Arte', 'Uber do Brasil', 'Estacionamento Shopping',
+    'Mercado Pão de Açúcar', 'Leroy Merlin', 'Correios Agência', 'Cartório 2º Ofício',
+]
+
+
+def _na_fatura(nome):
+    """Como o banco imprime: maiúsculas, sem espaço, às vezes com sufixo de cidade."""
+    return merchant_key(nome) + random.choice(['', '', '*SP', 'SAOPAULO'])
+
+
+def fatura_sintetica(linhas, seed=42):
+    """(lançamentos da fatura, gastos do portal, gabarito linha → gasto)."""
+    random.seed(seed)
+    inicio = date(2025, 1, 1)
+    lancamentos, gastos, gabarito = [], [], {}
+    for i in range(linhas):
+        nome = f'{random.choice(ESTABELECIMENTOS)} {random.choice(BAIRROS)}'
+        quando = inicio + timedelta(days=random.randrange(30))
+        valor = Decimal(random.choice([19.90, 49.90, 100, 250]) if random.random() < 0.2
+                        else random.randrange(500, 90000) / 100).quantize(Decimal('0.01'))
+        lancamentos.append({'last4': '1234', 'data': quando, 'valor': valor,
+                            'estabelecimento': _na_fatura(nome), 'parcela': ''})
+        sorte = random.random()
+        if sorte < 0.07:
+            continue                       # não lançado no portal
+        if sorte < 0.10:
+            valor += Decimal('10.00')      # digitado errado
+        gasto = SimpleNamespace(
+            id=len(gastos), valor=valor, estabelecimento=nome,
+            data_gasto=quando - timedelta(days=random.randrange(TOLERANCIA_DIAS + 1)),
+        )
+        gastos.append(gasto)
+        gabarito[i] = gasto.id
+    for _ in range(linhas // 50):          # lançado e sem cobrança
+        gastos.append(SimpleNamespace(
+            id=len(gastos), valor=Decimal('77.77'), estabelecimento='Despesa sem fatura',
+            data_gasto=inicio + timedelta(days=random.randrange(30)),
+        ))
+    gastos.sort(key=lambda g: (g.data_gasto, g.id))
+    return lancamentos, gastos, gabarito
+
+
+def conciliar_varredura(lancamentos, gastos):
+    """A conciliação antiga: varre os pendentes para cada linha. Só para conferência."""
+    pendentes = list(gastos)
+    conferidos, divergentes = [], []
+    for item in lancamentos:
+        chave = merchant_key(item['estabelecimento'])
+        candidatos = [g for g in pendentes if g.valor == item['valor']
+                      and abs((g.data_gasto - item['data']).days) <= TOLERANCIA_DIAS]
+        if candidatos:
+            candidatos.sort(key=lambda g: (not similar_keys(merchant_key(g.estabelecimento), chave),
+                                           abs((g.data_gasto - item['data']).days)))
+            pendentes.remove(candidatos[0])
+            conferidos.append((id(item), candidatos[0].id))
+            continue
+        perto = [g for g in pendentes if abs((g.data_gasto - item['data']).days) <= TOLERANCIA_DIAS
+                 and similar_keys(merchant_key(g.estabelecimento), chave)]
+        if perto:
+            perto.sort(key=lambda g: abs((g.data_gasto - item['data']).days))
+            pendentes.remove(perto[0])
+            divergentes.append((id(item), perto[0].id))
+    return conferidos, divergentes
+
+
+class Command(BaseCommand):
+    help = 'Benchmark da conciliação de fatura com uma fatura sintética'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=10000, help='Linhas da fatura (padrão 10000)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--referencia',
+            action='store_true',
+            help='Roda também a varredura antiga e compara os resultados'
+        )
+
+    def handle(self, *args, **options):
+        lancamentos, gastos, gabarito = fatura_sintetica(options['linhas'], options['seed'])
+        self.stdout.write(f'{len(lancamentos)} linhas de fatura, {len(gastos)} gastos no portal')
+
+        inicio = time.perf_counter()
+        relatorio = conciliar(lancamentos, gastos)
+        decorrido = time.perf_counter() - inicio
+
+        linha_de = {id(item): i for i, item in enumerate(lancamentos)}
+        certos = sum(1 for c in relatorio['conferidos']
+                     if gabarito.get(linha_de[id(c['fatura'])]) == c['gasto'].id)
+        divergencias_reais = sum(1 for d in relatorio['divergentes']
+                                 if gabarito.get(linha_de[id(d['fatura'])]) == d['gasto'].id)
+        qualidade = relatorio['qualidade']
+
+        self.stdout.write(f'Conciliação: {decorrido * 1000:.0f} ms '
+                          f'({len(lancamentos) / max(decorrido, 1e-9):,.0f} linhas/s)')
+        self.stdout.write(
+            f'Conferidos: {len(relatorio["conferidos"])} ({qualidade["taxa"]}% da fatura) — '
+            f'exata {qualidade["exata"]}, forte {qualidade["forte"]}, fraca {qualidade["fraca"]}'
+        )
+        if relatorio['conferidos']:
+            self.stdout.write(f'  casados com o gasto certo: {100 * certos / len(relatorio["conferidos"]):.1f}%')
+        self.stdout.write(f'Divergências: {len(relatorio["divergentes"])} ({divergencias_reais} no gasto certo)')
+        self.stdout.write(f'Não lançados: {len(relatorio["so_na_fatura"])}  '
+                          f'Sem cobrança: {len(relatorio["so_no_extrato"])}')
+
+        if options['referencia']:
+            inicio = time.perf_counter()
+            conferidos, divergentes = conciliar_varredura(lancamentos, gastos)
+            antigo = time.perf_counter() - inicio
+            iguais = (
+                conferidos == [(id(c['fatura']), c['gasto'].id) for c in relatorio['conferidos']]
+                and divergentes == [(id(d['fatura']), d['gasto'].id) for d in relatorio['divergentes']]
+            )
+            self.stdout.write(f'Varredura antiga: {antigo * 1000:.0f} ms ({antigo / max(decorrido, 1e-9):.0f}x)')
+            if iguais:
+                self.stdout.write(self.style.SUCCESS('Mesmo resultado da varredura antiga'))
+            else:
+                self.stdout.write(self.style.ERROR('Resultado diferente da varredura antiga'))
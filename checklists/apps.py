@@ -4,4 +4,9 @@ from django.apps import AppConfig
 class ChecklistsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'checklists'
-    verbose_name = 'Checklists'
\ No newline at end of file
+    verbose_name = 'Checklists'
+
+    def ready(self):
+        # Mantém o progresso gravado e o resumo diário dos painéis.
+        from . import summary
+        summary.connect_signals()
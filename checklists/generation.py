@@ -0,0 +1,145 @@
+"""
+Geração das execuções de checklist em conjunto (set-based).
+
+O gerador antigo fazia, para cada data × período da atribuição, um
+``get_or_create`` da execução, re-consultava as tarefas do template e criava
+cada ``ChecklistTaskExecution`` com um ``create()`` próprio — uma atribuição
+diária de um mês com 30 tarefas virava milhares de idas ao banco.
+
+Aqui os slots (data, período) são calculados em memória, as execuções já
+existentes vêm numa consulta só e o que falta entra por ``bulk_create`` em
+lotes. As unique constraints de ``ChecklistExecution`` (atribuição, data,
+período) e ``ChecklistTaskExecution`` (execução, tarefa) tornam a geração
+idempotente mesmo com duas chamadas simultâneas (``ignore_conflicts``).
+
+Com ``until`` a geração é "preguiçosa": materializa só uma janela à frente
+(ver o comando ``materialize_checklists``), em vez do intervalo inteiro.
+"""
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+from . import summary
+from .models import ChecklistAssignment, ChecklistExecution, ChecklistTask, ChecklistTaskExecution
+
+BATCH_SIZE = 500
+
+
+def assignment_periods(assignment) -> List[str]:
+    if assignment.period == 'both':
+        return ['morning', 'afternoon']
+    return [assignment.period]
+
+
+def assignment_slots(assignment, from_date: Optional[date] = None,
+                     until: Optional[date] = None) -> List[Tuple[date, str]]:
+    """(data, período) que a atribuição deve ter, opcionalmente dentro de [from_date, until]."""
+    periods = assignment_periods(assignment)
+    return [
+        (exec_date, period)
+        for exec_date in assignment.get_active_dates()
+        if (from_date is None or exec_date >= from_date) and (until is None or exec_date <= until)
+        for period in periods
+    ]
+
+
+def _tasks_by_template(template_ids: Iterable[int]) -> Dict[int, List[int]]:
+    tasks: Dict[int, List[int]] = {}
+    for template_id, task_id in ChecklistTask.objects.filter(
+        template_id__in=set(template_ids)
+    ).values_list('template_id', 'id'):
+        tasks.setdefault(template_id, []).append(task_id)
+    return tasks
+
+
+def ensure_task_executions(executions: Iterable[ChecklistExecution]) -> int:
+    """Cria as ``ChecklistTaskExecution`` que faltam para as execuções informadas.
+
+    Execuções criadas antes das tarefas do template (ou por um fluxo que
+    falhou no meio) ficavam sem tarefas; aqui é uma consulta para as tarefas,
+    uma para o que existe e ``bulk_create`` do resto.
+    """
+    executions = list(executions)
+    if not executions:
+        return 0
+
+    template_of = {e.pk: e.assignment.template_id for e in executions}
+    tasks = _tasks_by_template(template_of.values())
+
+    existing = set(
+        ChecklistTaskExecution.objects.filter(execution_id__in=list(template_of))
+        .values_list('execution_id', 'task_id')
+    )
+    missing = [
+        ChecklistTaskExecution(execution_id=execution_id, task_id=task_id)
+        for execution_id, template_id in template_of.items()
+        for task_id in tasks.get(template_id, [])
+        if (execution_id, task_id) not in existing
+    ]
+    ChecklistTaskExecution.objects.bulk_create(missing, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    if missing:
+        # bulk_create não dispara signals: o progresso gravado é refeito aqui.
+        summary.touch(execution_ids={task.execution_id for task in missing})
+    return len(missing)
+
+
+def materialize_executions(assignments: Iterable[ChecklistAssignment],
+                           from_date: Optional[date] = None,
+                           until: Optional[date] = None) -> Dict[str, int]:
+    """Garante execuções e tarefas de todas as atribuições (ou da janela pedida).
+
+    Retorna ``{'executions_created': n, 'task_executions_created': m}``.
+    """
+    assignments = list(assignments)
+    stats = {'executions_created': 0, 'task_executions_created': 0}
+    if not assignments:
+        return stats
+
+    wanted = {
+        (assignment.pk, exec_date, period)
+        for assignment in assignments
+        for exec_date, period in assignment_slots(assignment, from_date, until)
+    }
+    if not wanted:
+        return stats
+
+    dates = [d for _, d, _ in wanted]
+    assignment_ids = [a.pk for a in assignments]
+
+    def _existing():
+        return ChecklistExecution.objects.filter(
+            assignment_id__in=assignment_ids,
+            execution_date__gte=min(dates),
+            execution_date__lte=max(dates),
+        ).select_related('assignment').only('id', 'assignment_id', 'execution_date', 'period', 'assignment__template_id')
+
+    existing_keys = {
+        (e.assignment_id, e.execution_date, e.period) for e in _existing()
+    }
+    missing = [
+        ChecklistExecution(assignment_id=assignment_id, execution_date=exec_date, period=period, status='pending')
+        for assignment_id, exec_date, period in sorted(wanted - existing_keys)
+    ]
+    # ignore_conflicts: uma chamada concorrente pode ter criado o mesmo slot.
+    ChecklistExecution.objects.bulk_create(missing, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    stats['executions_created'] = len(missing)
+    summary.touch(dates={execution.execution_date for execution in missing})
+
+    # Relê com os ids (o bulk_create com ignore_conflicts não os devolve) e
+    # completa as tarefas de todas as execuções da janela de uma vez.
+    executions = [e for e in _existing() if (e.assignment_id, e.execution_date, e.period) in wanted]
+    stats['task_executions_created'] = ensure_task_executions(executions)
+    return stats
+
+
+def materialize_window(days_ahead: int = 14, today: Optional[date] = None) -> Dict[str, int]:
+    """Materializa de hoje até ``days_ahead`` dias à frente para as atribuições ativas."""
+    today = today or timezone.localdate()
+    until = today + timedelta(days=days_ahead)
+    # Datas personalizadas não respeitam start/end_date (ver get_active_dates).
+    assignments = ChecklistAssignment.objects.filter(is_active=True).filter(
+        Q(schedule_type='custom') | Q(start_date__lte=until, end_date__gte=today)
+    )
+    return materialize_executions(assignments, from_date=today, until=until)
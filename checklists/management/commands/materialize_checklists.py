@@ -0,0 +1,42 @@
+"""
+Materializa as execuções de checklist numa janela móvel à frente.
+
+Sugestão de cron (diário, de madrugada):
+    python manage.py materialize_checklists --days 14
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from checklists.generation import materialize_window
+
+
+class Command(BaseCommand):
+    help = 'Cria (em lote) as execuções e tarefas de checklist dos próximos dias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=14,
+            help='Quantos dias à frente materializar (padrão: 14)'
+        )
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='Data inicial (YYYY-MM-DD). Padrão: hoje.'
+        )
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError('Data inválida. Use o formato YYYY-MM-DD')
+
+        stats = materialize_window(days_ahead=options['days'], today=today)
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['executions_created']} execução(ões) e "
+            f"{stats['task_executions_created']} tarefa(s) criadas."
+        ))
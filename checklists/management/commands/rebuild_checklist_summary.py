@@ -0,0 +1,33 @@
+"""
+Refaz o progresso gravado das execuções e o resumo diário dos painéis.
+
+Os signals mantêm os dois em dia; este comando serve para corrigir depois de
+uma carga direta no banco ou de um script que usou ``QuerySet.update``:
+    python manage.py rebuild_checklist_summary --from 2026-01-01
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from checklists.summary import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Reconta o progresso das execuções de checklist e o resumo diário'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=str, help='Data inicial (YYYY-MM-DD). Padrão: tudo.')
+        parser.add_argument('--to', dest='date_to', type=str, help='Data final (YYYY-MM-DD). Padrão: tudo.')
+
+    def handle(self, *args, **options):
+        try:
+            date_from = date.fromisoformat(options['date_from']) if options['date_from'] else None
+            date_to = date.fromisoformat(options['date_to']) if options['date_to'] else None
+        except ValueError:
+            raise CommandError('Data inválida. Use o formato YYYY-MM-DD')
+
+        stats = rebuild(date_from, date_to)
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['executions']} execução(ões) recontada(s); "
+            f"{stats['days']} dia(s) e {stats['rows']} linha(s) de resumo."
+        ))
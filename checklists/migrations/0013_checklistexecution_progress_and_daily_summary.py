@@ -0,0 +1,70 @@
+# Generated by Django 5.2.5 on 2026-10-18 22:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def preencher_resumo(apps, schema_editor):
+    """Grava o progresso das execuções existentes e monta o resumo diário."""
+    ChecklistExecution = apps.get_model('checklists', 'ChecklistExecution')
+    ChecklistTaskExecution = apps.get_model('checklists', 'ChecklistTaskExecution')
+    ChecklistDailySummary = apps.get_model('checklists', 'ChecklistDailySummary')
+
+    def tarefas(**extra):
+        return Coalesce(models.Subquery(
+            ChecklistTaskExecution.objects.filter(execution=models.OuterRef('pk'), **extra)
+            .order_by().values('execution').annotate(n=models.Count('id')).values('n')
+        ), models.Value(0))
+
+    ChecklistExecution.objects.update(tasks_total=tarefas(), tasks_completed=tarefas(is_completed=True))
+    ChecklistDailySummary.objects.bulk_create([
+        ChecklistDailySummary(date=dia, sector_id=sector_id, assignee_id=assignee_id,
+                              period=period, status=status, executions=n)
+        for dia, sector_id, assignee_id, period, status, n in
+        ChecklistExecution.objects.values_list('execution_date', 'assignment__template__sector_id',
+                                               'assignment__assigned_to_id', 'period', 'status')
+        .annotate(n=models.Count('id')).order_by()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checklists', '0012_add_assignment_approval_system'),
+        ('users', '0032_user_tangerino_employee_id_user_tangerino_synced_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checklistexecution',
+            name='tasks_completed',
+            field=models.PositiveIntegerField(default=0, verbose_name='Tarefas Concluídas'),
+        ),
+        migrations.AddField(
+            model_name='checklistexecution',
+            name='tasks_total',
+            field=models.PositiveIntegerField(default=0, verbose_name='Total de Tarefas'),
+        ),
+        migrations.CreateModel(
+            name='ChecklistDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('period', models.CharField(choices=[('morning', 'Manhã'), ('afternoon', 'Tarde')], max_length=10, verbose_name='Período')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('in_progress', 'Em Andamento'), ('completed', 'Concluído'), ('overdue', 'Atrasado'), ('awaiting_approval', 'Aguardando Aprovação')], max_length=20, verbose_name='Status')),
+                ('executions', models.PositiveIntegerField(default=0, verbose_name='Execuções')),
+                ('assignee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Responsável')),
+                ('sector', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.sector', verbose_name='Setor')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Checklists',
+                'verbose_name_plural': 'Resumos Diários de Checklists',
+                'indexes': [models.Index(fields=['assignee', 'status', 'date'], name='checklist_resumo_resp_idx'), models.Index(fields=['sector', 'date'], name='checklist_resumo_setor_idx')],
+                'unique_together': {('date', 'sector', 'assignee', 'period', 'status')},
+            },
+        ),
+        migrations.RunPython(preencher_resumo, migrations.RunPython.noop),
+    ]
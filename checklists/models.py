@@ -414,8 +414,12 @@ class ChecklistExecutionQuerySet(models.QuerySet):
         )
 
     def para_listagem(self):
-        """O par que toda tela de listagem quer: contexto + progresso."""
-        return self.com_contexto().com_progresso()
+        """O que toda tela de listagem quer: o contexto.
+
+        O progresso já vem nas colunas ``tasks_total``/``tasks_completed``;
+        ``com_progresso()`` fica para quem precisa recontar.
+        """
+        return self.com_contexto()
 
 
 class ChecklistExecution(models.Model):
@@ -464,6 +468,11 @@ class ChecklistExecution(models.Model):
     
     # Observações
     notes = models.TextField(blank=True, verbose_name='Observações')
+
+    # Progresso gravado, mantido por checklists/summary.py quando as tarefas
+    # mudam. As listagens leem daqui em vez de contar as tarefas de cada linha.
+    tasks_total = models.PositiveIntegerField(default=0, verbose_name='Total de Tarefas')
+    tasks_completed = models.PositiveIntegerField(default=0, verbose_name='Tarefas Concluídas')
     
     class Meta:
         verbose_name = 'Execução de Checklist'
@@ -477,15 +486,20 @@ class ChecklistExecution(models.Model):
     
     @property
     def total_tarefas(self):
-        """Usa a anotação de ``com_progresso()`` quando ela veio junto."""
+        """Anotação de ``com_progresso()``, senão o total gravado na linha."""
         anotado = getattr(self, '_total_tarefas', None)
-        return anotado if anotado is not None else self.task_executions.count()
+        if anotado is not None:
+            return anotado
+        # Linha ainda sem tarefas contadas (criada antes dos signals, por exemplo).
+        return self.tasks_total or self.task_executions.count()
 
     @property
     def tarefas_feitas(self):
         anotado = getattr(self, '_tarefas_feitas', None)
         if anotado is not None:
             return anotado
+        if self.tasks_total:
+            return self.tasks_completed
         return self.task_executions.filter(is_completed=True).count()
 
     @property
@@ -493,9 +507,9 @@ class ChecklistExecution(models.Model):
         """Porcentagem de conclusão.
 
         Prefere os números anotados por ``ChecklistExecution.objects.com_progresso()``
-        e só vai ao banco quando a consulta não os trouxe — assim as telas de
-        listagem não disparam dois COUNT por linha e o resto do código que usa
-        a propriedade continua funcionando sem mudança.
+        e, sem eles, os gravados em ``tasks_total``/``tasks_completed`` — assim
+        as telas de listagem não disparam dois COUNT por linha e o resto do
+        código que usa a propriedade continua funcionando sem mudança.
         """
         total = self.total_tarefas
         if not total:
@@ -648,6 +662,33 @@ class ChecklistTaskExecution(models.Model):
             execution.save()
 
 
+class ChecklistDailySummary(models.Model):
+    """Quantas execuções há por dia, setor, responsável, período e status.
+
+    Tabela de leitura dos painéis, mantida por ``checklists/summary.py``. O
+    setor é o do template (o mesmo recorte que as telas de supervisor usam).
+    """
+
+    date = models.DateField(verbose_name='Data')
+    sector = models.ForeignKey(Sector, on_delete=models.CASCADE, related_name='+', verbose_name='Setor')
+    assignee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name='Responsável')
+    period = models.CharField(max_length=10, choices=ChecklistExecution.PERIOD_CHOICES, verbose_name='Período')
+    status = models.CharField(max_length=20, choices=ChecklistExecution.STATUS_CHOICES, verbose_name='Status')
+    executions = models.PositiveIntegerField(default=0, verbose_name='Execuções')
+
+    class Meta:
+        verbose_name = 'Resumo Diário de Checklists'
+        verbose_name_plural = 'Resumos Diários de Checklists'
+        unique_together = ['date', 'sector', 'assignee', 'period', 'status']
+        indexes = [
+            models.Index(fields=['assignee', 'status', 'date'], name='checklist_resumo_resp_idx'),
+            models.Index(fields=['sector', 'date'], name='checklist_resumo_setor_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.date} {self.assignee_id} {self.period} {self.status}: {self.executions}'
+
+
 class ChecklistAssignmentApprover(models.Model):
     """Define quais usuários podem aprovar atribuições de checklists"""
     
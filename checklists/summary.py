@@ -0,0 +1,224 @@
+"""Modelo de leitura dos painéis de checklist.
+
+O dashboard montava, para supervisores e superadmins, várias consultas de
+execuções com ``COUNT`` das tarefas de cada uma, juntava tudo em listas com
+``itertools.chain`` e filtrava por status em Python; a visão macro e os
+relatórios recontavam o histórico inteiro a cada acesso. Agora há duas coisas
+gravadas, mantidas por signals:
+
+* ``ChecklistExecution.tasks_total``/``tasks_completed`` — o progresso da
+  execução, recontado quando uma tarefa dela é gravada ou apagada;
+* ``ChecklistDailySummary`` — execuções por (data, setor, responsável,
+  período, status). Quando uma execução muda, o dia dela é refeito inteiro a
+  partir das execuções (um ``GROUP BY`` pequeno, pelo índice de data).
+
+O trabalho é acumulado durante a transação e feito uma vez no commit: apagar
+mil execuções refaz cada dia afetado uma vez, não mil. Caminhos que não
+disparam signals (``bulk_create``, ``QuerySet.update``) chamam ``touch``.
+``manage.py rebuild_checklist_summary`` refaz tudo (ou um intervalo).
+"""
+import threading
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import (
+    ChecklistAssignment, ChecklistDailySummary, ChecklistExecution, ChecklistTaskExecution, ChecklistTemplate,
+)
+
+BATCH_SIZE = 500
+SUMMARY_KEY = ['date', 'sector', 'assignee', 'period', 'status']
+
+_local = threading.local()
+
+
+# ─── Recontagem ──────────────────────────────────────────────────────────────
+
+def _count_tasks(**extra):
+    return Coalesce(Subquery(
+        ChecklistTaskExecution.objects.filter(execution=OuterRef('pk'), **extra)
+        .order_by().values('execution').annotate(n=Count('id')).values('n')
+    ), Value(0))
+
+
+def refresh_progress(execution_ids: Iterable[int]) -> None:
+    """Regrava ``tasks_total``/``tasks_completed`` das execuções, em lotes."""
+    ids = sorted(set(execution_ids))
+    for start in range(0, len(ids), BATCH_SIZE):
+        ChecklistExecution.objects.filter(pk__in=ids[start:start + BATCH_SIZE]).update(
+            tasks_total=_count_tasks(),
+            tasks_completed=_count_tasks(is_completed=True),
+        )
+
+
+def rebuild_days(dates: Iterable[date]) -> int:
+    """Refaz as linhas de resumo dos dias informados. Devolve quantas gravou."""
+    dates = sorted(set(dates))
+    written = 0
+    for start in range(0, len(dates), BATCH_SIZE):
+        chunk = dates[start:start + BATCH_SIZE]
+        with transaction.atomic():
+            rows = [
+                ChecklistDailySummary(date=day, sector_id=sector_id, assignee_id=assignee_id,
+                                      period=period, status=status, executions=n)
+                for day, sector_id, assignee_id, period, status, n in
+                ChecklistExecution.objects.filter(execution_date__in=chunk)
+                .values_list('execution_date', 'assignment__template__sector_id', 'assignment__assigned_to_id',
+                             'period', 'status')
+                .annotate(n=Count('id')).order_by()
+            ]
+            # Upsert pela chave única: dois commits simultâneos no mesmo dia não
+            # se chocam no INSERT (no Postgres o segundo espera o primeiro e
+            # atualiza a linha). Depois some o que deixou de existir no dia.
+            ChecklistDailySummary.objects.bulk_create(
+                rows, batch_size=BATCH_SIZE,
+                update_conflicts=True, unique_fields=SUMMARY_KEY, update_fields=['executions'],
+            )
+            fresh = {(row.date, row.sector_id, row.assignee_id, row.period, row.status) for row in rows}
+            stale = [
+                pk for pk, *key in ChecklistDailySummary.objects.filter(date__in=chunk)
+                .values_list('pk', 'date', 'sector_id', 'assignee_id', 'period', 'status')
+                if tuple(key) not in fresh
+            ]
+            if stale:
+                ChecklistDailySummary.objects.filter(pk__in=stale).delete()
+            written += len(rows)
+    return written
+
+
+def rebuild(date_from: Optional[date] = None, date_to: Optional[date] = None) -> Dict[str, int]:
+    """Reconta progresso e resumo do intervalo (tudo, sem datas)."""
+    executions = ChecklistExecution.objects.all()
+    if date_from:
+        executions = executions.filter(execution_date__gte=date_from)
+    if date_to:
+        executions = executions.filter(execution_date__lte=date_to)
+    ids = list(executions.values_list('id', flat=True))
+    refresh_progress(ids)
+
+    stale = ChecklistDailySummary.objects.all()
+    if date_from:
+        stale = stale.filter(date__gte=date_from)
+    if date_to:
+        stale = stale.filter(date__lte=date_to)
+    days = set(executions.values_list('execution_date', flat=True).distinct())
+    days.update(stale.values_list('date', flat=True).distinct())
+    return {'executions': len(ids), 'days': len(days), 'rows': rebuild_days(days)}
+
+
+# ─── Acúmulo por transação ───────────────────────────────────────────────────
+
+def _flush() -> None:
+    """Recontagem do que a transação acumulou (roda no commit)."""
+    execution_ids = getattr(_local, 'execution_ids', None)
+    dates = getattr(_local, 'dates', None)
+    _local.execution_ids, _local.dates = set(), set()
+    if execution_ids:
+        refresh_progress(execution_ids)
+    if dates:
+        rebuild_days(dates)
+
+
+def touch(execution_ids: Iterable[int] = (), dates: Iterable[date] = ()) -> None:
+    """Agenda a recontagem do progresso das execuções e do resumo dos dias."""
+    if not hasattr(_local, 'dates'):
+        _local.execution_ids, _local.dates = set(), set()
+    _local.execution_ids.update(execution_ids)
+    _local.dates.update(dates)
+    # Cada chamada agenda o flush; o primeiro a rodar esvazia os conjuntos e
+    # os demais não fazem nada. Se a transação for desfeita, os pendentes
+    # ficam para o próximo commit, que só reconta a partir do banco.
+    transaction.on_commit(_flush)
+
+
+def _assignment_dates(**filters):
+    return ChecklistExecution.objects.filter(**filters).values_list('execution_date', flat=True).distinct()
+
+
+# ─── Leitura ─────────────────────────────────────────────────────────────────
+
+def summary_rows(sector_ids: Optional[Iterable[int]] = None):
+    """Linhas do resumo, opcionalmente restritas aos setores informados."""
+    rows = ChecklistDailySummary.objects.all()
+    if sector_ids is not None:
+        rows = rows.filter(sector_id__in=list(sector_ids))
+    return rows
+
+
+def status_counts(rows) -> Dict[str, int]:
+    """``{status: execuções}`` somando as linhas do resumo."""
+    return dict(rows.values_list('status').annotate(n=Sum('executions')).order_by())
+
+
+def dashboard_counts(user, today: date, sector_ids: Optional[Iterable[int]] = None) -> Dict[str, int]:
+    """Pendentes/concluídas de hoje e atrasadas do usuário, para o dashboard.
+
+    ``sector_ids`` ``None``: todos os setores (superadmin); lista vazia: só o
+    que é do próprio usuário.
+    """
+    scope = Q(assignee=user)
+    if sector_ids is None:
+        scope = Q()
+    elif sector_ids:
+        scope |= Q(sector_id__in=list(sector_ids))
+    totals = ChecklistDailySummary.objects.filter(Q(date=today) | Q(assignee=user, status='overdue')).aggregate(
+        today_pending=Sum('executions', filter=scope & Q(date=today, status__in=['pending', 'in_progress'])),
+        today_completed=Sum('executions', filter=scope & Q(date=today, status__in=['completed', 'awaiting_approval'])),
+        overdue=Sum('executions', filter=Q(assignee=user, status='overdue')),
+    )
+    return {key: value or 0 for key, value in totals.items()}
+
+
+# ─── Signals ─────────────────────────────────────────────────────────────────
+
+def _on_task_execution_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        touch(execution_ids=[instance.execution_id])
+
+
+def _on_execution_change(sender, instance, raw=False, **kwargs):
+    # A data de uma execução não muda depois de criada; o status, sim.
+    if not raw:
+        touch(dates=[instance.execution_date])
+
+
+def _remember_owner(sender, instance, raw=False, **kwargs):
+    """Guarda setor/responsável de antes: se mudarem, o resumo das execuções muda."""
+    if raw or not instance.pk:
+        return
+    if sender is ChecklistTemplate:
+        instance._summary_previous = sender.objects.filter(pk=instance.pk).values_list('sector_id').first()
+    else:
+        instance._summary_previous = (
+            sender.objects.filter(pk=instance.pk).values_list('assigned_to_id', 'template_id').first()
+        )
+
+
+def _on_owner_change(sender, instance, created=False, raw=False, **kwargs):
+    previous = getattr(instance, '_summary_previous', None)
+    if raw or created or previous is None:
+        return
+    if sender is ChecklistTemplate:
+        if previous != (instance.sector_id,):
+            touch(dates=_assignment_dates(assignment__template=instance))
+    elif previous != (instance.assigned_to_id, instance.template_id):
+        touch(dates=_assignment_dates(assignment=instance))
+
+
+def connect_signals() -> None:
+    from django.db.models.signals import post_delete, post_save, pre_save
+
+    post_save.connect(_on_task_execution_change, sender=ChecklistTaskExecution,
+                      dispatch_uid='checklist-summary-task-save')
+    post_delete.connect(_on_task_execution_change, sender=ChecklistTaskExecution,
+                        dispatch_uid='checklist-summary-task-delete')
+    post_save.connect(_on_execution_change, sender=ChecklistExecution,
+                      dispatch_uid='checklist-summary-execution-save')
+    post_delete.connect(_on_execution_change, sender=ChecklistExecution,
+                        dispatch_uid='checklist-summary-execution-delete')
+    for model in (ChecklistTemplate, ChecklistAssignment):
+        pre_save.connect(_remember_owner, sender=model, dispatch_uid=f'checklist-summary-pre-{model.__name__}')
+        post_save.connect(_on_owner_change, sender=model, dispatch_uid=f'checklist-summary-{model.__name__}')
@@ -0,0 +1,174 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from users.models import Sector, User
+
+from . import summary
+from .generation import materialize_executions
+from .models import (
+    ChecklistAssignment, ChecklistDailySummary, ChecklistExecution, ChecklistTask, ChecklistTaskExecution,
+    ChecklistTemplate,
+)
+
+
+class ExecutionGeneratorTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='gerente', email='gerente@example.com', password='pass123', hierarchy='SUPERVISOR',
+        )
+        sector = Sector.objects.create(name='Loja Centro')
+        self.template = ChecklistTemplate.objects.create(name='Abertura', sector=sector, created_by=self.user)
+        for order in range(3):
+            ChecklistTask.objects.create(template=self.template, title=f'Tarefa {order}', order=order)
+        self.assignment = ChecklistAssignment.objects.create(
+            template=self.template,
+            assigned_to=self.user,
+            assigned_by=self.user,
+            schedule_type='daily',
+            period='both',
+            start_date=date(2026, 3, 1),
+            end_date=date(2026, 3, 10),
+        )
+
+    def test_creates_every_slot_with_its_tasks(self):
+        stats = materialize_executions([self.assignment])
+
+        self.assertEqual(stats, {'executions_created': 20, 'task_executions_created': 60})
+        self.assertEqual(ChecklistExecution.objects.filter(assignment=self.assignment).count(), 20)
+        self.assertEqual(ChecklistTaskExecution.objects.filter(execution__assignment=self.assignment).count(), 60)
+
+    def test_is_idempotent_and_fills_missing_tasks(self):
+        materialize_executions([self.assignment], until=date(2026, 3, 2))
+        ChecklistTask.objects.create(template=self.template, title='Tarefa nova', order=9)
+
+        stats = materialize_executions([self.assignment])
+
+        self.assertEqual(stats['executions_created'], 16)
+        self.assertEqual(stats['task_executions_created'], 4 + 16 * 4)
+        self.assertEqual(materialize_executions([self.assignment]),
+                         {'executions_created': 0, 'task_executions_created': 0})
+
+
+class ChecklistSummaryTests(TestCase):
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.gerente = User.objects.create_user('gerente', 'gerente@example.com', password='pass123',
+                                                hierarchy='SUPERADMIN')
+        self.vendedor = User.objects.create_user('vendedor', 'vendedor@example.com', password='pass123',
+                                                 hierarchy='PADRAO')
+        self.sector = Sector.objects.create(name='Loja Centro')
+        template = ChecklistTemplate.objects.create(name='Abertura', sector=self.sector, created_by=self.gerente)
+        for order in range(2):
+            ChecklistTask.objects.create(template=template, title=f'Tarefa {order}', order=order)
+        self.assignment = ChecklistAssignment.objects.create(
+            template=template, assigned_to=self.vendedor, assigned_by=self.gerente, schedule_type='daily',
+            period='both', start_date=self.today - timedelta(days=3), end_date=self.today,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            materialize_executions([self.assignment])
+
+    def _resumo(self, **filters):
+        return {(row.date, row.period, row.status): row.executions
+                for row in ChecklistDailySummary.objects.filter(assignee=self.vendedor, **filters)}
+
+    def test_progress_and_daily_summary_follow_the_executions(self):
+        self.assertEqual(len(self._resumo()), 8)
+        execution = ChecklistExecution.objects.get(execution_date=self.today, period='morning')
+        self.assertEqual((execution.tasks_total, execution.tasks_completed), (2, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for task in execution.task_executions.all():
+                task.complete_task()
+        execution.refresh_from_db()
+        self.assertEqual((execution.tasks_total, execution.tasks_completed, execution.status), (2, 2, 'completed'))
+        self.assertEqual(execution.progress_percentage, 100)
+        self.assertEqual(self._resumo(date=self.today),
+                         {(self.today, 'morning', 'completed'): 1, (self.today, 'afternoon', 'pending'): 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ChecklistExecution.objects.filter(execution_date=self.today - timedelta(days=3)).delete()
+        self.assertEqual(len(self._resumo()), 6)
+
+        ChecklistDailySummary.objects.all().delete()
+        ChecklistExecution.objects.update(tasks_total=0, tasks_completed=0)
+        out = StringIO()
+        call_command('rebuild_checklist_summary', stdout=out)
+        self.assertIn('6 execução(ões) recontada(s); 3 dia(s) e 6 linha(s) de resumo.', out.getvalue())
+        execution.refresh_from_db()
+        self.assertEqual((execution.tasks_total, execution.tasks_completed), (2, 2))
+
+    def test_rolled_back_touch_does_not_hold_back_the_next_commit(self):
+        execution = ChecklistExecution.objects.get(execution_date=self.today, period='morning')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    ChecklistExecution.objects.filter(pk=execution.pk).update(status='completed')
+                    summary.touch(dates=[self.today])
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ChecklistExecution.objects.filter(pk=execution.pk).update(status='in_progress')
+            summary.touch(dates=[self.today])
+            summary.touch(dates=[self.today])
+        self.assertEqual(self._resumo(date=self.today),
+                         {(self.today, 'morning', 'in_progress'): 1, (self.today, 'afternoon', 'pending'): 1})
+        self.assertEqual(summary.rebuild_days([self.today]), 2)
+        self.assertEqual(ChecklistDailySummary.objects.filter(date=self.today).count(), 2)
+
+    def test_dashboard_and_macro_read_the_summary(self):
+        ChecklistExecution.objects.filter(execution_date__lt=self.today - timedelta(days=1)).update(status='overdue')
+        call_command('rebuild_checklist_summary', stdout=StringIO())
+        self.client.force_login(self.gerente)
+
+        response = self.client.get(reverse('checklists:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['stats']['today_pending'], 2)
+        self.assertEqual(len(response.context['pending_checklists']), 2)
+        self.assertEqual(response.context['pending_checklists'][0].total_tarefas, 2)
+
+        response = self.client.get(reverse('checklists:admin_executions_macro'),
+                                   {'date': self.today.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        [linha] = response.context['users_data']
+        self.assertEqual(linha['user'], self.vendedor)
+        self.assertEqual((linha['morning']['total'], linha['afternoon']['pending'], linha['delayed']), (1, 1, 4))
+
+        response = self.client.get(reverse('checklists:admin_executions'),
+                                   {'date_from': (self.today - timedelta(days=3)).isoformat()})
+        self.assertEqual((response.context['stats']['total'], response.context['stats']['overdue']), (8, 4))
+        response = self.client.get(reverse('checklists:checklist_reports'), {'status': 'pending'})
+        self.assertEqual(response.context['stats']['pending'], 4)
+
+
+class ApproveAllSummaryTests(TransactionTestCase):
+    """Sem transação na requisição, o on_commit roda na hora: o resumo tem de
+    ser refeito depois do ``update()``."""
+
+    def test_approve_all_refreshes_the_summary_with_the_new_status(self):
+        today = timezone.now().date()
+        gerente = User.objects.create_user('gerente', 'gerente@example.com', password='pass123',
+                                           hierarchy='SUPERADMIN')
+        sector = Sector.objects.create(name='Loja Centro')
+        template = ChecklistTemplate.objects.create(name='Abertura', sector=sector, created_by=gerente)
+        assignment = ChecklistAssignment.objects.create(
+            template=template, assigned_to=gerente, assigned_by=gerente, schedule_type='daily',
+            period='morning', start_date=today, end_date=today,
+        )
+        materialize_executions([assignment])
+        ChecklistExecution.objects.update(status='awaiting_approval')
+        summary.rebuild_days([today])
+
+        self.client.force_login(gerente)
+        self.client.post(reverse('checklists:approve_all_checklists'))
+
+        self.assertEqual(list(ChecklistExecution.objects.values_list('status', flat=True)), ['completed'])
+        self.assertEqual(list(ChecklistDailySummary.objects.values_list('status', 'executions')), [('completed', 1)])
@@ -9,7 +9,6 @@ from django.core.cache import caches
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
 from django.utils import timezone
 from datetime import datetime, timedelta, date
-from itertools import chain
 import json
 
 from .models import (
@@ -17,6 +16,9 @@ from .models import (
     ChecklistTaskExecution, ChecklistAssignmentApprover, ChecklistPendingAssignment
 )
 from users.models import User, Sector
+from core.images import prefetch_variants
+from . import summary
+from .generation import ensure_task_executions, materialize_executions
 
 # Cache de processo (LocMemCache), não o Redis remoto — ver a nota em
 # CACHE_SETORES_SEGUNDOS.
@@ -99,106 +101,60 @@ def checklist_dashboard(request):
     is_supervisor = has_checklist_admin_permission(user)
     is_superadmin = user.hierarchy == 'SUPERADMIN' or user.is_superuser
     
+    # Escopo além do próprio usuário: tudo para o superadmin, os setores dos
+    # templates visíveis para o supervisor. As listas saem de uma consulta
+    # por tela (as próprias primeiro) e os números do resumo diário.
+    today = timezone.now().date()
+    user_sector_ids = get_user_visible_sector_ids(user, include_adm_for_admin_plus=True)
+    if is_superadmin:
+        scope_sector_ids = None
+        execution_scope = Q()
+    elif is_supervisor and user_sector_ids:
+        scope_sector_ids = user_sector_ids
+        execution_scope = Q(assignment__assigned_to=user) | Q(assignment__template__sector_id__in=user_sector_ids)
+    else:
+        scope_sector_ids = []
+        execution_scope = Q(assignment__assigned_to=user)
+    own_first = Case(When(assignment__assigned_to=user, then=0), default=1, output_field=IntegerField())
+
     # Checklists atribuídos ao usuário
-    my_assignments = ChecklistAssignment.objects.filter(
-        assigned_to=user,
-        is_active=True
-    ).select_related('template', 'assigned_by', 'assigned_to', 'assigned_to__sector'
-    ).annotate(qtd_tarefas_template=Count('template__tasks', distinct=True))
-    
+    my_assignments = ChecklistAssignment.objects.filter(assigned_to=user, is_active=True)
+
     # Para supervisores: mostrar checklists dos seus setores
     # Para superadmin: mostrar todos
     sector_assignments = ChecklistAssignment.objects.none()
-    if is_superadmin:
-        # SUPERADMIN vê todos os checklists
+    if scope_sector_ids is None:
+        sector_assignments = ChecklistAssignment.objects.filter(is_active=True).exclude(assigned_to=user)
+    elif scope_sector_ids:
         sector_assignments = ChecklistAssignment.objects.filter(
-            is_active=True
-        ).exclude(
-            assigned_to=user  # Não duplicar os que já estão em my_assignments
-        ).select_related('template', 'assigned_to', 'assigned_to__sector', 'assigned_by'
-        ).annotate(qtd_tarefas_template=Count('template__tasks', distinct=True))
-    elif is_supervisor:
-        # SUPERVISOR vê checklists cujo TEMPLATE é do seu setor
-        user_sector_ids = get_user_visible_sector_ids(user, include_adm_for_admin_plus=True)
-        
-        if user_sector_ids:
-            sector_assignments = ChecklistAssignment.objects.filter(
-                template__sector_id__in=user_sector_ids,
-                is_active=True
-            ).exclude(
-                assigned_to=user  # Não duplicar
-            ).select_related('template', 'assigned_to', 'assigned_to__sector', 'assigned_by'
-        ).annotate(qtd_tarefas_template=Count('template__tasks', distinct=True))
-    
-    # Execuções pendentes de hoje
-    today = timezone.now().date()
-    today_executions = ChecklistExecution.objects.filter(
-        assignment__assigned_to=user,
-        execution_date=today
-    ).para_listagem()
-    
-    # Para supervisores: incluir execuções dos checklists cujo TEMPLATE é do seu setor
-    # Para superadmin: incluir todas as execuções
-    if is_superadmin:
-        supervisor_executions = ChecklistExecution.objects.filter(
-            execution_date=today
-        ).exclude(
-            assignment__assigned_to=user  # Não duplicar
-        ).para_listagem()
-        
-        # Combinar as querysets
-        from itertools import chain
-        today_executions = list(chain(today_executions, supervisor_executions))
-    elif is_supervisor:
-        user_sector_ids = get_user_visible_sector_ids(user, include_adm_for_admin_plus=True)
-        
-        if user_sector_ids:
-            supervisor_executions = ChecklistExecution.objects.filter(
-                assignment__template__sector_id__in=user_sector_ids,
-                execution_date=today
-            ).exclude(
-                assignment__assigned_to=user  # Não duplicar
-            ).para_listagem()
-            
-            # Combinar as querysets
-            from itertools import chain
-            today_executions = list(chain(today_executions, supervisor_executions))
-    
-    # Separar por status apenas (combinando manhã e tarde)
-    if isinstance(today_executions, list):
-        # Se é lista (combinada), filtrar manualmente
-        pending_checklists = [e for e in today_executions if e.status in ['pending', 'in_progress']]
-        completed_checklists = [e for e in today_executions if e.status in ['completed', 'awaiting_approval']]
-    else:
-        # Se é queryset, usar filter
-        pending_checklists = today_executions.filter(
-            status__in=['pending', 'in_progress']
-        )
-        completed_checklists = today_executions.filter(
-            status__in=['completed', 'awaiting_approval']
-        )
-    
-    # Estatísticas
-    if isinstance(today_executions, list):
-        total_pending = len([e for e in today_executions if e.status in ['pending', 'in_progress']])
-        total_completed = len([e for e in today_executions if e.status in ['completed', 'awaiting_approval']])
-    else:
-        total_pending = today_executions.filter(status__in=['pending', 'in_progress']).count()
-        total_completed = today_executions.filter(status__in=['completed', 'awaiting_approval']).count()
-    
+            template__sector_id__in=scope_sector_ids, is_active=True
+        ).exclude(assigned_to=user)
+
+    def _cards(assignments):
+        # Contagem de tarefas só para os cinco cards exibidos.
+        return assignments.select_related(
+            'template', 'assigned_by', 'assigned_to', 'assigned_to__sector'
+        ).annotate(qtd_tarefas_template=Count('template__tasks', distinct=True))[:5]
+
+    # Execuções de hoje (as do usuário primeiro)
+    today_executions = list(
+        ChecklistExecution.objects.filter(execution_scope, execution_date=today)
+        .para_listagem().order_by(own_first, 'period', 'id')
+    )
+    pending_checklists = [e for e in today_executions if e.status in ['pending', 'in_progress']]
+    completed_checklists = [e for e in today_executions if e.status in ['completed', 'awaiting_approval']]
+
+    # Estatísticas (resumo diário)
+    counts = summary.dashboard_counts(user, today, scope_sector_ids)
     stats = {
         'total_assignments': my_assignments.count() + (sector_assignments.count() if is_supervisor else 0),
-        'today_pending': total_pending,
-        'today_completed': total_completed,
-        'overdue': ChecklistExecution.objects.filter(
-            assignment__assigned_to=user,
-            status='overdue'
-        ).count()
+        'today_pending': counts['today_pending'],
+        'today_completed': counts['today_completed'],
+        'overdue': counts['overdue'],
     }
-    
+
     # Templates disponíveis para criação (usuário do mesmo setor)
     available_templates = []
-    user_sector_ids = get_user_visible_sector_ids(user, include_adm_for_admin_plus=True)
     if user_sector_ids:
         available_templates = ChecklistTemplate.objects.filter(
             sector_id__in=user_sector_ids,
@@ -215,39 +171,10 @@ def checklist_dashboard(request):
     calendar_end = calendar_end.replace(day=1) - timedelta(days=1)  # último dia do próximo mês
     
     calendar_executions = ChecklistExecution.objects.filter(
-        assignment__assigned_to=user,
+        execution_scope,
         execution_date__gte=calendar_start,
         execution_date__lte=calendar_end
-    ).para_listagem().order_by('execution_date')
-    
-    # Para supervisores: incluir execuções dos checklists cujo TEMPLATE é do seu setor
-    # Para superadmin: incluir todas as execuções
-    if is_superadmin:
-        supervisor_calendar_executions = ChecklistExecution.objects.filter(
-            execution_date__gte=calendar_start,
-            execution_date__lte=calendar_end
-        ).exclude(
-            assignment__assigned_to=user  # Não duplicar
-        ).para_listagem().order_by('execution_date')
-        
-        from itertools import chain
-        calendar_executions = list(chain(calendar_executions, supervisor_calendar_executions))
-        calendar_executions.sort(key=lambda x: x.execution_date)
-    elif is_supervisor:
-        user_sector_ids = get_user_visible_sector_ids(user, include_adm_for_admin_plus=True)
-        
-        if user_sector_ids:
-            supervisor_calendar_executions = ChecklistExecution.objects.filter(
-                assignment__template__sector_id__in=user_sector_ids,
-                execution_date__gte=calendar_start,
-                execution_date__lte=calendar_end
-            ).exclude(
-                assignment__assigned_to=user  # Não duplicar
-            ).para_listagem().order_by('execution_date')
-            
-            from itertools import chain
-            calendar_executions = list(chain(calendar_executions, supervisor_calendar_executions))
-            calendar_executions.sort(key=lambda x: x.execution_date)
+    ).para_listagem().order_by('execution_date', own_first)
     
     # Contar atribuições pendentes de aprovação (para admins/supervisores)
     pending_assignments_count = 0
@@ -257,8 +184,8 @@ def checklist_dashboard(request):
         ).count()
     
     context = {
-        'my_assignments': my_assignments[:5],  # Primeiros 5
-        'sector_assignments': sector_assignments[:5] if is_supervisor else [],  # Primeiros 5 do setor
+        'my_assignments': _cards(my_assignments),  # Primeiros 5
+        'sector_assignments': _cards(sector_assignments) if is_supervisor else [],  # Primeiros 5 do setor
         'today_executions': today_executions,
         'pending_checklists': pending_checklists,
         'completed_checklists': completed_checklists,
@@ -468,44 +395,14 @@ def create_assignment(request):
     return render(request, 'checklists/create_assignment.html', context)
 
 
-def create_executions_for_assignment(assignment):
-    """Cria as execuções baseadas nas datas ativas da atribuição"""
-    active_dates = assignment.get_active_dates()
-    
-    # Determinar períodos a criar
-    if assignment.period == 'both':
-        periods = ['morning', 'afternoon']
-    else:
-        periods = [assignment.period]
-    
-    for exec_date in active_dates:
-        for period in periods:
-            # Verificar se já existe execução para esta data e período
-            execution, created = ChecklistExecution.objects.get_or_create(
-                assignment=assignment,
-                execution_date=exec_date,
-                period=period,
-                defaults={'status': 'pending'}
-            )
-            
-            # Criar task_executions se não existirem
-            # Verificar se há tarefas no template
-            template_tasks = assignment.template.tasks.all()
-            if template_tasks.exists():
-                # Verificar quais tasks já têm execução
-                existing_task_ids = set(
-                    ChecklistTaskExecution.objects.filter(
-                        execution=execution
-                    ).values_list('task_id', flat=True)
-                )
-                
-                # Criar task_executions para tarefas que ainda não têm
-                for task in template_tasks:
-                    if task.id not in existing_task_ids:
-                        ChecklistTaskExecution.objects.create(
-                            execution=execution,
-                            task=task
-                        )
+def create_executions_for_assignment(assignment, until=None):
+    """Cria as execuções baseadas nas datas ativas da atribuição.
+
+    Em conjunto (ver checklists/generation.py): slots calculados em memória,
+    uma consulta para o que já existe e ``bulk_create`` do que falta. Com
+    ``until`` materializa só até essa data.
+    """
+    return materialize_executions([assignment], until=until)
 
 
 @login_required
@@ -527,23 +424,10 @@ def execute_today_checklists(request):
     
     # IMPORTANTE: Garantir que todas as execuções tenham suas task_executions criadas
     # Isso corrige um bug onde execuções eram criadas sem task_executions
-    for execution in today_executions:
-        template_tasks = execution.assignment.template.tasks.all()
-        if template_tasks.exists():
-            existing_task_ids = set(
-                execution.task_executions.values_list('task_id', flat=True)
-            )
-            
-            # Criar task_executions para tarefas que ainda não têm
-            for task in template_tasks:
-                if task.id not in existing_task_ids:
-                    ChecklistTaskExecution.objects.create(
-                        execution=execution,
-                        task=task
-                    )
+    created_task_executions = ensure_task_executions(today_executions)
     
     # Recarregar execuções para pegar as task_executions recém-criadas
-    if any(execution.task_executions.count() == 0 for execution in today_executions):
+    if created_task_executions:
         today_executions = ChecklistExecution.objects.filter(
             assignment__assigned_to=user,
             execution_date=today,
@@ -1628,6 +1512,16 @@ def admin_approvals(request):
         executions = executions.filter(execution_date=date_filter)
     
     executions = executions.order_by('-submitted_at', 'execution_date')
+
+    # Uma consulta para as miniaturas de todas as evidências da página (a
+    # avaliação do queryset fica em cache e é reaproveitada pelo template).
+    prefetch_variants(
+        evidence.file
+        for execution in executions
+        for task_exec in execution.task_executions.all()
+        for evidence in task_exec.evidences.all()
+        if evidence.evidence_type == 'image'
+    )
     
     # Estatísticas (também filtradas por setor)
     stats_filter = {}
@@ -1799,7 +1693,12 @@ def approve_all_checklists(request):
         messages.info(request, 'Não há checklists aguardando aprovação.')
         return redirect('checklists:admin_approvals')
     
-    executions.update(status='completed', completed_at=timezone.now())
+    # update() não dispara signals: o resumo dos dias é refeito no commit,
+    # já com o status novo (sem transação, o on_commit rodaria na hora).
+    with transaction.atomic():
+        dates = list(executions.values_list('execution_date', flat=True).distinct())
+        executions.update(status='completed', completed_at=timezone.now())
+        summary.touch(dates=dates)
     
     messages.success(request, f'✅ {count} checklist(s) aprovado(s) com sucesso!')
     return redirect('checklists:admin_approvals')
@@ -1987,6 +1886,27 @@ def unapprove_task(request, task_exec_id):
     return redirect('checklists:admin_approvals')
 
 
+def _status_counts(executions, user, template_filter, sector_filter, user_filter='', period_filter='',
+                   date_from=None, date_to=None):
+    """Execuções por status para os quadros de estatística.
+
+    Sem filtro de template os números vêm do resumo diário (ver
+    checklists/summary.py), que não guarda o template; com ele, de um único
+    GROUP BY sobre as execuções já filtradas.
+    """
+    if template_filter:
+        return dict(executions.values_list('status').annotate(n=Count('id')).order_by())
+    sector_ids = None if user.is_superuser else get_user_visible_sector_ids(user, include_adm_for_admin_plus=True)
+    rows = summary.summary_rows(sector_ids).filter(date__gte=date_from, date__lte=date_to)
+    if sector_filter:
+        rows = rows.filter(sector_id=sector_filter)
+    if user_filter:
+        rows = rows.filter(assignee_id=user_filter)
+    if period_filter:
+        rows = rows.filter(period=period_filter)
+    return summary.status_counts(rows)
+
+
 @login_required
 def checklist_reports(request):
     """Relatório de quem fez e não fez os checklists"""
@@ -2093,10 +2013,18 @@ def checklist_reports(request):
     users_list = sorted(users_report.values(), key=lambda x: x['user'].get_full_name())
     
     # Estatísticas gerais
-    total_executions = executions.count()
-    completed_executions = executions.filter(status='completed').count()
-    pending_executions = executions.filter(status__in=['pending', 'in_progress', 'awaiting_approval']).count()
-    overdue_executions = executions.filter(status='overdue').count()
+    por_status = _status_counts(executions, request.user, template_filter, sector_filter,
+                                date_from=date_from_obj, date_to=date_to_obj)
+    if status_filter == 'completed':
+        por_status = {k: v for k, v in por_status.items() if k == 'completed'}
+    elif status_filter == 'pending':
+        por_status = {k: v for k, v in por_status.items() if k in ['pending', 'in_progress', 'awaiting_approval']}
+    elif status_filter == 'overdue':
+        por_status = {k: v for k, v in por_status.items() if k == 'overdue'}
+    total_executions = sum(por_status.values())
+    completed_executions = por_status.get('completed', 0)
+    pending_executions = sum(por_status.get(k, 0) for k in ['pending', 'in_progress', 'awaiting_approval'])
+    overdue_executions = por_status.get('overdue', 0)
     
     stats = {
         'total': total_executions,
@@ -2491,14 +2419,15 @@ def admin_executions(request):
     executions = executions.order_by('-execution_date', '-id')
     
     # Estatísticas
-    total_count = executions.count()
+    por_status = _status_counts(executions, request.user, template_filter, sector_filter,
+                                user_filter=user_filter, period_filter=period_filter,
+                                date_from=date_from_obj, date_to=date_to_obj)
+    if status_filter:
+        por_status = {status_filter: por_status.get(status_filter, 0)}
     stats = {
-        'total': total_count,
-        'pending': executions.filter(status='pending').count(),
-        'in_progress': executions.filter(status='in_progress').count(),
-        'awaiting_approval': executions.filter(status='awaiting_approval').count(),
-        'completed': executions.filter(status='completed').count(),
-        'overdue': executions.filter(status='overdue').count(),
+        'total': sum(por_status.values()),
+        **{status: por_status.get(status, 0)
+           for status in ['pending', 'in_progress', 'awaiting_approval', 'completed', 'overdue']},
     }
     
     # Paginação
@@ -2582,76 +2511,48 @@ def admin_executions_macro(request):
     
     # Obter setores para filtro
     if request.user.is_superuser:
+        user_sector_ids = None
         sectors = Sector.objects.all().order_by('name')
     else:
         user_sector_ids = get_user_visible_sector_ids(request.user, include_adm_for_admin_plus=True)
         sectors = Sector.objects.filter(id__in=user_sector_ids).order_by('name')
     
-    # Base queryset de execuções
-    executions_qs = ChecklistExecution.objects.select_related(
-        'assignment__template',
-        'assignment__template__sector',
-        'assignment__assigned_to'
-    )
-    
-    # Filtrar por setores do usuário
-    if not request.user.is_superuser:
-        user_sector_ids = get_user_visible_sector_ids(request.user, include_adm_for_admin_plus=True)
-        if user_sector_ids:
-            executions_qs = executions_qs.filter(assignment__template__sector_id__in=user_sector_ids)
-        else:
-            executions_qs = executions_qs.none()
-    
-    # Aplicar filtro de setor
+    # Números do resumo diário (ver checklists/summary.py): uma consulta
+    # agrupada para o dia e uma para os atrasados, sem tocar nas execuções.
+    resumo = summary.summary_rows(user_sector_ids)
     if sector_filter:
-        executions_qs = executions_qs.filter(assignment__template__sector_id=sector_filter)
-    
+        resumo = resumo.filter(sector_id=sector_filter)
+
     # Dados por usuário
     users_data = []
-    
-    # Buscar usuários com atribuições
-    if request.user.is_superuser:
-        users_with_assignments = User.objects.filter(
-            is_active=True,
-            checklist_assignments__isnull=False
-        ).select_related('sector').distinct()
-    else:
-        users_with_assignments = User.objects.filter(
-            is_active=True,
-            checklist_assignments__isnull=False,
-            checklist_assignments__template__sector_id__in=user_sector_ids
-        ).select_related('sector').distinct()
-    
-    if sector_filter:
-        users_with_assignments = users_with_assignments.filter(
-            checklist_assignments__template__sector_id=sector_filter
-        ).distinct()
-    
-    users_with_assignments = users_with_assignments.order_by('first_name', 'last_name')
 
-    # Os números de todo mundo saem em duas consultas agrupadas, não em nove
-    # por pessoa. Com ~46 usuários eram 414 COUNTs (12 s só nisso).
     FEITO = ['completed', 'awaiting_approval']
     ATRASAVEL = ['pending', 'in_progress', 'overdue']
 
     def _conta(turno):
         return {
-            'total': Count('id', filter=Q(period=turno)),
-            'pending': Count('id', filter=Q(period=turno, status='pending')),
-            'in_progress': Count('id', filter=Q(period=turno, status='in_progress')),
-            'completed': Count('id', filter=Q(period=turno, status__in=FEITO)),
+            'total': Sum('executions', filter=Q(period=turno)),
+            'pending': Sum('executions', filter=Q(period=turno, status='pending')),
+            'in_progress': Sum('executions', filter=Q(period=turno, status='in_progress')),
+            'completed': Sum('executions', filter=Q(period=turno, status__in=FEITO)),
         }
 
     do_dia = {
-        linha['assignment__assigned_to']: linha
-        for linha in executions_qs.filter(execution_date=selected_date)
-        .values('assignment__assigned_to')
+        linha['assignee']: {k: v or 0 for k, v in linha.items()}
+        for linha in resumo.filter(date=selected_date)
+        .values('assignee')
         .annotate(**{f'manha_{k}': v for k, v in _conta('morning').items()},
                   **{f'tarde_{k}': v for k, v in _conta('afternoon').items()})
+        .order_by()
     }
     atrasados = dict(
-        executions_qs.filter(execution_date__lte=delay_threshold, status__in=ATRASAVEL)
-        .values_list('assignment__assigned_to').annotate(n=Count('id')))
+        resumo.filter(date__lte=delay_threshold, status__in=ATRASAVEL)
+        .values_list('assignee').annotate(n=Sum('executions')).order_by())
+
+    # Só aparece quem tem números no dia ou atrasados.
+    users_with_assignments = User.objects.filter(
+        is_active=True, id__in=set(do_dia) | set(atrasados)
+    ).select_related('sector').order_by('first_name', 'last_name')
 
     for user in users_with_assignments:
         numeros = do_dia.get(user.id, {})
@@ -46,7 +46,10 @@ def comunicados_pendentes(user):
     )
 
 
-@register_popup_checker('comunicados_pendentes', 'Comunicados: todos com "Estou Ciente"')
+@register_popup_checker('comunicados_pendentes', 'Comunicados: todos com "Estou Ciente"', watch=[
+    ('communications.CommunicationRead', 'user_id'),
+    ('communications.Communication', None),
+])
 def comunicados_todos_cientes(user):
     """Concluído (True) quando não há comunicado pendente de "de acordo"."""
     return not comunicados_pendentes(user).exists()
@@ -20,6 +20,7 @@ from .models import Communication, CommunicationRead, CommunicationComment, Comm
 from .serializers import CommunicationSerializer
 from users.models import User, Sector
 from core.middleware import log_action
+from core.polling import conditional_poll, since_param
 
 
 def _get_experience_window_alerts_for_dp():
@@ -630,8 +631,17 @@ def delete_communication_view(request, communication_id):
 
 
 @login_required
+@conditional_poll(
+    lambda request: [('communications', None), ('communications', request.user.pk)],
+    # A vigência (active_from/active_until) muda com o relógio, sem escrita.
+    time_bucket=300,
+)
 def get_unread_communications(request):
-    """API para buscar comunicados não lidos (apenas ativos)"""
+    """API para buscar comunicados não lidos (apenas ativos).
+
+    Com ``?since=<id>`` a lista traz só os comunicados mais novos que esse id
+    (o ``count`` continua sendo o total de não lidos).
+    """
     from django.utils import timezone
     user = request.user
     now = timezone.now()
@@ -647,8 +657,13 @@ def get_unread_communications(request):
         communicationread__user=user
     ).distinct()
     
+    listed = unread_communications
+    since = since_param(request)
+    if since is not None:
+        listed = listed.filter(id__gt=since)
+    
     data = []
-    for comm in unread_communications[:5]:  # Últimos 5
+    for comm in listed.select_related('sender')[:5]:  # Últimos 5
         data.append({
             'id': comm.id,
             'title': comm.title,
@@ -659,7 +674,8 @@ def get_unread_communications(request):
     
     return JsonResponse({
         'communications': data,
-        'count': unread_communications.count()
+        'count': unread_communications.count(),
+        'delta': since is not None,
     })
 
 
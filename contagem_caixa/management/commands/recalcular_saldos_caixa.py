@@ -0,0 +1,41 @@
+"""
+Confere (e corrige) o saldo acumulado da Contagem de Caixa.
+
+As edições acertam o saldo por diferença (contagem_caixa/servicos.py): um
+UPDATE soma o delta no dia e em todos os seguintes. Este comando refaz a série
+com a soma acumulada do banco e regrava só o que divergir. Rodar uma vez após
+o deploy e, por segurança, no cron semanal (ou depois de editar dias pelo
+admin, que não passa pelo acerto por diferença).
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from contagem_caixa.servicos import recalcular_saldos
+
+
+class Command(BaseCommand):
+    help = 'Confere e corrige o saldo acumulado da Contagem de Caixa'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loja', type=int, help='ID do setor (padrão: todas as lojas)')
+        parser.add_argument('--desde', help='Data inicial AAAA-MM-DD (padrão: todo o histórico)')
+        parser.add_argument(
+            '--conferir',
+            action='store_true',
+            help='Só conta os dias com saldo errado, sem gravar'
+        )
+
+    def handle(self, *args, **options):
+        desde = None
+        if options.get('desde'):
+            try:
+                desde = date.fromisoformat(options['desde'])
+            except ValueError:
+                raise CommandError('Data inválida em --desde (use AAAA-MM-DD).')
+
+        errados = recalcular_saldos(options.get('loja'), desde, gravar=not options['conferir'])
+        if options['conferir']:
+            self.stdout.write(f'{errados} dia(s) com saldo divergente')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{errados} dia(s) corrigido(s)'))
@@ -1,9 +1,26 @@
-"""Importação da base de vendas e recálculo do saldo acumulado."""
+"""Importação da base de vendas e manutenção do saldo acumulado.
+
+O saldo é encadeado (saldo do dia = saldo anterior + valor real − depósito) e
+fica gravado em cada dia. Mexer num dia do meio não obriga a reescrever a
+série linha a linha: o que muda nos dias seguintes é sempre a mesma
+diferença, aplicada num único ``UPDATE … SET saldo = saldo + delta``
+(``aplicar_delta``). Uma correção retroativa numa loja com anos de histórico
+custa o mesmo que a de ontem.
+
+A importação só grava o Valor SAP, que não entra no saldo: dia existente não
+mexe no saldo de ninguém, e dia novo nasce com o saldo do dia anterior.
+
+``recalcular_saldos`` refaz a série inteira com uma soma em janela no banco.
+É a conferência/reparo (``manage.py recalcular_saldos_caixa``), não o
+caminho de cada edição.
+"""
 import logging
 import re
 import unicodedata
 from decimal import Decimal
 
+from django.db import transaction
+from django.db.models import F, Max, Q, Sum, Window
 from django.utils import timezone
 
 from .models import ConfiguracaoContagem, ContagemCaixaDia
@@ -181,69 +198,156 @@ def previa(arquivo, config=None):
 
 
 def importar(arquivo, usuario=None, config=None):
-    """Grava o Valor SAP de cada loja/dia e recalcula os saldos afetados."""
+    """Grava o Valor SAP de cada loja/dia, de todas as lojas num lote só."""
     config = config or ConfiguracaoContagem.get()
     linhas = ler_planilha(arquivo, config)
     indice = _indice_setores()
     agora = timezone.now()
 
-    criados = atualizados = 0
     sem_setor = set()
-    afetadas = {}
-
+    valores = {}
     for codigo, nome, data, valor in linhas:
         setor = casar_loja(codigo, nome, indice)
         if not setor:
             sem_setor.add(f'{nome} ({codigo})' if codigo else str(nome))
             continue
-        dia, novo = ContagemCaixaDia.objects.get_or_create(
-            loja=setor, data=data,
-            defaults={'valor_sap': valor, 'importado_em': agora})
-        if not novo:
+        # Códigos diferentes da planilha podem cair na mesma loja: vale o último.
+        valores[(setor.id, data)] = valor
+
+    criados = atualizados = 0
+    if valores:
+        lojas_ids = {loja_id for loja_id, _ in valores}
+        inicio, fim = min(d for _, d in valores), max(d for _, d in valores)
+        with transaction.atomic():
+            existentes = {
+                (dia.loja_id, dia.data): dia
+                for dia in ContagemCaixaDia.objects.select_for_update()
+                .filter(loja_id__in=lojas_ids, data__gte=inicio, data__lte=fim)
+                .only('id', 'loja_id', 'data', 'saldo', 'valor_sap')
+            }
             # A importação manda no Valor SAP; o que foi preenchido na tela
             # (vivogo, sangria, valor real…) não é tocado.
-            dia.valor_sap = valor
-            dia.importado_em = agora
-            dia.save(update_fields=['valor_sap', 'importado_em', 'atualizado_em'])
-            atualizados += 1
-        else:
-            criados += 1
-        anterior = afetadas.get(setor.id)
-        afetadas[setor.id] = min(anterior, data) if anterior else data
-
-    for setor_id, desde in afetadas.items():
-        recalcular_saldos(setor_id, desde)
+            alterados = []
+            for chave, valor in valores.items():
+                dia = existentes.get(chave)
+                if dia is not None:
+                    dia.valor_sap = valor
+                    dia.importado_em = agora
+                    dia.atualizado_em = agora
+                    alterados.append(dia)
+            ContagemCaixaDia.objects.bulk_update(
+                alterados, ['valor_sap', 'importado_em', 'atualizado_em'], batch_size=500)
+
+            novos = _dias_novos(valores, existentes, lojas_ids, inicio, agora)
+            ContagemCaixaDia.objects.bulk_create(novos, batch_size=500)
+            criados, atualizados = len(novos), len(alterados)
 
     return {
         'linhas': len(linhas),
         'criados': criados,
         'atualizados': atualizados,
         'sem_setor': sorted(sem_setor),
-        'lojas': len(afetadas),
+        'lojas': len({loja_id for loja_id, _ in valores}),
     }
 
 
-def recalcular_saldos(loja_id, desde=None):
-    """Refaz o saldo acumulado da loja a partir de uma data.
+def _dias_novos(valores, existentes, lojas_ids, inicio, agora):
+    """Dias que a importação cria, já com o saldo certo.
 
-    O saldo é encadeado (saldo do dia = saldo anterior + valor real), então
-    mexer num dia do meio obriga a refazer todos os seguintes.
+    Dia novo não tem valor real nem depósito: o saldo dele é o do dia anterior
+    da loja, e o dos dias seguintes não muda. Basta o último saldo antes do
+    período importado e o que já existe dentro dele.
     """
-    qs = ContagemCaixaDia.objects.filter(loja_id=loja_id).order_by('data')
+    ultimo = {}
+    anteriores = (ContagemCaixaDia.objects
+                  .filter(loja_id__in=lojas_ids, data__lt=inicio)
+                  .values('loja_id').annotate(ultima=Max('data')).order_by())
+    if anteriores:
+        condicao = None
+        for linha in anteriores:
+            q = Q(loja_id=linha['loja_id'], data=linha['ultima'])
+            condicao = q if condicao is None else condicao | q
+        ultimo = dict(ContagemCaixaDia.objects.filter(condicao).values_list('loja_id', 'saldo'))
+
+    dias = sorted(set(existentes) | set(valores), key=lambda chave: (chave[0], chave[1]))
+    novos = []
+    for loja_id, data in dias:
+        dia = existentes.get((loja_id, data))
+        if dia is not None:
+            ultimo[loja_id] = dia.saldo
+            continue
+        saldo = ultimo.get(loja_id, ZERO)
+        novos.append(ContagemCaixaDia(loja_id=loja_id, data=data, valor_sap=valores[(loja_id, data)],
+                                      importado_em=agora, saldo=saldo))
+    return novos
+
+
+def movimento(dia):
+    """Quanto o dia mexe no saldo: valor real − depósito."""
+    return (dia.valor_real or ZERO) - (dia.deposito or ZERO)
+
+
+def saldo_antes(loja_id, data):
+    """Saldo do último dia da loja anterior a ``data`` (zero se não houver)."""
+    saldo = (ContagemCaixaDia.objects.filter(loja_id=loja_id, data__lt=data)
+             .order_by('-data').values_list('saldo', flat=True).first())
+    return saldo if saldo is not None else ZERO
+
+
+def aplicar_delta(loja_id, desde, delta, incluir_desde=True):
+    """Soma ``delta`` ao saldo dos dias da loja a partir de ``desde``. Um UPDATE."""
+    if not delta:
+        return 0
+    filtro = {'data__gte': desde} if incluir_desde else {'data__gt': desde}
+    return (ContagemCaixaDia.objects.filter(loja_id=loja_id, **filtro)
+            .update(saldo=F('saldo') + delta))
+
+
+def registrar_movimento(dia, movimento_anterior, novo=False):
+    """Acerta o saldo depois de gravar um dia cujo movimento era ``movimento_anterior``.
+
+    Dia que já existia: o dia e todos os seguintes andam a mesma diferença.
+    Dia novo: nasce com o saldo do dia anterior mais o próprio movimento, e os
+    seguintes andam só esse movimento.
+    """
+    if novo:
+        saldo = saldo_antes(dia.loja_id, dia.data) + movimento(dia)
+        ContagemCaixaDia.objects.filter(pk=dia.pk).update(saldo=saldo)
+        aplicar_delta(dia.loja_id, dia.data, movimento(dia), incluir_desde=False)
+    else:
+        aplicar_delta(dia.loja_id, dia.data, movimento(dia) - movimento_anterior)
+
+
+def recalcular_saldos(loja_id=None, desde=None, gravar=True):
+    """Refaz o saldo acumulado a partir de uma data, para uma loja ou todas.
+
+    A soma acumulada sai do banco (``SUM() OVER (PARTITION BY loja ORDER BY
+    data)``); aqui só se compara com o gravado e regrava o que divergir.
+    Devolve quantos dias estavam errados. ``gravar=False`` só confere.
+    """
+    qs = ContagemCaixaDia.objects.order_by()
+    if loja_id is not None:
+        qs = qs.filter(loja_id=loja_id)
+
+    base = {}
     if desde:
-        anterior = (qs.filter(data__lt=desde).order_by('-data').first())
-        saldo = anterior.saldo if anterior else ZERO
+        lojas_ids = [loja_id] if loja_id is not None else list(
+            qs.filter(data__gte=desde).values_list('loja_id', flat=True).distinct())
+        base = {i: saldo_antes(i, desde) for i in lojas_ids}
         qs = qs.filter(data__gte=desde)
-    else:
-        saldo = ZERO
+
+    acumulado = qs.annotate(acumulado=Window(
+        Sum(F('valor_real') - F('deposito')),
+        partition_by=[F('loja_id')],
+        order_by=[F('data').asc()],
+    )).values_list('id', 'loja_id', 'saldo', 'acumulado')
 
     alterados = []
-    for dia in qs:
-        saldo = dia.calcular_saldo(saldo)
-        if dia.saldo != saldo:
-            dia.saldo = saldo
-            alterados.append(dia)
-    if alterados:
+    for pk, loja, saldo, soma in acumulado.iterator(chunk_size=2000):
+        certo = (base.get(loja, ZERO) + Decimal(str(soma or 0))).quantize(ZERO)
+        if saldo != certo:
+            alterados.append(ContagemCaixaDia(pk=pk, saldo=certo))
+    if gravar and alterados:
         ContagemCaixaDia.objects.bulk_update(alterados, ['saldo'], batch_size=500)
     return len(alterados)
 
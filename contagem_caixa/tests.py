@@ -0,0 +1,53 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from users.models import Sector
+
+from .models import ContagemCaixaDia
+from .servicos import _dias_novos, movimento, recalcular_saldos, registrar_movimento
+
+
+class SaldoIncrementalTests(TestCase):
+    def setUp(self):
+        self.loja = Sector.objects.create(name='Loja Centro')
+        for dia, real in ((1, '100.00'), (2, '50.00'), (5, '30.00')):
+            registro = ContagemCaixaDia.objects.create(loja=self.loja, data=date(2025, 3, dia),
+                                                       valor_real=Decimal(real))
+            registrar_movimento(registro, Decimal('0.00'), novo=True)
+
+    def _saldos(self):
+        return list(ContagemCaixaDia.objects.filter(loja=self.loja).order_by('data')
+                    .values_list('data__day', 'saldo'))
+
+    def test_back_dated_edits_shift_following_days(self):
+        self.assertEqual(self._saldos(), [(1, Decimal('100.00')), (2, Decimal('150.00')),
+                                          (5, Decimal('180.00'))])
+
+        dia = ContagemCaixaDia.objects.get(loja=self.loja, data=date(2025, 3, 1))
+        anterior = movimento(dia)
+        dia.deposito = Decimal('40.00')
+        dia.save()
+        registrar_movimento(dia, anterior)
+
+        novo = ContagemCaixaDia.objects.create(loja=self.loja, data=date(2025, 3, 3),
+                                               valor_real=Decimal('20.00'))
+        registrar_movimento(novo, Decimal('0.00'), novo=True)
+
+        self.assertEqual(self._saldos(), [(1, Decimal('60.00')), (2, Decimal('110.00')),
+                                          (3, Decimal('130.00')), (5, Decimal('160.00'))])
+        self.assertEqual(recalcular_saldos(self.loja.id, gravar=False), 0)
+
+    def test_imported_days_start_from_previous_balance_and_repair_fixes_drift(self):
+        existentes = {(d.loja_id, d.data): d for d in ContagemCaixaDia.objects.filter(
+            loja=self.loja, data__gte=date(2025, 3, 2))}
+        valores = {(self.loja.id, date(2025, 3, 4)): Decimal('10.00'),
+                   (self.loja.id, date(2025, 3, 6)): Decimal('10.00')}
+        novos = _dias_novos(valores, existentes, {self.loja.id}, date(2025, 3, 2), None)
+        self.assertEqual([(d.data.day, d.saldo) for d in novos],
+                         [(4, Decimal('150.00')), (6, Decimal('180.00'))])
+
+        ContagemCaixaDia.objects.filter(loja=self.loja, data=date(2025, 3, 2)).update(saldo=0)
+        self.assertEqual(recalcular_saldos(self.loja.id, desde=date(2025, 3, 2)), 1)
+        self.assertEqual(recalcular_saldos(gravar=False), 0)
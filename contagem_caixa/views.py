@@ -5,6 +5,7 @@ from decimal import Decimal, InvalidOperation
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.db.models import Count, F, Sum
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
@@ -16,7 +17,7 @@ from users.models import Sector
 from .models import ConfiguracaoContagem, ContagemCaixaDia, ImportacaoContagem
 from .permissions import e_gestor as _e_gestor
 from .permissions import lojas_do_usuario as _lojas_do_usuario
-from .servicos import importar, notificar_atencao, previa, recalcular_saldos
+from .servicos import importar, movimento, notificar_atencao, previa, registrar_movimento
 
 logger = logging.getLogger(__name__)
 ZERO = Decimal('0.00')
@@ -219,14 +220,17 @@ def salvar_dia(request, loja_id):
                  'erro': f'“{bruto}” não é um valor válido em {rotulo}.'},
                 status=400)
 
-    registro, _ = ContagemCaixaDia.objects.get_or_create(loja=loja, data=dia_data)
-    for campo, valor in novos.items():
-        setattr(registro, campo, valor)
-    registro.observacao = (request.POST.get('observacao') or '')[:2000]
-    registro.atualizado_por = request.user
-    registro.save()
-
-    recalcular_saldos(loja.id, desde=dia_data)
+    with transaction.atomic():
+        registro, criado = (ContagemCaixaDia.objects.select_for_update()
+                            .get_or_create(loja=loja, data=dia_data))
+        movimento_anterior = movimento(registro)
+        for campo, valor in novos.items():
+            setattr(registro, campo, valor)
+        registro.observacao = (request.POST.get('observacao') or '')[:2000]
+        registro.atualizado_por = request.user
+        # O saldo é acertado por registrar_movimento: não sobrescrever com o lido.
+        registro.save(update_fields=[*novos, 'observacao', 'atualizado_por', 'atualizado_em'])
+        registrar_movimento(registro, movimento_anterior, novo=criado)
     registro.refresh_from_db()
 
     # Divergência nova avisa o gerente da loja.
@@ -4,7 +4,6 @@ import json
 import unicodedata
 import datetime
 from decimal import Decimal, InvalidOperation
-import pandas as pd
 import requests
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
@@ -18,6 +17,10 @@ from django.utils import timezone
 
 from .models import ExclusionRecord, ExclusionSyncBatch, Contestation, ContestationHistory, ContestationCartDraft
 from users.models import SystemConfig, User
+from core.lazy import lazy_import
+from core.reconciliation import KeyedPool
+
+pd = lazy_import('pandas')
 
 
 HIERARCHY_RANK = {
@@ -740,20 +743,22 @@ def update_exclusions(request):
 
     # Indexa os registros do lote atual por chave de correspondência. Chaves
     # repetidas viram uma fila para casar 1-para-1 com as linhas da planilha.
-    existing_by_key = {}
-    for record in ExclusionRecord.objects.filter(sync_batch=latest_batch):
-        existing_by_key.setdefault(_record_match_key(record), []).append(record)
+    # Só os campos importados saem do banco, em blocos.
+    existing = KeyedPool(
+        ExclusionRecord.objects.filter(sync_batch=latest_batch)
+        .only('id', *EXCLUSION_IMPORT_FIELDS).iterator(chunk_size=2000),
+        key=_record_match_key,
+    )
 
     to_update = []
     to_create = []
     matched_count = 0
-    for _, row in df.iterrows():
+    for row in df.to_dict('records'):
         fields = _row_to_exclusion_fields(row, cols)
         if fields is None:
             continue
-        bucket = existing_by_key.get(_fields_match_key(fields))
-        if bucket:
-            record = bucket.pop(0)
+        record = existing.take(_fields_match_key(fields))
+        if record is not None:
             changed = False
             for field in EXCLUSION_IMPORT_FIELDS:
                 new_value = fields[field]
@@ -779,7 +784,7 @@ def update_exclusions(request):
         ExclusionRecord.objects.bulk_create(to_create, batch_size=500)
 
     # Registros do lote que não vieram na planilha nova — mantidos como estão.
-    kept_count = sum(len(bucket) for bucket in existing_by_key.values())
+    kept_count = len(existing.remaining())
 
     latest_batch.record_count = ExclusionRecord.objects.filter(sync_batch=latest_batch).count()
     author = getattr(request.user, 'full_name', '') or request.user.get_username()
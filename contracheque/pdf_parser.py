@@ -3,15 +3,10 @@ import io
 import unicodedata
 from decimal import Decimal, InvalidOperation
 
-try:
-    import pdfplumber
-except ImportError:
-    pdfplumber = None
-
-try:
-    import pypdfium2 as pdfium
-except ImportError:
-    pdfium = None
+from core.lazy import lazy_optional
+
+pdfplumber = lazy_optional('pdfplumber')
+pdfium = lazy_optional('pypdfium2')
 
 
 def parse_currency(value_str):
@@ -0,0 +1,227 @@
+"""Upsert em lote para as sincronizações que vêm do MySQL (fibras, Validação D-1).
+
+As sincronizações faziam, por linha da fonte, um ``filter().first()`` seguido
+de ``save()`` ou ``create()``: duas idas ao banco por venda. Um mês inteiro de
+fibras, ou o reprocessamento de vários dias do D-1, virava dezenas de
+milhares de viagens. ``bulk_upsert`` generaliza o ``_gravar_em_lote`` do
+tangerino/sync.py:
+
+* as linhas passam pelo ``to_python`` dos campos do modelo e a chave natural
+  vira um hash do texto normalizado. Assim '2025-03-01' da fonte e o
+  ``date`` que volta do banco caem na mesma chave;
+* repetições na própria fonte são resolvidas em memória: a última vence ou,
+  com ``chain``, a primeira é a original e as demais viram duplicatas
+  apontando para ela;
+* uma consulta por lote descobre o que já existe, trazendo só a chave e os
+  campos comparados;
+* só é gravado o que mudou. Linhas idênticas, no máximo, têm os campos de
+  ``touch`` (ex.: "última sincronização") carimbados num UPDATE único;
+* no Postgres (e no SQLite), novos e alterados saem num só
+  ``bulk_create(update_conflicts=True)`` quando a chave tem restrição de
+  unicidade. Nos demais bancos, ``bulk_create`` + ``bulk_update``.
+
+``UpsertStats`` conta criados, alterados, iguais, ignorados e as consultas
+feitas.
+"""
+import hashlib
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+BATCH_SIZE = 500
+
+
+@dataclass
+class UpsertStats:
+    source: int = 0          # linhas recebidas
+    invalid: int = 0         # sem chave natural
+    duplicates: int = 0      # repetidas na própria fonte
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0         # já existiam e ``skip_existing``
+    batches: int = 0
+    queries: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def key_hash(values: Sequence) -> str:
+    """Hash estável da chave natural, sobre o texto de cada valor."""
+    raw = '\x1f'.join('' if value is None else str(value) for value in values)
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _clean(model, row: dict) -> dict:
+    return {name: model._meta.get_field(name).to_python(value) for name, value in row.items()}
+
+
+def _has_unique_key(model, key: Sequence[str]) -> bool:
+    wanted = set(key)
+    if len(key) == 1 and model._meta.get_field(key[0]).unique:
+        return True
+    if any(set(fields) == wanted for fields in model._meta.unique_together):
+        return True
+    return any(
+        set(getattr(constraint, 'fields', ()) or ()) == wanted and not getattr(constraint, 'condition', None)
+        for constraint in model._meta.constraints
+    )
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def bulk_upsert(model, rows: Iterable[dict], *, key: Sequence[str], fields: Sequence[str] = (),
+                defaults: Optional[dict] = None, touch: Sequence[str] = (), skip_existing: bool = False,
+                chain: Optional[Tuple[str, str]] = None, scope=None,
+                batch_size: int = BATCH_SIZE) -> UpsertStats:
+    """Cria ou atualiza ``model`` a partir de ``rows`` (dicts campo → valor).
+
+    ``key``: campos da chave natural; o primeiro deve ser o mais seletivo
+    (é ele que vai no ``__in`` da consulta de existência).
+    ``fields``: campos atualizáveis. Campo ausente de uma linha não é tocado
+    na atualização e, na criação, vem de ``defaults``.
+    ``touch``: campos carimbados com ``now()`` em toda linha vista.
+    ``skip_existing``: o que já existe não é comparado nem alterado.
+    ``chain=(flag, fk)``: repetições da fonte são criadas com ``flag=True``
+    e ``fk`` apontando para a primeira ocorrência (só se ela for criada agora).
+    ``scope``: queryset que limita a consulta de existência.
+    """
+    key, fields, defaults = list(key), list(fields), dict(defaults or {})
+    stats = UpsertStats()
+    db = router.db_for_write(model)
+    connection = connections[db]
+    counter = _QueryCounter()
+
+    # Repetições resolvidas em memória, antes de qualquer consulta.
+    unique: Dict[str, dict] = {}
+    repeats: List[Tuple[str, dict]] = []
+    for raw in rows:
+        stats.source += 1
+        row = _clean(model, raw)
+        values = [row.get(name) for name in key]
+        if values[0] in (None, ''):
+            stats.invalid += 1
+            continue
+        digest = key_hash(values)
+        if digest in unique:
+            stats.duplicates += 1
+            if chain:
+                repeats.append((digest, row))
+            else:
+                unique[digest] = row
+            continue
+        unique[digest] = row
+
+    with connection.execute_wrapper(counter), transaction.atomic(using=db):
+        created_pks: Dict[str, object] = {}
+        for batch in _chunks(list(unique.items()), batch_size):
+            stats.batches += 1
+            created_pks.update(_write_batch(
+                model, batch, key, fields, defaults, touch, skip_existing, scope, connection, stats))
+        if chain:
+            _write_repeats(model, repeats, key, defaults, chain, created_pks, batch_size, stats)
+    stats.queries = counter.count
+    return stats
+
+
+def _existing(model, batch, key, fields, scope) -> Dict[str, dict]:
+    base = scope if scope is not None else model._default_manager.all()
+    first = key[0]
+    found = {}
+    qs = base.filter(**{f'{first}__in': {row[first] for _, row in batch}}).order_by()
+    for current in qs.values('pk', *key, *fields):
+        found[key_hash([current[name] for name in key])] = current
+    return found
+
+
+def _write_batch(model, batch, key, fields, defaults, touch, skip_existing, scope, connection, stats):
+    now = timezone.now()
+    existing = _existing(model, batch, key, [] if skip_existing else fields, scope)
+    new_objs: List[Tuple[str, object]] = []
+    changed_objs, changed_fields, unchanged_pks = [], set(), []
+
+    for digest, row in batch:
+        current = existing.get(digest)
+        if current is None:
+            new_objs.append((digest, model(**{**defaults, **row})))
+            continue
+        if skip_existing:
+            stats.skipped += 1
+            continue
+        changes = {name: row[name] for name in fields if name in row and row[name] != current[name]}
+        if not changes:
+            unchanged_pks.append(current['pk'])
+            continue
+        obj = model(**{name: current[name] for name in key + fields})
+        obj.pk = current['pk']
+        for name, value in changes.items():
+            setattr(obj, name, value)
+        changed_objs.append(obj)
+        changed_fields.update(changes)
+
+    for obj in changed_objs:
+        for name in touch:
+            setattr(obj, name, now)
+    update_fields = sorted(changed_fields | set(touch))
+
+    use_conflicts = (
+        changed_objs and connection.features.supports_update_conflicts_with_target
+        and _has_unique_key(model, key)
+    )
+    if use_conflicts:
+        # Sem pk nos alterados: o conflito é pela chave natural, não pelo id.
+        for obj in changed_objs:
+            obj.pk = None
+        model._default_manager.bulk_create(
+            [obj for _, obj in new_objs] + changed_objs, batch_size=len(batch),
+            update_conflicts=True, unique_fields=key, update_fields=update_fields,
+        )
+    else:
+        if new_objs:
+            model._default_manager.bulk_create([obj for _, obj in new_objs], batch_size=len(batch))
+        if changed_objs:
+            model._default_manager.bulk_update(changed_objs, update_fields, batch_size=len(batch))
+    if unchanged_pks and touch:
+        model._default_manager.filter(pk__in=unchanged_pks).update(**{name: now for name in touch})
+
+    stats.created += len(new_objs)
+    stats.updated += len(changed_objs)
+    stats.unchanged += len(unchanged_pks)
+
+    created = {digest: obj.pk for digest, obj in new_objs}
+    if any(pk is None for pk in created.values()):
+        # Banco sem RETURNING no insert em lote: busca os ids pela chave.
+        created = {digest: current['pk'] for digest, current in _existing(model, batch, key, [], scope).items()
+                   if digest in created}
+    return created
+
+
+def _write_repeats(model, repeats, key, defaults, chain, created_pks, batch_size, stats):
+    flag, parent = chain
+    parent_attname = model._meta.get_field(parent).attname
+    objs = []
+    for digest, row in repeats:
+        parent_pk = created_pks.get(digest)
+        if parent_pk is None:
+            # A original já existia: a repetição também já foi gravada antes.
+            stats.skipped += 1
+            continue
+        objs.append(model(**{**defaults, **row, flag: True, parent_attname: parent_pk}))
+    if objs:
+        model._default_manager.bulk_create(objs, batch_size=batch_size)
+    stats.created += len(objs)
@@ -0,0 +1,325 @@
+"""Ingestão de avisos de progresso de vídeo (heartbeats) com gravação em lote.
+
+O player avisa a posição a cada poucos segundos. Antes, cada aviso virava
+``get_or_create`` + ``save()`` de uma ou duas linhas. Um treinamento
+obrigatório liberado para a empresa inteira gerava centenas de escritas por
+segundo na mesma tabela, e quase todas só empurravam "assistido até" alguns
+segundos para frente.
+
+``ProgressBuffer`` guarda, por (usuário, conteúdo), o último estado aceito:
+num hash do Redis ou, sem Redis (dev/testes), na memória do processo. Os pares
+alterados entram num conjunto de "sujos". ``flush`` grava tudo num lote
+(``bulk_update``/``bulk_create``) pela função de cada app. Ela roda pelo cron
+(``manage.py flush_video_progress``) e, como rede de segurança, dentro do
+próprio aviso quando o último lote tem mais de ``VIDEO_PROGRESS_FLUSH_SECONDS``.
+
+O Redis é remoto (cada ida e volta pesa), então gravar o estado, marcar o par
+como sujo e tentar o lock do lote vão numa única chamada. Quando o estado só
+sobe (``merge_max``), até a leitura do anterior entra nela: o máximo é feito
+no próprio Redis.
+
+O que tem efeito de negócio (conclusão, que libera pontos e certificado) não
+passa pelo buffer: a view grava na hora e chama ``discard``.
+"""
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'hb:'
+FLUSH_LOCK_TIMEOUT = 120
+# Estado sem aviso há mais que isso sai do buffer depois de gravado.
+STATE_TTL = 6 * 60 * 60
+
+Pair = Tuple[int, int]
+FlushFn = Callable[[Dict[Pair, dict]], None]
+
+_BUFFERS: Dict[str, 'ProgressBuffer'] = {}
+
+
+def _flush_interval() -> int:
+    return getattr(settings, 'VIDEO_PROGRESS_FLUSH_SECONDS', 60)
+
+
+def _field(pair: Pair) -> str:
+    return f'{pair[0]}:{pair[1]}'
+
+
+def _pair(field) -> Pair:
+    if isinstance(field, bytes):
+        field = field.decode()
+    user_id, content_id = field.split(':')
+    return int(user_id), int(content_id)
+
+
+# ─── Armazenamento ───────────────────────────────────────────────────────────
+
+def _lock_key(kind) -> str:
+    return f'{KEY_PREFIX}{kind}:flush-lock'
+
+
+# Estado novo com o máximo de cada campo numérico em relação ao guardado, par
+# sujo e lock do lote (SET NX) — tudo numa chamada.
+_MERGE_MAX = """
+local raw = redis.call('HGET', KEYS[1], ARGV[1])
+local state = cjson.decode(ARGV[2])
+if raw then
+  for key, value in pairs(cjson.decode(raw)) do
+    if type(value) == 'number' and type(state[key]) == 'number' and value > state[key] then
+      state[key] = value
+    end
+  end
+end
+local encoded = cjson.encode(state)
+redis.call('HSET', KEYS[1], ARGV[1], encoded)
+redis.call('SADD', KEYS[2], ARGV[1])
+local locked = redis.call('SET', KEYS[3], '1', 'NX', 'EX', ARGV[3])
+return {encoded, raw and 1 or 0, locked and 1 or 0}
+"""
+
+
+class _RedisStore:
+    """Hash ``hb:<tipo>`` com o estado em JSON e conjunto ``hb:<tipo>:dirty``."""
+
+    def __init__(self, client):
+        self.client = client
+        self._merge_max = client.register_script(_MERGE_MAX)
+
+    def get(self, kind, pair):
+        raw = self.client.hget(f'{KEY_PREFIX}{kind}', _field(pair))
+        return json.loads(raw) if raw else None
+
+    def put(self, kind, pair, state, lock_ttl):
+        """Grava o estado e tenta o lock do lote; True se o lock veio."""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hset(f'{KEY_PREFIX}{kind}', _field(pair), json.dumps(state))
+        pipe.sadd(f'{KEY_PREFIX}{kind}:dirty', _field(pair))
+        pipe.set(_lock_key(kind), 1, nx=True, ex=lock_ttl)
+        return bool(pipe.execute()[2])
+
+    def merge_max(self, kind, pair, state, lock_ttl):
+        encoded, existed, locked = self._merge_max(
+            keys=[f'{KEY_PREFIX}{kind}', f'{KEY_PREFIX}{kind}:dirty', _lock_key(kind)],
+            args=[_field(pair), json.dumps(state), lock_ttl],
+        )
+        return json.loads(encoded), bool(existed), bool(locked)
+
+    def take_dirty(self, kind):
+        """Troca o conjunto de sujos por um novo (RENAME é atômico): avisos que
+        chegarem durante o lote caem no conjunto novo e vão no próximo."""
+        dirty, taking = f'{KEY_PREFIX}{kind}:dirty', f'{KEY_PREFIX}{kind}:flushing'
+        try:
+            self.client.rename(dirty, taking)
+        except Exception:          # conjunto vazio não existe: nada a gravar
+            return {}
+        pipe = self.client.pipeline(transaction=False)
+        pipe.smembers(taking)
+        pipe.delete(taking)
+        fields = sorted(pipe.execute()[0])
+        if not fields:
+            return {}
+        values = self.client.hmget(f'{KEY_PREFIX}{kind}', fields)
+        return {_pair(f): json.loads(v) for f, v in zip(fields, values) if v}
+
+    def mark_dirty(self, kind, pairs):
+        if pairs:
+            self.client.sadd(f'{KEY_PREFIX}{kind}:dirty', *[_field(p) for p in pairs])
+
+    def drop(self, kind, pairs):
+        if pairs:
+            fields = [_field(p) for p in pairs]
+            pipe = self.client.pipeline(transaction=False)
+            pipe.hdel(f'{KEY_PREFIX}{kind}', *fields)
+            pipe.srem(f'{KEY_PREFIX}{kind}:dirty', *fields)
+            pipe.execute()
+
+    def stale(self, kind, older_than):
+        fields = self.client.hkeys(f'{KEY_PREFIX}{kind}')
+        if not fields:
+            return []
+        dirty = self.client.smembers(f'{KEY_PREFIX}{kind}:dirty')
+        values = self.client.hmget(f'{KEY_PREFIX}{kind}', fields)
+        return [
+            _pair(f) for f, v in zip(fields, values)
+            if f not in dirty and (not v or json.loads(v).get('seen', 0) < older_than)
+        ]
+
+
+class _MemoryStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.states: Dict[str, Dict[Pair, dict]] = {}
+        self.dirty: Dict[str, set] = {}
+        self.flush_locks: Dict[str, float] = {}
+
+    def get(self, kind, pair):
+        with self.lock:
+            state = self.states.get(kind, {}).get(pair)
+            return dict(state) if state else None
+
+    def _take_flush_lock(self, kind, lock_ttl):
+        now = time.time()
+        if self.flush_locks.get(kind, 0) > now:
+            return False
+        self.flush_locks[kind] = now + lock_ttl
+        return True
+
+    def put(self, kind, pair, state, lock_ttl):
+        with self.lock:
+            self.states.setdefault(kind, {})[pair] = dict(state)
+            self.dirty.setdefault(kind, set()).add(pair)
+            return self._take_flush_lock(kind, lock_ttl)
+
+    def merge_max(self, kind, pair, state, lock_ttl):
+        with self.lock:
+            previous = self.states.get(kind, {}).get(pair)
+            state = dict(state)
+            for key, value in (previous or {}).items():
+                if isinstance(value, (int, float)) and isinstance(state.get(key), (int, float)):
+                    state[key] = max(value, state[key])
+            self.states.setdefault(kind, {})[pair] = state
+            self.dirty.setdefault(kind, set()).add(pair)
+            return dict(state), previous is not None, self._take_flush_lock(kind, lock_ttl)
+
+    def take_dirty(self, kind):
+        with self.lock:
+            pairs, self.dirty[kind] = self.dirty.get(kind, set()), set()
+            states = self.states.get(kind, {})
+            return {pair: dict(states[pair]) for pair in pairs if pair in states}
+
+    def mark_dirty(self, kind, pairs):
+        with self.lock:
+            self.dirty.setdefault(kind, set()).update(pairs)
+
+    def drop(self, kind, pairs):
+        with self.lock:
+            for pair in pairs:
+                self.states.get(kind, {}).pop(pair, None)
+                self.dirty.get(kind, set()).discard(pair)
+
+    def stale(self, kind, older_than):
+        with self.lock:
+            dirty = self.dirty.get(kind, set())
+            return [pair for pair, state in self.states.get(kind, {}).items()
+                    if pair not in dirty and state.get('seen', 0) < older_than]
+
+    def clear(self):
+        with self.lock:
+            self.states.clear()
+            self.dirty.clear()
+            self.flush_locks.clear()
+
+
+_store_instance = None
+
+
+def _store():
+    global _store_instance
+    if _store_instance is None:
+        try:
+            from django_redis import get_redis_connection
+            _store_instance = _RedisStore(get_redis_connection('default'))
+        except Exception:
+            _store_instance = _MemoryStore()
+    return _store_instance
+
+
+# ─── Buffer ──────────────────────────────────────────────────────────────────
+
+class ProgressBuffer:
+    """Último estado aceito por (usuário, conteúdo) de um tipo de vídeo.
+
+    ``flush_fn`` recebe ``{(user_id, content_id): estado}`` e grava em lote.
+    """
+
+    def __init__(self, kind: str, flush_fn: FlushFn):
+        self.kind = kind
+        self.flush_fn = flush_fn
+        _BUFFERS[kind] = self
+
+    def get(self, user_id: int, content_id: int) -> Optional[dict]:
+        try:
+            return _store().get(self.kind, (user_id, content_id))
+        except Exception:
+            logger.warning('Buffer de progresso indisponível (%s)', self.kind, exc_info=True)
+            return None
+
+    def put(self, user_id: int, content_id: int, state: dict) -> bool:
+        """Guarda o estado para o próximo lote. False se o buffer estiver fora —
+        aí quem chamou grava direto."""
+        state = dict(state, seen=time.time())
+        try:
+            locked = _store().put(self.kind, (user_id, content_id), state, _flush_interval())
+        except Exception:
+            logger.warning('Buffer de progresso indisponível (%s)', self.kind, exc_info=True)
+            return False
+        if locked:
+            self._flush_quietly()
+        return True
+
+    def merge_max(self, user_id: int, content_id: int, state: dict) -> Optional[Tuple[dict, bool]]:
+        """Guarda o máximo, campo a campo, entre ``state`` e o estado anterior.
+
+        Para avisos que só sobem: dispensa ler o estado antes. Devolve
+        ``(estado guardado, havia estado antes)`` ou ``None`` com o buffer fora.
+        """
+        state = dict(state, seen=time.time())
+        try:
+            merged, existed, locked = _store().merge_max(
+                self.kind, (user_id, content_id), state, _flush_interval())
+        except Exception:
+            logger.warning('Buffer de progresso indisponível (%s)', self.kind, exc_info=True)
+            return None
+        if locked:
+            self._flush_quietly()
+        return merged, existed
+
+    def discard(self, user_id: int, content_id: int) -> None:
+        """Esquece o par (já gravado de forma síncrona pela view)."""
+        try:
+            _store().drop(self.kind, [(user_id, content_id)])
+        except Exception:
+            logger.warning('Buffer de progresso indisponível (%s)', self.kind, exc_info=True)
+
+    def persist(self, user_id: int, content_id: int) -> None:
+        """Grava já o estado pendente de um par (antes de uma leitura que precisa dele)."""
+        state = self.get(user_id, content_id)
+        if state is not None:
+            self.flush_fn({(user_id, content_id): state})
+
+    def flush(self) -> int:
+        store = _store()
+        states = store.take_dirty(self.kind)
+        if states:
+            try:
+                self.flush_fn(states)
+            except Exception:
+                # Volta para os sujos: o próximo lote tenta de novo.
+                store.mark_dirty(self.kind, list(states))
+                raise
+        store.drop(self.kind, store.stale(self.kind, time.time() - STATE_TTL))
+        return len(states)
+
+    def _flush_quietly(self) -> None:
+        try:
+            self.flush()
+        except Exception:
+            logger.warning('Falha ao gravar o lote de progresso (%s)', self.kind, exc_info=True)
+
+
+def buffers() -> List[ProgressBuffer]:
+    return list(_BUFFERS.values())
+
+
+def flush_all(kinds: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """Grava os pares pendentes de todos os tipos (ou dos informados)."""
+    return {
+        buffer.kind: buffer.flush()
+        for buffer in buffers()
+        if kinds is None or buffer.kind in kinds
+    }
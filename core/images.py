@@ -0,0 +1,234 @@
+"""
+Derivados de imagem (miniatura e tamanho de exibição) para fotos enviadas.
+
+Fotos de celular chegam com vários MB e eram servidas como vieram nas telas de
+aprovação e galerias. Depois do upload, este módulo gera em segundo plano uma
+versão ``thumb`` e uma ``display`` em WebP (com EXIF removido e orientação
+corrigida), grava no mesmo storage do arquivo original e registra dimensões e
+tamanho em ``core.ImageDerivative``.
+
+Nas templates, ``{{ arquivo|image_variant:'thumb' }}`` (``core.templatetags.
+image_tags``) devolve a URL do derivado, ou a do original enquanto ele ainda não
+foi gerado — a página nunca quebra por falta de derivado.
+"""
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Lado maior (px) de cada variante.
+VARIANTS: Dict[str, int] = {
+    'thumb': 320,
+    'display': 1280,
+}
+OUTPUT_FORMAT = 'WEBP'
+OUTPUT_EXTENSION = '.webp'
+OUTPUT_QUALITY = 80
+
+# (modelo, campo) que recebem derivados automaticamente no upload e no backfill.
+IMAGE_SOURCES: List[Tuple[str, str]] = [
+    ('checklists.ChecklistTaskEvidence', 'file'),
+    ('experiencia.ExperienciaAnswer', 'photo'),
+    ('experiencia.ExperienciaAnswerPhoto', 'photo'),
+    ('assets.ProductMedia', 'file'),
+    ('knowledge_trails.SlideImage', 'image'),
+    ('users.User', 'profile_picture'),
+    ('tickets.TicketAttachment', 'file'),
+]
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff'}
+
+# Lookups de derivado acontecem várias vezes por página (uma por foto), então
+# ficam no cache local do processo, como o get_user_role do Simulador.
+CACHE_PREFIX = 'imgder:'
+CACHE_TTL = 300
+CACHE_TTL_MISSING = 60
+
+# Poucos workers: o Pillow usa CPU e o processo web continua atendendo requests.
+_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-derivatives')
+
+
+def derivatives_enabled() -> bool:
+    return getattr(settings, 'IMAGE_DERIVATIVES_ENABLED', True)
+
+
+def is_image_name(name: str) -> bool:
+    return os.path.splitext(name or '')[1].lower() in IMAGE_EXTENSIONS
+
+
+def _source_hash(source_name: str) -> str:
+    return hashlib.sha1(source_name.encode('utf-8')).hexdigest()
+
+
+def derivative_name(source_name: str, variant: str) -> str:
+    """Caminho do derivado no storage: derivatives/<variante>/<ab>/<sha1>.webp."""
+    digest = _source_hash(source_name)
+    return f'derivatives/{variant}/{digest[:2]}/{digest}{OUTPUT_EXTENSION}'
+
+
+def _cache():
+    try:
+        return caches['local']
+    except Exception:
+        return caches['default']
+
+
+def _cache_key(source_name: str) -> str:
+    return CACHE_PREFIX + _source_hash(source_name)
+
+
+def render_variant(image, max_side: int) -> Tuple[bytes, int, int]:
+    """Redimensiona (sem ampliar) e codifica em WebP. Retorna (bytes, largura, altura)."""
+    from PIL import Image
+
+    variant = image.copy()
+    variant.thumbnail((max_side, max_side), Image.LANCZOS)
+    if variant.mode not in ('RGB', 'RGBA'):
+        variant = variant.convert('RGBA' if 'A' in variant.getbands() else 'RGB')
+
+    buffer = io.BytesIO()
+    # Sem ``exif=``: o Pillow não copia os metadados (GPS, aparelho) para o derivado.
+    variant.save(buffer, OUTPUT_FORMAT, quality=OUTPUT_QUALITY, method=4)
+    return buffer.getvalue(), variant.width, variant.height
+
+
+def generate_derivatives(storage, source_name: str, force: bool = False) -> List:
+    """Gera todas as variantes de ``source_name``. Nunca levanta; devolve as criadas."""
+    from PIL import Image, ImageOps
+
+    from core.models import ImageDerivative
+
+    if not source_name or not is_image_name(source_name):
+        return []
+
+    existing = {
+        d.variant: d for d in ImageDerivative.objects.filter(source_name=source_name)
+    }
+    if not force and set(VARIANTS) <= set(existing):
+        return []
+
+    try:
+        with storage.open(source_name, 'rb') as fh:
+            raw = fh.read()
+        image = Image.open(io.BytesIO(raw))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except Exception:
+        logger.warning('Não foi possível abrir a imagem %s para gerar derivados', source_name, exc_info=True)
+        return []
+
+    created = []
+    for variant, max_side in VARIANTS.items():
+        if variant in existing and not force:
+            continue
+        try:
+            data, width, height = render_variant(image, max_side)
+            target = derivative_name(source_name, variant)
+            if storage.exists(target):
+                storage.delete(target)
+            saved_name = storage.save(target, ContentFile(data))
+        except Exception:
+            logger.exception('Falha ao gerar o derivado %s de %s', variant, source_name)
+            continue
+
+        derivative, _ = ImageDerivative.objects.update_or_create(
+            source_name=source_name,
+            variant=variant,
+            defaults={
+                'file_name': saved_name,
+                'width': width,
+                'height': height,
+                'size_bytes': len(data),
+                'source_width': image.width,
+                'source_height': image.height,
+                'source_size_bytes': len(raw),
+            },
+        )
+        created.append(derivative)
+
+    _cache().delete(_cache_key(source_name))
+    return created
+
+
+def _run_job(storage, source_name: str) -> None:
+    try:
+        generate_derivatives(storage, source_name)
+    except Exception:
+        logger.exception('Falha inesperada gerando derivados de %s', source_name)
+    finally:
+        # Thread própria abre suas conexões de banco; precisa devolvê-las.
+        from django.db import connections
+        connections.close_all()
+
+
+def schedule_derivatives(fieldfile) -> bool:
+    """Agenda a geração dos derivados após o commit. Retorna False se não se aplica."""
+    name = getattr(fieldfile, 'name', '') or ''
+    if not derivatives_enabled() or not is_image_name(name):
+        return False
+    # Já tem derivados conhecidos neste processo: nada a fazer.
+    if _cache().get(_cache_key(name)):
+        return False
+
+    storage = fieldfile.storage
+    transaction.on_commit(lambda: _EXECUTOR.submit(_run_job, storage, name))
+    return True
+
+
+def _load_variants(names: Iterable[str]) -> Dict[str, Dict[str, str]]:
+    """{source_name: {variante: arquivo}} usando o cache local e UMA consulta para o resto."""
+    from core.models import ImageDerivative
+
+    names = [n for n in set(names) if n]
+    if not names:
+        return {}
+
+    cache = _cache()
+    keys = {_cache_key(n): n for n in names}
+    cached = cache.get_many(list(keys))
+    result = {keys[k]: v for k, v in cached.items()}
+
+    missing = [n for n in names if n not in result]
+    if missing:
+        found: Dict[str, Dict[str, str]] = {n: {} for n in missing}
+        rows = ImageDerivative.objects.filter(source_name__in=missing).values_list(
+            'source_name', 'variant', 'file_name'
+        )
+        for source_name, variant, file_name in rows:
+            found[source_name][variant] = file_name
+        for source_name, variants in found.items():
+            cache.set(_cache_key(source_name), variants, CACHE_TTL if variants else CACHE_TTL_MISSING)
+        result.update(found)
+    return result
+
+
+def prefetch_variants(fieldfiles: Iterable) -> None:
+    """Aquece o cache de derivados de uma página inteira com uma única consulta."""
+    _load_variants(getattr(f, 'name', '') for f in fieldfiles if f)
+
+
+def variant_url(fieldfile, variant: str) -> Optional[str]:
+    """URL do derivado ``variant`` do arquivo, ou a URL do original se não houver."""
+    name = getattr(fieldfile, 'name', '') or ''
+    if not name:
+        return None
+    if variant in VARIANTS and is_image_name(name):
+        file_name = _load_variants([name]).get(name, {}).get(variant)
+        if file_name:
+            try:
+                return fieldfile.storage.url(file_name)
+            except Exception:
+                logger.warning('Falha ao montar a URL do derivado %s', file_name, exc_info=True)
+    try:
+        return fieldfile.url
+    except Exception:
+        return None
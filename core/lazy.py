@@ -0,0 +1,98 @@
+"""Importação adiada das bibliotecas pesadas (pandas, openpyxl, pdfplumber).
+
+``redeconfianca.urls`` importa as views de todos os apps. Com ``import pandas``
+e ``import openpyxl`` no topo dos módulos, cada boot de worker e cada
+``manage.py`` do cron (``warm_realized_cache``, ``sync_tangerino``,
+``sync_fibras``) pagava centenas de milissegundos e dezenas de MB antes de
+fazer qualquer coisa — mesmo sem nunca gerar uma planilha.
+
+Os módulos declaram o que usam com os mesmos nomes de antes::
+
+    pd = lazy_import('pandas')
+    Workbook = lazy_attr('openpyxl', 'Workbook')
+
+e o import de verdade acontece no primeiro uso (``pd.read_excel(...)``,
+``Workbook()``). ``manage.py profile_startup`` mostra o custo de import por
+app e ``manage.py benchmark_startup`` falha se o boot passar do orçamento.
+"""
+import importlib
+import importlib.util
+import threading
+from typing import Optional
+
+# Bibliotecas que não devem ser carregadas só por importar as URLs.
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl', 'pdfplumber', 'openai')
+
+_lock = threading.Lock()
+
+
+class LazyModule:
+    """Substituto do módulo: importa no primeiro acesso a atributo."""
+
+    def __init__(self, name: str):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with _lock:
+                module = self.__dict__['_module']
+                if module is None:
+                    module = importlib.import_module(self._name)
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = 'carregado' if self.__dict__['_module'] is not None else 'adiado'
+        return f'<LazyModule {self._name} ({state})>'
+
+
+class LazyAttr:
+    """Nome importado com ``from módulo import nome``, resolvido no primeiro uso.
+
+    Chamável (classes e funções); atributos são repassados ao objeto real.
+    """
+
+    def __init__(self, module: str, name: str):
+        self._module = LazyModule(module)
+        self._attr = name
+
+    def resolve(self):
+        return getattr(self._module, self._attr)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        return getattr(self.resolve(), attr)
+
+    def __repr__(self):
+        return f'<LazyAttr {self._module._name}.{self._attr}>'
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def lazy_attr(module: str, name: str) -> LazyAttr:
+    return LazyAttr(module, name)
+
+
+def lazy_optional(name: str) -> Optional[LazyModule]:
+    """Como ``lazy_import``, mas ``None`` se a biblioteca não estiver instalada.
+
+    Substitui o ``try: import x / except ImportError: x = None`` sem carregar
+    o módulo (só procura o pacote no ``sys.path``).
+    """
+    if importlib.util.find_spec(name) is None:
+        return None
+    return LazyModule(name)
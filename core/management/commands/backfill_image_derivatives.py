@@ -0,0 +1,114 @@
+"""
+Gera os derivados de imagem (thumb/display) das fotos já existentes no storage.
+
+Uploads novos recebem derivados automaticamente (core.signals); este comando
+cobre a mídia enviada antes disso ou após mudança das variantes (--force).
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from core.images import IMAGE_SOURCES, VARIANTS, generate_derivatives, is_image_name
+from core.models import ImageDerivative
+
+
+class Command(BaseCommand):
+    help = 'Gera miniaturas e versões de exibição (WebP) das imagens já enviadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            action='append',
+            help='Limita a um modelo (ex.: checklists.ChecklistTaskEvidence). Pode repetir.'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=0,
+            help='Máximo de imagens processadas por modelo (0 = todas)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Tamanho do lote na checagem de derivados existentes (padrão: 200)'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regera os derivados mesmo quando já existem'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas conta o que seria processado'
+        )
+
+    def handle(self, *args, **options):
+        sources = IMAGE_SOURCES
+        if options['model']:
+            wanted = set(options['model'])
+            sources = [s for s in IMAGE_SOURCES if s[0] in wanted]
+            unknown = wanted - {s[0] for s in sources}
+            if unknown:
+                raise CommandError(f'Modelo(s) sem derivados configurados: {", ".join(sorted(unknown))}')
+
+        total_generated = 0
+        for label, field_name in sources:
+            model = apps.get_model(label)
+            generated, skipped = self._backfill_model(model, field_name, options)
+            total_generated += generated
+            self.stdout.write(f'{label}.{field_name}: {generated} gerada(s), {skipped} já prontas')
+
+        verb = 'seriam geradas' if options['dry_run'] else 'geradas'
+        self.stdout.write(self.style.SUCCESS(f'Concluído: {total_generated} imagem(ns) {verb}.'))
+
+    def _backfill_model(self, model, field_name, options):
+        queryset = (
+            model.objects.exclude(**{field_name: ''})
+            .exclude(**{f'{field_name}__isnull': True})
+            .order_by('pk')
+            .values_list(field_name, flat=True)
+        )
+        storage = model._meta.get_field(field_name).storage
+        limit = options['limit']
+        batch_size = options['batch_size']
+        generated = skipped = 0
+
+        batch = []
+        for name in queryset.iterator(chunk_size=batch_size):
+            if not is_image_name(name):
+                continue
+            batch.append(name)
+            # O último lote vai só até o limite: cada nome gera no máximo uma imagem.
+            if len(batch) >= (min(batch_size, limit - generated) if limit else batch_size):
+                g, s = self._process_batch(storage, batch, options)
+                generated, skipped = generated + g, skipped + s
+                batch = []
+            if limit and generated >= limit:
+                return generated, skipped
+        if batch:
+            g, s = self._process_batch(storage, batch, options)
+            generated, skipped = generated + g, skipped + s
+        return generated, skipped
+
+    def _process_batch(self, storage, names, options):
+        done = set()
+        if not options['force']:
+            # Uma consulta por lote para descobrir quais já têm todas as variantes.
+            have = {}
+            for source_name, variant in ImageDerivative.objects.filter(
+                source_name__in=names
+            ).values_list('source_name', 'variant'):
+                have.setdefault(source_name, set()).add(variant)
+            done = {n for n, variants in have.items() if set(VARIANTS) <= variants}
+
+        generated = 0
+        for name in names:
+            if name in done:
+                continue
+            if options['dry_run']:
+                generated += 1
+                continue
+            if generate_derivatives(storage, name, force=options['force']):
+                generated += 1
+        return generated, len(done)
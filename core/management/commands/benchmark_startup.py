@@ -0,0 +1,61 @@
+"""
+Orçamento de boot, para rodar no CI ou localmente antes do deploy.
+
+Sobe o Django ``--runs`` vezes em subprocessos novos (setup + import das
+URLs, ver core/startup.py) e falha (código de saída 1) se a mediana do tempo
+passar de ``--budget-ms``, se o pico de RSS passar de ``--budget-rss-mb`` ou
+se alguma biblioteca pesada (pandas, openpyxl...) for carregada no boot.
+
+Os orçamentos padrão vêm de ``STARTUP_BUDGET_MS`` e ``STARTUP_BUDGET_RSS_MB``.
+
+    python manage.py benchmark_startup --runs 5
+"""
+import statistics
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import startup
+
+
+class Command(BaseCommand):
+    help = 'Falha se o boot do Django passar do orçamento de tempo ou memória'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--budget-ms', type=float, default=settings.STARTUP_BUDGET_MS)
+        parser.add_argument('--budget-rss-mb', type=float, default=settings.STARTUP_BUDGET_RSS_MB)
+        parser.add_argument('--allow-heavy', action='store_true',
+                            help='Não falha por biblioteca pesada carregada no boot')
+
+    def handle(self, *args, **opts):
+        samples = []
+        for _ in range(max(1, opts['runs'])):
+            try:
+                samples.append(startup.measure())
+            except RuntimeError as exc:
+                raise CommandError(f'Falha ao subir o Django: {exc}')
+
+        wall = statistics.median(sample.wall_ms for sample in samples)
+        setup = statistics.median(sample.setup_ms for sample in samples)
+        urls = statistics.median(sample.urls_ms for sample in samples)
+        rss = max(sample.rss_mb for sample in samples)
+        heavy = sorted({name for sample in samples for name in sample.heavy})
+
+        self.stdout.write(
+            f'{len(samples)} boots: mediana {wall:.0f} ms (setup {setup:.0f} ms, URLs {urls:.0f} ms; '
+            f'orçamento {opts["budget_ms"]:.0f} ms), pico de RSS {rss:.0f} MB '
+            f'(orçamento {opts["budget_rss_mb"]:.0f} MB)'
+        )
+
+        problems = []
+        if wall > opts['budget_ms']:
+            problems.append(f'tempo de boot {wall:.0f} ms > {opts["budget_ms"]:.0f} ms')
+        if rss > opts['budget_rss_mb']:
+            problems.append(f'RSS {rss:.0f} MB > {opts["budget_rss_mb"]:.0f} MB')
+        if heavy and not opts['allow_heavy']:
+            problems.append('bibliotecas pesadas no boot: ' + ', '.join(heavy))
+        if problems:
+            raise CommandError('Orçamento de boot estourado: ' + '; '.join(problems)
+                               + '. Veja `manage.py profile_startup`.')
+        self.stdout.write(self.style.SUCCESS('Dentro do orçamento.'))
@@ -0,0 +1,30 @@
+"""
+Grava no banco o progresso de vídeo acumulado no buffer de heartbeats.
+
+Os avisos do player (treinamentos, vídeos do Conectar) ficam no Redis e são
+gravados em lote (core/heartbeats.py). Rodar no cron a cada minuto; os
+próprios avisos também gravam o lote quando o cron atrasa.
+"""
+from django.core.management.base import BaseCommand
+
+from core.heartbeats import buffers, flush_all
+
+
+class Command(BaseCommand):
+    help = 'Grava em lote o progresso de vídeo pendente no buffer de heartbeats'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            action='append',
+            help='Limita a um tipo de buffer (ex.: training). Pode repetir.'
+        )
+
+    def handle(self, *args, **options):
+        kinds = options.get('kind')
+        known = {buffer.kind for buffer in buffers()}
+        for kind in kinds or []:
+            if kind not in known:
+                self.stderr.write(f'Tipo desconhecido: {kind} (conhecidos: {", ".join(sorted(known))})')
+        for kind, count in flush_all(kinds).items():
+            self.stdout.write(f'{kind}: {count} par(es) gravado(s)')
@@ -56,11 +56,20 @@ class Command(BaseCommand):
         created_count = 0
         updated_count = 0
         
+        # Templates e checklists já existentes do período: uma consulta cada,
+        # em vez de uma por dia.
+        active_templates = list(active_templates)
+        end_date = start_date + timedelta(days=options['days'] - 1)
+        existing_by_date = {
+            checklist.date: checklist
+            for checklist in DailyAdminChecklist.objects.filter(date__range=(start_date, end_date))
+        }
+        
         for i in range(options['days']):
             current_date = start_date + timedelta(days=i)
             
             # Verificar se já existe checklist para esta data
-            existing_checklist = DailyAdminChecklist.objects.filter(date=current_date).first()
+            existing_checklist = existing_by_date.get(current_date)
             
             if existing_checklist and not options['force']:
                 self.stdout.write(
@@ -84,15 +93,15 @@ class Command(BaseCommand):
                 created_count += 1
                 action = 'criado'
             
-            # Criar tarefas baseadas nos templates
-            tasks_created = 0
-            for template in active_templates:
-                AdminChecklistTask.objects.create(
+            # Criar tarefas baseadas nos templates (uma inserção em lote por dia)
+            tasks_created = len(AdminChecklistTask.objects.bulk_create([
+                AdminChecklistTask(
                     checklist=daily_checklist,
                     template=template,
                     status='PENDING'
                 )
-                tasks_created += 1
+                for template in active_templates
+            ]))
             
             self.stdout.write(
                 self.style.SUCCESS(
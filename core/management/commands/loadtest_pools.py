@@ -0,0 +1,85 @@
+"""
+Cenário de carga que mostra o isolamento entre os pools do Gunicorn.
+
+Enquanto ``--slow-clients`` conexões seguram requisições lentas
+(``/_loadtest/slow/``, que cai no pool heavy pelo nginx), outras
+``--fast-clients`` fazem ``--fast-requests`` chamadas leves (``/healthz/``) e
+o comando mede a latência delas. Rodar duas vezes:
+
+1. contra o nginx (``--base-url http://localhost``): as leves continuam em
+   milissegundos e respondem com ``X-Pool: web``;
+2. direto num pool só (``--base-url http://localhost:8000``): as lentas
+   ocupam as threads do próprio web e a latência das leves dispara.
+
+Sem nginx, ``--slow-base-url http://localhost:8001`` manda as lentas direto
+para o pool heavy e reproduz o caso 1.
+
+Precisa de ``LOADTEST_ENDPOINTS_ENABLED=True`` no servidor testado.
+"""
+import statistics
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+
+def _get(url, timeout):
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            return time.perf_counter() - started, response.status, response.headers.get('X-Pool', '?')
+    except urllib.error.HTTPError as err:
+        return time.perf_counter() - started, err.code, err.headers.get('X-Pool', '?')
+    except Exception:
+        return time.perf_counter() - started, 0, '-'
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = 'Mede a latência das rotas leves enquanto o pool heavy está ocupado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://localhost', help='Proxy (ou pool) a testar')
+        parser.add_argument('--slow-base-url', help='Destino das lentas (padrão: --base-url)')
+        parser.add_argument('--slow-path', default='/_loadtest/slow/', help='Rota lenta')
+        parser.add_argument('--slow-seconds', type=float, default=20)
+        parser.add_argument('--slow-clients', type=int, default=30)
+        parser.add_argument('--fast-path', default='/healthz/', help='Rota leve medida')
+        parser.add_argument('--fast-clients', type=int, default=10)
+        parser.add_argument('--fast-requests', type=int, default=200)
+        parser.add_argument('--timeout', type=float, default=60)
+
+    def handle(self, *args, **opts):
+        base = opts['base_url'].rstrip('/')
+        slow_base = (opts.get('slow_base_url') or base).rstrip('/')
+        slow_url = f"{slow_base}{opts['slow_path']}?seconds={opts['slow_seconds']}"
+        fast_url = f"{base}{opts['fast_path']}"
+        timeout = max(opts['timeout'], opts['slow_seconds'] + 10)
+
+        with ThreadPoolExecutor(max_workers=opts['slow_clients']) as slow_pool:
+            slow = [slow_pool.submit(_get, slow_url, timeout) for _ in range(opts['slow_clients'])]
+            time.sleep(1)  # as lentas ocupam os workers antes da medição
+            with ThreadPoolExecutor(max_workers=opts['fast_clients']) as fast_pool:
+                fast = list(fast_pool.map(lambda _: _get(fast_url, opts['timeout']), range(opts['fast_requests'])))
+            slow = [future.result() for future in slow]
+
+        ok = [elapsed for elapsed, status, _ in fast if status == 200]
+        self.stdout.write(f'Leves ({fast_url}): {len(ok)}/{len(fast)} OK')
+        if ok:
+            self.stdout.write(
+                f'  p50 {statistics.median(ok) * 1000:.0f} ms | p95 {_percentile(ok, 95) * 1000:.0f} ms'
+                f' | máx {max(ok) * 1000:.0f} ms'
+            )
+        self.stdout.write(f"  pools: {dict(Counter(pool for _, _, pool in fast))}")
+        self.stdout.write(
+            f"Lentas ({slow_url}): {sum(1 for _, status, _ in slow if status == 200)}/{len(slow)} OK, "
+            f"pools: {dict(Counter(pool for _, _, pool in slow))}"
+        )
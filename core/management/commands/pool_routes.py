@@ -0,0 +1,16 @@
+"""
+Imprime o bloco ``map`` do nginx.conf que separa os pools do Gunicorn.
+
+As rotas pesadas ficam em redeconfianca/serving.py; depois de mudar a lista,
+rode este comando e cole a saída no nginx.conf (o teste acusa se esquecer).
+"""
+from django.core.management.base import BaseCommand
+
+from redeconfianca.serving import nginx_map
+
+
+class Command(BaseCommand):
+    help = 'Imprime o bloco map do nginx que manda as rotas pesadas para o pool heavy'
+
+    def handle(self, *args, **options):
+        self.stdout.write(nginx_map())
@@ -0,0 +1,60 @@
+"""
+Custo de import do boot, por app.
+
+Sobe o Django num subprocesso com ``python -X importtime``, importa o
+``ROOT_URLCONF`` e soma o tempo de cada módulo no app do projeto que o puxou
+(ver core/startup.py). Lista também os módulos mais caros e as bibliotecas
+pesadas que foram carregadas sem necessidade (core/lazy.py).
+
+    python manage.py profile_startup --top 15
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core import startup
+
+
+def _walk(nodes):
+    for node in nodes:
+        yield node
+        yield from _walk(node.children)
+
+
+class Command(BaseCommand):
+    help = 'Mostra o custo de import do boot (setup + URLs) por app'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help='Quantos apps/módulos listar')
+        parser.add_argument('--all', action='store_true', help='Inclui Django e bibliotecas de terceiros')
+
+    def handle(self, *args, **opts):
+        try:
+            sample = startup.measure(importtime=True)
+        except RuntimeError as exc:
+            raise CommandError(f'Falha ao subir o Django: {exc}')
+
+        self.stdout.write(
+            f'Boot: {sample.wall_ms:.0f} ms no total (setup {sample.setup_ms:.0f} ms, '
+            f'URLs {sample.urls_ms:.0f} ms), pico de RSS {sample.rss_mb:.0f} MB'
+        )
+
+        packages = startup.project_packages()
+        costs = startup.cost_by_owner(sample.imports, packages)
+        rows = sorted(costs.items(), key=lambda item: item[1], reverse=True)
+        if not opts['all']:
+            rows = [row for row in rows if row[0] in packages]
+        self.stdout.write('\nImport por app (inclui o que o app puxou):')
+        for owner, ms in rows[:opts['top']]:
+            self.stdout.write(f'  {owner:<28} {ms:8.1f} ms')
+
+        slowest = sorted(_walk(sample.imports), key=lambda node: node.cumulative_us, reverse=True)
+        self.stdout.write('\nMódulos mais caros (acumulado):')
+        for node in slowest[:opts['top']]:
+            self.stdout.write(f'  {node.name:<48} {node.cumulative_us / 1000:8.1f} ms')
+
+        if sample.heavy:
+            self.stdout.write(self.style.WARNING(
+                '\nBibliotecas pesadas carregadas no boot: ' + ', '.join(sample.heavy)
+                + ' — importe pelo core.lazy ou dentro da função que usa.'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('\nNenhuma biblioteca pesada carregada no boot.'))
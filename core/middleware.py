@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
+from . import perf
 from .models import SystemLog
 
 
@@ -18,6 +20,49 @@ class LoggingMiddleware(MiddlewareMixin):
         return ip
 
 
+class PerformanceMiddleware:
+    """Mede consultas, cache e serviços externos de uma amostra das requisições.
+
+    Os números vão para o relatório de ``core.perf.perf_report`` e, para
+    superadmins (ou com DEBUG), para o header ``Server-Timing``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        perf.install()
+
+    def __call__(self, request):
+        if not perf.should_sample(request):
+            return self.get_response(request)
+
+        with perf.profiling() as profile:
+            response = self.get_response(request)
+
+        # O usuário só é conhecido depois da view: uma medição forçada pelo
+        # header de quem não pode ver os tempos não entra no relatório.
+        may_see_timings = self._may_see_timings(request)
+        if perf.forced_sample(request) and not may_see_timings:
+            return response
+
+        view = getattr(request, 'perf_view', None)
+        if view:
+            perf.record(view, profile, response.status_code)
+        if may_see_timings:
+            response['Server-Timing'] = perf.server_timing(profile)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        func = getattr(view_func, 'view_class', view_func)
+        request.perf_view = f'{func.__module__}.{getattr(func, "__qualname__", func.__class__.__name__)}'
+        return None
+
+    @staticmethod
+    def _may_see_timings(request):
+        if settings.DEBUG:
+            return True
+        return perf.can_see_timings(getattr(request, 'user', None))
+
+
 def log_action(user, action_type, description, request=None):
     """
     Função utilitária para registrar ações no sistema
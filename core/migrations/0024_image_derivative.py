@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_make_due_date_nullable'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageDerivative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_name', models.CharField(db_index=True, max_length=500, verbose_name='Arquivo original')),
+                ('variant', models.CharField(max_length=20, verbose_name='Variante')),
+                ('file_name', models.CharField(max_length=500, verbose_name='Arquivo derivado')),
+                ('width', models.PositiveIntegerField(default=0, verbose_name='Largura')),
+                ('height', models.PositiveIntegerField(default=0, verbose_name='Altura')),
+                ('size_bytes', models.PositiveIntegerField(default=0, verbose_name='Tamanho (bytes)')),
+                ('source_width', models.PositiveIntegerField(default=0, verbose_name='Largura original')),
+                ('source_height', models.PositiveIntegerField(default=0, verbose_name='Altura original')),
+                ('source_size_bytes', models.PositiveBigIntegerField(default=0, verbose_name='Tamanho original (bytes)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Derivado de Imagem',
+                'verbose_name_plural': 'Derivados de Imagem',
+                'constraints': [models.UniqueConstraint(fields=('source_name', 'variant'), name='unique_image_derivative_variant')],
+            },
+        ),
+    ]
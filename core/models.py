@@ -1325,3 +1325,36 @@ class AdminChecklistAssignment(models.Model):
     
     def __str__(self):
         return f"{self.task_template.title} → {self.user.get_full_name()}"
+
+
+class ImageDerivative(models.Model):
+    """Versão reduzida (miniatura/exibição) de uma imagem enviada ao portal.
+
+    Identificada pelo caminho do arquivo original no storage, e não por FK,
+    para servir igualmente evidências de checklist, fotos de produto, fotos de
+    perfil etc. Gerada em segundo plano por ``core.images``.
+    """
+
+    source_name = models.CharField(max_length=500, db_index=True, verbose_name="Arquivo original")
+    variant = models.CharField(max_length=20, verbose_name="Variante")
+    file_name = models.CharField(max_length=500, verbose_name="Arquivo derivado")
+    width = models.PositiveIntegerField(default=0, verbose_name="Largura")
+    height = models.PositiveIntegerField(default=0, verbose_name="Altura")
+    size_bytes = models.PositiveIntegerField(default=0, verbose_name="Tamanho (bytes)")
+    source_width = models.PositiveIntegerField(default=0, verbose_name="Largura original")
+    source_height = models.PositiveIntegerField(default=0, verbose_name="Altura original")
+    source_size_bytes = models.PositiveBigIntegerField(default=0, verbose_name="Tamanho original (bytes)")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Derivado de Imagem"
+        verbose_name_plural = "Derivados de Imagem"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source_name', 'variant'],
+                name='unique_image_derivative_variant',
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.source_name} [{self.variant}] {self.width}x{self.height}"
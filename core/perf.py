@@ -0,0 +1,456 @@
+"""
+Instrumentação de desempenho por requisição.
+
+Numa requisição amostrada (``PERF_SAMPLE_RATE``) o ``PerformanceMiddleware``
+abre um ``RequestProfile`` e, enquanto a view roda, são contados:
+
+- consultas ao banco e o tempo gasto nelas (``execute_wrapper`` do Django),
+  agrupadas por "forma" do SQL para detectar N+1;
+- acertos e faltas de cache (backends ``Instrumented*Cache`` do settings);
+- tempo em serviços externos: HTTP via ``requests`` (Tangerino, OneSignal,
+  OneDrive…) e o MySQL de vendas via PyMySQL.
+
+Ao fim, os números vão para um agregado diário por view no Redis (um hash
+com somas e histogramas; ver ``record``) e, para superadmins, para o header
+``Server-Timing`` — que o DevTools do navegador já sabe mostrar. Requisições
+não amostradas pagam só um ``random()``.
+
+Os percentis do relatório (``perf_report``) são estimados pelos histogramas:
+valem o limite superior do balde, precisão suficiente para achar a view lenta.
+"""
+import contextvars
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Limites superiores dos baldes dos histogramas (o último é "acima disso").
+DURATION_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Trecho do host -> nome do serviço no relatório/Server-Timing.
+EXTERNAL_HOSTS = (
+    ('tangerino', 'tangerino'),
+    ('onesignal', 'onesignal'),
+    ('graph.microsoft', 'onedrive'),
+    ('sharepoint', 'onedrive'),
+    ('onedrive', 'onedrive'),
+    ('1drv.ms', 'onedrive'),
+)
+
+KEY_PREFIX = 'perf:'
+
+_current: contextvars.ContextVar = contextvars.ContextVar('perf_profile', default=None)
+
+
+class RequestProfile:
+    """Contadores de uma requisição amostrada."""
+
+    __slots__ = ('started', 'total_ms', 'queries', 'db_ms', 'shapes',
+                 'cache_hits', 'cache_misses', 'external')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total_ms = 0.0
+        self.queries = 0
+        self.db_ms = 0.0
+        self.shapes: Counter = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.external: Dict[str, float] = {}
+
+    def finish(self) -> None:
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+
+    def repeated_shapes(self, threshold: int) -> List[tuple]:
+        """Formas de SQL repetidas ``threshold`` vezes ou mais (suspeitas de N+1)."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current.get()
+
+
+# --- SQL ---------------------------------------------------------------------
+
+_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_SQL_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SQL_IN_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_SQL_SPACES = re.compile(r'\s+')
+
+
+def sql_shape(sql: str) -> str:
+    """SQL sem literais: ``WHERE id = 7`` e ``WHERE id = 9`` têm a mesma forma.
+
+    O Django já passa os parâmetros à parte (``%s``); aqui saem também os
+    literais de SQL cru e as listas de ``IN`` de tamanho variável.
+    """
+    shape = _SQL_STRING.sub('?', sql)
+    shape = _SQL_NUMBER.sub('?', shape)
+    shape = _SQL_IN_LIST.sub('(...)', shape)
+    return _SQL_SPACES.sub(' ', shape).strip()
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.db_ms += (time.perf_counter() - start) * 1000
+        profile.shapes[sql_shape(sql)] += 1
+
+
+# --- Cache -------------------------------------------------------------------
+
+_MISS = object()
+
+
+def _record_cache(hits: int, misses: int) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.cache_hits += hits
+        profile.cache_misses += misses
+
+
+class _InstrumentedCacheMixin:
+    def get(self, key, default=None, version=None, **kwargs):
+        value = super().get(key, _MISS, version=version, **kwargs)
+        # Com IGNORE_EXCEPTIONS o Redis fora devolve None: conta como falta.
+        _record_cache(*((0, 1) if value is _MISS or value is None else (1, 0)))
+        return default if value is _MISS else value
+
+
+class InstrumentedLocMemCache(_InstrumentedCacheMixin, LocMemCache):
+    """LocMemCache que conta acertos/faltas (o get_many da base já passa pelo get)."""
+
+
+try:
+    from django_redis.cache import RedisCache
+except ImportError:  # pragma: no cover - django-redis é dependência do projeto
+    RedisCache = None
+else:
+    class InstrumentedRedisCache(_InstrumentedCacheMixin, RedisCache):
+        """RedisCache do django-redis que conta acertos/faltas."""
+
+        def get_many(self, keys, *args, **kwargs):
+            keys = list(keys)
+            found = super().get_many(keys, *args, **kwargs)
+            _record_cache(len(found), len(keys) - len(found))
+            return found
+
+
+# --- Serviços externos -------------------------------------------------------
+
+@contextmanager
+def external(service: str):
+    """Soma o tempo do bloco ao serviço externo ``service`` (se amostrado)."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.external[service] = profile.external.get(service, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def service_for_url(url: str) -> str:
+    host = (urlsplit(url).hostname or '').lower()
+    for needle, service in EXTERNAL_HOSTS:
+        if needle in host:
+            return service
+    return 'http'
+
+
+def _timed(original, service_of):
+    def wrapper(self, *args, **kwargs):
+        if _current.get() is None:
+            return original(self, *args, **kwargs)
+        with external(service_of(self, *args)):
+            return original(self, *args, **kwargs)
+    wrapper.__wrapped__ = original
+    return wrapper
+
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install() -> None:
+    """Liga a medição de ``requests`` e PyMySQL (uma vez por processo).
+
+    Todas as chamadas HTTP do projeto passam por ``Session.send`` (inclusive
+    ``requests.get``) e todo SQL do PyMySQL por ``Connection.query``; fora de
+    uma requisição amostrada o custo é um ``ContextVar.get``.
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        _installed = True
+
+        try:
+            import requests
+        except ImportError:
+            pass
+        else:
+            requests.Session.send = _timed(
+                requests.Session.send, lambda session, request, *a: service_for_url(request.url))
+
+        try:
+            from pymysql.connections import Connection
+        except ImportError:
+            pass
+        else:
+            Connection.connect = _timed(Connection.connect, lambda *a: 'mysql')
+            Connection.query = _timed(Connection.query, lambda *a: 'mysql')
+
+
+# --- Ciclo da requisição -----------------------------------------------------
+
+def can_see_timings(user) -> bool:
+    """Quem vê o Server-Timing e o relatório: superadmins (hierarquia ou Django)."""
+    return bool(user and user.is_authenticated and
+                (user.is_superuser or getattr(user, 'hierarchy', None) == 'SUPERADMIN'))
+
+
+def forced_sample(request) -> bool:
+    """``X-Perf-Sample: 1`` pede a medição desta chamada (para ler o Server-Timing).
+
+    Só vale com ``PERF_SAMPLE_HEADER_ENABLED``; o middleware ainda descarta a
+    medição forçada de quem não é superadmin.
+    """
+    return (getattr(settings, 'PERF_SAMPLE_HEADER_ENABLED', False)
+            and request.META.get('HTTP_X_PERF_SAMPLE') == '1')
+
+
+def should_sample(request) -> bool:
+    if not getattr(settings, 'PERF_INSTRUMENTATION_ENABLED', True):
+        return False
+    if forced_sample(request):
+        return True
+    return random.random() < getattr(settings, 'PERF_SAMPLE_RATE', 0.05)
+
+
+@contextmanager
+def profiling():
+    """Abre um ``RequestProfile`` e mede o banco de todas as conexões."""
+    profile = RequestProfile()
+    token = _current.set(profile)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(_db_wrapper))
+            yield profile
+    finally:
+        _current.reset(token)
+        profile.finish()
+
+
+def server_timing(profile: RequestProfile) -> str:
+    parts = [
+        f'app;dur={profile.total_ms:.1f}',
+        f'db;dur={profile.db_ms:.1f};desc="{profile.queries} queries"',
+        f'cache;desc="{profile.cache_hits} hits, {profile.cache_misses} misses"',
+    ]
+    for service, ms in sorted(profile.external.items()):
+        parts.append(f'ext-{service};dur={ms:.1f}')
+    return ', '.join(parts)
+
+
+def _bucket(value: float, bounds) -> str:
+    for bound in bounds:
+        if value <= bound:
+            return str(bound)
+    return 'inf'
+
+
+def record(view: str, profile: RequestProfile, status_code: int) -> None:
+    """Acumula a requisição no agregado do dia da view e avisa de N+1."""
+    threshold = getattr(settings, 'PERF_NPLUS1_THRESHOLD', 5)
+    repeated = profile.repeated_shapes(threshold)
+    for shape, count in repeated[:3]:
+        logger.warning('Possível N+1 em %s: %d× %s', view, count, shape[:300])
+
+    fields = {
+        'n': 1,
+        'ms': round(profile.total_ms),
+        'q': profile.queries,
+        'db_ms': round(profile.db_ms),
+        'hits': profile.cache_hits,
+        'misses': profile.cache_misses,
+        'n1': 1 if repeated else 0,
+        'err': 1 if status_code >= 500 else 0,
+        f'd:{_bucket(profile.total_ms, DURATION_BUCKETS_MS)}': 1,
+        f'q:{_bucket(profile.queries, QUERY_BUCKETS)}': 1,
+    }
+    for service, ms in profile.external.items():
+        fields[f'ext:{service}'] = round(ms)
+    nplus1 = {f'{view}|{shape[:500]}': 1 for shape, _ in repeated}
+
+    try:
+        _store().add(timezone.localdate().isoformat(), view, fields, nplus1)
+    except Exception:
+        logger.warning('Falha ao gravar métricas de desempenho', exc_info=True)
+
+
+# --- Armazenamento dos agregados ---------------------------------------------
+
+class _RedisStore:
+    """Hash por view e dia no Redis: ``HINCRBY`` num pipeline por requisição."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def add(self, day, view, fields, nplus1):
+        ttl = int(timedelta(days=getattr(settings, 'PERF_RETENTION_DAYS', 7)).total_seconds())
+        views_key, view_key, nplus1_key = _keys(day, view)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.sadd(views_key, view)
+        pipe.expire(views_key, ttl)
+        for field, value in fields.items():
+            if value:
+                pipe.hincrby(view_key, field, value)
+        pipe.expire(view_key, ttl)
+        for field in nplus1:
+            pipe.hincrby(nplus1_key, field, 1)
+        if nplus1:
+            pipe.expire(nplus1_key, ttl)
+        pipe.execute()
+
+    def read(self, day):
+        views_key, _, nplus1_key = _keys(day)
+        views = sorted(v.decode() if isinstance(v, bytes) else v for v in self.client.smembers(views_key))
+        pipe = self.client.pipeline(transaction=False)
+        for view in views:
+            pipe.hgetall(_keys(day, view)[1])
+        pipe.hgetall(nplus1_key)
+        *hashes, nplus1 = pipe.execute()
+        return dict(zip(views, (_decode(h) for h in hashes))), _decode(nplus1)
+
+
+class _MemoryStore:
+    """Agregado no próprio processo, para quando o cache não é Redis (dev/testes)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.days: Dict[str, tuple] = {}
+
+    def add(self, day, view, fields, nplus1):
+        with self.lock:
+            views, shapes = self.days.setdefault(day, ({}, Counter()))
+            views.setdefault(view, Counter()).update(fields)
+            shapes.update(nplus1)
+
+    def read(self, day):
+        with self.lock:
+            views, shapes = self.days.get(day, ({}, Counter()))
+            return {view: dict(data) for view, data in views.items()}, dict(shapes)
+
+    def clear(self):
+        with self.lock:
+            self.days.clear()
+
+
+def _keys(day, view=''):
+    return f'{KEY_PREFIX}{day}:views', f'{KEY_PREFIX}{day}:v:{view}', f'{KEY_PREFIX}{day}:nplus1'
+
+
+def _decode(mapping) -> Dict[str, int]:
+    return {
+        (k.decode() if isinstance(k, bytes) else k): int(v)
+        for k, v in (mapping or {}).items()
+    }
+
+
+_store_instance = None
+
+
+def _store():
+    global _store_instance
+    if _store_instance is None:
+        try:
+            from django_redis import get_redis_connection
+            _store_instance = _RedisStore(get_redis_connection('default'))
+        except Exception:
+            _store_instance = _MemoryStore()
+    return _store_instance
+
+
+# --- Relatório ---------------------------------------------------------------
+
+def _percentile(histogram: Dict[str, int], bounds, total: int, p: float) -> Optional[float]:
+    """Limite superior do balde onde cai o percentil ``p`` (acima do último: o último limite)."""
+    if not total:
+        return None
+    target = p * total
+    seen = 0
+    for bound in [*map(str, bounds), 'inf']:
+        seen += histogram.get(bound, 0)
+        if seen >= target:
+            return float(bound) if bound != 'inf' else float(bounds[-1])
+    return float(bounds[-1])
+
+
+def perf_report(days: int = 1, limit: int = 50) -> Dict[str, list]:
+    """Percentis e médias por view dos últimos ``days`` dias, mais lentas primeiro."""
+    store = _store()
+    today = timezone.localdate()
+    merged: Dict[str, Counter] = {}
+    nplus1: Counter = Counter()
+    for offset in range(max(days, 1)):
+        views, shapes = store.read((today - timedelta(days=offset)).isoformat())
+        for view, data in views.items():
+            merged.setdefault(view, Counter()).update(data)
+        nplus1.update(shapes)
+
+    rows = []
+    for view, data in merged.items():
+        n = data.get('n', 0)
+        if not n:
+            continue
+        durations = {k[2:]: v for k, v in data.items() if k.startswith('d:')}
+        queries = {k[2:]: v for k, v in data.items() if k.startswith('q:')}
+        rows.append({
+            'view': view,
+            'requests': n,
+            'p50_ms': _percentile(durations, DURATION_BUCKETS_MS, n, 0.50),
+            'p95_ms': _percentile(durations, DURATION_BUCKETS_MS, n, 0.95),
+            'p99_ms': _percentile(durations, DURATION_BUCKETS_MS, n, 0.99),
+            'avg_ms': round(data.get('ms', 0) / n, 1),
+            'avg_queries': round(data.get('q', 0) / n, 1),
+            'p95_queries': _percentile(queries, QUERY_BUCKETS, n, 0.95),
+            'avg_db_ms': round(data.get('db_ms', 0) / n, 1),
+            'cache_hits': data.get('hits', 0),
+            'cache_misses': data.get('misses', 0),
+            'external_avg_ms': {
+                k[4:]: round(v / n, 1) for k, v in data.items() if k.startswith('ext:')
+            },
+            'nplus1_requests': data.get('n1', 0),
+            'errors': data.get('err', 0),
+        })
+    rows.sort(key=lambda r: (r['p95_ms'] or 0, r['avg_ms']), reverse=True)
+
+    suspects = [
+        {'view': key.split('|', 1)[0], 'sql': key.split('|', 1)[1], 'requests': count}
+        for key, count in nplus1.most_common(limit)
+    ]
+    return {'views': rows[:limit], 'nplus1': suspects}
@@ -0,0 +1,144 @@
+"""
+GET condicional (ETag/304) e deltas para os endpoints JSON que o navegador
+consulta em intervalo (notificações, comunicados, fila do chat, ponto, convites).
+
+Cada endpoint declara de quais "versões" o seu payload depende — contadores
+por escopo no Redis (``poll:<escopo>:<chave>``), incrementados a cada escrita
+relevante (``bump``; os signals ficam em core/signals.py). O ETag da resposta
+é derivado dessas versões, então um ``If-None-Match`` igual devolve 304 sem a
+view rodar nenhuma consulta: uma aba ociosa custa uma leitura no Redis.
+
+Payloads que também mudam com o relógio (janela de vigência de comunicado,
+horas trabalhadas no ponto) informam ``time_bucket``: o ETag vira junto a
+cada N segundos, mesmo sem escrita.
+
+Se o Redis estiver fora, ``current_versions`` devolve None e a view roda
+normalmente, sem ETag — perde-se só a economia, nunca o dado.
+"""
+import hashlib
+import logging
+import time
+from functools import wraps
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponseNotModified
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'poll:'
+# Sem expiração: uma versão que some e volta precisa continuar "andando para
+# frente", por isso o valor inicial é o relógio em ms e não zero.
+VERSION_TIMEOUT = None
+
+Scope = Tuple[str, Optional[object]]
+
+
+def _key(scope: str, key=None) -> str:
+    return f'{KEY_PREFIX}{scope}:{key if key is not None else "*"}'
+
+
+def _seed() -> int:
+    return int(time.time() * 1000)
+
+
+def _bump_now(keys: Sequence[str]) -> None:
+    for cache_key in keys:
+        try:
+            cache.add(cache_key, _seed(), VERSION_TIMEOUT)
+            cache.incr(cache_key)
+        except ValueError:
+            # Expirou/foi removida entre o add e o incr: recomeça pelo relógio.
+            cache.set(cache_key, _seed(), VERSION_TIMEOUT)
+        except Exception:
+            logger.warning('Falha ao incrementar a versão de polling %s', cache_key, exc_info=True)
+
+
+def bump(scope: str, key=None) -> None:
+    """Marca o escopo como alterado. Roda após o commit, para o ETag novo não
+    ser servido com dados ainda não visíveis."""
+    bump_many(scope, [key])
+
+
+def bump_many(scope: str, keys: Iterable) -> None:
+    cache_keys = [_key(scope, k) for k in set(keys)]
+    if cache_keys:
+        transaction.on_commit(lambda: _bump_now(cache_keys))
+
+
+def current_versions(scopes: Sequence[Scope]) -> Optional[List[int]]:
+    """Versões atuais dos escopos; None se o cache não responder."""
+    cache_keys = [_key(scope, key) for scope, key in scopes]
+    try:
+        found = cache.get_many(cache_keys)
+        missing = [k for k in cache_keys if k not in found]
+        for cache_key in missing:
+            cache.add(cache_key, _seed(), VERSION_TIMEOUT)
+        if missing:
+            found.update(cache.get_many(missing))
+    except Exception:
+        logger.warning('Cache indisponível para versões de polling', exc_info=True)
+        return None
+    if any(found.get(k) is None for k in cache_keys):
+        return None
+    return [found[k] for k in cache_keys]
+
+
+def _etag(request, versions: List[int], time_bucket: Optional[int]) -> str:
+    parts = [request.get_full_path(), str(getattr(request.user, 'pk', ''))]
+    parts.extend(str(v) for v in versions)
+    if time_bucket:
+        parts.append(str(int(time.time()) // time_bucket))
+    digest = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _etag_matches(request, etag: str) -> bool:
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if not header:
+        return False
+    candidates = {c.strip() for c in header.split(',')}
+    # Proxies podem remover o W/; compara também sem ele.
+    return etag in candidates or etag[2:] in candidates or '*' in candidates
+
+
+def since_param(request) -> Optional[int]:
+    """Valor de ``?since=`` (último id já visto pelo cliente), ou None."""
+    try:
+        value = int(request.GET.get('since', ''))
+    except (TypeError, ValueError):
+        return None
+    return value if value >= 0 else None
+
+
+def conditional_poll(scopes: Callable[..., Sequence[Scope]], time_bucket: Optional[int] = None):
+    """Decorator para endpoints de polling.
+
+    ``scopes(request, *args, **kwargs)`` devolve os ``(escopo, chave)`` de que
+    o payload depende (chave None = escopo global). Deve ficar por dentro do
+    ``login_required``.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+
+            versions = current_versions(scopes(request, *args, **kwargs))
+            if versions is None:
+                return view_func(request, *args, **kwargs)
+
+            etag = _etag(request, versions, time_bucket)
+            if _etag_matches(request, etag):
+                response = HttpResponseNotModified()
+            else:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            # O navegador guarda a resposta mas revalida sempre (If-None-Match).
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,181 @@
+"""Motor de conciliação: casa itens de duas fontes sem varrer uma para cada item da outra.
+
+A conciliação da fatura do cartão filtrava a lista inteira de gastos pendentes
+para cada linha da fatura. Ela renormalizava os dois nomes a cada comparação e
+tirava o escolhido com ``list.remove``: O(n·m) com trabalho pesado de string.
+Com faturas corporativas de milhares de linhas, a tela travava. Aqui:
+
+* ``merchant_key`` normaliza cada nome **uma vez**, na entrada;
+* ``Reconciler`` guarda os candidatos em mapas por (valor, dia). Achar os de
+  mesmo valor dentro da tolerância custa ``2 × tolerância + 1`` consultas a
+  dicionário, não uma varredura;
+* o "estabelecimento parecido" (um nome contém o outro) sai de um índice de
+  trigramas por dia: só quem está na janela de datas e tem o trigrama mais
+  raro do nome (ou começa por um trigrama dele) chega à comparação de verdade;
+* casados saem por marcação (``taken``), sem mexer nas listas;
+* ``KeyedPool`` é o caso simples: chave exata, fila por chave, casamento
+  1-para-1 na ordem de chegada (planilhas × registros já gravados).
+
+A regra de negócio (o que é casar, desempate, tolerância) continua em quem
+chama: ``cartoes.fatura.conciliar`` e ``contestacao.views.update_exclusions``.
+Benchmark: ``manage.py benchmark_conciliacao``.
+"""
+import re
+import unicodedata
+from collections import defaultdict, deque
+from datetime import date
+from typing import Callable, Dict, FrozenSet, Generic, Hashable, Iterable, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+NGRAM = 3
+MIN_SIMILAR_LENGTH = 5
+
+_NON_KEY = re.compile(r'[^A-Z0-9]')
+
+
+def merchant_key(text) -> str:
+    """Nome comparável: sem acento, sem pontuação, sem espaço, em maiúsculas.
+
+    A fatura vem sem espaços ('PADARIANOVAREPUBLICA') e o portal, com eles.
+    Comparar sem separador algum é o que faz os dois se encontrarem.
+    """
+    ascii_text = unicodedata.normalize('NFKD', str(text or '')).encode('ascii', 'ignore').decode()
+    return _NON_KEY.sub('', ascii_text.upper())
+
+
+def similar_keys(a: str, b: str, min_length: int = MIN_SIMILAR_LENGTH) -> bool:
+    """Uma chave contém a outra, e a menor tem ao menos ``min_length`` caracteres."""
+    if not a or not b:
+        return False
+    shorter, longer = (a, b) if len(a) <= len(b) else (b, a)
+    return len(shorter) >= min_length and shorter in longer
+
+
+def _ngrams(key: str) -> FrozenSet[str]:
+    return frozenset(key[i:i + NGRAM] for i in range(len(key) - NGRAM + 1))
+
+
+class KeyedPool(Generic[T]):
+    """Multimapa chave → fila: cada ``take`` devolve o próximo item da chave.
+
+    Chaves repetidas casam 1-para-1, na ordem em que os itens entraram.
+    """
+
+    def __init__(self, items: Iterable[T], key: Callable[[T], Hashable]):
+        self._queues: Dict[Hashable, deque] = defaultdict(deque)
+        for item in items:
+            self._queues[key(item)].append(item)
+
+    def take(self, key: Hashable) -> Optional[T]:
+        queue = self._queues.get(key)
+        return queue.popleft() if queue else None
+
+    def remaining(self) -> List[T]:
+        return [item for queue in self._queues.values() for item in queue]
+
+
+class Reconciler(Generic[T]):
+    """Candidatos indexados por (valor, dia) e por (trigrama, dia) do nome.
+
+    ``amount``, ``when`` e ``name`` extraem valor, data e nome de cada
+    candidato. Os métodos ``best_*`` escolhem e já retiram o candidato;
+    empates ficam com o que veio primeiro na lista de entrada.
+    """
+
+    def __init__(self, candidates: Iterable[T], *, amount: Callable[[T], object],
+                 when: Callable[[T], date], name: Callable[[T], str],
+                 tolerance_days: int, min_similar_length: int = MIN_SIMILAR_LENGTH):
+        self.items: List[T] = list(candidates)
+        self.tolerance = tolerance_days
+        self.min_similar_length = min_similar_length
+        self.keys: List[str] = [merchant_key(name(c)) for c in self.items]
+        self.days: List[int] = [when(c).toordinal() for c in self.items]
+        self.taken = [False] * len(self.items)
+
+        self._by_amount_day: Dict[Tuple[object, int], List[int]] = defaultdict(list)
+        # (trigrama, dia) → candidatos que têm o trigrama / que começam por ele.
+        self._grams: Dict[Tuple[str, int], List[int]] = defaultdict(list)
+        self._prefixes: Dict[Tuple[str, int], List[int]] = defaultdict(list)
+        for index, candidate in enumerate(self.items):
+            day, key = self.days[index], self.keys[index]
+            self._by_amount_day[(amount(candidate), day)].append(index)
+            if len(key) < min_similar_length:
+                continue
+            for gram in _ngrams(key):
+                self._grams[(gram, day)].append(index)
+            self._prefixes[(key[:NGRAM], day)].append(index)
+
+    def _window(self, when: date) -> Tuple[int, range]:
+        day = when.toordinal()
+        return day, range(day - self.tolerance, day + self.tolerance + 1)
+
+    # ─── Consultas ───────────────────────────────────────────────────────────
+
+    def best_same_amount(self, amount, when: date, key: str) -> Optional[Tuple[T, bool, int]]:
+        """Mesmo valor dentro da tolerância; nome parecido primeiro, depois o dia mais perto.
+
+        Devolve ``(candidato, nome_parecido, dias_de_diferença)`` ou None.
+        """
+        day, window = self._window(when)
+        best = None
+        for other_day in window:
+            for index in self._by_amount_day.get((amount, other_day), ()):
+                if self.taken[index]:
+                    continue
+                similar = similar_keys(key, self.keys[index], self.min_similar_length)
+                rank = (not similar, abs(other_day - day), index)
+                if best is None or rank < best[0]:
+                    best = (rank, index, similar)
+        if best is None:
+            return None
+        _, index, similar = best
+        self.taken[index] = True
+        return self.items[index], similar, abs(self.days[index] - day)
+
+    def _similar_candidates(self, key: str, window: range) -> Iterable[int]:
+        """Quem pode conter ``key`` ou estar contido nela, dentro da janela.
+
+        Contém ``key`` ⇒ tem todos os trigramas dela: basta a lista do trigrama
+        mais raro. Está contido em ``key`` ⇒ começa por um trigrama dela.
+        """
+        grams = _ngrams(key)
+        rarest = min(grams, key=lambda gram: sum(len(self._grams.get((gram, d), ())) for d in window))
+        for other_day in window:
+            yield from self._grams.get((rarest, other_day), ())
+            for gram in grams:
+                yield from self._prefixes.get((gram, other_day), ())
+
+    def best_similar(self, when: date, key: str) -> Optional[T]:
+        """Nome parecido dentro da tolerância, qualquer valor; o dia mais perto ganha."""
+        if len(key) < self.min_similar_length:
+            return None
+        day, window = self._window(when)
+        best = None
+        for index in self._similar_candidates(key, window):
+            if self.taken[index]:
+                continue
+            rank = (abs(self.days[index] - day), index)
+            if (best is None or rank < best) and similar_keys(key, self.keys[index], self.min_similar_length):
+                best = rank
+        if best is None:
+            return None
+        self.taken[best[1]] = True
+        return self.items[best[1]]
+
+    def remaining(self) -> List[T]:
+        """Candidatos não casados, na ordem de entrada."""
+        return [item for item, taken in zip(self.items, self.taken) if not taken]
+
+
+def match_grade(similar: bool, day_distance: int) -> str:
+    """Qualidade de um casamento por valor: 'exata', 'forte' ou 'fraca'.
+
+    exata = mesmo dia e nome parecido; forte = um dos dois; fraca = só o valor
+    dentro da tolerância (vale conferir à mão).
+    """
+    if similar and day_distance == 0:
+        return 'exata'
+    if similar or day_distance == 0:
+        return 'forte'
+    return 'fraca'
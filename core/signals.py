@@ -2,7 +2,7 @@
 Signals para capturar automaticamente ações importantes do sistema
 """
 from django.contrib.auth.signals import user_logged_in, user_logged_out
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.conf import settings
 from .models import SystemLog
@@ -97,3 +97,92 @@ def log_prize_redemption(sender, instance, created, **kwargs):
 
 # Registrar alterações de C$ (se houver um modelo específico)
 # Você pode adicionar mais signals conforme necessário
+
+
+# Derivados de imagem (miniatura/exibição) das fotos enviadas
+def _schedule_image_derivatives(sender, instance, update_fields=None, **kwargs):
+    from core.images import schedule_derivatives
+
+    field_name = _IMAGE_SOURCE_FIELDS.get(sender._meta.label)
+    if not field_name:
+        return
+    # Saves parciais que não tocam a foto (ex.: last_login do usuário) não geram nada.
+    if update_fields is not None and field_name not in update_fields:
+        return
+    fieldfile = getattr(instance, field_name, None)
+    if fieldfile:
+        schedule_derivatives(fieldfile)
+
+
+def _connect_image_derivative_signals():
+    from core.images import IMAGE_SOURCES
+
+    for label, field_name in IMAGE_SOURCES:
+        _IMAGE_SOURCE_FIELDS[label] = field_name
+        post_save.connect(
+            _schedule_image_derivatives,
+            sender=label,
+            dispatch_uid=f'image_derivatives_{label}',
+        )
+
+
+_IMAGE_SOURCE_FIELDS = {}
+_connect_image_derivative_signals()
+
+
+# Versões de polling (ETag/304 dos endpoints consultados em intervalo).
+# Escritas em massa (bulk_create/update) não disparam signals: quem as faz
+# chama ``core.polling.bump_many`` diretamente.
+def _bump_user_scope(scope):
+    def handler(sender, instance, **kwargs):
+        from core.polling import bump
+        bump(scope, instance.user_id)
+    return handler
+
+
+def _bump_global_scope(scope):
+    def handler(sender, **kwargs):
+        from core.polling import bump
+        bump(scope)
+    return handler
+
+
+def _bump_event_participants(sender, instance, **kwargs):
+    from core.polling import bump_many
+    from agenda.models import EventParticipant
+
+    user_ids = EventParticipant.objects.filter(event_id=instance.pk).values_list('user_id', flat=True)
+    bump_many('agenda_invites', list(user_ids))
+
+
+_POLLING_HANDLERS = [
+    ('notifications.UserNotification', 'notifications', _bump_user_scope),
+    ('communications.CommunicationRead', 'communications', _bump_user_scope),
+    ('agenda.EventParticipant', 'agenda_invites', _bump_user_scope),
+    ('communications.Communication', 'communications', _bump_global_scope),
+    ('projects.SupportChat', 'support_queue', _bump_global_scope),
+]
+
+
+def _connect_polling_signals():
+    for label, scope, factory in _POLLING_HANDLERS:
+        handler = factory(scope)
+        _POLLING_RECEIVERS[label] = handler  # connect guarda referência fraca
+        for signal in (post_save, post_delete):
+            signal.connect(handler, sender=label, dispatch_uid=f'polling_{id(signal)}_{label}')
+
+    # Mudar os destinatários muda quem vê o comunicado.
+    m2m_changed.connect(
+        _POLLING_RECEIVERS['communications.Communication'],
+        sender='communications.Communication_recipients',
+        dispatch_uid='polling_communication_recipients',
+    )
+    post_save.connect(
+        _bump_event_participants,
+        sender='agenda.CalendarEvent',
+        dispatch_uid='polling_calendar_event',
+    )
+
+
+_POLLING_RECEIVERS = {}
+_connect_polling_signals()
@@ -7,8 +7,13 @@ signatário, imagem da assinatura, IP e ID do registro + hash de verificação.
 
 Usa apenas Pillow (desenho da página) e pypdfium2 (merge) — sem novas
 dependências além das já presentes no projeto.
+
+A parte fixa da folha (logo, título, texto de abertura) é desenhada uma vez
+por processo (``_header_layer``); cada certificado copia essa camada e
+escreve só os dados do registro. As fontes também ficam carregadas.
 """
 import base64
+import functools
 import io
 import os
 
@@ -34,7 +39,8 @@ _ACCENT = (22, 101, 52)
 _LINE = (209, 213, 219)
 
 
-def _font(size, bold=False):
+@functools.lru_cache(maxsize=32)
+def font(size, bold=False):
     """Fonte DejaVu (cobertura completa de acentos) embutida no repositório."""
     fname = 'DejaVuSans-Bold.ttf' if bold else 'DejaVuSans.ttf'
     path = os.path.join(settings.BASE_DIR, 'static', 'fonts', fname)
@@ -71,18 +77,15 @@ def _decode_signature(signature_data_url):
         return None
 
 
-def _build_certificate_pdf(*, doc_title, person_name, cpf, signed_at_str,
-                           ip, record_id, signature_data_url, hash_value,
-                           extra_lines=None):
-    """Desenha a folha do certificado e devolve os bytes de um PDF de 1 página."""
+@functools.lru_cache(maxsize=1)
+def _header_layer():
+    """Folha com logo, título e texto de abertura; devolve (imagem, y seguinte)."""
     img = Image.new('RGB', (_PAGE_W, _PAGE_H), 'white')
     d = ImageDraw.Draw(img)
 
-    f_title = _font(52, bold=True)
-    f_sub = _font(28)
-    f_label = _font(24)
-    f_value = _font(30)
-    f_small = _font(22)
+    f_title = font(52, bold=True)
+    f_sub = font(28)
+    f_small = font(22)
 
     # ── Logo centralizada ──
     logo_path = _logo_path()
@@ -116,6 +119,20 @@ def _build_certificate_pdf(*, doc_title, person_name, cpf, signed_at_str,
            'eletronicamente no Portal Rede Confiança, com os dados a seguir:',
            font=f_small, fill=_MUTED)
     y += 60
+    return img, y
+
+
+def _build_certificate_pdf(*, doc_title, person_name, cpf, signed_at_str,
+                           ip, record_id, signature_data_url, hash_value,
+                           extra_lines=None):
+    """Desenha a folha do certificado e devolve os bytes de um PDF de 1 página."""
+    header, y = _header_layer()
+    img = header.copy()
+    d = ImageDraw.Draw(img)
+
+    f_label = font(24)
+    f_value = font(30)
+    f_small = font(22)
 
     rows = [
         ('Documento', doc_title or '—'),
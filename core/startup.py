@@ -0,0 +1,130 @@
+"""Medição do boot: quanto custa subir o Django e importar as URLs.
+
+Cada worker do Gunicorn e cada ``manage.py`` do cron começam num processo
+novo. O que ``profile_startup`` e ``benchmark_startup`` medem é esse começo,
+sempre num subprocesso limpo (nada do processo atual fica em cache):
+
+* ``django.setup()`` — apps, modelos e ``ready()``, o que todo comando paga;
+* ``import`` do ``ROOT_URLCONF`` — todas as views, o que o worker paga na
+  primeira requisição.
+
+Com ``python -X importtime`` o subprocesso também devolve a árvore de imports.
+``cost_by_owner`` atribui o tempo de cada módulo ao app do projeto que o
+puxou: pandas importado por ``users.views`` conta para ``users``.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from .lazy import HEAVY_MODULES
+
+_PROBE = r'''
+import json, resource, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+from django.conf import settings
+__import__(settings.ROOT_URLCONF)
+urls_done = time.perf_counter()
+heavy = [name for name in json.loads(sys.argv[1]) if name in sys.modules]
+print(json.dumps({
+    'setup_ms': (setup_done - started) * 1000,
+    'urls_ms': (urls_done - setup_done) * 1000,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'heavy': heavy,
+}))
+'''
+
+
+@dataclass
+class ImportNode:
+    name: str
+    self_us: int
+    cumulative_us: int
+    children: List['ImportNode'] = field(default_factory=list)
+
+    @property
+    def root(self) -> str:
+        return self.name.split('.', 1)[0]
+
+
+@dataclass
+class StartupSample:
+    wall_ms: float
+    setup_ms: float
+    urls_ms: float
+    rss_mb: float
+    heavy: List[str]
+    imports: List[ImportNode] = field(default_factory=list)
+
+
+def parse_importtime(stderr: str) -> List[ImportNode]:
+    """Monta a árvore a partir da saída de ``-X importtime`` (pós-ordem)."""
+    pending: Dict[int, List[ImportNode]] = defaultdict(list)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # cabeçalho
+        raw_name = parts[2][1:]
+        depth = (len(raw_name) - len(raw_name.lstrip(' '))) // 2
+        node = ImportNode(raw_name.strip(), int(parts[0]), int(parts[1]))
+        node.children = pending.pop(depth + 1, [])
+        pending[depth].append(node)
+    return pending.get(0, [])
+
+
+def project_packages() -> set:
+    """Pacotes do próprio repositório (apps e o pacote de configuração)."""
+    base = Path(settings.BASE_DIR)
+    return {
+        path.name for path in base.iterdir()
+        if path.is_dir() and (path / '__init__.py').exists()
+    }
+
+
+def cost_by_owner(roots: Iterable[ImportNode], packages: Optional[set] = None) -> Dict[str, float]:
+    """Milissegundos por "dono": o app do projeto mais próximo na cadeia de imports.
+
+    Módulos que nenhum app puxou (Django, DRF, ``site``) ficam com o próprio
+    pacote raiz.
+    """
+    packages = project_packages() if packages is None else packages
+    costs: Dict[str, float] = defaultdict(float)
+    stack = [(node, None) for node in roots]
+    while stack:
+        node, owner = stack.pop()
+        if node.root in packages:
+            owner = node.root
+        costs[owner or node.root] += node.self_us / 1000
+        stack.extend((child, owner) for child in node.children)
+    return dict(costs)
+
+
+def measure(importtime: bool = False, python: Optional[str] = None) -> StartupSample:
+    """Sobe o Django num subprocesso novo e devolve tempos e pico de memória."""
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'redeconfianca.settings')}
+    cmd = [python or sys.executable]
+    if importtime:
+        cmd += ['-X', 'importtime']
+    cmd += ['-c', _PROBE, json.dumps(HEAVY_MODULES)]
+    started = time.perf_counter()
+    result = subprocess.run(cmd, cwd=str(settings.BASE_DIR), env=env, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'subprocesso falhou')
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    return StartupSample(
+        wall_ms=wall_ms, setup_ms=data['setup_ms'], urls_ms=data['urls_ms'], rss_mb=data['rss_mb'],
+        heavy=data['heavy'], imports=parse_importtime(result.stderr) if importtime else [],
+    )
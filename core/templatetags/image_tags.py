@@ -0,0 +1,16 @@
+from django import template
+
+from core.images import variant_url
+
+register = template.Library()
+
+
+@register.filter
+def image_variant(fieldfile, variant='display'):
+    """URL do derivado da imagem (thumb/display), ou do original se ainda não existir.
+
+    Uso: ``<img src="{{ evidence.file|image_variant:'thumb' }}">``
+    """
+    if not fieldfile:
+        return ''
+    return variant_url(fieldfile, variant) or ''
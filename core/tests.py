@@ -1,3 +1,320 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.files.storage import FileSystemStorage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core import perf, startup
+from core.bulk_upsert import bulk_upsert
+from core.images import VARIANTS, derivative_name, generate_derivatives
+from core.lazy import lazy_attr, lazy_import, lazy_optional
+from core.models import ImageDerivative
+from core.reconciliation import KeyedPool
+from redeconfianca import serving
+from notifications.models import PushNotification, UserNotification
+from users.models import User
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        self.media_dir = tempfile.mkdtemp()
+        self.storage = FileSystemStorage(location=self.media_dir, base_url='/media/')
+
+        exif = Image.Exif()
+        exif[0x010F] = 'Fabricante do Celular'
+        buffer = io.BytesIO()
+        Image.new('RGB', (3000, 2000), 'orange').save(buffer, 'JPEG', exif=exif)
+        self.source_name = self.storage.save('checklists/evidences/foto.jpg', ContentFile(buffer.getvalue()))
+
+    def tearDown(self):
+        shutil.rmtree(self.media_dir, ignore_errors=True)
+
+    def test_generates_every_variant_without_exif(self):
+        created = generate_derivatives(self.storage, self.source_name)
+
+        self.assertEqual({d.variant for d in created}, set(VARIANTS))
+        thumb = ImageDerivative.objects.get(source_name=self.source_name, variant='thumb')
+        self.assertEqual((thumb.width, thumb.height), (320, 213))
+        self.assertEqual((thumb.source_width, thumb.source_height), (3000, 2000))
+        self.assertEqual(thumb.file_name, derivative_name(self.source_name, 'thumb'))
+
+        with self.storage.open(thumb.file_name, 'rb') as fh:
+            image = Image.open(fh)
+            self.assertEqual(image.format, 'WEBP')
+            self.assertFalse(image.getexif())
+
+    def test_existing_derivatives_are_not_regenerated(self):
+        generate_derivatives(self.storage, self.source_name)
+
+        self.assertEqual(generate_derivatives(self.storage, self.source_name), [])
+        self.assertEqual(len(generate_derivatives(self.storage, self.source_name, force=True)), len(VARIANTS))
+        self.assertEqual(ImageDerivative.objects.filter(source_name=self.source_name).count(), len(VARIANTS))
+
+    def test_non_image_files_are_ignored(self):
+        self.assertEqual(generate_derivatives(self.storage, 'tickets/anexo.pdf'), [])
+
+    def test_backfill_limit_is_exact(self):
+        for i in range(5):
+            User.objects.create_user(f'foto{i}', f'foto{i}@example.com', password='pass123',
+                                     profile_picture=f'profile_pics/foto{i}.jpg')
+        out = io.StringIO()
+        call_command('backfill_image_derivatives', model=['users.User'], limit=3, batch_size=2,
+                     dry_run=True, stdout=out)
+        self.assertIn('users.User.profile_picture: 3 gerada(s)', out.getvalue())
+
+
+# O cache configurado é o Redis compartilhado: ``cache.clear()`` nele apagaria
+# dados de verdade, e sem Redis os testes falhariam.
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'core-default'},
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'core-local'},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConditionalPollTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='colab', email='colab@example.com', password='pass123', hierarchy='PADRAO',
+        )
+        self.client.force_login(self.user)
+        self.url = reverse('core:notifications_count_api')
+
+    def test_matching_etag_returns_304_until_a_write_bumps_the_version(self):
+        first = self.client.get(self.url)
+        etag = first['ETag']
+        self.assertEqual(first.status_code, 200)
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        notification = PushNotification.objects.create(title='Aviso', message='Olá', created_by=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            UserNotification.objects.create(notification=notification, user=self.user)
+
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+        self.assertEqual(changed.json()['count'], 1)
+
+
+@override_settings(PERF_SAMPLE_RATE=1.0, PERF_NPLUS1_THRESHOLD=3, CACHES=LOCMEM_CACHES)
+class PerformanceInstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        perf._store_instance = perf._MemoryStore()
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass123', hierarchy='SUPERADMIN',
+        )
+        self.user = User.objects.create_user(
+            username='colab', email='colab@example.com', password='pass123', hierarchy='PADRAO',
+        )
+
+    def tearDown(self):
+        perf._store_instance = None
+
+    def test_sql_shape_ignores_literals_and_in_list_size(self):
+        self.assertEqual(
+            perf.sql_shape("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x'"),
+            perf.sql_shape("SELECT *  FROM t WHERE id IN (%s) AND name = 'y'"),
+        )
+
+    def test_sampled_requests_feed_report_and_server_timing_is_admin_only(self):
+        url = reverse('core:notifications_count_api')
+        self.client.force_login(self.user)
+        self.assertNotIn('Server-Timing', self.client.get(url))
+
+        self.client.force_login(self.admin)
+        response = self.client.get(url)
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+        report = self.client.get(reverse('core:perf_report')).json()
+        row = next(r for r in report['views'] if r['view'].endswith('notifications_count_api_view'))
+        self.assertEqual(row['requests'], 2)
+        self.assertGreater(row['avg_queries'], 0)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('core:perf_report')).status_code, 403)
+
+        # Superusuário do Django vê os tempos e, portanto, o relatório.
+        self.user.is_superuser = True
+        self.user.save(update_fields=['is_superuser'])
+        self.assertIn('Server-Timing', self.client.get(url))
+        self.assertEqual(self.client.get(reverse('core:perf_report')).status_code, 200)
+
+    @override_settings(PERF_SAMPLE_RATE=0.0)
+    def test_sample_header_needs_the_flag_and_a_superadmin(self):
+        url = reverse('core:notifications_count_api')
+        self.client.force_login(self.admin)
+        self.assertNotIn('Server-Timing', self.client.get(url, HTTP_X_PERF_SAMPLE='1'))
+
+        with override_settings(PERF_SAMPLE_HEADER_ENABLED=True):
+            self.assertIn('Server-Timing', self.client.get(url, HTTP_X_PERF_SAMPLE='1'))
+            self.client.force_login(self.user)
+            self.client.get(url, HTTP_X_PERF_SAMPLE='1')
+
+        self.client.force_login(self.admin)
+        report = self.client.get(reverse('core:perf_report')).json()
+        row = next(r for r in report['views'] if r['view'].endswith('notifications_count_api_view'))
+        self.assertEqual(row['requests'], 1)
+
+    def test_repeated_query_shapes_are_reported_as_nplus1(self):
+        with perf.profiling() as profile:
+            for user in User.objects.all():
+                User.objects.filter(pk=user.pk).exists()
+                User.objects.filter(pk=user.pk).exists()
+        with self.assertLogs('core.perf', 'WARNING'):
+            perf.record('tests.loop', profile, 200)
+
+        report = perf.perf_report()
+        self.assertEqual(report['views'][0]['nplus1_requests'], 1)
+        self.assertEqual(report['nplus1'][0]['view'], 'tests.loop')
+
+
+class ReconciliationTests(TestCase):
+    def _gasto(self, pk, valor, estabelecimento, dia):
+        return SimpleNamespace(id=pk, valor=Decimal(valor), estabelecimento=estabelecimento,
+                               data_gasto=date(2025, 3, dia))
+
+    def test_card_statement_matching_rules(self):
+        from cartoes.fatura import conciliar
+
+        gastos = [
+            self._gasto(1, '50.00', 'Posto Ipiranga', 10),
+            self._gasto(2, '50.00', 'Padaria Nova República', 9),
+            self._gasto(3, '80.00', 'Drogaria São Paulo', 12),
+            self._gasto(4, '15.00', 'Estacionamento', 20),
+        ]
+        fatura = [
+            {'data': date(2025, 3, 10), 'valor': Decimal('50.00'), 'estabelecimento': 'PADARIANOVAREPUBLICA*SP'},
+            {'data': date(2025, 3, 10), 'valor': Decimal('50.00'), 'estabelecimento': 'UBER*TRIP'},
+            {'data': date(2025, 3, 13), 'valor': Decimal('85.00'), 'estabelecimento': 'DROGARIASAOPAULO'},
+            {'data': date(2025, 3, 14), 'valor': Decimal('9.90'), 'estabelecimento': 'NETFLIX'},
+        ]
+
+        relatorio = conciliar(fatura, gastos)
+
+        # Mesmo valor: o nome parecido ganha do dia exato.
+        self.assertEqual([(c['gasto'].id, c['qualidade']) for c in relatorio['conferidos']],
+                         [(2, 'forte'), (1, 'forte')])
+        self.assertEqual([(d['gasto'].id, d['diferenca']) for d in relatorio['divergentes']],
+                         [(3, Decimal('5.00'))])
+        self.assertEqual([i['estabelecimento'] for i in relatorio['so_na_fatura']], ['NETFLIX'])
+        self.assertEqual([g.id for g in relatorio['so_no_extrato']], [4])
+        self.assertEqual(relatorio['qualidade']['taxa'], 50.0)
+
+    def test_keyed_pool_matches_repeated_keys_one_to_one(self):
+        pool = KeyedPool(['a1', 'b1', 'a2'], key=lambda item: item[0])
+
+        self.assertEqual(pool.take('a'), 'a1')
+        self.assertEqual(pool.take('a'), 'a2')
+        self.assertIsNone(pool.take('a'))
+        self.assertIsNone(pool.take('z'))
+        self.assertEqual(pool.remaining(), ['b1'])
+
+
+class BulkUpsertTests(TestCase):
+    def _fibra(self, numero, **extra):
+        row = {'numero_da_venda': numero, 'numero_protocolo': f'P{numero}', 'cliente': 'Cliente',
+               'valor': '99.90', 'data_da_venda': '2025-03-10', 'venda_ativa': '1'}
+        row.update(extra)
+        return row
+
+    def test_fibra_sync_writes_only_changes(self):
+        from fibras.models import Fibra
+        from fibras.services import sync_fibras
+
+        fonte = [self._fibra(str(n)) for n in range(1, 6)]
+        with mock.patch('fibras.services.fetch_fibras_from_mysql', return_value=fonte):
+            primeira = sync_fibras()
+        self.assertEqual((primeira['created'], primeira['updated']), (5, 0))
+        self.assertEqual(set(Fibra.objects.values_list('status', flat=True)), {Fibra.STATUS_AGENDADO})
+
+        Fibra.objects.filter(numero_da_venda='2').update(status=Fibra.STATUS_INSTALADO)
+        fonte[0]['cliente'] = 'Cliente Renomeado'
+        fonte[2]['venda_ativa'] = '0'
+        fonte.append(self._fibra('1', cliente='Cliente Renomeado'))
+        with mock.patch('fibras.services.fetch_fibras_from_mysql', return_value=fonte):
+            segunda = sync_fibras()
+        self.assertEqual((segunda['created'], segunda['updated'], segunda['unchanged'], segunda['duplicates']),
+                         (0, 2, 3, 1))
+        self.assertLessEqual(segunda['queries'], 5)
+        self.assertEqual(Fibra.objects.get(numero_da_venda='1').cliente, 'Cliente Renomeado')
+        self.assertEqual(Fibra.objects.get(numero_da_venda='2').status, Fibra.STATUS_INSTALADO)
+        self.assertEqual(Fibra.objects.get(numero_da_venda='3').status, Fibra.STATUS_CANCELADO)
+
+    def test_d1_chains_source_duplicates_and_skips_existing(self):
+        from validad1.models import VendaD1
+
+        venda = {'numero_da_venda': '77', 'cpf': '123', 'produto': 'Plano', 'data_da_venda': date(2025, 3, 10),
+                 'numero_acesso': '1199', 'servicos': 'Fibra', 'valor': Decimal('50')}
+        chave = ['numero_da_venda', 'cpf', 'produto', 'data_da_venda', 'numero_acesso', 'servicos']
+        outra = dict(venda, numero_da_venda='78')
+
+        stats = bulk_upsert(VendaD1, [venda, dict(venda), outra], key=chave, skip_existing=True,
+                            chain=('is_duplicate', 'duplicate_of'))
+        self.assertEqual((stats.created, stats.duplicates), (3, 1))
+        original = VendaD1.objects.get(numero_da_venda='77', is_duplicate=False)
+        self.assertEqual(VendaD1.objects.get(is_duplicate=True).duplicate_of, original)
+
+        again = bulk_upsert(VendaD1, [venda, dict(venda), outra], key=chave, skip_existing=True,
+                            chain=('is_duplicate', 'duplicate_of'))
+        self.assertEqual((again.created, again.skipped), (0, 3))
+        self.assertEqual(VendaD1.objects.count(), 3)
+
+
+class ServingProfileTests(TestCase):
+    def test_nginx_map_matches_heavy_routes(self):
+        with open(settings.BASE_DIR / 'nginx.conf', encoding='utf-8') as fh:
+            conf = fh.read()
+        map_block = '\n'.join('    ' + line for line in serving.nginx_map().splitlines())
+        self.assertIn(map_block, conf, 'nginx.conf desatualizado: rode manage.py pool_routes')
+
+        self.assertTrue(serving.is_heavy_path('/commission/export/'))
+        self.assertTrue(serving.is_heavy_path('/fibras/export/canceladas-csv/'))
+        self.assertTrue(serving.is_heavy_path('/contracheque/api/importar-lote/'))
+        self.assertFalse(serving.is_heavy_path('/notifications/'))
+        self.assertFalse(serving.is_heavy_path('/api/tangerino/ponto/status/'))
+
+    def test_healthz_and_loadtest_endpoint(self):
+        response = self.client.get('/healthz/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Pool'], 'web')
+        self.assertEqual(self.client.get('/_loadtest/slow/?seconds=0').status_code, 404)
+        with override_settings(LOADTEST_ENDPOINTS_ENABLED=True):
+            self.assertEqual(self.client.get('/_loadtest/slow/?seconds=0').status_code, 200)
+
+
+class StartupCostTests(TestCase):
+    def test_importtime_cost_goes_to_the_app_that_pulled_it(self):
+        stderr = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       300 |        300 |       numpy.core\n'
+            'import time:       700 |       1000 |     numpy\n'
+            'import time:      2000 |       3000 |   pandas\n'
+            'import time:       500 |       3500 | users.views\n'
+            'import time:       400 |        400 | django.http\n'
+        )
+        roots = startup.parse_importtime(stderr)
+        self.assertEqual([node.name for node in roots], ['users.views', 'django.http'])
+        self.assertEqual(roots[0].children[0].children[0].name, 'numpy')
+        self.assertEqual(startup.cost_by_owner(roots, {'users'}), {'users': 3.5, 'django': 0.4})
+
+        self.assertIsNone(lazy_optional('pacote_que_nao_existe'))
+        self.assertEqual(lazy_import('json').dumps([1]), '[1]')
+        self.assertEqual(lazy_attr('decimal', 'Decimal')('1.5'), Decimal('1.5'))
+
+    def test_boot_does_not_load_heavy_libraries(self):
+        sample = startup.measure()
+        self.assertEqual(sample.heavy, [], f'carregadas no import das URLs: {sample.heavy}')
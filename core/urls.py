@@ -19,6 +19,7 @@ urlpatterns = [
     # Histórico de Atividades (Superadmin)
     path('activity-history/', views.activity_history, name='activity_history'),
     path('activity-history/export/', views.export_activity_history, name='export_activity_history'),
+    path('api/perf/', views.perf_report_view, name='perf_report'),
     
     # Checklist Administrativo
     path('admin-checklist/', include('core.admin_checklist_urls')),
@@ -8,6 +8,7 @@ from django.db import models
 from tickets.models import Ticket, Category
 from .models import Notification, AdminChecklistSectorTask, AdminChecklistTemplate, DailyAdminChecklist, AdminChecklistTask, AdminChecklistAssignment
 from .middleware import log_action
+from .polling import bump, conditional_poll, since_param
 from users.models import User
 import json
 
@@ -330,9 +331,17 @@ def report_detail(request, report_id):
 # ========================
 
 @login_required
+@conditional_poll(lambda request: [('notifications', request.user.pk)])
 def notifications_api_view(request):
-    """API para listar notificações do usuário"""
-    notifications = request.user.notifications.all()[:10]  # Últimas 10
+    """API para listar notificações do usuário.
+
+    Com ``?since=<id>`` devolve só as notificações mais novas que esse id.
+    """
+    notifications = request.user.notifications.all()
+    since = since_param(request)
+    if since is not None:
+        notifications = notifications.filter(id__gt=since)
+    notifications = notifications[:10]  # Últimas 10
     
     notifications_data = []
     for notification in notifications:
@@ -350,17 +359,42 @@ def notifications_api_view(request):
     
     return JsonResponse({
         'notifications': notifications_data,
-        'unread_count': unread_count
+        'unread_count': unread_count,
+        'delta': since is not None,
     })
 
 
 @login_required
+@conditional_poll(lambda request: [('notifications', request.user.pk)])
 def notifications_count_api_view(request):
     """API para contar notificações não lidas"""
     count = request.user.notifications.filter(is_read=False).count()
     return JsonResponse({'count': count})
 
 
+@login_required
+def perf_report_view(request):
+    """Percentis de tempo, consultas e suspeitas de N+1 por view - Apenas Superadmins.
+
+    ``?days=N`` soma os últimos N dias (padrão 1, máximo o que o Redis guarda).
+    """
+    from django.conf import settings
+    from .perf import can_see_timings, perf_report
+
+    if not can_see_timings(request.user):
+        return HttpResponseForbidden()
+
+    try:
+        days = int(request.GET.get('days', 1))
+    except ValueError:
+        days = 1
+    days = max(1, min(days, getattr(settings, 'PERF_RETENTION_DAYS', 7)))
+
+    report = perf_report(days=days)
+    report['days'] = days
+    report['sample_rate'] = getattr(settings, 'PERF_SAMPLE_RATE', 0.05)
+    return JsonResponse(report)
+
 @login_required
 @require_POST
 def notification_mark_read_api_view(request, notification_id):
@@ -378,6 +412,8 @@ def notification_mark_read_api_view(request, notification_id):
 def notifications_mark_all_read_api_view(request):
     """API para marcar todas as notificações como lidas"""
     request.user.notifications.filter(is_read=False).update(is_read=True)
+    # update() não dispara signals: a versão do polling sobe à mão.
+    bump('notifications', request.user.pk)
     return JsonResponse({'success': True})
 
 
@@ -389,7 +425,7 @@ from django.db.models import Count, Q, Avg
 from django.http import HttpResponse
 import csv
 from io import BytesIO
-import openpyxl
+from .lazy import lazy_import
 from .models import (
     AdminChecklistTemplate, 
     DailyAdminChecklist, 
@@ -397,6 +433,8 @@ from .models import (
     AdminChecklistAssignment
 )
 
+openpyxl = lazy_import('openpyxl')
+
 
 @login_required
 def admin_checklist_dashboard(request):
@@ -47,6 +47,11 @@ except Exception as e:
     done
 fi
 
+# Migrações ficam com o pool web; o heavy sobe da mesma imagem em paralelo
+# e não pode disputar o migrate. (O collectstatic roda nos dois: o manifest
+# dos estáticos é local de cada container.)
+if [ "${GUNICORN_POOL:-web}" != "heavy" ]; then
+
 # Aplicar migrações
 echo "🗄️ Aplicando migrações do banco de dados..."
 python manage.py migrate --noinput || {
@@ -56,6 +61,8 @@ python manage.py migrate --noinput || {
     exit 1
 }
 
+fi
+
 # Coletar arquivos estáticos
 echo "📁 Coletando arquivos estáticos..."
 python manage.py collectstatic --noinput --clear || {
@@ -89,22 +96,11 @@ fi
 
 echo "✅ Deploy configurado com sucesso!"
 echo "🌐 Iniciando servidor Gunicorn..."
-echo "📊 Configurações:"
-echo "   - Porta: ${PORT:-8000}"
-echo "   - Workers: ${WEB_CONCURRENCY:-3}"
-echo "   - Timeout: 600s"
+echo "📊 Configurações (gunicorn.conf.py):"
+echo "   - Pool: ${GUNICORN_POOL:-web} (web = portal; heavy = importações/exportações, ver nginx.conf)"
+echo "   - Porta: ${PORT:-padrão do pool}"
+echo "   - Workers: ${WEB_CONCURRENCY:-padrão do pool} x ${GUNICORN_THREADS:-padrão} threads (gthread)"
 echo "   - Database: ${DATABASE_URL:0:20}..."
 
-# Iniciar servidor com logs detalhados
-exec gunicorn redeconfianca.wsgi:application \
-    --bind 0.0.0.0:${PORT:-8000} \
-    --workers ${WEB_CONCURRENCY:-3} \
-    --worker-class sync \
-    --timeout 600 \
-    --keep-alive 2 \
-    --max-requests 1000 \
-    --max-requests-jitter 100 \
-    --access-logfile - \
-    --error-logfile - \
-    --log-level info \
-    --capture-output
+# Iniciar servidor. Perfil, timeouts e religação pós-fork ficam em gunicorn.conf.py.
+exec gunicorn --config gunicorn.conf.py
@@ -7,7 +7,10 @@ assinatura — exibindo o lembrete até que todas as assinaturas estejam em dia.
 from portal_popups.checkers import register_popup_checker
 
 
-@register_popup_checker('documentos_pendentes', 'Documentos: todas as assinaturas em dia')
+@register_popup_checker('documentos_pendentes', 'Documentos: todas as assinaturas em dia', watch=[
+    ('documentos.DocumentSignature', 'user_id'),
+    ('documentos.Document', None),
+])
 def no_pending_documents(user):
     """True quando o usuário NÃO tem documentos pendentes de assinatura.
 
@@ -6,8 +6,6 @@ ORDEM | PILAR | ITEM | GRAVIDADE | PONTUAÇÃO | PERGUNTA | DETALHAMENTO | CONTE
 """
 import re
 
-import pdfplumber
-
 
 GRAVIDADE_MAP = {
     'leve': 'leve',
@@ -71,6 +69,8 @@ def parse_checklist_pdf(file_obj):
     """
     questions = []
 
+    import pdfplumber
+
     with pdfplumber.open(file_obj) as pdf:
         for page in pdf.pages:
             tables = page.extract_tables()
@@ -0,0 +1,291 @@
+"""Cubo de respostas da Pesquisa de Clima e da Entrevista de Desligamento.
+
+Os relatórios carregavam todas as respostas e refaziam, em Python, uma volta
+por pergunta sobre a lista inteira (mais uma por filtro de perfil). O tempo
+crescia com o número de respondentes e a Pesquisa de Clima é respondida pela
+empresa toda.
+
+Agora cada envio é decomposto na hora em que é gravado (sinal ``post_save``):
+
+* ``SurveyAnswerFact``: uma linha por pergunta respondida, com setor, função e
+  tempo de empresa do respondente;
+* ``SurveyAnswerCount``: contadores por (setor, função, tempo de empresa,
+  pergunta, resposta), incrementados com ``F()`` — a soma da nota vai junto,
+  para as médias.
+
+O relatório soma contadores (uma consulta, tamanho proporcional ao número de
+perguntas). O filtro "quem respondeu X na pergunta Y" não cabe nos contadores:
+sai dos fatos, com subconsulta. Reconstrução: ``manage.py rebuild_survey_analytics``.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import (
+    ClimateSurveyResponse,
+    ExitInterviewResponse,
+    SurveyAnswerCount,
+    SurveyAnswerFact,
+)
+
+RESPONSES = '__respostas'
+DURATION = '__duracao'
+FUNCAO = '__funcao'
+TEMPO_EMPRESA = '__tempo_empresa'
+
+RESPONSE_MODELS = (ClimateSurveyResponse, ExitInterviewResponse)
+# Campos que mudam o que foi contado; outros saves não mexem no cubo.
+_COUNTED_FIELDS = {'answers', 'sector', 'sector_id', 'duration_seconds', 'survey_key'}
+
+Fact = Tuple[str, str, Optional[int]]
+Cells = Dict[Tuple[str, str], List[int]]
+
+
+def answer_facts(answers, duration_seconds=None) -> Tuple[List[Fact], str, str]:
+    """Decompõe ``answers`` em ``(pergunta, resposta, valor numérico)``.
+
+    Serve aos dois formatos: clima (likert/open/profile) e desligamento
+    (scale/choice/text). Textos livres não entram. Devolve também função e
+    tempo de empresa do perfil (vazios no desligamento).
+    """
+    answers = answers or {}
+    facts: List[Fact] = [(RESPONSES, '', None)]
+    if duration_seconds:
+        facts.append((DURATION, '', int(duration_seconds)))
+    for group in ('likert', 'scale'):
+        for key, value in (answers.get(group) or {}).items():
+            if isinstance(value, int) and not isinstance(value, bool):
+                facts.append((key, str(value), value))
+    for key, value in (answers.get('choice') or {}).items():
+        if value:
+            facts.append((key, str(value)[:200], None))
+
+    profile = answers.get('profile') or {}
+    funcao = str(profile.get('funcao') or '')[:60]
+    tempo = str(profile.get('tempo_empresa') or '')[:60]
+    if funcao:
+        facts.append((FUNCAO, funcao, None))
+    if tempo:
+        facts.append((TEMPO_EMPRESA, tempo, None))
+    return facts, funcao, tempo
+
+
+# ─── Gravação ────────────────────────────────────────────────────────────────
+
+def _apply(survey_key: str, dims: dict, deltas: Dict[Tuple[str, str], Tuple[int, int]]) -> None:
+    """Soma ``(n, soma)`` em cada célula, criando as que faltam."""
+    if not deltas:
+        return
+    cell = dict(survey_key=survey_key, **dims)
+    SurveyAnswerCount.objects.bulk_create(
+        [SurveyAnswerCount(question_key=q, answer_value=v, **cell) for q, v in deltas],
+        ignore_conflicts=True,
+    )
+    # Um UPDATE por incremento distinto (nota 1..5, duração), não por pergunta.
+    by_increment: Dict[Tuple[int, int], Q] = defaultdict(Q)
+    for (question, value), increment in deltas.items():
+        by_increment[increment] |= Q(question_key=question, answer_value=value)
+    for (n, total), condition in by_increment.items():
+        SurveyAnswerCount.objects.filter(condition, **cell).update(
+            count=F('count') + n, value_sum=F('value_sum') + total,
+        )
+
+
+def _deltas(facts: Iterable[Tuple[str, str, Optional[int]]], sign: int) -> Dict[Tuple[str, str], Tuple[int, int]]:
+    deltas: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0])
+    for question, value, numeric in facts:
+        deltas[(question, value)][0] += sign
+        deltas[(question, value)][1] += sign * (numeric or 0)
+    return {key: tuple(pair) for key, pair in deltas.items()}
+
+
+def forget(survey_key: str, response_id: int) -> None:
+    """Tira um envio do cubo (resposta apagada ou editada)."""
+    facts = list(SurveyAnswerFact.objects.filter(survey_key=survey_key, response_id=response_id))
+    if not facts:
+        return
+    groups = defaultdict(list)
+    for fact in facts:
+        groups[(fact.sector_id, fact.funcao, fact.tempo_empresa)].append(
+            (fact.question_key, fact.answer_value, fact.numeric))
+    for (sector_id, funcao, tempo), items in groups.items():
+        _apply(survey_key, {'sector_id': sector_id, 'funcao': funcao, 'tempo_empresa': tempo},
+               _deltas(items, -1))
+    SurveyAnswerFact.objects.filter(pk__in=[fact.pk for fact in facts]).delete()
+
+
+def record(response) -> None:
+    """(Re)decompõe um envio e atualiza os contadores."""
+    facts, funcao, tempo = answer_facts(response.answers, response.duration_seconds)
+    dims = {'sector_id': response.sector_id or 0, 'funcao': funcao, 'tempo_empresa': tempo}
+    with transaction.atomic():
+        forget(response.survey_key, response.pk)
+        SurveyAnswerFact.objects.bulk_create([
+            SurveyAnswerFact(survey_key=response.survey_key, response_id=response.pk,
+                             question_key=q, answer_value=v, numeric=n, **dims)
+            for q, v, n in facts
+        ])
+        _apply(response.survey_key, dims, _deltas(facts, 1))
+
+
+def rebuild(survey_key: Optional[str] = None, *, models=None) -> int:
+    """Apaga e refaz o cubo a partir das respostas gravadas. Devolve quantos envios.
+
+    ``models`` = ``(fato, contador, [modelos de resposta])``; a migração que
+    cria o cubo passa os modelos históricos.
+    """
+    fact_model, count_model, response_models = models or (SurveyAnswerFact, SurveyAnswerCount, RESPONSE_MODELS)
+    facts_qs, counts_qs = fact_model.objects.all(), count_model.objects.all()
+    if survey_key:
+        facts_qs, counts_qs = facts_qs.filter(survey_key=survey_key), counts_qs.filter(survey_key=survey_key)
+
+    total = 0
+    with transaction.atomic():
+        facts_qs.delete()
+        counts_qs.delete()
+        cells: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0])
+        for model in response_models:
+            responses = model.objects.order_by()
+            if survey_key:
+                responses = responses.filter(survey_key=survey_key)
+            batch = []
+            for response in responses.only('id', 'survey_key', 'sector_id', 'answers', 'duration_seconds').iterator(chunk_size=500):
+                facts, funcao, tempo = answer_facts(response.answers, response.duration_seconds)
+                dims = (response.survey_key, response.sector_id or 0, funcao, tempo)
+                for question, value, numeric in facts:
+                    batch.append(fact_model(
+                        survey_key=response.survey_key, response_id=response.pk, sector_id=dims[1],
+                        funcao=funcao, tempo_empresa=tempo, question_key=question,
+                        answer_value=value, numeric=numeric,
+                    ))
+                    cell = cells[dims + (question, value)]
+                    cell[0] += 1
+                    cell[1] += numeric or 0
+                total += 1
+                if len(batch) >= 2000:
+                    fact_model.objects.bulk_create(batch)
+                    batch = []
+            fact_model.objects.bulk_create(batch)
+        count_model.objects.bulk_create([
+            count_model(survey_key=key, sector_id=sector_id, funcao=funcao, tempo_empresa=tempo,
+                        question_key=question, answer_value=value, count=n, value_sum=s)
+            for (key, sector_id, funcao, tempo, question, value), (n, s) in cells.items()
+        ], batch_size=1000)
+    return total
+
+
+def _on_save(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields and not _COUNTED_FIELDS & set(update_fields)):
+        return
+    record(instance)
+
+
+def _on_delete(sender, instance, **kwargs):
+    forget(instance.survey_key, instance.pk)
+
+
+def connect_signals() -> None:
+    from django.db.models.signals import post_delete, post_save
+
+    for model in RESPONSE_MODELS:
+        post_save.connect(_on_save, sender=model, dispatch_uid=f'survey-analytics-save-{model.__name__}')
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=f'survey-analytics-delete-{model.__name__}')
+
+
+# ─── Leitura ─────────────────────────────────────────────────────────────────
+
+class Cube:
+    """Células ``(pergunta, resposta) → [quantidade, soma]`` já filtradas."""
+
+    def __init__(self, cells: Cells):
+        self.cells = cells
+
+    def count(self, question: str) -> int:
+        return sum(n for (q, _), (n, _) in self.cells.items() if q == question)
+
+    def average(self, question: str, digits: int = 2) -> Optional[float]:
+        count = self.count(question)
+        if not count:
+            return None
+        total = sum(s for (q, _), (_, s) in self.cells.items() if q == question)
+        return round(total / count, digits)
+
+    def distribution(self, question: str) -> Dict[str, int]:
+        return {v: n for (q, v), (n, _) in self.cells.items() if q == question and n}
+
+    @property
+    def responses(self) -> int:
+        return self.count(RESPONSES)
+
+
+def _collect(rows, cells: Cells, sign: int = 1) -> None:
+    for row in rows:
+        cell = cells.setdefault((row['question_key'], row['answer_value']), [0, 0])
+        cell[0] += sign * (row['n'] or 0)
+        cell[1] += sign * (row['s'] or 0)
+
+
+def _answered(survey_key: str, answered: Tuple[str, str]):
+    """Subconsulta dos envios que deram ``answered``; a resposta é cortada como em ``answer_facts``."""
+    question, value = answered
+    return SurveyAnswerFact.objects.filter(
+        survey_key=survey_key, question_key=question, answer_value=str(value)[:200],
+    ).values('response_id')
+
+
+def filter_responses(responses, survey_key: str, *, funcao: str = '', tempo_empresa: str = '',
+                     answered: Optional[Tuple[str, str]] = None):
+    """Aplica a um queryset de respostas os mesmos filtros do cubo, pelos fatos.
+
+    Assim a listagem individual do relatório é filtrada e paginada no banco, em
+    vez de carregar todos os envios para filtrar o JSON em Python.
+    """
+    facts = SurveyAnswerFact.objects.filter(survey_key=survey_key)
+    if funcao:
+        responses = responses.filter(pk__in=facts.filter(
+            question_key=FUNCAO, answer_value=funcao[:60]).values('response_id'))
+    if tempo_empresa:
+        responses = responses.filter(pk__in=facts.filter(
+            question_key=TEMPO_EMPRESA, answer_value=tempo_empresa[:60]).values('response_id'))
+    if answered:
+        responses = responses.filter(pk__in=_answered(survey_key, answered))
+    return responses
+
+
+def cube(survey_key: str, *, sector_id: Optional[int] = None, funcao: str = '', tempo_empresa: str = '',
+         answered: Optional[Tuple[str, str]] = None, exclude_response_ids: Iterable[int] = ()) -> Cube:
+    """Cubo filtrado por setor/função/tempo de empresa.
+
+    ``answered=(pergunta, resposta)`` restringe a quem deu aquela resposta
+    (lido dos fatos). ``exclude_response_ids`` tira envios específicos
+    (ex.: de usuários isentos da Pesquisa de Clima).
+    """
+    dims = {}
+    if sector_id is not None:
+        dims['sector_id'] = sector_id
+    if funcao:
+        dims['funcao'] = funcao
+    if tempo_empresa:
+        dims['tempo_empresa'] = tempo_empresa
+    excluded = list(exclude_response_ids)
+    cells: Cells = {}
+
+    if answered:
+        matching = _answered(survey_key, answered)
+        facts = SurveyAnswerFact.objects.filter(survey_key=survey_key, response_id__in=matching, **dims)
+        if excluded:
+            facts = facts.exclude(response_id__in=excluded)
+        _collect(facts.values('question_key', 'answer_value')
+                 .annotate(n=Count('id'), s=Sum('numeric')).order_by(), cells)
+        return Cube(cells)
+
+    _collect(SurveyAnswerCount.objects.filter(survey_key=survey_key, **dims)
+             .values('question_key', 'answer_value')
+             .annotate(n=Sum('count'), s=Sum('value_sum')).order_by(), cells)
+    if excluded:
+        _collect(SurveyAnswerFact.objects.filter(survey_key=survey_key, response_id__in=excluded, **dims)
+                 .values('question_key', 'answer_value')
+                 .annotate(n=Count('id'), s=Sum('numeric')).order_by(), cells, sign=-1)
+    return Cube(cells)
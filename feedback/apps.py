@@ -12,3 +12,6 @@ class FeedbackConfig(AppConfig):
             from . import popup_checkers  # noqa: F401
         except Exception:
             pass
+        # Mantém o cubo dos relatórios de pesquisa em dia a cada envio.
+        from .analytics import connect_signals
+        connect_signals()
@@ -0,0 +1,21 @@
+"""
+Refaz o cubo de respostas das pesquisas (feedback/analytics.py).
+
+Os contadores são mantidos a cada envio; este comando apaga e recalcula tudo a
+partir das respostas gravadas. Útil depois de alterar respostas direto no
+banco ou de excluir um setor (as respostas ficam sem setor, o cubo não).
+"""
+from django.core.management.base import BaseCommand
+
+from feedback.analytics import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o cubo de respostas da Pesquisa de Clima e da Entrevista de Desligamento'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--survey', help='Chave da pesquisa (padrão: todas)')
+
+    def handle(self, *args, **options):
+        total = rebuild(options.get('survey') or None)
+        self.stdout.write(self.style.SUCCESS(f'{total} resposta(s) decomposta(s)'))
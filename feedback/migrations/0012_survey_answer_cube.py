@@ -0,0 +1,63 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:51
+
+from django.db import migrations, models
+
+
+def preencher_cubo(apps, schema_editor):
+    """Decompõe as respostas já gravadas (os relatórios passam a ler do cubo)."""
+    from feedback.analytics import rebuild
+
+    rebuild(models=(
+        apps.get_model('feedback', 'SurveyAnswerFact'),
+        apps.get_model('feedback', 'SurveyAnswerCount'),
+        [apps.get_model('feedback', 'ClimateSurveyResponse'), apps.get_model('feedback', 'ExitInterviewResponse')],
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0011_hiddenclientreport_climatesurveyexemption'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyAnswerCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('survey_key', models.CharField(max_length=80)),
+                ('sector_id', models.PositiveIntegerField(default=0)),
+                ('funcao', models.CharField(blank=True, max_length=60)),
+                ('tempo_empresa', models.CharField(blank=True, max_length=60)),
+                ('question_key', models.CharField(max_length=80)),
+                ('answer_value', models.CharField(blank=True, max_length=200)),
+                ('count', models.IntegerField(default=0)),
+                ('value_sum', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contador de respostas de pesquisa',
+                'verbose_name_plural': 'Contadores de respostas de pesquisa',
+                'constraints': [models.UniqueConstraint(fields=('survey_key', 'sector_id', 'funcao', 'tempo_empresa', 'question_key', 'answer_value'), name='feedback_answer_count_cell')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SurveyAnswerFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('survey_key', models.CharField(max_length=80)),
+                ('response_id', models.PositiveIntegerField()),
+                ('sector_id', models.PositiveIntegerField(default=0)),
+                ('funcao', models.CharField(blank=True, max_length=60)),
+                ('tempo_empresa', models.CharField(blank=True, max_length=60)),
+                ('question_key', models.CharField(max_length=80)),
+                ('answer_value', models.CharField(blank=True, max_length=200)),
+                ('numeric', models.IntegerField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Resposta decomposta de pesquisa',
+                'verbose_name_plural': 'Respostas decompostas de pesquisa',
+                'indexes': [models.Index(fields=['survey_key', 'response_id'], name='feedback_fact_response_idx'), models.Index(fields=['survey_key', 'question_key', 'answer_value'], name='feedback_fact_answer_idx')],
+            },
+        ),
+        migrations.RunPython(preencher_cubo, migrations.RunPython.noop),
+    ]
@@ -618,3 +618,61 @@ class FeedbackReminderDismissal(models.Model):
 
     def __str__(self):
         return f'{self.user} dispensou {self.key}'
+
+
+class SurveyAnswerFact(models.Model):
+    """Uma resposta de uma pergunta em um envio de pesquisa (feedback/analytics.py).
+
+    Pseudo-perguntas começadas por ``__`` guardam o envio em si (``__respostas``),
+    a duração (``__duracao``) e o perfil (``__funcao``, ``__tempo_empresa``).
+    """
+
+    survey_key = models.CharField(max_length=80)
+    response_id = models.PositiveIntegerField()
+    sector_id = models.PositiveIntegerField(default=0)
+    funcao = models.CharField(max_length=60, blank=True)
+    tempo_empresa = models.CharField(max_length=60, blank=True)
+    question_key = models.CharField(max_length=80)
+    answer_value = models.CharField(max_length=200, blank=True)
+    numeric = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Resposta decomposta de pesquisa'
+        verbose_name_plural = 'Respostas decompostas de pesquisa'
+        indexes = [
+            models.Index(fields=['survey_key', 'response_id'], name='feedback_fact_response_idx'),
+            models.Index(fields=['survey_key', 'question_key', 'answer_value'], name='feedback_fact_answer_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.survey_key} #{self.response_id}: {self.question_key}={self.answer_value}'
+
+
+class SurveyAnswerCount(models.Model):
+    """Contador por (pesquisa, setor, função, tempo de empresa, pergunta, resposta).
+
+    ``value_sum`` soma a parte numérica (nota, segundos) para as médias.
+    ``sector_id`` 0 = sem setor.
+    """
+
+    survey_key = models.CharField(max_length=80)
+    sector_id = models.PositiveIntegerField(default=0)
+    funcao = models.CharField(max_length=60, blank=True)
+    tempo_empresa = models.CharField(max_length=60, blank=True)
+    question_key = models.CharField(max_length=80)
+    answer_value = models.CharField(max_length=200, blank=True)
+    count = models.IntegerField(default=0)
+    value_sum = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Contador de respostas de pesquisa'
+        verbose_name_plural = 'Contadores de respostas de pesquisa'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['survey_key', 'sector_id', 'funcao', 'tempo_empresa', 'question_key', 'answer_value'],
+                name='feedback_answer_count_cell',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.survey_key}: {self.question_key}={self.answer_value} ({self.count})'
@@ -7,7 +7,10 @@ diretamente do app de feedback.
 from portal_popups.checkers import register_popup_checker
 
 
-@register_popup_checker('climate_survey', 'Pesquisa de Clima respondida (ou isento)')
+@register_popup_checker('climate_survey', 'Pesquisa de Clima respondida (ou isento)', watch=[
+    ('feedback.ClimateSurveyParticipation', 'user_id'),
+    ('feedback.ClimateSurveyExemption', 'user_id'),
+])
 def climate_survey_completed(user):
     from .models import (
         CLIMATE_SURVEY_KEY,
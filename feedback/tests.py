@@ -0,0 +1,118 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from users.models import Sector, User
+
+from . import analytics
+from .models import (
+    CLIMATE_SURVEY_KEY,
+    ClimateSurveyExemption,
+    ClimateSurveyResponse,
+    ExitInterviewResponse,
+    SurveyAnswerCount,
+)
+from .views import EXIT_INTERVIEW_KEY
+
+
+class SurveyAnalyticsTests(TestCase):
+    def setUp(self):
+        self.loja = Sector.objects.create(name='Loja Centro')
+        self.outra = Sector.objects.create(name='Loja Norte')
+        self.users = [
+            User.objects.create_user(f'colab{i}', f'colab{i}@example.com', password='pass123', hierarchy='PADRAO')
+            for i in range(3)
+        ]
+
+    def _responder(self, user, sector, nota, funcao='Vendas', duracao=120):
+        return ClimateSurveyResponse.objects.create(
+            survey_key=CLIMATE_SURVEY_KEY, user=user, sector=sector, duration_seconds=duracao,
+            answers={
+                'likert': {'ambiente_recursos': nota, 'ambiente_condicoes': 5},
+                'open': {'comentario': 'texto livre não entra no cubo'},
+                'profile': {'funcao': funcao, 'tempo_empresa': 'De 1 a 2 anos'},
+            },
+        )
+
+    def test_counters_follow_saves_and_deletes(self):
+        self._responder(self.users[0], self.loja, 2)
+        segunda = self._responder(self.users[1], self.loja, 4, duracao=60)
+        self._responder(self.users[2], self.outra, 5, funcao='Liderança de loja')
+
+        todos = analytics.cube(CLIMATE_SURVEY_KEY)
+        self.assertEqual(todos.responses, 3)
+        self.assertEqual(todos.count('ambiente_recursos'), 3)
+        self.assertEqual(todos.average('ambiente_recursos'), 3.67)
+        self.assertEqual(todos.distribution(analytics.FUNCAO), {'Vendas': 2, 'Liderança de loja': 1})
+        self.assertEqual(analytics.cube(CLIMATE_SURVEY_KEY, sector_id=self.loja.id).average('ambiente_recursos'), 3.0)
+        self.assertEqual(analytics.cube(CLIMATE_SURVEY_KEY, funcao='Vendas').average(analytics.DURATION), 90.0)
+
+        filtrado = analytics.cube(CLIMATE_SURVEY_KEY, answered=('ambiente_recursos', '4'))
+        self.assertEqual(filtrado.responses, 1)
+        self.assertEqual(filtrado.average(analytics.DURATION), 60.0)
+
+        segunda.answers['likert']['ambiente_recursos'] = 1
+        segunda.save()
+        self.assertEqual(analytics.cube(CLIMATE_SURVEY_KEY).distribution('ambiente_recursos'),
+                         {'1': 1, '2': 1, '5': 1})
+
+        segunda.delete()
+        depois = analytics.cube(CLIMATE_SURVEY_KEY)
+        self.assertEqual(depois.responses, 2)
+        self.assertEqual(depois.average('ambiente_recursos'), 3.5)
+
+        antes = sorted(SurveyAnswerCount.objects.filter(count__gt=0)
+                       .values_list('sector_id', 'funcao', 'question_key', 'answer_value', 'count', 'value_sum'))
+        self.assertEqual(analytics.rebuild(), 2)
+        self.assertEqual(sorted(SurveyAnswerCount.objects.values_list(
+            'sector_id', 'funcao', 'question_key', 'answer_value', 'count', 'value_sum')), antes)
+
+    def test_report_reads_cube_without_exempt_users(self):
+        self._responder(self.users[0], self.loja, 1)
+        self._responder(self.users[1], self.loja, 5)
+        ClimateSurveyExemption.objects.create(survey_key=CLIMATE_SURVEY_KEY, user=self.users[0])
+
+        admin = User.objects.create_user('gestor', 'gestor@example.com', password='pass123', hierarchy='SUPERADMIN')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('feedback:climate_survey_report'), {'sector': self.loja.id})
+        self.assertEqual(response.status_code, 200)
+        stats = {item['question']: item for item in response.context['question_stats']}
+        recursos = stats['Tenho os recursos e ferramentas necessários para realizar meu trabalho.']
+        self.assertEqual((recursos['avg'], recursos['count']), (5.0, 1))
+        self.assertEqual(len(response.context['response_rows']), 1)
+
+    def test_report_lists_one_page_of_filtered_responses(self):
+        extras = [
+            User.objects.create_user(f'extra{i}', f'extra{i}@example.com', password='pass123', hierarchy='PADRAO')
+            for i in range(27)
+        ]
+        for user in self.users + extras:
+            self._responder(user, self.loja, 4)
+        self._responder(self.users[0], self.outra, 2, funcao='Liderança de loja')
+
+        admin = User.objects.create_user('gestor', 'gestor@example.com', password='pass123', hierarchy='SUPERADMIN')
+        self.client.force_login(admin)
+        url = reverse('feedback:climate_survey_report')
+        response = self.client.get(url, {'q_key': 'ambiente_recursos', 'q_val': '4', 'page': 2})
+        self.assertEqual(response.context['page_obj'].paginator.count, 30)
+        self.assertEqual(len(response.context['response_rows']), 5)
+        self.assertEqual(response.context['analysis_count'], 30)
+
+        response = self.client.get(url, {'funcao': 'Liderança de loja'})
+        self.assertEqual([row['sector'] for row in response.context['response_rows']], [self.outra])
+
+    def test_long_choice_answer_filters_the_exit_report(self):
+        motivo = 'Mudança de cidade ' * 15
+        ExitInterviewResponse.objects.create(
+            survey_key=EXIT_INTERVIEW_KEY, user=self.users[0], sector=self.loja,
+            answers={'choice': {'motivo_desligamento': motivo}},
+        )
+        ExitInterviewResponse.objects.create(
+            survey_key=EXIT_INTERVIEW_KEY, user=self.users[1], sector=self.loja,
+            answers={'choice': {'motivo_desligamento': 'Salário'}},
+        )
+        admin = User.objects.create_user('gestor', 'gestor@example.com', password='pass123', hierarchy='SUPERADMIN')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('feedback:exit_interview_report'),
+                                   {'q_key': 'motivo_desligamento', 'q_val': motivo})
+        self.assertEqual(response.context['totals']['responses'], 1)
+        self.assertEqual([row['user'] for row in response.context['response_rows']], [self.users[0]])
@@ -3,6 +3,7 @@ from functools import wraps
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
 from django.db.models import Avg, Count, Max, Q
 from django.http import HttpResponse, JsonResponse, HttpResponseForbidden
 from django.shortcuts import get_object_or_404, redirect, render
@@ -12,6 +13,7 @@ from django.views.decorators.http import require_http_methods, require_POST
 
 from users.models import Sector, User
 
+from . import analytics as survey_analytics
 from .ai import generate_ai_summary, transcribe_feedback_audio
 from .forms import AssignmentForm, FeedbackForm
 from .models import (
@@ -482,7 +484,7 @@ def climate_survey_progress(request):
     return JsonResponse({'success': True})
 
 
-def _build_climate_report_context(request):
+def _build_climate_report_context(request, paginate=True):
     sector_filter_id = request.GET.get('sector')
     status_filter = (request.GET.get('status') or '').strip().lower()
 
@@ -504,7 +506,10 @@ def _build_climate_report_context(request):
         .select_related('user', 'sector')
     }
 
+    # Uma volta só pelos usuários: linha detalhada e agregado por setor.
     rows = []
+    overview_map = {}
+    all_users_rows = []
     for user in users_qs:
         sector = _primary_sector_for_user(user)
         participation = participations.get(user.id)
@@ -523,30 +528,6 @@ def _build_climate_report_context(request):
             }.get(status, status),
         })
 
-    selected_sector = None
-    if sector_filter_id:
-        try:
-            selected_sector = Sector.objects.filter(id=int(sector_filter_id)).first()
-            rows = [row for row in rows if row['sector'] and selected_sector and row['sector'].id == selected_sector.id]
-        except (TypeError, ValueError):
-            selected_sector = None
-
-    if status_filter in ['completed', 'in_progress', 'not_started']:
-        status_map = {
-            'completed': 'COMPLETED',
-            'in_progress': 'IN_PROGRESS',
-            'not_started': 'NOT_STARTED',
-        }
-        rows = [row for row in rows if row['status'] == status_map[status_filter]]
-
-    overview_map = {}
-    all_users_rows = []
-    for user in users_qs:
-        sector = _primary_sector_for_user(user)
-        participation = participations.get(user.id)
-        if participation and participation.sector:
-            sector = participation.sector
-        status = participation.status if participation else 'NOT_STARTED'
         key = sector.id if sector else 0
         bucket = overview_map.setdefault(key, {
             'sector': sector,
@@ -565,6 +546,22 @@ def _build_climate_report_context(request):
             bucket['not_started'] += 1
         all_users_rows.append({'sector': sector, 'status': status})
 
+    selected_sector = None
+    if sector_filter_id:
+        try:
+            selected_sector = Sector.objects.filter(id=int(sector_filter_id)).first()
+            rows = [row for row in rows if row['sector'] and selected_sector and row['sector'].id == selected_sector.id]
+        except (TypeError, ValueError):
+            selected_sector = None
+
+    if status_filter in ['completed', 'in_progress', 'not_started']:
+        status_map = {
+            'completed': 'COMPLETED',
+            'in_progress': 'IN_PROGRESS',
+            'not_started': 'NOT_STARTED',
+        }
+        rows = [row for row in rows if row['status'] == status_map[status_filter]]
+
     overview = sorted(overview_map.values(), key=lambda item: item['sector_name'].lower())
     for bucket in overview:
         bucket['completed_pct'] = round((bucket['completed'] / bucket['total']) * 100, 1) if bucket['total'] else 0.0
@@ -574,70 +571,87 @@ def _build_climate_report_context(request):
     answer_key = (request.GET.get('q_key') or '').strip()
     answer_val = (request.GET.get('q_val') or '').strip()
 
-    responses = (
-        ClimateSurveyResponse.objects
-        .filter(survey_key=CLIMATE_SURVEY_KEY)
-        .exclude(user_id__in=exempt_ids)
-        .select_related('sector', 'user')
-    )
-    if selected_sector:
-        responses = responses.filter(sector=selected_sector)
-    responses = list(responses)
-    if funcao_filter in CLIMATE_FUNCTION_OPTIONS:
-        responses = [r for r in responses if (r.answers or {}).get('profile', {}).get('funcao') == funcao_filter]
-    if tempo_filter in CLIMATE_TENURE_OPTIONS:
-        responses = [r for r in responses if (r.answers or {}).get('profile', {}).get('tempo_empresa') == tempo_filter]
     label_map = _climate_question_label_map()
+    if funcao_filter not in CLIMATE_FUNCTION_OPTIONS:
+        funcao_filter = ''
+    if tempo_filter not in CLIMATE_TENURE_OPTIONS:
+        tempo_filter = ''
+    answered = None
     if answer_key in label_map and answer_val.isdigit():
-        responses = [r for r in responses if (r.answers or {}).get('likert', {}).get(answer_key) == int(answer_val)]
+        answered = (answer_key, str(int(answer_val)))
+
+    # Médias e distribuições saem do cubo (feedback/analytics.py): o custo
+    # depende do número de perguntas, não de quantos responderam.
+    exempt_response_ids = []
+    if exempt_ids:
+        exempt_response_ids = list(
+            ClimateSurveyResponse.objects
+            .filter(survey_key=CLIMATE_SURVEY_KEY, user_id__in=exempt_ids)
+            .values_list('id', flat=True)
+        )
+    stats = survey_analytics.cube(
+        CLIMATE_SURVEY_KEY,
+        sector_id=selected_sector.id if selected_sector else None,
+        funcao=funcao_filter,
+        tempo_empresa=tempo_filter,
+        answered=answered,
+        exclude_response_ids=exempt_response_ids,
+    )
 
     question_stats = []
     for section in CLIMATE_SURVEY_SECTIONS:
         for question in section['questions']:
-            values = []
-            for response in responses:
-                value = (response.answers or {}).get('likert', {}).get(question['key'])
-                if isinstance(value, int):
-                    values.append(value)
-            avg = round(sum(values) / len(values), 2) if values else None
             question_stats.append({
                 'section': section['title'],
                 'question': question['label'],
-                'avg': avg,
-                'count': len(values),
+                'avg': stats.average(question['key']),
+                'count': stats.count(question['key']),
             })
 
     # Perfil dos respondentes (função e tempo de empresa) com base nas respostas anônimas.
-    def _profile_distribution(field, options):
+    def _profile_distribution(question_key, options):
         counter = {opt: 0 for opt in options}
-        total = 0
-        for response in responses:
-            value = (response.answers or {}).get('profile', {}).get(field)
-            if value:
-                counter[value] = counter.get(value, 0) + 1
-                total += 1
+        counter.update(stats.distribution(question_key))
+        total = sum(counter.values())
         return [
             {'label': opt, 'count': cnt, 'pct': round((cnt / total) * 100, 1) if total else 0.0}
             for opt, cnt in counter.items()
         ]
 
     profile_stats = {
-        'funcao': _profile_distribution('funcao', CLIMATE_FUNCTION_OPTIONS),
-        'tempo_empresa': _profile_distribution('tempo_empresa', CLIMATE_TENURE_OPTIONS),
+        'funcao': _profile_distribution(survey_analytics.FUNCAO, CLIMATE_FUNCTION_OPTIONS),
+        'tempo_empresa': _profile_distribution(survey_analytics.TEMPO_EMPRESA, CLIMATE_TENURE_OPTIONS),
     }
 
-    # Respostas individuais (não anônimas) para análise por colaborador.
+    # Respostas individuais (não anônimas) para análise por colaborador:
+    # filtradas pelos fatos do cubo e paginadas no banco. A exportação
+    # (paginate=False) percorre todas.
+    responses = (
+        ClimateSurveyResponse.objects
+        .filter(survey_key=CLIMATE_SURVEY_KEY)
+        .exclude(user_id__in=exempt_ids)
+        .select_related('sector', 'user')
+        .order_by('-submitted_at', '-id')
+    )
+    if selected_sector:
+        responses = responses.filter(sector=selected_sector)
+    responses = survey_analytics.filter_responses(
+        responses, CLIMATE_SURVEY_KEY,
+        funcao=funcao_filter, tempo_empresa=tempo_filter, answered=answered,
+    )
+    page_obj = None
+    if paginate:
+        page_obj = Paginator(responses, 25).get_page(request.GET.get('page'))
+        responses = page_obj.object_list
+
     open_label_map = {q['key']: q['label'] for q in CLIMATE_OPEN_QUESTIONS}
     response_rows = []
-    duration_values = []
-    for response in sorted(responses, key=lambda r: r.submitted_at, reverse=True):
+    for response in responses:
         likert = (response.answers or {}).get('likert', {})
         profile = (response.answers or {}).get('profile', {})
         open_answers = (response.answers or {}).get('open', {})
         scores = [v for v in likert.values() if isinstance(v, int)]
         avg = round(sum(scores) / len(scores), 2) if scores else None
-        if response.duration_seconds:
-            duration_values.append(response.duration_seconds)
         likert_items = [
             {'label': label_map.get(k, k), 'value': likert.get(k)}
             for k in label_map if k in likert
@@ -660,7 +674,8 @@ def _build_climate_report_context(request):
             'open_raw': open_answers,
         })
 
-    avg_duration_seconds = round(sum(duration_values) / len(duration_values)) if duration_values else None
+    avg_duration = stats.average(survey_analytics.DURATION)
+    avg_duration_seconds = round(avg_duration) if avg_duration is not None else None
     from .models import _format_duration
     avg_duration_display = _format_duration(avg_duration_seconds)
 
@@ -737,9 +752,10 @@ def _build_climate_report_context(request):
         'tenure_options': CLIMATE_TENURE_OPTIONS,
         'all_sectors': Sector.objects.all().order_by('name'),
         'survey_key': CLIMATE_SURVEY_KEY,
-        'analysis_count': len(responses),
+        'analysis_count': stats.responses,
         'charts_json': json.dumps(charts),
         'response_rows': response_rows,
+        'page_obj': page_obj,
         'avg_duration_display': avg_duration_display,
         'answer_filter_options': answer_filter_options,
         'answer_key': answer_key,
@@ -766,7 +782,7 @@ def climate_survey_report_export(request):
     from openpyxl.styles import Alignment, Font, PatternFill
     from openpyxl.utils import get_column_letter
 
-    ctx = _build_climate_report_context(request)
+    ctx = _build_climate_report_context(request, paginate=False)
 
     header_fill = PatternFill('solid', fgColor='0284C7')
     header_font = Font(bold=True, color='FFFFFF', name='Calibri', size=11)
@@ -1231,36 +1247,41 @@ def exit_interview_report(request):
         status_map = {'completed': 'COMPLETED', 'in_progress': 'IN_PROGRESS', 'not_started': 'NOT_STARTED'}
         detailed = [row for row in detailed if row['status'] == status_map[status_filter]]
 
-    responses = ExitInterviewResponse.objects.filter(survey_key=EXIT_INTERVIEW_KEY).select_related('sector', 'user', 'interviewer')
+    exit_type_map = {q['key']: q['type'] for q in _exit_questions()}
+
+    # Notas e múltipla escolha saem do cubo (feedback/analytics.py).
+    answered = None
+    if exit_type_map.get(answer_key) == 'scale' and answer_val.isdigit():
+        answered = (answer_key, str(int(answer_val)))
+    elif exit_type_map.get(answer_key) == 'choice' and answer_val:
+        answered = (answer_key, answer_val)
+    stats = survey_analytics.cube(
+        EXIT_INTERVIEW_KEY,
+        sector_id=selected_sector.id if selected_sector else None,
+        answered=answered,
+    )
+
+    # Respostas filtradas pelos fatos do cubo; só a página atual é carregada.
+    responses = (
+        ExitInterviewResponse.objects.filter(survey_key=EXIT_INTERVIEW_KEY)
+        .select_related('sector', 'user', 'interviewer')
+        .order_by('-submitted_at', '-id')
+    )
     if selected_sector:
         responses = responses.filter(sector=selected_sector)
-    responses = list(responses)
-    exit_label_map = {q['key']: q['label'] for q in _exit_questions()}
-    exit_type_map = {q['key']: q['type'] for q in _exit_questions()}
-    if answer_key in exit_type_map:
-        qtype = exit_type_map[answer_key]
-        if qtype == 'scale' and answer_val.isdigit():
-            responses = [r for r in responses if (r.answers or {}).get('scale', {}).get(answer_key) == int(answer_val)]
-        elif qtype == 'choice' and answer_val:
-            responses = [r for r in responses if (r.answers or {}).get('choice', {}).get(answer_key) == answer_val]
+    responses = survey_analytics.filter_responses(responses, EXIT_INTERVIEW_KEY, answered=answered)
 
     # Estatísticas das notas (escala 1-5).
     scale_stats = []
     for question in _exit_questions():
         if question['type'] != 'scale':
             continue
-        values = []
-        for response in responses:
-            value = (response.answers or {}).get('scale', {}).get(question['key'])
-            if isinstance(value, int):
-                values.append(value)
-        avg = round(sum(values) / len(values), 2) if values else None
         scale_stats.append({
             'key': question['key'],
             'label': question['label'],
             'short': question['label'].split('?')[0][:60],
-            'avg': avg,
-            'count': len(values),
+            'avg': stats.average(question['key']),
+            'count': stats.count(question['key']),
         })
 
     # Distribuição das perguntas de múltipla escolha.
@@ -1269,12 +1290,8 @@ def exit_interview_report(request):
         if question['type'] != 'choice':
             continue
         counter = {opt: 0 for opt in (question.get('options') or [])}
-        total = 0
-        for response in responses:
-            value = (response.answers or {}).get('choice', {}).get(question['key'])
-            if value:
-                counter[value] = counter.get(value, 0) + 1
-                total += 1
+        counter.update(stats.distribution(question['key']))
+        total = sum(counter.values())
         choice_stats.append({
             'key': question['key'],
             'label': question['label'],
@@ -1286,17 +1303,18 @@ def exit_interview_report(request):
             ],
         })
 
-    # Comentários abertos (texto/paragraph).
-    open_blocks = []
-    for question in _exit_questions():
-        if question['type'] not in ('text', 'paragraph'):
-            continue
-        texts = []
-        for response in responses:
-            value = (response.answers or {}).get('text', {}).get(question['key'])
-            if value and value.strip():
-                texts.append(value.strip())
-        open_blocks.append({'label': question['label'], 'answers': texts})
+    # Comentários abertos (texto/paragraph): texto livre não entra no cubo,
+    # então lê só a coluna ``answers`` dos envios filtrados.
+    text_questions = [q for q in _exit_questions() if q['type'] in ('text', 'paragraph')]
+    open_texts = {q['key']: [] for q in text_questions}
+    if text_questions:
+        for answers in responses.values_list('answers', flat=True).iterator():
+            text = (answers or {}).get('text', {})
+            for key, texts in open_texts.items():
+                value = text.get(key)
+                if value and value.strip():
+                    texts.append(value.strip())
+    open_blocks = [{'label': q['label'], 'answers': open_texts[q['key']]} for q in text_questions]
 
     dropout = (
         ExitInterviewParticipation.objects
@@ -1308,17 +1326,15 @@ def exit_interview_report(request):
 
     # Respostas individuais (não anônimas) por colaborador.
     from .models import _format_duration
+    page_obj = Paginator(responses, 25).get_page(request.GET.get('page'))
     response_rows = []
-    duration_values = []
-    for response in sorted(responses, key=lambda r: r.submitted_at, reverse=True):
+    for response in page_obj.object_list:
         ans = response.answers or {}
         scale = ans.get('scale', {})
         choice = ans.get('choice', {})
         text = ans.get('text', {})
         scores = [v for v in scale.values() if isinstance(v, int)]
         avg = round(sum(scores) / len(scores), 2) if scores else None
-        if response.duration_seconds:
-            duration_values.append(response.duration_seconds)
         items = []
         for q in _exit_questions():
             k = q['key']
@@ -1338,7 +1354,8 @@ def exit_interview_report(request):
             'items': items,
         })
 
-    avg_duration_seconds = round(sum(duration_values) / len(duration_values)) if duration_values else None
+    avg_duration = stats.average(survey_analytics.DURATION)
+    avg_duration_seconds = round(avg_duration) if avg_duration is not None else None
     avg_duration_display = _format_duration(avg_duration_seconds)
 
     answer_filter_options = [
@@ -1351,7 +1368,7 @@ def exit_interview_report(request):
         'completed': sum(1 for r in rows if r['status'] == 'COMPLETED'),
         'in_progress': sum(1 for r in rows if r['status'] == 'IN_PROGRESS'),
         'not_started': sum(1 for r in rows if r['status'] == 'NOT_STARTED'),
-        'responses': len(responses),
+        'responses': stats.responses,
     }
     totals['completed_pct'] = round((totals['completed'] / totals['total']) * 100, 1) if totals['total'] else 0.0
 
@@ -1368,6 +1385,7 @@ def exit_interview_report(request):
         'all_sectors': Sector.objects.all().order_by('name'),
         'survey_key': EXIT_INTERVIEW_KEY,
         'response_rows': response_rows,
+        'page_obj': page_obj,
         'avg_duration_display': avg_duration_display,
         'answer_filter_options': answer_filter_options,
         'answer_key': answer_key,
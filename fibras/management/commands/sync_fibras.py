@@ -13,6 +13,7 @@ class Command(BaseCommand):
     def handle(self, *args, **opts):
         stats = sync_fibras(year=opts.get('year'), month=opts.get('month'))
         self.stdout.write(self.style.SUCCESS(
-            f"Sync concluído: {stats['created']} novas, {stats['updated']} atualizadas "
-            f"(total na fonte: {stats['total_in_source']})."
+            f"Sync concluído: {stats['created']} novas, {stats['updated']} atualizadas, "
+            f"{stats['unchanged']} sem mudança (total na fonte: {stats['total_in_source']}; "
+            f"{stats['queries']} consultas ao banco)."
         ))
@@ -10,6 +10,7 @@ from typing import Iterable, Optional
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
+from core.bulk_upsert import bulk_upsert
 from simulator.sql_realizado import _mysql_config
 
 from .models import Fibra, FibraStatusHistory, PlanilhaOrdemInconsistente
@@ -164,50 +165,45 @@ def fetch_fibras_by_protocols(protocols: Iterable[str]) -> list[dict]:
     return rows
 
 
-def _upsert_fibra_from_mysql_row(r: dict) -> tuple[Optional[Fibra], bool]:
-    """Cria ou atualiza uma Fibra a partir de um dict do MySQL.
+# Campos que o sync traz do MySQL; ``status`` só entra quando a venda foi cancelada.
+FIBRA_SYNC_FIELDS = [
+    'numero_protocolo', 'cpf', 'cliente', 'endereco', 'numero_acesso', 'plano',
+    'valor', 'pdv', 'vendedor', 'data_da_venda', 'pilar', 'servico_tecnico', 'status',
+]
 
-    Retorna ``(fibra, created)``. Se o número da venda for vazio devolve
-    ``(None, False)``.
+
+def _fibra_row_from_mysql(r: dict) -> Optional[dict]:
+    """Converte um dict do MySQL nos campos da ``Fibra``.
+
+    Devolve None se o número da venda for vazio.
     """
     numero = (str(r.get('numero_da_venda') or '')).strip()
     if not numero:
-        return None, False
+        return None
 
-    venda_ativa = (str(r.get('venda_ativa') or '')).strip()
-    cancelada = venda_ativa == '0'
+    def _txt(field) -> str:
+        return (r.get(field) or '').strip() if r.get(field) else ''
 
-    common = {
+    row = {
+        'numero_da_venda': numero,
         'numero_protocolo': (str(r.get('numero_protocolo') or '')).strip(),
-        'cpf': (r.get('cpf') or '').strip() if r.get('cpf') else '',
-        'cliente': (r.get('cliente') or '').strip() if r.get('cliente') else '',
-        'endereco': (r.get('endereco') or '').strip() if r.get('endereco') else '',
+        'cpf': _txt('cpf'),
+        'cliente': _txt('cliente'),
+        'endereco': _txt('endereco'),
         'numero_acesso': (str(r.get('numero_acesso') or '')).strip(),
-        'plano': (r.get('plano') or '').strip() if r.get('plano') else '',
+        'plano': _txt('plano'),
         'valor': Decimal(str(r.get('valor') or 0)),
-        'pdv': (r.get('pdv') or '').strip() if r.get('pdv') else '',
-        'vendedor': (r.get('vendedor') or '').strip() if r.get('vendedor') else '',
+        'pdv': _txt('pdv'),
+        'vendedor': _txt('vendedor'),
         'data_da_venda': r.get('data_da_venda'),
-        'pilar': (r.get('pilar') or '').strip() if r.get('pilar') else '',
-        'servico_tecnico': (r.get('servico_tecnico') or '').strip() if r.get('servico_tecnico') else '',
+        'pilar': _txt('pilar'),
+        'servico_tecnico': _txt('servico_tecnico'),
     }
-
-    existing = Fibra.objects.filter(numero_da_venda=numero).first()
-    if existing:
-        for field, value in common.items():
-            setattr(existing, field, value)
-        if cancelada and existing.status != Fibra.STATUS_CANCELADO:
-            existing.status = Fibra.STATUS_CANCELADO
-        existing.save()
-        return existing, False
-
-    initial_status = Fibra.STATUS_CANCELADO if cancelada else Fibra.STATUS_AGENDADO
-    fibra = Fibra.objects.create(
-        numero_da_venda=numero,
-        status=initial_status,
-        **common,
-    )
-    return fibra, True
+    # Venda cancelada no MySQL (Venda_ativa='0') derruba o status local;
+    # fora isso o status é da Myrella e o sync não mexe.
+    if (str(r.get('venda_ativa') or '')).strip() == '0':
+        row['status'] = Fibra.STATUS_CANCELADO
+    return row
 
 
 def sync_fibras(*, year: Optional[int] = None, month: Optional[int] = None) -> dict:
@@ -218,19 +214,19 @@ def sync_fibras(*, year: Optional[int] = None, month: Optional[int] = None) -> d
     foi cancelada no MySQL (``Venda_ativa='0'``), o status local vira
     ``STATUS_CANCELADO`` automaticamente.
 
-    Retorna estatísticas (created, updated).
+    Grava em lote (core/bulk_upsert.py): só as vendas que mudaram são
+    escritas. Retorna estatísticas (created, updated, unchanged, ...).
     """
     raw = fetch_fibras_from_mysql(year=year, month=month)
-    created = 0
-    updated = 0
-    for r in raw:
-        _, was_created = _upsert_fibra_from_mysql_row(r)
-        if was_created:
-            created += 1
-        else:
-            updated += 1
-
-    return {'created': created, 'updated': updated, 'total_in_source': len(raw)}
+    rows = [row for row in map(_fibra_row_from_mysql, raw) if row]
+    stats = bulk_upsert(
+        Fibra, rows,
+        key=['numero_da_venda'],
+        fields=FIBRA_SYNC_FIELDS,
+        defaults={'status': Fibra.STATUS_AGENDADO},
+        touch=['last_synced_at'],
+    )
+    return {**stats.as_dict(), 'total_in_source': len(raw)}
 
 
 # ---------------------------------------------------------------------------
@@ -480,6 +476,12 @@ def import_planilha_xlsx(file_obj, *, by_user=None) -> dict:
     # Mantém um mapa proto -> status_raw para registrar inconsistências.
     unmatched_status: dict[str, str] = {}
 
+    # Tudo o que casou vai num bulk_update só; histórico num bulk_create.
+    touched: dict[int, Fibra] = {}
+    status_changed: set[int] = set()
+    history: list[FibraStatusHistory] = []
+    changes: list[tuple[Fibra, str, str]] = []
+
     for ordem, (proto, status_raw, sla_val, motivo_val) in enumerate(parsed, start=1):
         if not proto:
             continue
@@ -494,30 +496,40 @@ def import_planilha_xlsx(file_obj, *, by_user=None) -> dict:
         fibra.status_planilha_raw = status_raw[:120]
         fibra.sla_agenda = sla_val[:120]
         fibra.motivo_planilha = motivo_val[:255]
-        update_fields = [
-            'ordem_planilha', 'last_planilha_at', 'status_planilha_raw',
-            'sla_agenda', 'motivo_planilha',
-        ]
+        touched[fibra.pk] = fibra
 
         mapped = _map_planilha_status(status_raw)
         if mapped and mapped != fibra.status:
             old = fibra.status
             fibra.status = mapped
-            update_fields.append('status')
+            status_changed.add(fibra.pk)
             updated_status += 1
-            try:
-                FibraStatusHistory.objects.create(
-                    fibra=fibra,
-                    status_anterior=old,
-                    status_novo=mapped,
-                    retorno=f'Import planilha: {status_raw[:80]}',
-                    alterado_por=by_user,
-                )
-            except Exception:
-                pass
-            _notify_vendor(fibra, old, mapped)
-
-        fibra.save(update_fields=update_fields)
+            history.append(FibraStatusHistory(
+                fibra=fibra,
+                status_anterior=old,
+                status_novo=mapped,
+                retorno=f'Import planilha: {status_raw[:80]}',
+                alterado_por=by_user,
+            ))
+            changes.append((fibra, old, mapped))
+
+    planilha_fields = [
+        'ordem_planilha', 'last_planilha_at', 'status_planilha_raw',
+        'sla_agenda', 'motivo_planilha',
+    ]
+    Fibra.objects.bulk_update(
+        [f for pk, f in touched.items() if pk not in status_changed], planilha_fields, batch_size=500,
+    )
+    Fibra.objects.bulk_update(
+        [f for pk, f in touched.items() if pk in status_changed], planilha_fields + ['status'], batch_size=500,
+    )
+    try:
+        FibraStatusHistory.objects.bulk_create(history, batch_size=500)
+    except Exception:
+        pass
+    vendors = _vendor_index()
+    for fibra, old, mapped in changes:
+        _notify_vendor(fibra, old, mapped, vendors=vendors)
 
     # --- Persistência de inconsistências (ORDEMs da planilha sem match local).
     inc_created = 0
@@ -683,11 +695,17 @@ def change_status(fibra: Fibra, new_status: str, *, changed_by, retorno: str = '
     _notify_vendor(fibra, old, new_status)
 
 
-def _notify_vendor(fibra: Fibra, old_status: str, new_status: str) -> None:
-    """Notifica o vendedor (se cadastrado no portal) sobre a mudança de status."""
+def _notify_vendor(fibra: Fibra, old_status: str, new_status: str, *, vendors: Optional[dict] = None) -> None:
+    """Notifica o vendedor (se cadastrado no portal) sobre a mudança de status.
+
+    ``vendors`` é o índice de :func:`_vendor_index`, para quem notifica em lote.
+    """
     if old_status == new_status:
         return
-    vendor_user = _find_vendor_user(fibra.vendedor)
+    if vendors is not None:
+        vendor_user = vendors.get(_normalize(fibra.vendedor)) if fibra.vendedor else None
+    else:
+        vendor_user = _find_vendor_user(fibra.vendedor)
     if not vendor_user:
         return
 
@@ -721,6 +739,14 @@ def _notify_vendor(fibra: Fibra, old_status: str, new_status: str) -> None:
         pass
 
 
+def _vendor_index() -> dict:
+    """Nome normalizado → usuário ativo (o primeiro, como em ``_find_vendor_user``)."""
+    index = {}
+    for u in User.objects.filter(is_active=True).only('id', 'first_name', 'last_name', 'username'):
+        index.setdefault(_normalize(f"{u.first_name} {u.last_name}".strip() or u.username), u)
+    return index
+
+
 def _find_vendor_user(vendedor_nome: str):
     if not vendedor_nome:
         return None
@@ -359,8 +359,8 @@ def sync_now(request):
     stats = sync_fibras()
     messages.success(
         request,
-        f"Sincronização concluída: {stats['created']} novas, {stats['updated']} atualizadas "
-        f"(de {stats['total_in_source']} no MySQL).",
+        f"Sincronização concluída: {stats['created']} novas, {stats['updated']} atualizadas, "
+        f"{stats['unchanged']} sem mudança (de {stats['total_in_source']} no MySQL).",
     )
     return redirect('fibras:kanban')
 
@@ -8,15 +8,10 @@ import io
 import re
 import unicodedata
 
-try:
-    import pdfplumber
-except ImportError:  # pragma: no cover
-    pdfplumber = None
-
-try:
-    import pypdfium2 as pdfium
-except ImportError:  # pragma: no cover
-    pdfium = None
+from core.lazy import lazy_optional
+
+pdfplumber = lazy_optional('pdfplumber')
+pdfium = lazy_optional('pypdfium2')
 
 
 def normalize_name(name):
@@ -0,0 +1,54 @@
+"""Configuração do Gunicorn usada pelo deploy_new.sh.
+
+``GUNICORN_POOL`` escolhe o perfil (redeconfianca/serving.py):
+
+* ``web`` (padrão): gthread, timeout curto. Atende o portal, o polling e os
+  contadores;
+* ``heavy``: poucos workers, timeout longo. O proxy manda para ele só as
+  importações, exportações e páginas do Tangerino (nginx.conf).
+
+Variáveis que sobrescrevem o perfil: ``PORT``, ``WEB_CONCURRENCY``,
+``GUNICORN_THREADS``, ``GUNICORN_TIMEOUT``.
+"""
+import os
+
+PROFILES = {
+    'web': {'port': 8000, 'workers': 3, 'threads': 8, 'timeout': 120},
+    'heavy': {'port': 8001, 'workers': 2, 'threads': 4, 'timeout': 900},
+}
+
+pool = os.environ.get('GUNICORN_POOL', 'web')
+profile = PROFILES.get(pool, PROFILES['web'])
+
+wsgi_app = 'redeconfianca.wsgi:application'
+bind = f"0.0.0.0:{os.environ.get('PORT', profile['port'])}"
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', profile['workers']))
+threads = int(os.environ.get('GUNICORN_THREADS', profile['threads']))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', profile['timeout']))
+graceful_timeout = 30
+keepalive = 5
+max_requests = 1000
+max_requests_jitter = 100
+proc_name = f'redeconfianca-{pool}'
+
+# Django carregado uma vez no mestre: fork mais rápido e memória compartilhada.
+# As conexões herdadas são descartadas em post_fork.
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+loglevel = 'info'
+capture_output = True
+
+
+def post_fork(server, worker):
+    from redeconfianca.serving import reset_connections_after_fork
+
+    reset_connections_after_fork()
+
+
+def when_ready(server):
+    server.log.info(
+        'Pool %s: %s workers x %s threads, timeout %ss', pool, workers, threads, timeout,
+    )
@@ -5,3 +5,7 @@ class ImpulsoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'impulso'
     verbose_name = 'Impulso'
+
+    def ready(self):
+        # Registra o buffer de progresso de vídeo (flush_video_progress).
+        from . import progress  # noqa: F401
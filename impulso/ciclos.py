@@ -156,33 +156,25 @@ def creditar_confiancas(ciclo, usuario):
     if ciclo.confiancas_creditadas:
         return []
 
-    from prizes.models import CSTransaction
+    from prizes.ledger import bulk_credit
 
     totais = (PontuacaoMensal.objects
               .filter(mes__ciclo=ciclo, confiancas_previstas__gt=0)
               .values('user')
               .annotate(total=Sum('confiancas_previstas')))
 
-    creditados = []
-    for linha in totais:
-        valor = Decimal(str(linha['total'] or 0))
-        if valor <= 0:
-            continue
-        colaborador = User.objects.filter(id=linha['user']).first()
-        if not colaborador:
-            continue
-        # Saldo é campo armazenado: atualizar E registrar a transação.
-        colaborador.balance_cs = (colaborador.balance_cs or Decimal('0')) + valor
-        colaborador.save(update_fields=['balance_cs'])
-        CSTransaction.objects.create(
-            user=colaborador,
-            amount=valor,
-            transaction_type='CREDIT',
-            description=f'Impulso — prêmio do ciclo {ciclo.nome}',
-            status='APPROVED',
-            created_by=usuario,
-        )
-        creditados.append({'user': colaborador, 'valor': valor})
+    # Saldo é campo armazenado: o ledger atualiza o saldo E registra as
+    # transações de todos os colaboradores em lote, na mesma transação.
+    transacoes = bulk_credit(
+        [(linha['user'], linha['total']) for linha in totais],
+        description=f'Impulso — prêmio do ciclo {ciclo.nome}',
+        created_by=usuario,
+    )
+    colaboradores = User.objects.in_bulk([t.user_id for t in transacoes])
+    creditados = [
+        {'user': colaboradores[t.user_id], 'valor': t.amount}
+        for t in transacoes
+    ]
 
     ciclo.confiancas_creditadas = True
     ciclo.save(update_fields=['confiancas_creditadas'])
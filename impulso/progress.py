@@ -0,0 +1,96 @@
+"""Progresso dos vídeos do Conectar via buffer de heartbeats (core/heartbeats.py).
+
+A regra anti-pulo continua a mesma de ``views.conteudo_progresso_video``: o
+avanço aceito não passa do tempo real decorrido desde o aviso anterior. O
+estado que ela precisa (assistido até, duração, hora do último aviso) fica no
+buffer. O banco só recebe o lote periódico e, na hora, a conclusão do vídeo,
+que é o que libera o botão de concluir.
+"""
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Tuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+from core.heartbeats import ProgressBuffer
+
+from .models import ConclusaoConteudo
+
+VIDEO_FIELDS = ['video_assistido_ate', 'video_duracao', 'video_concluido', 'video_atualizado_em']
+
+
+def _moment(epoch):
+    return datetime.fromtimestamp(epoch, tz=dt_timezone.utc) if epoch else None
+
+
+def _state_from(conclusao):
+    if conclusao is None:
+        return {'ate': 0.0, 'dur': 0.0, 'em': None, 'concluido': False}
+    return {
+        'ate': conclusao.video_assistido_ate,
+        'dur': conclusao.video_duracao,
+        'em': conclusao.video_atualizado_em.timestamp() if conclusao.video_atualizado_em else None,
+        'concluido': conclusao.video_concluido,
+    }
+
+
+def _flush(states: Dict[Tuple[int, int], dict]) -> None:
+    condition = Q()
+    for user_id, conteudo_id in states:
+        condition |= Q(user_id=user_id, conteudo_id=conteudo_id)
+    existing = {(c.user_id, c.conteudo_id): c for c in ConclusaoConteudo.objects.filter(condition)}
+
+    changed, created = [], []
+    for (user_id, conteudo_id), state in states.items():
+        conclusao = existing.get((user_id, conteudo_id))
+        if conclusao is None:
+            conclusao = ConclusaoConteudo(user_id=user_id, conteudo_id=conteudo_id)
+            created.append(conclusao)
+        elif state['ate'] <= conclusao.video_assistido_ate and conclusao.video_atualizado_em:
+            continue
+        else:
+            changed.append(conclusao)
+        conclusao.video_assistido_ate = max(conclusao.video_assistido_ate, state['ate'])
+        conclusao.video_duracao = state['dur'] or conclusao.video_duracao
+        conclusao.video_concluido = conclusao.video_concluido or state['concluido']
+        conclusao.video_atualizado_em = _moment(state['em'])
+
+    ConclusaoConteudo.objects.bulk_update(changed, VIDEO_FIELDS, batch_size=500)
+    ConclusaoConteudo.objects.bulk_create(created, batch_size=500, ignore_conflicts=True)
+
+
+buffer = ProgressBuffer('impulso_video', _flush)
+
+
+def heartbeat(user, conteudo, posicao, duracao, agora=None):
+    """Aplica um aviso do player e devolve o estado aceito."""
+    agora = agora or timezone.now()
+    state = buffer.get(user.pk, conteudo.pk)
+    if state is None:
+        state = _state_from(ConclusaoConteudo.objects.filter(conteudo=conteudo, user=user).first())
+
+    if duracao > 0:
+        state['dur'] = duracao
+
+    # Quanto tempo real passou desde o último aviso? O avanço não pode ser
+    # maior que isso (com folga para latência e para o primeiro aviso).
+    decorrido = agora.timestamp() - state['em'] if state['em'] else 30
+    teto = state['ate'] + max(decorrido * 1.5, 5)
+    if posicao > state['ate']:
+        state['ate'] = min(posicao, teto)
+    state['em'] = agora.timestamp()
+
+    alvo = (state['dur'] or 0) * ConclusaoConteudo.FRACAO_PARA_CONCLUIR
+    if not state['concluido'] and alvo and state['ate'] >= alvo:
+        # Cruzou a linha de conclusão: grava na hora, não espera o lote.
+        state['concluido'] = True
+        conclusao, _ = ConclusaoConteudo.objects.get_or_create(conteudo=conteudo, user=user)
+        conclusao.video_assistido_ate = state['ate']
+        conclusao.video_duracao = state['dur']
+        conclusao.video_concluido = True
+        conclusao.video_atualizado_em = agora
+        conclusao.save(update_fields=VIDEO_FIELDS)
+        buffer.discard(user.pk, conteudo.pk)
+    elif not buffer.put(user.pk, conteudo.pk, state):
+        _flush({(user.pk, conteudo.pk): state})
+    return state
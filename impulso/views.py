@@ -19,6 +19,7 @@ from core.models import NotificationMixin
 from . import ai
 from .ai import generate_feedback_summary
 from . import ciclos as ciclos_service
+from . import progress as video_progress
 from .models import (
     FAIXAS_DA_NOTA,
     Ciclo, CicloMes, ConclusaoConteudo, ConteudoConectar, Ideia, ImpulsoFeedback,
@@ -1177,6 +1178,8 @@ def conteudo_create(request):
 @impulso_member_required
 def conteudo_detail(request, conteudo_id):
     conteudo = get_object_or_404(ConteudoConectar, id=conteudo_id)
+    # Retoma o vídeo de onde parou, incluindo o que ainda está no buffer.
+    video_progress.buffer.persist(request.user.pk, conteudo.id)
     conclusao = ConclusaoConteudo.objects.filter(
         conteudo=conteudo, user=request.user).first()
     context = {
@@ -1197,6 +1200,7 @@ def conteudo_progresso_video(request, conteudo_id):
     O navegador avisa a cada poucos segundos. O servidor só aceita avanço
     compatível com o tempo real decorrido: sem isso, bastaria mandar
     "assisti tudo" de uma vez e o vídeo obrigatório viraria enfeite.
+    Os avisos são acumulados e gravados em lote (ver impulso/progress.py).
     """
     conteudo = get_object_or_404(ConteudoConectar, id=conteudo_id)
     if not conteudo.video_reproduzivel:
@@ -1208,35 +1212,11 @@ def conteudo_progresso_video(request, conteudo_id):
     except (TypeError, ValueError):
         return JsonResponse({'ok': False, 'erro': 'Progresso inválido.'}, status=400)
 
-    conclusao, _ = ConclusaoConteudo.objects.get_or_create(
-        conteudo=conteudo, user=request.user)
-
-    agora = timezone.now()
-    if duracao > 0:
-        conclusao.video_duracao = duracao
-
-    # Quanto tempo real passou desde o último aviso? O avanço não pode ser
-    # maior que isso (com folga para latência e para o primeiro aviso).
-    if conclusao.video_atualizado_em:
-        decorrido = (agora - conclusao.video_atualizado_em).total_seconds()
-    else:
-        decorrido = 30
-    teto = conclusao.video_assistido_ate + max(decorrido * 1.5, 5)
-
-    if posicao > conclusao.video_assistido_ate:
-        conclusao.video_assistido_ate = min(posicao, teto)
-
-    alvo = (conclusao.video_duracao or 0) * ConclusaoConteudo.FRACAO_PARA_CONCLUIR
-    if alvo and conclusao.video_assistido_ate >= alvo:
-        conclusao.video_concluido = True
-
-    conclusao.video_atualizado_em = agora
-    conclusao.save(update_fields=['video_assistido_ate', 'video_duracao',
-                                  'video_concluido', 'video_atualizado_em'])
+    state = video_progress.heartbeat(request.user, conteudo, posicao, duracao)
     return JsonResponse({
         'ok': True,
-        'assistido_ate': round(conclusao.video_assistido_ate, 1),
-        'video_concluido': conclusao.video_concluido,
+        'assistido_ate': round(state['ate'], 1),
+        'video_concluido': state['concluido'],
     })
 
 
@@ -1244,6 +1224,7 @@ def conteudo_progresso_video(request, conteudo_id):
 @impulso_member_required
 def conteudo_concluir(request, conteudo_id):
     conteudo = get_object_or_404(ConteudoConectar, id=conteudo_id)
+    video_progress.buffer.persist(request.user.pk, conteudo.id)
     conclusao, _ = ConclusaoConteudo.objects.get_or_create(
         conteudo=conteudo, user=request.user)
 
@@ -12,3 +12,8 @@ class KnowledgeTrailsConfig(AppConfig):
             from . import popup_checkers  # noqa: F401
         except Exception:
             pass
+        # Esquece o total de lições em cache quando a trilha é editada.
+        from . import certificates, progress
+        progress.connect_signals()
+        # Gera o PDF do certificado na emissão.
+        certificates.connect_signals()
@@ -0,0 +1,218 @@
+"""PDF dos certificados de conclusão de trilha.
+
+O download desenhava o certificado inteiro a cada clique, com reportlab (que
+nem está no requirements.txt), e lia a logo por ``certificate_logo.path``, que
+não existe no storage S3. Agora, no mesmo esquema de core/signature_cert.py
+(Pillow, A4 paisagem em 150 DPI):
+
+* a parte fixa de cada trilha (fundo, bordas, logo, títulos, nome da trilha)
+  é desenhada uma vez e fica em memória no processo, identificada por
+  ``template_fingerprint``. Editar título, carga horária ou logo muda a
+  impressão digital e o modelo é redesenhado;
+* cada certificado copia essa camada e escreve só nome, pontuação, data e
+  código;
+* o PDF é gerado na emissão (signal ``post_save``), gravado no storage de
+  mídia (``Certificate.pdf_file``) e o download só lê o arquivo. Se o
+  modelo mudou, o próximo download refaz o PDF;
+* ``manage.py render_certificates`` refaz em lote depois de mudar o modelo.
+"""
+import hashlib
+import io
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone, translation
+from django.utils.dateformat import format as date_format
+
+logger = logging.getLogger(__name__)
+
+# Suba ao mudar o desenho abaixo: todos os PDFs ficam desatualizados.
+TEMPLATE_VERSION = 1
+
+DPI = 150
+PAGE_W, PAGE_H = 1754, 1240          # A4 paisagem
+_BLUE = (51, 77, 153)
+_BACKGROUND = (242, 242, 250)
+_INK = (0, 0, 0)
+
+MAX_TEMPLATES = 16
+_templates: 'OrderedDict[tuple, object]' = OrderedDict()
+_lock = threading.Lock()
+
+
+def font(size: int, bold: bool = False):
+    # Pillow só é carregado quando um certificado é desenhado (ver core/lazy.py).
+    from core.signature_cert import font as portal_font
+
+    return portal_font(size, bold)
+
+
+def _cm(value: float) -> int:
+    return round(value * DPI / 2.54)
+
+
+def _pt(value: float) -> int:
+    return round(value * DPI / 72)
+
+
+def template_fingerprint(trail) -> str:
+    """Muda quando algo desenhado no modelo da trilha muda."""
+    logo = trail.certificate_logo.name if trail.certificate_logo else ''
+    raw = '\x1f'.join([str(TEMPLATE_VERSION), trail.title, str(trail.estimated_hours), logo])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _fit(text: str, size_pt: float, bold: bool = False, max_width: int = PAGE_W - 2 * _cm(2.5)):
+    """Fonte no tamanho pedido, reduzida até o texto caber na largura."""
+    size = _pt(size_pt)
+    while size > _pt(8) and font(size, bold).getlength(text) > max_width:
+        size -= 2
+    return font(size, bold)
+
+
+def _read_logo(trail):
+    from PIL import Image
+
+    field = trail.certificate_logo
+    if not field:
+        return None
+    try:
+        with field.storage.open(field.name, 'rb') as fh:
+            return Image.open(io.BytesIO(fh.read())).convert('RGBA')
+    except Exception:
+        logger.warning('Logo do certificado da trilha %s indisponível', trail.pk, exc_info=True)
+        return None
+
+
+def _draw_template(trail):
+    from PIL import Image, ImageDraw
+
+    img = Image.new('RGB', (PAGE_W, PAGE_H), _BACKGROUND)
+    d = ImageDraw.Draw(img)
+    center = PAGE_W / 2
+
+    d.rectangle([_cm(1), _cm(1), PAGE_W - _cm(1), PAGE_H - _cm(1)], outline=_BLUE, width=_pt(3))
+    d.rectangle([_cm(1.5), _cm(1.5), PAGE_W - _cm(1.5), PAGE_H - _cm(1.5)], outline=_BLUE, width=_pt(1))
+
+    logo = _read_logo(trail)
+    if logo is not None:
+        logo.thumbnail((_cm(6), _cm(3)))
+        img.paste(logo, (int(center - logo.width / 2), _cm(3) + (_cm(3) - logo.height) // 2), logo)
+
+    d.text((center, _cm(8)), 'CERTIFICADO', font=font(_pt(36), True), anchor='ms', fill=_BLUE)
+    d.text((center, _cm(9.5)), 'DE CONCLUSÃO', font=font(_pt(16)), anchor='ms', fill=_BLUE)
+    d.text((center, _cm(11.5)), 'Certificamos que', font=font(_pt(14)), anchor='ms', fill=_INK)
+    d.text((center, _cm(15)), 'concluiu com êxito a trilha de conhecimento', font=font(_pt(14)),
+           anchor='ms', fill=_INK)
+    d.text((center, _cm(16.5)), trail.title, font=_fit(trail.title, 18, bold=True), anchor='ms', fill=_BLUE)
+    return img
+
+
+def template_layer(trail):
+    """Camada fixa da trilha, desenhada uma vez por processo e modelo."""
+    key = (trail.pk, template_fingerprint(trail))
+    with _lock:
+        cached = _templates.get(key)
+        if cached is not None:
+            _templates.move_to_end(key)
+            return cached
+    layer = _draw_template(trail)
+    with _lock:
+        _templates[key] = layer
+        while len(_templates) > MAX_TEMPLATES:
+            _templates.popitem(last=False)
+    return layer
+
+
+def render_pdf(certificate) -> bytes:
+    """PDF de uma página: camada da trilha + dados do certificado."""
+    from PIL import ImageDraw
+
+    trail = certificate.trail
+    img = template_layer(trail).copy()
+    d = ImageDraw.Draw(img)
+    center = PAGE_W / 2
+
+    name = certificate.user.get_full_name() or certificate.user.username
+    d.text((center, _cm(13.5)), name, font=_fit(name, 24, bold=True), anchor='ms', fill=_BLUE)
+    d.text((center, _cm(17.5)),
+           f'Carga horária: {trail.estimated_hours}h | '
+           f'Pontuação: {certificate.trail_progress.total_points_earned} pontos',
+           font=font(_pt(12)), anchor='ms', fill=_INK)
+
+    with translation.override(settings.LANGUAGE_CODE):
+        issued = date_format(timezone.localtime(certificate.issued_at), r'd \d\e F \d\e Y')
+    d.text((center, PAGE_H - _cm(2.6)), f'Emitido em: {issued}', font=font(_pt(10)), anchor='ms', fill=_INK)
+    d.text((center, PAGE_H - _cm(2.1)), f'Código de Verificação: {certificate.certificate_code}',
+           font=font(_pt(10)), anchor='ms', fill=_INK)
+
+    out = io.BytesIO()
+    img.save(out, 'PDF', resolution=float(DPI))
+    return out.getvalue()
+
+
+def is_current(certificate) -> bool:
+    return bool(certificate.pdf_file) and certificate.template_fingerprint == template_fingerprint(certificate.trail)
+
+
+def issue(certificate, force: bool = False) -> Optional[bytes]:
+    """Gera e grava o PDF se faltar ou estiver desatualizado. Devolve os bytes gerados."""
+    if not force and is_current(certificate):
+        return None
+    data = render_pdf(certificate)
+    old_name = certificate.pdf_file.name if certificate.pdf_file else ''
+    if old_name:
+        try:
+            certificate.pdf_file.storage.delete(old_name)
+        except Exception:
+            logger.warning('Não foi possível apagar %s', old_name, exc_info=True)
+    certificate.pdf_file.save(f'certificado_{certificate.certificate_code}.pdf', ContentFile(data), save=False)
+    certificate.template_fingerprint = template_fingerprint(certificate.trail)
+    certificate.save(update_fields=['pdf_file', 'template_fingerprint'])
+    return data
+
+
+def pdf_bytes(certificate) -> bytes:
+    """Bytes para download: o arquivo gravado ou, se faltar, um PDF novo (e gravado)."""
+    if is_current(certificate):
+        try:
+            with certificate.pdf_file.storage.open(certificate.pdf_file.name, 'rb') as fh:
+                data = fh.read()
+            if data:
+                return data
+        except Exception:
+            logger.warning('PDF do certificado %s ilegível; gerando de novo', certificate.pk, exc_info=True)
+    try:
+        return issue(certificate, force=True)
+    except Exception:
+        # Storage fora do ar não impede o download.
+        logger.exception('Falha ao gravar o PDF do certificado %s', certificate.pk)
+        return render_pdf(certificate)
+
+
+def _issue_later(certificate_id: int) -> None:
+    from .models import Certificate
+
+    try:
+        certificate = Certificate.objects.select_related('trail', 'user', 'trail_progress').get(pk=certificate_id)
+        issue(certificate)
+    except Exception:
+        logger.exception('Falha ao gerar o PDF do certificado %s', certificate_id)
+
+
+def _on_certificate_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(lambda: _issue_later(instance.pk))
+
+
+def connect_signals() -> None:
+    from django.db.models.signals import post_save
+
+    from .models import Certificate
+
+    post_save.connect(_on_certificate_created, sender=Certificate, dispatch_uid='certificate-pdf-on-issue')
@@ -0,0 +1,40 @@
+"""
+Gera (ou refaz) os PDFs dos certificados de trilha (knowledge_trails/certificates.py).
+
+Por padrão só gera os que faltam ou foram feitos com outro modelo da trilha
+(título, carga horária, logo ou ``TEMPLATE_VERSION`` diferentes). Rodar depois
+de mudar o desenho do certificado; ``--force`` refaz todos (ex.: nomes de
+usuários corrigidos).
+"""
+from django.core.management.base import BaseCommand
+
+from knowledge_trails import certificates
+from knowledge_trails.models import Certificate
+
+
+class Command(BaseCommand):
+    help = 'Gera os PDFs de certificados ausentes ou com modelo desatualizado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trail', type=int, help='Só os certificados desta trilha (id)')
+        parser.add_argument('--force', action='store_true', help='Refaz mesmo os que estão em dia')
+
+    def handle(self, *args, **options):
+        qs = Certificate.objects.select_related('trail', 'user', 'trail_progress').order_by('trail_id', 'id')
+        if options.get('trail'):
+            qs = qs.filter(trail_id=options['trail'])
+
+        rendered = current = failed = 0
+        for certificate in qs.iterator(chunk_size=200):
+            try:
+                if certificates.issue(certificate, force=options['force']) is None:
+                    current += 1
+                else:
+                    rendered += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f'Certificado {certificate.pk}: {exc}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{rendered} PDF(s) gerado(s), {current} já em dia, {failed} falha(s)'
+        ))
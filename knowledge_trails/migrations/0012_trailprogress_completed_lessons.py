@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-18 22:08
+
+from django.db import migrations, models
+
+
+def preencher_contadores(apps, schema_editor):
+    """Conta as lições já concluídas de cada progresso (o painel passa a ler o contador)."""
+    TrailProgress = apps.get_model('knowledge_trails', 'TrailProgress')
+    LessonProgress = apps.get_model('knowledge_trails', 'LessonProgress')
+
+    concluidas = {
+        (trail_id, user_id): n
+        for trail_id, user_id, n in LessonProgress.objects.filter(completed=True)
+        .values_list('lesson__module__trail_id', 'user_id').annotate(n=models.Count('id')).order_by()
+    }
+    alterados = []
+    for progress in TrailProgress.objects.only('id', 'trail_id', 'user_id').iterator(chunk_size=1000):
+        n = concluidas.get((progress.trail_id, progress.user_id), 0)
+        if n:
+            progress.completed_lessons = n
+            alterados.append(progress)
+    TrailProgress.objects.bulk_update(alterados, ['completed_lessons'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knowledge_trails', '0011_popup_trilha5_gerente_adm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trailprogress',
+            name='completed_lessons',
+            field=models.PositiveIntegerField(default=0, verbose_name='Lições Concluídas'),
+        ),
+        migrations.RunPython(preencher_contadores, migrations.RunPython.noop),
+    ]
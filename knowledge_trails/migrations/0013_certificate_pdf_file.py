@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 22:10
+
+import knowledge_trails.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knowledge_trails', '0012_trailprogress_completed_lessons'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='pdf_file',
+            field=models.FileField(blank=True, null=True, upload_to=knowledge_trails.models.upload_certificate_pdf, verbose_name='PDF do Certificado'),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='template_fingerprint',
+            field=models.CharField(blank=True, help_text='Identifica o modelo da trilha usado no PDF gerado', max_length=40, verbose_name='Versão do Modelo'),
+        ),
+    ]
@@ -69,6 +69,11 @@ def upload_certificate_logo(instance, filename):
     return os.path.join('knowledge_trails', 'certificates', new_filename)
 
 
+def upload_certificate_pdf(instance, filename):
+    """Define o caminho do PDF gerado de um certificado"""
+    return os.path.join('knowledge_trails', 'certificates', 'pdf', filename)
+
+
 class KnowledgeTrail(models.Model):
     """Trilha de conhecimento de um setor"""
     
@@ -200,18 +205,10 @@ class KnowledgeTrail(models.Model):
         return progress
     
     def get_completion_percentage(self, user):
-        """Retorna a porcentagem de conclusão"""
-        total_lessons = sum(module.lessons.count() for module in self.modules.all())
-        if total_lessons == 0:
-            return 0
-        
-        completed_lessons = LessonProgress.objects.filter(
-            lesson__module__trail=self,
-            user=user,
-            completed=True
-        ).count()
-        
-        return round((completed_lessons / total_lessons) * 100)
+        """Retorna a porcentagem de conclusão (ver knowledge_trails/progress.py)"""
+        from .progress import completion_percentage, lesson_totals, progress_for
+
+        return completion_percentage(progress_for(user, [self.pk])[self.pk], lesson_totals([self.pk])[self.pk])
     
     def get_leaderboard(self):
         """Retorna o ranking de usuários desta trilha"""
@@ -676,6 +673,10 @@ class TrailProgress(models.Model):
         default=0,
         verbose_name='Pontos Conquistados'
     )
+    completed_lessons = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Lições Concluídas'
+    )
     
     class Meta:
         verbose_name = 'Progresso na Trilha'
@@ -686,43 +687,10 @@ class TrailProgress(models.Model):
         return f'{self.user.get_full_name()} - {self.trail.title}'
     
     def update_progress(self):
-        """Atualiza o status e pontos do progresso"""
-        total_lessons = sum(
-            module.lessons.filter(is_active=True).count() 
-            for module in self.trail.modules.filter(is_active=True)
-        )
-        
-        if total_lessons == 0:
-            return
-        
-        completed_lessons = LessonProgress.objects.filter(
-            lesson__module__trail=self.trail,
-            user=self.user,
-            completed=True
-        ).count()
-        
-        # Atualizar pontos
-        self.total_points_earned = LessonProgress.objects.filter(
-            lesson__module__trail=self.trail,
-            user=self.user,
-            completed=True
-        ).aggregate(
-            total=models.Sum('lesson__points')
-        )['total'] or 0
-        
-        # Atualizar status
-        if completed_lessons == 0:
-            self.status = 'not_started'
-        elif completed_lessons >= total_lessons:
-            self.status = 'completed'
-            if not self.completed_at:
-                self.completed_at = timezone.now()
-        else:
-            self.status = 'in_progress'
-            if not self.started_at:
-                self.started_at = timezone.now()
-        
-        self.save()
+        """Recalcula status, pontos e lições concluídas a partir das lições"""
+        from .progress import recount
+
+        return recount(self)
 
 
 class LessonProgress(models.Model):
@@ -765,18 +733,12 @@ class LessonProgress(models.Model):
         return f'{self.user.get_full_name()} - {self.lesson.title}'
     
     def mark_completed(self):
-        """Marca a lição como concluída"""
-        if not self.completed:
-            self.completed = True
-            self.completed_at = timezone.now()
+        """Marca a lição como concluída e soma no progresso da trilha"""
+        from .progress import record_completion
+
+        if self.pk is None:
             self.save()
-            
-            # Atualizar progresso da trilha
-            trail_progress = TrailProgress.objects.get_or_create(
-                trail=self.lesson.module.trail,
-                user=self.user
-            )[0]
-            trail_progress.update_progress()
+        record_completion(self)
 
 
 class Certificate(models.Model):
@@ -807,6 +769,21 @@ class Certificate(models.Model):
         verbose_name='Código do Certificado'
     )
     issued_at = models.DateTimeField(auto_now_add=True, verbose_name='Emitido em')
+
+    # PDF gerado na emissão (knowledge_trails/certificates.py)
+    pdf_file = models.FileField(
+        upload_to=upload_certificate_pdf,
+        storage=get_trail_media_storage(),
+        blank=True,
+        null=True,
+        verbose_name='PDF do Certificado'
+    )
+    template_fingerprint = models.CharField(
+        max_length=40,
+        blank=True,
+        verbose_name='Versão do Modelo',
+        help_text='Identifica o modelo da trilha usado no PDF gerado'
+    )
     
     class Meta:
         verbose_name = 'Certificado'
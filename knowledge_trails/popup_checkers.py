@@ -11,7 +11,10 @@ GRUPO_ALVO = 'Gerente / ADM'
 TRILHA_ID = 5
 
 
-@register_popup_checker('trilha5_gerente_adm', 'Trilha "FUNÇÕES SAP" concluída (grupo Gerente / ADM)')
+@register_popup_checker('trilha5_gerente_adm', 'Trilha "FUNÇÕES SAP" concluída (grupo Gerente / ADM)', watch=[
+    ('knowledge_trails.TrailProgress', 'user_id'),
+    ('knowledge_trails.Certificate', 'user_id'),
+])
 def trilha5_concluida(user):
     """Concluído (True) para quem não é do grupo, ou quem já concluiu a trilha 5."""
     if not getattr(user, 'is_authenticated', False):
@@ -0,0 +1,173 @@
+"""Progresso dos usuários nas trilhas de conhecimento.
+
+O painel de trilhas chamava, para cada trilha ativa, ``get_progress`` (um
+``get_or_create``: escrita num GET) e ``get_completion_percentage`` (uma
+contagem de lições por módulo e mais uma de ``LessonProgress``). Cada lição
+concluída recontava tudo de novo em ``TrailProgress.update_progress``.
+
+Agora:
+
+* o total de lições ativas de cada trilha fica no cache e é esquecido
+  quando a trilha, um módulo ou uma lição é gravado ou apagado (signals);
+* ``TrailProgress.completed_lessons`` é um contador: concluir uma lição soma
+  1 (e os pontos dela) em vez de recontar;
+* o painel lê o progresso de todas as trilhas do usuário numa consulta só.
+  Quem nunca começou uma trilha recebe um ``TrailProgress`` não salvo; a
+  linha só é criada quando a primeira lição é concluída.
+
+``recount`` refaz um progresso a partir das lições (admin, correções).
+"""
+from typing import Dict, Iterable, List, Optional
+
+from django.core.cache import cache
+from django.db import models, transaction
+from django.utils import timezone
+
+from .models import KnowledgeTrail, Lesson, LessonProgress, TrailModule, TrailProgress
+
+TOTALS_KEY = 'knowledge_trails:lesson_totals:{}'
+TOTALS_TIMEOUT = 60 * 60 * 6       # rede de segurança; a invalidação é por signal
+
+
+# ─── Totais por trilha ───────────────────────────────────────────────────────
+
+def lesson_totals(trail_ids: Iterable[int]) -> Dict[int, int]:
+    """Lições ativas (em módulos ativos) de cada trilha, lidas do cache."""
+    trail_ids = list(dict.fromkeys(trail_ids))
+    cached = cache.get_many([TOTALS_KEY.format(pk) for pk in trail_ids])
+    totals = {pk: cached[TOTALS_KEY.format(pk)] for pk in trail_ids if TOTALS_KEY.format(pk) in cached}
+    missing = [pk for pk in trail_ids if pk not in totals]
+    if missing:
+        fresh = dict.fromkeys(missing, 0)
+        fresh.update(
+            Lesson.objects.filter(module__trail_id__in=missing, is_active=True, module__is_active=True)
+            .values_list('module__trail_id').annotate(n=models.Count('id')).order_by()
+        )
+        cache.set_many({TOTALS_KEY.format(pk): n for pk, n in fresh.items()}, TOTALS_TIMEOUT)
+        totals.update(fresh)
+    return totals
+
+
+def forget_totals(trail_id: Optional[int]) -> None:
+    if trail_id:
+        cache.delete(TOTALS_KEY.format(trail_id))
+
+
+def completion_percentage(progress: TrailProgress, total_lessons: int) -> int:
+    if not total_lessons:
+        return 0
+    return min(100, round(progress.completed_lessons / total_lessons * 100))
+
+
+# ─── Leitura ─────────────────────────────────────────────────────────────────
+
+def progress_for(user, trail_ids: Iterable[int]) -> Dict[int, TrailProgress]:
+    """Progresso do usuário em cada trilha, sem gravar nada.
+
+    Trilhas sem linha de progresso recebem um ``TrailProgress`` não salvo
+    (``not_started``, zerado).
+    """
+    trail_ids = list(trail_ids)
+    found = {progress.trail_id: progress
+             for progress in TrailProgress.objects.filter(user=user, trail_id__in=trail_ids)}
+    return {
+        pk: found.get(pk) or TrailProgress(trail_id=pk, user=user, status='not_started')
+        for pk in trail_ids
+    }
+
+
+def dashboard(user, trails: List[KnowledgeTrail]) -> List[dict]:
+    """``{'trail', 'progress', 'completion'}`` por trilha, em duas consultas no máximo."""
+    ids = [trail.pk for trail in trails]
+    totals = lesson_totals(ids)
+    progresses = progress_for(user, ids)
+    return [
+        {
+            'trail': trail,
+            'progress': progresses[trail.pk],
+            'completion': completion_percentage(progresses[trail.pk], totals.get(trail.pk, 0)),
+        }
+        for trail in trails
+    ]
+
+
+# ─── Escrita ─────────────────────────────────────────────────────────────────
+
+def _apply_status(progress: TrailProgress, total_lessons: int) -> None:
+    now = timezone.now()
+    if progress.completed_lessons <= 0:
+        progress.status = 'not_started'
+    elif total_lessons and progress.completed_lessons >= total_lessons:
+        progress.status = 'completed'
+        progress.completed_at = progress.completed_at or now
+        progress.started_at = progress.started_at or now
+    else:
+        progress.status = 'in_progress'
+        progress.started_at = progress.started_at or now
+
+
+def record_completion(lesson_progress: LessonProgress) -> Optional[TrailProgress]:
+    """Marca a lição como concluída e soma 1 no progresso da trilha.
+
+    Idempotente: um segundo envio da mesma conclusão (duplo clique, aba
+    repetida) não conta de novo. Devolve o progresso atualizado, ou ``None``
+    se a lição já estava concluída.
+    """
+    now = timezone.now()
+    lesson = lesson_progress.lesson
+    with transaction.atomic():
+        # A tentativa do quiz (nota, número) vai junto com a conclusão.
+        marked = LessonProgress.objects.filter(pk=lesson_progress.pk, completed=False).update(
+            completed=True, completed_at=now,
+            quiz_score=lesson_progress.quiz_score, quiz_attempts=lesson_progress.quiz_attempts,
+        )
+        lesson_progress.completed = True
+        lesson_progress.completed_at = lesson_progress.completed_at or now
+        if not marked:
+            return None
+
+        trail_id = TrailModule.objects.filter(pk=lesson.module_id).values_list('trail_id', flat=True).first()
+        TrailProgress.objects.get_or_create(trail_id=trail_id, user_id=lesson_progress.user_id)
+        progress = TrailProgress.objects.select_for_update().get(trail_id=trail_id, user_id=lesson_progress.user_id)
+        progress.completed_lessons += 1
+        progress.total_points_earned += lesson.points
+        _apply_status(progress, lesson_totals([trail_id])[trail_id])
+        progress.save()
+    return progress
+
+
+def recount(progress: TrailProgress) -> TrailProgress:
+    """Refaz contador, pontos e status a partir das lições concluídas."""
+    done = LessonProgress.objects.filter(
+        lesson__module__trail_id=progress.trail_id, user_id=progress.user_id, completed=True,
+    ).aggregate(n=models.Count('id'), points=models.Sum('lesson__points'))
+    progress.completed_lessons = done['n'] or 0
+    progress.total_points_earned = done['points'] or 0
+    _apply_status(progress, lesson_totals([progress.trail_id])[progress.trail_id])
+    progress.save()
+    return progress
+
+
+# ─── Invalidação ─────────────────────────────────────────────────────────────
+
+def _on_trail_change(sender, instance, **kwargs):
+    forget_totals(instance.pk)
+
+
+def _on_module_change(sender, instance, **kwargs):
+    forget_totals(instance.trail_id)
+
+
+def _on_lesson_change(sender, instance, **kwargs):
+    forget_totals(
+        TrailModule.objects.filter(pk=instance.module_id).values_list('trail_id', flat=True).first()
+    )
+
+
+def connect_signals() -> None:
+    from django.db.models.signals import post_delete, post_save
+
+    for model, handler in ((KnowledgeTrail, _on_trail_change), (TrailModule, _on_module_change),
+                           (Lesson, _on_lesson_change)):
+        post_save.connect(handler, sender=model, dispatch_uid=f'trail-totals-save-{model.__name__}')
+        post_delete.connect(handler, sender=model, dispatch_uid=f'trail-totals-delete-{model.__name__}')
@@ -0,0 +1,126 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.models import Sector, User
+
+from . import certificates, progress
+from .models import Certificate, KnowledgeTrail, Lesson, LessonProgress, TrailModule, TrailProgress
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'trails-default'},
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'trails-local'},
+})
+class TrailProgressServiceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('aluno', 'aluno@example.com', password='pass123', hierarchy='PADRAO')
+        sector = Sector.objects.create(name='Loja Centro')
+        self.trail = KnowledgeTrail.objects.create(title='Atendimento', description='-', sector=sector)
+        self.outra = KnowledgeTrail.objects.create(title='Vendas', description='-', sector=sector)
+        module = TrailModule.objects.create(trail=self.trail, title='Módulo 1')
+        self.lessons = [Lesson.objects.create(module=module, title=f'Lição {i}', order=i, points=10) for i in range(3)]
+        Lesson.objects.create(module=module, title='Inativa', order=9, is_active=False)
+
+    def _concluir(self, lesson):
+        lesson_progress, _ = LessonProgress.objects.get_or_create(lesson=lesson, user=self.user)
+        lesson_progress.mark_completed()
+        return lesson_progress
+
+    def test_completion_counts_incrementally_and_once(self):
+        self.assertEqual(progress.lesson_totals([self.trail.id, self.outra.id]), {self.trail.id: 3, self.outra.id: 0})
+
+        self._concluir(self.lessons[0])
+        repetida = LessonProgress.objects.get(lesson=self.lessons[0], user=self.user)
+        repetida.completed = False  # instância velha, de uma segunda aba
+        repetida.mark_completed()
+        registro = TrailProgress.objects.get(trail=self.trail, user=self.user)
+        self.assertEqual((registro.completed_lessons, registro.total_points_earned, registro.status),
+                         (1, 10, 'in_progress'))
+
+        # Nova lição: o total em cache é esquecido e a porcentagem acompanha.
+        Lesson.objects.create(module=self.lessons[0].module, title='Lição extra', order=5)
+        self.assertEqual(self.trail.get_completion_percentage(self.user), 25)
+
+        for lesson in Lesson.objects.filter(module__trail=self.trail, is_active=True):
+            self._concluir(lesson)
+        registro.refresh_from_db()
+        self.assertEqual((registro.completed_lessons, registro.status), (4, 'completed'))
+        self.assertIsNotNone(registro.completed_at)
+
+        registro.completed_lessons = 0
+        registro.update_progress()
+        self.assertEqual((registro.completed_lessons, registro.total_points_earned), (4, 40))
+
+    def test_dashboard_reads_without_creating_progress(self):
+        self._concluir(self.lessons[0])
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('knowledge_trails:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        trilhas = [q['sql'] for q in queries.captured_queries if 'knowledge_trails_' in q['sql']]
+        # trilhas, total da trilha ainda fora do cache, progresso, estatísticas, certificados
+        self.assertEqual(len(trilhas), 5, trilhas)
+        self.assertFalse(any(sql.startswith('INSERT') for sql in trilhas))
+        completions = {item['trail'].id: item['completion'] for item in response.context['trail_data']}
+        self.assertEqual(completions, {self.trail.id: 33, self.outra.id: 0})
+        self.assertEqual(response.context['user_stats']['total_lessons_completed'], 1)
+        self.assertFalse(TrailProgress.objects.filter(trail=self.outra).exists())
+
+
+class CertificatePdfTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+        certificates._templates.clear()
+
+        self.user = User.objects.create_user('aluna', 'aluna@example.com', password='pass123', hierarchy='PADRAO',
+                                             first_name='Maria', last_name='Souza')
+        sector = Sector.objects.create(name='Loja Centro')
+        self.trail = KnowledgeTrail.objects.create(title='Atendimento', description='-', sector=sector)
+        self.progress = TrailProgress.objects.create(trail=self.trail, user=self.user, status='completed',
+                                                     total_points_earned=30)
+
+    def test_pdf_is_rendered_at_issue_and_served_from_storage(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            certificate = Certificate.objects.create(trail_progress=self.progress, user=self.user, trail=self.trail)
+        certificate.refresh_from_db()
+        self.assertTrue(certificate.pdf_file.name.endswith(f'certificado_{certificate.certificate_code}.pdf'))
+        with certificate.pdf_file.open('rb') as fh:
+            stored = fh.read()
+        self.assertTrue(stored.startswith(b'%PDF'))
+
+        self.client.force_login(self.user)
+        with mock.patch.object(certificates, 'render_pdf', side_effect=AssertionError('não deveria desenhar')):
+            response = self.client.get(reverse('knowledge_trails:download_certificate', args=[certificate.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, stored)
+
+    def test_template_layer_is_reused_until_the_trail_changes(self):
+        outro = User.objects.create_user('joao', 'joao@example.com', password='pass123', hierarchy='PADRAO')
+        outro_progresso = TrailProgress.objects.create(trail=self.trail, user=outro, status='completed')
+        with mock.patch.object(certificates, '_draw_template', wraps=certificates._draw_template) as draw, \
+                self.captureOnCommitCallbacks(execute=True):
+            Certificate.objects.create(trail_progress=self.progress, user=self.user, trail=self.trail)
+            Certificate.objects.create(trail_progress=outro_progresso, user=outro, trail=self.trail)
+        self.assertEqual(draw.call_count, 1)
+
+        self.trail.title = 'Atendimento Premium'
+        self.trail.save()
+        out = StringIO()
+        call_command('render_certificates', stdout=out)
+        self.assertIn('2 PDF(s) gerado(s), 0 já em dia', out.getvalue())
+        call_command('render_certificates', stdout=out)
+        self.assertIn('0 PDF(s) gerado(s), 2 já em dia', out.getvalue())
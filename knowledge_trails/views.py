@@ -11,6 +11,8 @@ from .models import (
     KnowledgeTrail, TrailModule, Lesson, QuizQuestion, QuizOption, QuizAnswer,
     TrailProgress, LessonProgress, Certificate
 )
+from . import certificates
+from . import progress as progress_service
 from users.models import Sector, User
 import json
 
@@ -53,15 +55,7 @@ def trails_dashboard(request):
     user = request.user
     
     # Buscar todas as trilhas ativas
-    trails = KnowledgeTrail.objects.filter(is_active=True).select_related('sector').prefetch_related(
-        'modules__lessons'
-    ).annotate(
-        total_modules=Count('modules', filter=Q(modules__is_active=True)),
-        total_lessons=Count('modules__lessons', filter=Q(
-            modules__is_active=True,
-            modules__lessons__is_active=True
-        ))
-    )
+    trails = list(KnowledgeTrail.objects.filter(is_active=True).select_related('sector'))
     
     # Determinar setores que o usuário pode gerenciar
     user_sectors = []
@@ -75,43 +69,29 @@ def trails_dashboard(request):
             if user.sector:
                 user_sectors.append(user.sector)
     
-    # Adicionar progresso do usuário
-    trail_data = []
-    for trail in trails:
-        progress = trail.get_progress(user)
-        completion = trail.get_completion_percentage(user)
-        
+    # Progresso do usuário em todas as trilhas de uma vez (não cria linhas)
+    trail_data = progress_service.dashboard(user, trails)
+    for item in trail_data:
         # Determinar se pode gerenciar esta trilha
         can_manage = False
         if user_sectors is None:  # SUPERADMIN
             can_manage = True
-        elif user_sectors and trail.sector in user_sectors:  # SUPERVISOR do setor
+        elif user_sectors and item['trail'].sector in user_sectors:  # SUPERVISOR do setor
             can_manage = True
-        
-        trail_data.append({
-            'trail': trail,
-            'progress': progress,
-            'completion': completion,
-            'can_manage': can_manage
-        })
-    
-    # Estatísticas do usuário
+        item['can_manage'] = can_manage
+    
+    # Estatísticas do usuário (uma agregação sobre os contadores de progresso)
+    totals = TrailProgress.objects.filter(user=user).aggregate(
+        started=Count('id', filter=Q(status__in=['in_progress', 'completed'])),
+        completed=Count('id', filter=Q(status='completed')),
+        points=Sum('total_points_earned'),
+        lessons=Sum('completed_lessons'),
+    )
     user_stats = {
-        'total_trails_started': TrailProgress.objects.filter(
-            user=user,
-            status__in=['in_progress', 'completed']
-        ).count(),
-        'total_trails_completed': TrailProgress.objects.filter(
-            user=user,
-            status='completed'
-        ).count(),
-        'total_points': TrailProgress.objects.filter(user=user).aggregate(
-            total=Sum('total_points_earned')
-        )['total'] or 0,
-        'total_lessons_completed': LessonProgress.objects.filter(
-            user=user,
-            completed=True
-        ).count(),
+        'total_trails_started': totals['started'],
+        'total_trails_completed': totals['completed'],
+        'total_points': totals['points'] or 0,
+        'total_lessons_completed': totals['lessons'] or 0,
     }
     
     # Certificados do usuário
@@ -147,8 +127,8 @@ def trail_detail(request, trail_id):
     )
     
     user = request.user
-    progress = trail.get_progress(user)
-    completion = trail.get_completion_percentage(user)
+    progress = progress_service.progress_for(user, [trail.id])[trail.id]
+    completion = progress_service.completion_percentage(progress, progress_service.lesson_totals([trail.id])[trail.id])
     
     # Verificar permissão de gerenciamento
     can_manage = False
@@ -403,7 +383,7 @@ def leaderboard(request, trail_id):
     ).select_related('user').order_by('-total_points_earned', 'completed_at')[:50]
     
     # Posição do usuário atual
-    user_progress = trail.get_progress(request.user)
+    user_progress = progress_service.progress_for(request.user, [trail.id])[trail.id]
     user_rank = TrailProgress.objects.filter(
         trail=trail,
         total_points_earned__gt=user_progress.total_points_earned
@@ -441,15 +421,9 @@ def certificate_view(request, certificate_id):
 
 @login_required
 def download_certificate_pdf(request, certificate_id):
-    """Download do certificado em PDF"""
-    from reportlab.lib.pagesizes import A4, landscape
-    from reportlab.lib.units import cm
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.utils import ImageReader
-    from io import BytesIO
-    
+    """Download do certificado em PDF (gerado na emissão, ver certificates.py)"""
     certificate = get_object_or_404(
-        Certificate.objects.select_related('user', 'trail'),
+        Certificate.objects.select_related('user', 'trail', 'trail_progress'),
         id=certificate_id
     )
     
@@ -458,75 +432,7 @@ def download_certificate_pdf(request, certificate_id):
         messages.error(request, 'Você não tem permissão para baixar este certificado.')
         return redirect('knowledge_trails:dashboard')
     
-    # Criar PDF
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=landscape(A4))
-    width, height = landscape(A4)
-    
-    # Fundo
-    p.setFillColorRGB(0.95, 0.95, 0.98)
-    p.rect(0, 0, width, height, fill=1)
-    
-    # Borda decorativa
-    p.setStrokeColorRGB(0.2, 0.3, 0.6)
-    p.setLineWidth(3)
-    p.rect(1*cm, 1*cm, width-2*cm, height-2*cm)
-    
-    p.setLineWidth(1)
-    p.rect(1.5*cm, 1.5*cm, width-3*cm, height-3*cm)
-    
-    # Logo (se existir)
-    if certificate.trail.certificate_logo:
-        try:
-            logo = ImageReader(certificate.trail.certificate_logo.path)
-            p.drawImage(logo, width/2 - 3*cm, height - 6*cm, width=6*cm, height=3*cm, mask='auto')
-        except:
-            pass
-    
-    # Título
-    p.setFillColorRGB(0.2, 0.3, 0.6)
-    p.setFont("Helvetica-Bold", 36)
-    p.drawCentredString(width/2, height - 8*cm, "CERTIFICADO")
-    
-    p.setFont("Helvetica", 16)
-    p.drawCentredString(width/2, height - 9.5*cm, "DE CONCLUSÃO")
-    
-    # Texto principal
-    p.setFillColorRGB(0, 0, 0)
-    p.setFont("Helvetica", 14)
-    p.drawCentredString(width/2, height - 11.5*cm, "Certificamos que")
-    
-    p.setFont("Helvetica-Bold", 24)
-    p.setFillColorRGB(0.2, 0.3, 0.6)
-    p.drawCentredString(width/2, height - 13.5*cm, certificate.user.get_full_name())
-    
-    p.setFillColorRGB(0, 0, 0)
-    p.setFont("Helvetica", 14)
-    p.drawCentredString(width/2, height - 15*cm, "concluiu com êxito a trilha de conhecimento")
-    
-    p.setFont("Helvetica-Bold", 18)
-    p.setFillColorRGB(0.2, 0.3, 0.6)
-    p.drawCentredString(width/2, height - 16.5*cm, certificate.trail.title)
-    
-    # Informações adicionais
-    p.setFillColorRGB(0, 0, 0)
-    p.setFont("Helvetica", 12)
-    p.drawCentredString(width/2, height - 18*cm, 
-                       f"Carga horária: {certificate.trail.estimated_hours}h | "
-                       f"Pontuação: {certificate.trail_progress.total_points_earned} pontos")
-    
-    # Data e código
-    p.setFont("Helvetica", 10)
-    p.drawCentredString(width/2, 3*cm, 
-                       f"Emitido em: {certificate.issued_at.strftime('%d de %B de %Y')}")
-    p.drawCentredString(width/2, 2.5*cm, 
-                       f"Código de Verificação: {certificate.certificate_code}")
-    
-    p.showPage()
-    p.save()
-    
-    buffer.seek(0)
-    response = HttpResponse(buffer.read(), content_type='application/pdf')
+    response = HttpResponse(certificates.pdf_bytes(certificate), content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="certificado_{certificate.certificate_code}.pdf"'
     
     return response
@@ -156,6 +156,8 @@ class PushNotification(models.Model):
         
         # Bulk create para performance
         UserNotification.objects.bulk_create(notification_records)
+        from core.polling import bump_many
+        bump_many('notifications', [u.pk for u in target_users])
         
         # Enviar push notifications usando o serviço
         try:
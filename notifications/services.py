@@ -13,6 +13,7 @@ from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from core.polling import bump_many
 
 if TYPE_CHECKING:
     from users.models import User as UserType
@@ -392,6 +393,7 @@ class NotificationService:
             ]
             
             UserNotification.objects.bulk_create(user_notifications, ignore_conflicts=True)
+            bump_many('notifications', [user.pk for user in recipients])
             
             logger.info(f"In-app notification created for {len(recipients)} users")
             
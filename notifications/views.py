@@ -10,6 +10,7 @@ from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from .models import PushNotification, NotificationCategory, UserNotification, DeviceToken
 from users.models import Sector, User
+from core.polling import bump
 import json
 import logging
 
@@ -103,6 +104,7 @@ def api_mark_all_as_read(request):
                 is_read=True,
                 read_at=timezone.now()
             )
+            bump('notifications', request.user.pk)
             
             return JsonResponse({
                 'success': True,
@@ -328,6 +330,7 @@ def mark_all_notifications_read(request):
             is_read=True,
             read_at=timezone.now()
         )
+        bump('notifications', request.user.pk)
         
         count = unread_notifications.count()
         
@@ -5,3 +5,7 @@ class PortalPopupsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'portal_popups'
     verbose_name = 'Popups do Portal'
+
+    def ready(self):
+        from .eligibility import connect_signals
+        connect_signals()
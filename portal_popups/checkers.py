@@ -12,15 +12,24 @@ tela de gestão de popups ofereça a opção sem precisar mexer neste arquivo.
 _CHECKERS = {}
 
 
-def register_popup_checker(key, label):
+def register_popup_checker(key, label, watch=()):
     """Registra uma função de verificação sob uma chave estável.
 
+    O resultado fica memorizado por usuário (ver eligibility.checker_results).
+    ``watch`` lista os modelos cuja gravação muda a resposta, como pares
+    ``(rótulo do modelo, campo do usuário)``; campo None vale para todos.
+
     Uso:
-        @register_popup_checker('climate_survey', 'Pesquisa de Clima respondida')
+        @register_popup_checker('climate_survey', 'Pesquisa de Clima respondida',
+                                watch=[('feedback.ClimateSurveyParticipation', 'user_id')])
         def _climate(user): ...
     """
     def decorator(func):
         _CHECKERS[key] = {'label': label, 'func': func}
+        if watch:
+            from .eligibility import watch_model
+            for model_label, user_field in watch:
+                watch_model(key, model_label, user_field)
         return func
     return decorator
 
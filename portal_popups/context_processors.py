@@ -30,25 +30,14 @@ def portal_popup_gate(request):
     is_home = bool(resolver) and resolver.url_name == 'home' and not resolver.namespace
 
     try:
-        from .models import PortalPopup
-
-        # Sem prefetch: quando o popup é target_all (caso do clima), applies_to
-        # retorna sem tocar nas relações — prefetch aqui só adicionaria queries
-        # desperdiçadas em toda página autenticada (DB remoto).
-        candidates = PortalPopup.objects.filter(is_active=True).order_by('order', 'id')
+        from .eligibility import pending_popups
 
         def on_action_page(popup):
             return bool(popup.action_url) and path.startswith(popup.action_url)
 
-        pending = []
-        for popup in candidates:
-            if not popup.is_within_window():
-                continue
-            if not popup.applies_to(user):
-                continue
-            if popup.is_completed_by(user):
-                continue
-            pending.append(popup)
+        # Público, conclusões e checkers vêm pré-calculados do cache
+        # (ver eligibility.py): nenhuma consulta por popup em cada página.
+        pending = pending_popups(user)
 
         if not pending:
             return empty
@@ -0,0 +1,320 @@
+"""Elegibilidade dos popups pré-calculada, para o gate que roda em toda página.
+
+O gate original fazia, por popup ativo e por página, uma consulta de
+``target_users``, uma de ``target_sectors``, outra dos setores do usuário e
+mais uma de ``PopupCompletion`` (ou o checker externo inteiro). Aqui:
+
+- o **catálogo** (popups ativos + público de cada um compilado num conjunto
+  de ids de usuário) fica na memória do processo (``caches['local']``), sob
+  uma versão guardada no Redis; a versão só muda quando um popup, suas
+  relações M2M ou a hierarquia/setor de alguém mudam;
+- as **conclusões** (ACK/LINK) de cada usuário ficam num conjunto por usuário,
+  esquecido quando ele conclui um popup;
+- o resultado dos **checkers** externos é memorizado por usuário durante
+  ``PORTAL_POPUP_CHECKER_TTL`` segundos e esquecido antes disso quando um
+  dos modelos que o checker declarou em ``watch`` é gravado.
+
+Cada operação no Redis custa uma ida e volta ao servidor remoto: o gate faz
+uma leitura (versão do catálogo + conclusões do usuário) e, só se houver popup
+com checker externo aplicável, mais uma (gerações + resultados memorizados).
+"""
+import logging
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils import timezone
+
+from .checkers import run_checker
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = 'popups:catalog:version'
+CATALOG_TIMEOUT = 60 * 10          # rede de segurança; a invalidação é pela versão
+COMPLETED_TIMEOUT = 60 * 60 * 24
+CHECKER_TTL_DEFAULT = 60 * 5
+
+# (popup, público) — público None = todos os usuários (target_all).
+CatalogEntry = Tuple[object, Optional[FrozenSet[int]]]
+
+
+def _checker_ttl() -> int:
+    return getattr(settings, 'PORTAL_POPUP_CHECKER_TTL', CHECKER_TTL_DEFAULT)
+
+
+# --------------------------------------------------------------------------- #
+# Catálogo
+# --------------------------------------------------------------------------- #
+def compile_catalog() -> List[CatalogEntry]:
+    """Popups ativos com o público compilado, em número fixo de consultas."""
+    from django.contrib.auth import get_user_model
+
+    from .models import PortalPopup
+
+    User = get_user_model()
+    popups = list(PortalPopup.objects.filter(is_active=True).order_by('order', 'id'))
+    scoped = [p for p in popups if not p.target_all]
+    if not scoped:
+        return [(popup, None) for popup in popups]
+
+    ids = [p.pk for p in scoped]
+    users_by_popup: Dict[int, set] = {pk: set() for pk in ids}
+    for popup_id, user_id in PortalPopup.target_users.through.objects.filter(
+        portalpopup_id__in=ids
+    ).values_list('portalpopup_id', 'user_id'):
+        users_by_popup[popup_id].add(user_id)
+
+    sectors_by_popup: Dict[int, set] = {pk: set() for pk in ids}
+    for popup_id, sector_id in PortalPopup.target_sectors.through.objects.filter(
+        portalpopup_id__in=ids
+    ).values_list('portalpopup_id', 'sector_id'):
+        sectors_by_popup[popup_id].add(sector_id)
+
+    # Setor principal ou qualquer setor do usuário (mesma regra de applies_to).
+    all_sectors = set().union(*sectors_by_popup.values())
+    users_by_sector: Dict[int, set] = {}
+    if all_sectors:
+        for sector_id, user_id in User.objects.filter(
+            sector_id__in=all_sectors
+        ).values_list('sector_id', 'id'):
+            users_by_sector.setdefault(sector_id, set()).add(user_id)
+        for sector_id, user_id in User.sectors.through.objects.filter(
+            sector_id__in=all_sectors
+        ).values_list('sector_id', 'user_id'):
+            users_by_sector.setdefault(sector_id, set()).add(user_id)
+
+    all_hierarchies = {h for p in scoped for h in (p.target_hierarchies or [])}
+    users_by_hierarchy: Dict[str, set] = {}
+    if all_hierarchies:
+        for hierarchy, user_id in User.objects.filter(
+            hierarchy__in=all_hierarchies
+        ).values_list('hierarchy', 'id'):
+            users_by_hierarchy.setdefault(hierarchy, set()).add(user_id)
+
+    catalog: List[CatalogEntry] = []
+    for popup in popups:
+        if popup.target_all:
+            catalog.append((popup, None))
+            continue
+        audience = set(users_by_popup[popup.pk])
+        for hierarchy in popup.target_hierarchies or []:
+            audience |= users_by_hierarchy.get(hierarchy, set())
+        for sector_id in sectors_by_popup[popup.pk]:
+            audience |= users_by_sector.get(sector_id, set())
+        catalog.append((popup, frozenset(audience)))
+    return catalog
+
+
+def _catalog_key(version) -> str:
+    return f'popups:catalog:{version}'
+
+
+def get_catalog(version=None) -> List[CatalogEntry]:
+    """Catálogo da ``version`` (lida do Redis se não informada), compilado uma vez por processo."""
+    if version is None:
+        version = cache.get(CATALOG_VERSION_KEY, 0)
+    local = caches['local']
+    catalog = local.get(_catalog_key(version))
+    if catalog is None:
+        catalog = compile_catalog()
+        local.set(_catalog_key(version), catalog, CATALOG_TIMEOUT)
+    return catalog
+
+
+def invalidate_catalog() -> None:
+    """Troca a versão do catálogo: todos os processos recompilam no próximo acesso."""
+    def _bump():
+        cache.add(CATALOG_VERSION_KEY, 0, None)
+        try:
+            cache.incr(CATALOG_VERSION_KEY)
+        except ValueError:
+            cache.set(CATALOG_VERSION_KEY, 1, None)
+    transaction.on_commit(_bump)
+
+
+# --------------------------------------------------------------------------- #
+# Conclusões (ACK/LINK)
+# --------------------------------------------------------------------------- #
+def _completed_key(user_id) -> str:
+    return f'popups:done:{user_id}'
+
+
+def completed_popup_ids(user_id, cached=None) -> FrozenSet[int]:
+    """Popups concluídos; ``cached`` é o valor já lido do cache (``None`` = ler)."""
+    key = _completed_key(user_id)
+    done = cache.get(key) if cached is None else cached
+    if done is None:
+        from .models import PopupCompletion
+        done = frozenset(PopupCompletion.objects.filter(user_id=user_id).values_list('popup_id', flat=True))
+        cache.set(key, done, COMPLETED_TIMEOUT)
+    return done
+
+
+def invalidate_completed(user_id) -> None:
+    key = _completed_key(user_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+# --------------------------------------------------------------------------- #
+# Checkers externos
+# --------------------------------------------------------------------------- #
+def _generation_key(check_key) -> str:
+    return f'popups:chk:{check_key}:gen'
+
+
+def _result_key(check_key, user_id) -> str:
+    return f'popups:chk:{check_key}:{user_id}'
+
+
+def checker_results(check_keys: Iterable[str], user) -> Dict[str, bool]:
+    """Resultado dos checkers para o usuário, memorizado por ``PORTAL_POPUP_CHECKER_TTL``.
+
+    Cada chave tem uma geração; trocar a geração (``forget_checker`` sem
+    usuário) descarta de uma vez o resultado memorizado de todo mundo. O
+    resultado é guardado junto com a geração em que foi calculado, para que
+    gerações e resultados venham numa única leitura.
+    """
+    check_keys = sorted(set(check_keys))
+    if not check_keys:
+        return {}
+    keys = [_generation_key(k) for k in check_keys] + [_result_key(k, user.pk) for k in check_keys]
+    found = cache.get_many(keys)
+
+    results: Dict[str, bool] = {}
+    fresh = {}
+    for check_key in check_keys:
+        generation = found.get(_generation_key(check_key), 0)
+        memo = found.get(_result_key(check_key, user.pk))
+        if memo is not None and memo[0] == generation:
+            results[check_key] = memo[1]
+        else:
+            results[check_key] = run_checker(check_key, user)
+            fresh[_result_key(check_key, user.pk)] = (generation, results[check_key])
+    if fresh:
+        cache.set_many(fresh, _checker_ttl())
+    return results
+
+
+def forget_checker(check_key: str, user_id=None) -> None:
+    """Esquece o resultado memorizado do checker (de um usuário ou de todos)."""
+    def _forget():
+        if user_id is None:
+            generation_key = _generation_key(check_key)
+            cache.add(generation_key, 0, None)
+            try:
+                cache.incr(generation_key)
+            except ValueError:
+                cache.set(generation_key, 1, None)
+        else:
+            cache.delete(_result_key(check_key, user_id))
+    transaction.on_commit(_forget)
+
+
+def watch_model(check_key: str, model_label: str, user_field: Optional[str]) -> None:
+    """Liga o ``forget_checker`` às gravações de um modelo.
+
+    Com ``user_field`` esquece só o usuário da linha gravada; sem ele (modelos
+    que afetam todo mundo, como um comunicado novo), esquece todos.
+    """
+    from django.db.models.signals import post_delete, post_save
+
+    def handler(sender, instance, **kwargs):
+        forget_checker(check_key, getattr(instance, user_field) if user_field else None)
+
+    _WATCHERS.append(handler)  # o connect guarda só referência fraca
+    for signal in (post_save, post_delete):
+        signal.connect(handler, sender=model_label,
+                       dispatch_uid=f'popup_checker_{check_key}_{model_label}_{id(signal)}')
+
+
+_WATCHERS = []
+
+
+# --------------------------------------------------------------------------- #
+# Gate
+# --------------------------------------------------------------------------- #
+def pending_popups(user, now=None) -> list:
+    """Popups ativos, na janela, que se aplicam ao usuário e que ele não concluiu."""
+    now = now or timezone.now()
+    # Uma ida ao Redis para a versão do catálogo e as conclusões do usuário.
+    shared = cache.get_many([CATALOG_VERSION_KEY, _completed_key(user.pk)])
+    applicable = [
+        popup for popup, audience in get_catalog(shared.get(CATALOG_VERSION_KEY, 0))
+        if popup.is_within_window(now) and (audience is None or user.pk in audience)
+    ]
+    if not applicable:
+        return []
+
+    external = [p for p in applicable if p.completion_mode == p.MODE_EXTERNAL]
+    checks = checker_results([p.external_check_key for p in external if p.external_check_key], user)
+    done = (
+        completed_popup_ids(user.pk, shared.get(_completed_key(user.pk)))
+        if len(external) < len(applicable) else frozenset()
+    )
+
+    pending = []
+    for popup in applicable:
+        if popup.completion_mode == popup.MODE_EXTERNAL:
+            # Sem chave configurada o popup nunca se conclui (regra de is_completed_by).
+            if popup.external_check_key and checks.get(popup.external_check_key):
+                continue
+        elif popup.pk in done:
+            continue
+        pending.append(popup)
+    return pending
+
+
+# --------------------------------------------------------------------------- #
+# Invalidação
+# --------------------------------------------------------------------------- #
+# Campos do usuário que entram no público dos popups (M2M ``sectors`` à parte).
+_AUDIENCE_USER_FIELDS = ('sector_id', 'hierarchy')
+
+
+def _on_popup_change(sender, **kwargs):
+    invalidate_catalog()
+
+
+def _remember_audience_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Guarda setor/hierarquia de antes; login, saldo etc. não mexem no catálogo."""
+    instance._popup_audience_previous = None
+    if raw or not instance.pk:
+        return
+    if update_fields is not None and not {'sector', 'sector_id', 'hierarchy'} & set(update_fields):
+        return
+    instance._popup_audience_previous = (
+        sender.objects.filter(pk=instance.pk).values_list(*_AUDIENCE_USER_FIELDS).first()
+    )
+
+
+def _on_user_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_popup_audience_previous', None)
+    current = tuple(getattr(instance, field) for field in _AUDIENCE_USER_FIELDS)
+    if created or (previous is not None and previous != current):
+        invalidate_catalog()
+
+
+def _on_completion_change(sender, instance, **kwargs):
+    invalidate_completed(instance.user_id)
+
+
+def connect_signals() -> None:
+    from django.contrib.auth import get_user_model
+    from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+
+    from .models import PopupCompletion, PortalPopup
+
+    User = get_user_model()
+    for signal in (post_save, post_delete):
+        signal.connect(_on_popup_change, sender=PortalPopup, dispatch_uid=f'popup_catalog_{id(signal)}')
+        signal.connect(_on_completion_change, sender=PopupCompletion,
+                       dispatch_uid=f'popup_completion_{id(signal)}')
+    for through in (PortalPopup.target_users.through, PortalPopup.target_sectors.through,
+                    User.sectors.through):
+        m2m_changed.connect(_on_popup_change, sender=through, dispatch_uid=f'popup_catalog_m2m_{through._meta.label}')
+    pre_save.connect(_remember_audience_fields, sender=User, dispatch_uid='popup_catalog_user_pre')
+    post_save.connect(_on_user_saved, sender=User, dispatch_uid='popup_catalog_user')
+    post_delete.connect(_on_popup_change, sender=User, dispatch_uid='popup_catalog_user_delete')
@@ -0,0 +1,83 @@
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+
+from users.models import Sector, User
+
+from .checkers import _CHECKERS, register_popup_checker
+from .eligibility import CATALOG_VERSION_KEY, pending_popups
+from .models import PortalPopup
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'popups-default'},
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'popups-local'},
+})
+class PopupEligibilityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['local'].clear()
+        self.sector = Sector.objects.create(name='Loja Centro')
+        self.user = User.objects.create_user(
+            username='colab', email='colab@example.com', password='pass123', hierarchy='PADRAO',
+        )
+        self.other = User.objects.create_user(
+            username='outro', email='outro@example.com', password='pass123', hierarchy='PADRAO',
+        )
+
+    def test_audience_and_completion_follow_writes(self):
+        popup = PortalPopup.objects.create(title='Aviso', message='Leia')
+        with self.captureOnCommitCallbacks(execute=True):
+            popup.target_sectors.add(self.sector)
+        self.assertEqual(pending_popups(self.user), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.sectors.add(self.sector)
+        self.assertEqual([p.pk for p in pending_popups(self.user)], [popup.pk])
+        self.assertEqual(pending_popups(self.other), [])
+
+        # Catálogo e conclusões em cache: a checagem seguinte não vai ao banco.
+        with self.assertNumQueries(0):
+            pending_popups(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            popup.mark_completed(self.user)
+        self.assertEqual(pending_popups(self.user), [])
+
+    def test_external_checker_is_memoized_until_a_watched_model_changes(self):
+        calls = []
+
+        @register_popup_checker('teste_setor', 'Teste', watch=[('users.Sector', None)])
+        def _checker(user):
+            calls.append(user.pk)
+            return Sector.objects.filter(name='Liberado').exists()
+
+        self.addCleanup(_CHECKERS.pop, 'teste_setor')
+        PortalPopup.objects.create(
+            title='Tarefa', message='Cumpra', target_all=True,
+            completion_mode=PortalPopup.MODE_EXTERNAL, external_check_key='teste_setor',
+        )
+
+        self.assertEqual(len(pending_popups(self.user)), 1)
+        self.assertEqual(len(pending_popups(self.user)), 1)
+        self.assertEqual(len(calls), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Sector.objects.create(name='Liberado')
+        self.assertEqual(pending_popups(self.user), [])
+        self.assertEqual(len(calls), 2)
+
+    def test_only_audience_fields_of_a_user_change_the_catalog(self):
+        PortalPopup.objects.create(title='Gerentes', message='Leia', target_hierarchies=['SUPERVISOR'])
+        self.assertEqual(pending_popups(self.user), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Ana'
+            self.user.save()
+            self.user.save(update_fields=['last_login'])
+        self.assertIsNone(cache.get(CATALOG_VERSION_KEY))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.hierarchy = 'SUPERVISOR'
+            self.user.save()
+        self.assertEqual(cache.get(CATALOG_VERSION_KEY), 1)
+        self.assertEqual(len(pending_popups(self.user)), 1)
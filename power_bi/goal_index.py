@@ -0,0 +1,156 @@
+"""Índice das metas de cada carga (GoalUpload).
+
+A tela de metas carregava todas as linhas da carga em Python até quatro vezes
+(filtro de CN, de gerente, de loja e de pilar), normalizava nome/loja/pilar
+linha a linha e voltava ao banco com ``id__in=[...]``; o simulador montava
+outra cópia para achar as metas de cada pessoa. Agora:
+
+* cada ``GoalEntry`` grava ``user_key``, ``store_key`` e ``pilar_key`` já
+  normalizados (na importação, em ``build_entries``, e em ``save``), com
+  índices compostos por carga — os filtros viram igualdade no SQL;
+* a comparação aproximada de lojas (``stores_match``) roda contra as poucas
+  lojas distintas da carga, não contra as linhas;
+* ``goal_maps`` soma as metas por pessoa, loja e coordenação com um
+  ``GROUP BY`` e guarda o resultado em memória por versão da carga
+  (``id`` + ``updated_at``): reimportar muda a versão.
+"""
+import threading
+import unicodedata
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Dict, Iterable, List
+
+from django.db.models import Sum
+
+MAX_VERSIONS = 4
+_maps: 'OrderedDict[str, dict]' = OrderedDict()
+_lock = threading.Lock()
+
+
+# ─── Normalização ────────────────────────────────────────────────────────────
+
+def normalize_text(value):
+    if value is None:
+        return ''
+    text = str(value).strip()
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.upper().split())
+
+
+def normalize_store_key(value):
+    normalized = normalize_text(value)
+    for prefix in ('LOJA ', 'PDV ', 'FILIAL '):
+        if normalized.startswith(prefix):
+            normalized = normalized[len(prefix):].strip()
+    return normalized
+
+
+def stores_match(store_a, store_b):
+    a = normalize_store_key(store_a)
+    b = normalize_store_key(store_b)
+    if not a or not b:
+        return False
+    if a == b:
+        return True
+    if a in b or b in a:
+        return True
+    a_words = set(a.split())
+    b_words = set(b.split())
+    common = a_words & b_words
+    return len(common) >= 2 or (len(common) == 1 and min(len(a_words), len(b_words)) == 1)
+
+
+def index_keys(user_name, store_name, pilar) -> Dict[str, str]:
+    """Colunas de índice de uma linha de meta."""
+    return {
+        'user_key': normalize_text(user_name),
+        'store_key': normalize_text(store_name),
+        'pilar_key': normalize_text(pilar),
+    }
+
+
+def build_entries(upload, parsed_entries: Iterable[dict]) -> List:
+    """``GoalEntry`` prontos para ``bulk_create``, já com as chaves preenchidas."""
+    from .models import GoalEntry
+
+    return [
+        GoalEntry(upload=upload, **entry,
+                  **index_keys(entry.get('user_name'), entry.get('store_name'), entry.get('pilar')))
+        for entry in parsed_entries
+    ]
+
+
+# ─── Consultas ───────────────────────────────────────────────────────────────
+
+def store_keys(upload, sheet_type=None) -> List[str]:
+    """Lojas distintas (normalizadas) da carga."""
+    from .models import GoalEntry
+
+    entries = GoalEntry.objects.filter(upload=upload).exclude(store_key='')
+    if sheet_type:
+        entries = entries.filter(sheet_type=sheet_type)
+    return list(entries.order_by().values_list('store_key', flat=True).distinct())
+
+
+def matching_store_keys(upload, store, sheet_type=None) -> List[str]:
+    """Lojas da carga que ``stores_match`` aproxima de ``store``."""
+    if not store:
+        return []
+    return [key for key in store_keys(upload, sheet_type) if stores_match(key, store)]
+
+
+def version(upload) -> str:
+    return f'{upload.id}:{upload.updated_at.timestamp()}'
+
+
+def _build_maps(upload) -> dict:
+    from .models import GoalEntry
+
+    cn: Dict[str, Dict[str, Decimal]] = {}
+    pdv: Dict[str, Dict[str, Decimal]] = {}
+    totals = (
+        GoalEntry.objects.filter(upload=upload, goal_value__isnull=False)
+        .values_list('sheet_type', 'user_key', 'store_key', 'pilar_key')
+        .annotate(total=Sum('goal_value')).order_by()
+    )
+    for sheet_type, user_key, store_key, pilar_key, total in totals:
+        if sheet_type == GoalEntry.SHEET_CN_REAL:
+            bucket = cn.setdefault(user_key, {})
+        elif sheet_type == GoalEntry.SHEET_PDV_REAL:
+            bucket = pdv.setdefault(store_key, {})
+        else:
+            continue
+        bucket[pilar_key] = bucket.get(pilar_key, Decimal('0')) + total
+
+    # A coordenação só existe no row_data de cada linha da META PDV REAL: uma
+    # leitura por carga, não por coordenador consultado. Soma linha a linha,
+    # como a busca antiga — a mesma loja pode vir com coordenações diferentes
+    # (ou sem nome de loja) e não herda a coordenação da primeira linha.
+    coord: Dict[str, Dict[str, Decimal]] = {}
+    pdv_rows = GoalEntry.objects.filter(
+        upload=upload, sheet_type=GoalEntry.SHEET_PDV_REAL, goal_value__isnull=False,
+    )
+    for row_data, pilar_key, value in pdv_rows.values_list('row_data', 'pilar_key', 'goal_value').order_by():
+        bucket = coord.setdefault(normalize_text((row_data or {}).get('COORDENAÇÃO')), {})
+        bucket[pilar_key] = bucket.get(pilar_key, Decimal('0')) + value
+    return {'cn': cn, 'pdv': pdv, 'coord': coord}
+
+
+def goal_maps(upload) -> dict:
+    """``{'cn': {user_key: {pilar_key: meta}}, 'pdv': {store_key: …}, 'coord': {coord_key: …}}``.
+
+    Montado uma vez por versão da carga e mantido em memória no processo.
+    """
+    key = version(upload)
+    with _lock:
+        cached = _maps.get(key)
+        if cached is not None:
+            _maps.move_to_end(key)
+            return cached
+    maps = _build_maps(upload)
+    with _lock:
+        _maps[key] = maps
+        while len(_maps) > MAX_VERSIONS:
+            _maps.popitem(last=False)
+    return maps
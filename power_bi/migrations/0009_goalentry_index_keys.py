@@ -0,0 +1,65 @@
+import unicodedata
+
+from django.db import migrations, models
+
+
+def _normalizar(value):
+    if value is None:
+        return ''
+    text = unicodedata.normalize('NFKD', str(value).strip())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.upper().split())
+
+
+def preencher_chaves(apps, schema_editor):
+    """Grava as chaves normalizadas das cargas já importadas."""
+    GoalEntry = apps.get_model('power_bi', 'GoalEntry')
+    batch = []
+    for entry in GoalEntry.objects.only('user_name', 'store_name', 'pilar').iterator(chunk_size=2000):
+        entry.user_key = _normalizar(entry.user_name)
+        entry.store_key = _normalizar(entry.store_name)
+        entry.pilar_key = _normalizar(entry.pilar)
+        batch.append(entry)
+        if len(batch) >= 2000:
+            GoalEntry.objects.bulk_update(batch, ['user_key', 'store_key', 'pilar_key'])
+            batch = []
+    if batch:
+        GoalEntry.objects.bulk_update(batch, ['user_key', 'store_key', 'pilar_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('power_bi', '0008_powerbireport_predominant_color'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='goalentry',
+            name='pilar_key',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Chave do pilar'),
+        ),
+        migrations.AddField(
+            model_name='goalentry',
+            name='store_key',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Chave da loja'),
+        ),
+        migrations.AddField(
+            model_name='goalentry',
+            name='user_key',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Chave do usuario'),
+        ),
+        migrations.RunPython(preencher_chaves, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='goalentry',
+            index=models.Index(fields=['upload', 'sheet_type', 'user_key'], name='goal_entry_user_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goalentry',
+            index=models.Index(fields=['upload', 'sheet_type', 'store_key'], name='goal_entry_store_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goalentry',
+            index=models.Index(fields=['upload', 'pilar_key'], name='goal_entry_pilar_key_idx'),
+        ),
+    ]
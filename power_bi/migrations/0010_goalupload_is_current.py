@@ -0,0 +1,36 @@
+import django.db.models.manager
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('power_bi', '0009_goalentry_index_keys'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='goalupload',
+            options={'base_manager_name': 'all_objects', 'ordering': ['-year', '-month', '-updated_at'], 'verbose_name': 'Carga de Metas', 'verbose_name_plural': 'Cargas de Metas'},
+        ),
+        migrations.AlterModelManagers(
+            name='goalupload',
+            managers=[
+                ('objects', django.db.models.manager.Manager()),
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.RemoveConstraint(
+            model_name='goalupload',
+            name='unique_goal_upload_by_month_year',
+        ),
+        migrations.AddField(
+            model_name='goalupload',
+            name='is_current',
+            field=models.BooleanField(default=True, verbose_name='Carga atual'),
+        ),
+        migrations.AddConstraint(
+            model_name='goalupload',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_current', True)), fields=('year', 'month'), name='unique_goal_upload_by_month_year'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from users.models import get_media_storage
 
 from communications.models import CommunicationGroup
@@ -98,6 +99,13 @@ class PowerBIReport(models.Model):
         return False
 
 
+class CurrentGoalUploadManager(models.Manager):
+    """Só as cargas publicadas: uma importação em andamento fica invisível."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_current=True)
+
+
 class GoalUpload(models.Model):
     year = models.PositiveSmallIntegerField(verbose_name='Ano')
     month = models.PositiveSmallIntegerField(verbose_name='Mes')
@@ -111,15 +119,26 @@ class GoalUpload(models.Model):
         related_name='goal_uploads',
         verbose_name='Enviado por'
     )
+    # Importacao nova entra com False e so vira a carga do mes na troca final
+    # (ver _publish_goal_upload em views.py).
+    is_current = models.BooleanField(default=True, verbose_name='Carga atual')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CurrentGoalUploadManager()
+    all_objects = models.Manager()
+
     class Meta:
         verbose_name = 'Carga de Metas'
         verbose_name_plural = 'Cargas de Metas'
         ordering = ['-year', '-month', '-updated_at']
+        base_manager_name = 'all_objects'
         constraints = [
-            models.UniqueConstraint(fields=['year', 'month'], name='unique_goal_upload_by_month_year')
+            models.UniqueConstraint(
+                fields=['year', 'month'],
+                condition=models.Q(is_current=True),
+                name='unique_goal_upload_by_month_year',
+            )
         ]
 
     def __str__(self):
@@ -147,6 +166,10 @@ class GoalEntry(models.Model):
     goal_value = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, verbose_name='Meta')
     row_number = models.PositiveIntegerField(default=0, verbose_name='Linha na planilha')
     row_data = models.JSONField(default=dict, blank=True, verbose_name='Dados da linha')
+    # Nome, loja e pilar normalizados (ver goal_index.py), para filtrar por igualdade.
+    user_key = models.CharField(max_length=255, blank=True, default='', verbose_name='Chave do usuario')
+    store_key = models.CharField(max_length=255, blank=True, default='', verbose_name='Chave da loja')
+    pilar_key = models.CharField(max_length=255, blank=True, default='', verbose_name='Chave do pilar')
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -158,11 +181,34 @@ class GoalEntry(models.Model):
             models.Index(fields=['user_name']),
             models.Index(fields=['store_name']),
             models.Index(fields=['pilar']),
+            models.Index(fields=['upload', 'sheet_type', 'user_key'], name='goal_entry_user_key_idx'),
+            models.Index(fields=['upload', 'sheet_type', 'store_key'], name='goal_entry_store_key_idx'),
+            models.Index(fields=['upload', 'pilar_key'], name='goal_entry_pilar_key_idx'),
         ]
 
     def __str__(self):
         return f'{self.upload} - {self.sheet_type} - {self.user_name or self.store_name or "sem identificacao"}'
 
+    def save(self, *args, **kwargs):
+        from .goal_index import index_keys
+
+        for field, value in index_keys(self.user_name, self.store_name, self.pilar).items():
+            setattr(self, field, value)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'user_key', 'store_key', 'pilar_key'}
+        super().save(*args, **kwargs)
+        self._touch_upload()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._touch_upload()
+        return result
+
+    def _touch_upload(self):
+        # A versão do índice da carga é o updated_at: editar uma linha a muda.
+        GoalUpload.all_objects.filter(pk=self.upload_id).update(updated_at=timezone.now())
+
 
 class PowerBIAccessLog(models.Model):
     report = models.ForeignKey(
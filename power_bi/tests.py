@@ -0,0 +1,230 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from decimal import Decimal
+from unittest import mock
+
+import openpyxl
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from communications.models import CommunicationGroup
+from simulator.services import get_metas_from_power_bi, get_pdv_metas_for_coordinator
+from users.models import Sector, User
+
+from . import goal_index, views
+from .models import GoalEntry, GoalUpload
+
+
+def _cn(user_name, store_name, pilar, value):
+    return {'sheet_type': GoalEntry.SHEET_CN_REAL, 'user_name': user_name, 'store_name': store_name,
+            'pilar': pilar, 'goal_value': Decimal(value), 'row_number': 2, 'row_data': {}}
+
+
+def _pdv(store_name, pilar, value, coord):
+    return {'sheet_type': GoalEntry.SHEET_PDV_REAL, 'user_name': '', 'store_name': store_name,
+            'pilar': pilar, 'goal_value': Decimal(value), 'row_number': 2, 'row_data': {'COORDENAÇÃO': coord}}
+
+
+class GoalIndexTests(TestCase):
+    def setUp(self):
+        goal_index._maps.clear()
+        self.sector = Sector.objects.create(name='Loja - Jardim Camburi')
+        self.upload = GoalUpload.objects.create(year=2026, month=10)
+        GoalEntry.objects.bulk_create(goal_index.build_entries(self.upload, [
+            _cn('Ana  Souza', 'JARDIM CAMBURI', 'MÓVEL', '1000'),
+            _cn('Ana Souza', 'JARDIM CAMBURI', 'FIXA', '10'),
+            _cn('Bruno Lima', 'PRAIA DO CANTO', 'MOVEL', '900'),
+            _pdv('JARDIM CAMBURI', 'MOVEL', '5000', 'Coord Norte'),
+            _pdv('PRAIA DO CANTO', 'MOVEL', '4000', 'Coord Norte'),
+            _pdv('PRAIA DO CANTO', 'SEGURO', '300', 'Coord Norte'),
+        ]))
+
+    def test_goal_screens_filter_by_index_keys(self):
+        consultora = User.objects.create_user('ana', 'ana@example.com', password='pass123', hierarchy='PADRAO',
+                                              first_name='Ana', last_name='Souza', sector=self.sector)
+        self.client.force_login(consultora)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('power_bi:goals_list'))
+        self.assertEqual(response.context['cn_total'], Decimal('1010'))
+        self.assertEqual(response.context['pdv_total'], Decimal('5000'))
+        goal_sql = [q['sql'] for q in queries.captured_queries if 'power_bi_goalentry' in q['sql']]
+        self.assertFalse([sql for sql in goal_sql if ' IN (' in sql and '"id" IN' in sql], goal_sql)
+
+        gerentes = CommunicationGroup.objects.create(name='GERENTES', created_by=consultora)
+        gerente = User.objects.create_user('gerente', 'gerente@example.com', password='pass123',
+                                           hierarchy='PADRAO', sector=self.sector)
+        gerentes.members.add(gerente)
+        self.client.force_login(gerente)
+        response = self.client.get(reverse('power_bi:goals_list'), {'cn': 'ana souza'})
+        self.assertEqual(response.context['available_cns'], ['Ana  Souza', 'Ana Souza'])
+        self.assertEqual(response.context['cn_total'], Decimal('1010'))
+        self.assertEqual(response.context['pdv_total'], Decimal('5000'))
+
+    def test_simulator_metas_come_from_the_upload_index(self):
+        self.assertEqual(get_metas_from_power_bi(user_name='ana souza'), {'movel': 1000.0, 'fixa': 10.0})
+        self.assertEqual(get_metas_from_power_bi(store_name='Praia do Canto'), {'movel': 4000.0, 'seguros': 300.0})
+        self.assertEqual(get_pdv_metas_for_coordinator('COORD NORTE'), {'movel': 9000.0, 'seguros': 300.0})
+
+        with CaptureQueriesContext(connection) as queries:
+            get_metas_from_power_bi(user_name='Bruno Lima')
+        self.assertFalse([q for q in queries.captured_queries if 'power_bi_goalentry' in q['sql']])
+
+        # Coordenação lida linha a linha: mesma loja (ou loja sem nome) com
+        # coordenações diferentes não herda a da primeira linha.
+        GoalEntry.objects.bulk_create(goal_index.build_entries(self.upload, [
+            _pdv('PRAIA DO CANTO', 'MOVEL', '700', 'Coord Sul'),
+            _pdv('', 'MOVEL', '50', 'Coord Norte'),
+            _pdv('', 'MOVEL', '60', 'Coord Sul'),
+        ]))
+        goal_index._maps.clear()
+        self.assertEqual(get_pdv_metas_for_coordinator('COORD NORTE'), {'movel': 9050.0, 'seguros': 300.0})
+        self.assertEqual(get_pdv_metas_for_coordinator('Coord Sul'), {'movel': 760.0})
+
+        # Editar uma linha muda a versão da carga e o índice é refeito.
+        entry = GoalEntry.objects.get(user_key='BRUNO LIMA')
+        entry.goal_value = Decimal('950')
+        entry.save()
+        self.assertEqual(get_metas_from_power_bi(user_name='Bruno Lima'), {'movel': 950.0})
+
+
+def _goal_workbook(rows_cn, rows_pdv):
+    workbook = openpyxl.Workbook()
+    cn_sheet = workbook.active
+    cn_sheet.title = 'METAS CN REAL'
+    cn_sheet.append(['CONSULTOR', 'PDV', 'MOVEL', '% CN'])
+    for row in rows_cn:
+        cn_sheet.append(row)
+    pdv_sheet = workbook.create_sheet('META PDV REAL')
+    pdv_sheet.append(['PDV', 'MOVEL', 'COORDENAÇÃO'])
+    for row in rows_pdv:
+        pdv_sheet.append(row)
+    handle, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(handle)
+    workbook.save(path)
+    return path
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'power-bi-default'},
+})
+class GoalImportJobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        goal_index._maps.clear()
+        self.sector = Sector.objects.create(name='Loja - Jardim Camburi')
+        self.ana = User.objects.create_user('ana', 'ana@example.com', password='pass123', hierarchy='PADRAO',
+                                            first_name='Ana', last_name='Souza')
+        self.current = GoalUpload.objects.create(year=2026, month=10)
+        GoalEntry.objects.bulk_create(goal_index.build_entries(self.current, [
+            _cn('Ana Souza', 'JARDIM CAMBURI', 'MOVEL', '1000'),
+            _pdv('JARDIM CAMBURI', 'MOVEL', '5000', 'Coord Norte'),
+        ]))
+
+    def test_import_publishes_the_staged_upload_in_one_swap(self):
+        path = _goal_workbook(
+            [['Ana Souza', 'JARDIM CAMBURI', 1200, '12'], ['Bruno Lima', 'PRAIA DO CANTO', 900, '9']],
+            [['JARDIM CAMBURI', 6000, 'Coord Norte'], ['PRAIA DO CANTO', 4000, 'Coord Norte']],
+        )
+        staged = GoalUpload.all_objects.create(year=2026, month=10, is_current=False)
+        # A carga em preparo nao aparece para as telas nem para o simulador.
+        self.assertEqual(list(GoalUpload.objects.filter(year=2026, month=10)), [self.current])
+
+        with mock.patch.object(views, 'GOALS_IMPORT_CHUNK', 2):
+            views._import_goal_upload(staged.id, path)
+
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(list(GoalUpload.objects.filter(year=2026, month=10)), [staged])
+        self.assertFalse(GoalUpload.all_objects.filter(pk=self.current.pk).exists())
+        self.assertEqual(staged.entries.count(), 4)
+        self.assertEqual(get_metas_from_power_bi(user_name='Ana Souza'), {'movel': 1200.0})
+        progress = views._goal_progress('import', staged.id)
+        self.assertEqual((progress['stage'], progress['rows']), ('done', 4))
+        self.ana.refresh_from_db()
+        self.assertEqual((self.ana.pcn, self.ana.sector), ('12', self.sector))
+
+    def test_failed_import_keeps_the_current_upload(self):
+        path = _goal_workbook([['Ana Souza', 'JARDIM CAMBURI', 1200, '12']], [])
+        staged = GoalUpload.all_objects.create(year=2026, month=10, is_current=False)
+        with mock.patch.object(views, '_publish_goal_upload', side_effect=RuntimeError('falhou')), \
+                self.assertLogs('power_bi.views', 'ERROR'):
+            views._import_goal_upload(staged.id, path)
+
+        self.assertEqual(views._goal_progress('import', staged.id)['stage'], 'failed')
+        self.assertFalse(GoalUpload.all_objects.filter(pk=staged.pk).exists())
+        self.assertEqual(list(GoalUpload.objects.filter(year=2026, month=10)), [self.current])
+        self.assertEqual(get_metas_from_power_bi(user_name='Ana Souza'), {'movel': 1000.0})
+
+    def test_upload_view_queues_the_import_and_sync_writes_in_batches(self):
+        admin = User.objects.create_user('admin', 'admin@example.com', password='pass123', hierarchy='SUPERADMIN')
+        self.client.force_login(admin)
+        path = _goal_workbook([['Ana Souza', 'JARDIM CAMBURI', 1200, '12']], [['JARDIM CAMBURI', 6000, 'X']])
+        with open(path, 'rb') as handle, mock.patch.object(views, '_schedule_goal_job') as schedule:
+            response = self.client.post(reverse('power_bi:upload_goals'), {'year': 2026, 'month': 10, 'file': handle})
+        os.unlink(path)
+        self.assertRedirects(response, reverse('power_bi:manage_goals'), fetch_redirect_response=False)
+        job, staged_id, staged_path = schedule.call_args.args
+        self.assertIs(job, views._import_goal_upload)
+        self.assertFalse(GoalUpload.all_objects.get(pk=staged_id).is_current)
+        os.unlink(staged_path)
+
+        cursor = mock.MagicMock()
+        fake = mock.MagicMock()
+        fake.cursor.return_value.__enter__.return_value = cursor
+
+        @contextmanager
+        def _fake_connection():
+            yield fake
+
+        with mock.patch.object(views, '_goals_mysql_connection', _fake_connection), \
+                mock.patch.object(views, 'GOALS_MYSQL_BATCH', 1):
+            views._sync_goal_upload(self.current.id)
+
+        self.assertEqual(views._goal_progress('sync', self.current.id)['stage'], 'done')
+        batches = [call.args[1] for call in cursor.executemany.call_args_list]
+        self.assertTrue(batches)
+        self.assertTrue(all(len(batch) == 1 for batch in batches))
+        fake.commit.assert_called_once()
+
+        response = self.client.get(reverse('power_bi:goals_jobs_progress'))
+        stages = {(job['kind'], job['upload_id']): job['stage'] for job in response.json()['jobs']}
+        self.assertEqual(stages[('import', staged_id)], 'queued')
+
+    def test_jobs_for_a_deleted_upload_fail_instead_of_staying_queued(self):
+        path = _goal_workbook([], [])
+        views._set_goal_progress('import', 999, stage='queued')
+        views._import_goal_upload(999, path)
+        self.assertEqual(views._goal_progress('import', 999)['stage'], 'failed')
+        self.assertFalse(os.path.exists(path))
+
+        views._set_goal_progress('sync', 999, stage='queued')
+        views._sync_goal_upload(999)
+        self.assertEqual(views._goal_progress('sync', 999)['stage'], 'failed')
+
+    def test_sync_of_a_month_already_syncing_elsewhere_is_refused(self):
+        lock = views._goal_sync_lock_key(2026, 10)
+        cache.set(lock, 'outro processo')
+        with mock.patch.object(views, '_goals_mysql_connection') as mysql:
+            views._sync_goal_upload(self.current.id)
+        mysql.assert_not_called()
+        self.assertEqual(views._goal_progress('sync', self.current.id)['stage'], 'failed')
+        self.assertEqual(cache.get(lock), 'outro processo')
+
+        cache.delete(lock)
+        with mock.patch.object(views, '_goals_mysql_connection', side_effect=RuntimeError('sem MySQL')), \
+                self.assertLogs('power_bi.views', 'ERROR'):
+            views._sync_goal_upload(self.current.id)
+        self.assertIsNone(cache.get(lock))
+
+    def test_two_first_imports_of_a_month_publish_one_after_the_other(self):
+        primeira = GoalUpload.all_objects.create(year=2026, month=11, is_current=False)
+        segunda = GoalUpload.all_objects.create(year=2026, month=11, is_current=False)
+
+        previous, _, _ = views._publish_goal_upload(primeira, {}, {})
+        self.assertEqual(previous, [])
+        previous, _, _ = views._publish_goal_upload(segunda, {}, {})
+        self.assertEqual(previous, [primeira])
+        self.assertEqual(list(GoalUpload.objects.filter(year=2026, month=11)), [segunda])
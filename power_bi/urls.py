@@ -14,6 +14,7 @@ urlpatterns = [
     path('manage/<int:report_id>/edit/', views.edit_power_bi_view, name='edit'),
     path('manage/<int:report_id>/delete/', views.delete_power_bi_view, name='delete'),
     path('manage/metas/', views.manage_goals_view, name='manage_goals'),
+    path('manage/metas/progress/', views.goals_jobs_progress_view, name='goals_jobs_progress'),
     path('manage/metas/upload/', views.upload_goals_view, name='upload_goals'),
     path('manage/metas/<int:upload_id>/delete/', views.delete_goals_upload_view, name='delete_goals_upload'),
     path('manage/metas/<int:upload_id>/sync-mysql/', views.sync_goals_upload_to_mysql_view, name='sync_goals_upload_mysql'),
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Prize, PrizeCategory, Redemption, CSTransaction
+from .models import Prize, PrizeCategory, Redemption, CSTransaction, CSBalanceCheckpoint
 
 
 @admin.register(PrizeCategory)
@@ -91,3 +91,11 @@ class CSTransactionAdmin(admin.ModelAdmin):
             'fields': ('created_by', 'created_at')
         }),
     )
+
+
+@admin.register(CSBalanceCheckpoint)
+class CSBalanceCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['user', 'balance', 'total_credits', 'total_debits', 'last_transaction_id', 'created_at']
+    search_fields = ['user__first_name', 'user__last_name', 'user__email']
+    readonly_fields = ['created_at']
+    ordering = ['-created_at']
@@ -0,0 +1,238 @@
+"""
+Ledger de Confianças (C$).
+
+``User.balance_cs`` é um saldo armazenado; cada movimento precisa atualizar o
+saldo E registrar a ``CSTransaction`` na mesma transação de banco. As views
+liam o saldo para o Python e gravavam ``balance_cs -= valor`` de volta, o que
+perde atualizações com resgates simultâneos. Aqui o saldo só muda por UPDATE
+com ``F()`` (atômico na linha), e o débito com checagem de saldo é um UPDATE
+condicional — não existe janela entre "ler" e "gravar".
+
+O saldo recalculado a partir das transações parte do último
+``CSBalanceCheckpoint`` do usuário e soma apenas o que veio depois dele.
+"""
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import CSBalanceCheckpoint, CSTransaction
+
+# Status que já movimentaram o saldo. COMPLETED é o que a remoção manual grava.
+EFFECTIVE_STATUSES = ('APPROVED', 'COMPLETED')
+CREDIT_TYPES = ('CREDIT', 'ADJUSTMENT', 'REFUND')
+DEBIT_TYPES = ('DEBIT', 'REDEMPTION')
+
+BULK_BATCH_SIZE = 500
+
+ZERO = Decimal('0.00')
+_MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+class InsufficientBalance(Exception):
+    """Débito recusado porque o saldo atual não cobre o valor."""
+
+
+def _user_model():
+    from django.contrib.auth import get_user_model
+    return get_user_model()
+
+
+def _signed_sums() -> Dict[str, Sum]:
+    """Agregações de créditos e débitos (débitos sempre negativos)."""
+    return {
+        'credits': Coalesce(
+            Sum('amount', filter=Q(transaction_type__in=CREDIT_TYPES)),
+            Value(ZERO), output_field=_MONEY,
+        ),
+        'debits': Coalesce(
+            Sum(
+                Case(When(amount__gt=0, then=-F('amount')), default=F('amount'), output_field=_MONEY),
+                filter=Q(transaction_type__in=DEBIT_TYPES),
+            ),
+            Value(ZERO), output_field=_MONEY,
+        ),
+    }
+
+
+def apply_movement(user, amount, transaction_type: str, description: str, created_by,
+                   require_funds: bool = False, **fields) -> CSTransaction:
+    """Aplica ``amount`` (com sinal) ao saldo e registra a transação, atomicamente.
+
+    Com ``require_funds`` o débito só acontece se o saldo cobrir o valor;
+    caso contrário levanta ``InsufficientBalance`` e nada é gravado. Atualiza
+    ``user.balance_cs`` em memória com o valor que ficou no banco.
+    """
+    User = _user_model()
+    amount = Decimal(str(amount))
+    fields.setdefault('status', 'APPROVED')
+
+    with transaction.atomic():
+        rows = User.objects.filter(pk=user.pk)
+        if require_funds and amount < 0:
+            rows = rows.filter(balance_cs__gte=-amount)
+        if not rows.update(balance_cs=F('balance_cs') + amount):
+            raise InsufficientBalance('Saldo insuficiente')
+
+        cs_transaction = CSTransaction.objects.create(
+            user=user,
+            amount=amount,
+            transaction_type=transaction_type,
+            description=description,
+            created_by=created_by,
+            **fields
+        )
+
+    user.balance_cs = User.objects.values_list('balance_cs', flat=True).get(pk=user.pk)
+    return cs_transaction
+
+
+def approve_pending(cs_transaction: CSTransaction, approved_by) -> CSTransaction:
+    """Aprova uma transação pendente; créditos entram no saldo na mesma transação."""
+    User = _user_model()
+    with transaction.atomic():
+        updated = CSTransaction.objects.filter(pk=cs_transaction.pk, status='PENDING').update(
+            status='APPROVED', approved_by=approved_by, approved_at=timezone.now(),
+        )
+        # Outra aprovação concorrente já levou esta: não credita duas vezes.
+        if updated and cs_transaction.transaction_type == 'CREDIT':
+            User.objects.filter(pk=cs_transaction.user_id).update(
+                balance_cs=F('balance_cs') + cs_transaction.amount
+            )
+    cs_transaction.refresh_from_db()
+    return cs_transaction
+
+
+def bulk_credit(credits: Iterable[Tuple[int, Decimal]], description: str, created_by,
+                transaction_type: str = 'CREDIT', **fields) -> List[CSTransaction]:
+    """Credita vários usuários de uma vez (pagamentos de campanha).
+
+    ``credits`` é uma lista de ``(user_id, valor)``. Por lote são um
+    ``bulk_create`` de transações e um único UPDATE com CASE por usuário.
+    """
+    User = _user_model()
+    fields.setdefault('status', 'APPROVED')
+
+    totals: Dict[int, Decimal] = {}
+    for user_id, amount in credits:
+        amount = Decimal(str(amount or 0))
+        if amount > 0:
+            totals[user_id] = totals.get(user_id, ZERO) + amount
+
+    existing = set(User.objects.filter(pk__in=list(totals)).values_list('pk', flat=True))
+    items = [(uid, amount) for uid, amount in totals.items() if uid in existing]
+
+    created: List[CSTransaction] = []
+    with transaction.atomic():
+        for start in range(0, len(items), BULK_BATCH_SIZE):
+            batch = items[start:start + BULK_BATCH_SIZE]
+            created.extend(CSTransaction.objects.bulk_create([
+                CSTransaction(
+                    user_id=uid,
+                    amount=amount,
+                    transaction_type=transaction_type,
+                    description=description,
+                    created_by=created_by,
+                    **fields
+                )
+                for uid, amount in batch
+            ]))
+            User.objects.filter(pk__in=[uid for uid, _ in batch]).update(
+                balance_cs=F('balance_cs') + Case(
+                    *[When(pk=uid, then=Value(amount)) for uid, amount in batch],
+                    default=Value(ZERO),
+                    output_field=_MONEY,
+                )
+            )
+    return created
+
+
+def _latest_checkpoint(user_id) -> Optional[CSBalanceCheckpoint]:
+    return CSBalanceCheckpoint.objects.filter(user_id=user_id).order_by('-last_transaction_id').first()
+
+
+def ledger_totals(user) -> Dict[str, Decimal]:
+    """Saldo, créditos e débitos do ledger: checkpoint + transações posteriores."""
+    checkpoint = _latest_checkpoint(user.pk)
+    base_id = checkpoint.last_transaction_id if checkpoint else 0
+
+    since = CSTransaction.objects.filter(
+        user_id=user.pk, status__in=EFFECTIVE_STATUSES, id__gt=base_id
+    ).aggregate(**_signed_sums())
+
+    credits = since['credits'] + (checkpoint.total_credits if checkpoint else ZERO)
+    debits = since['debits'] + (checkpoint.total_debits if checkpoint else ZERO)
+    return {'balance': credits + debits, 'credits': credits, 'debits': debits}
+
+
+def ledger_totals_by_user(user_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, Decimal]]:
+    """``ledger_totals`` de muitos usuários com duas consultas (para a reconciliação)."""
+    checkpoints: Dict[int, CSBalanceCheckpoint] = {}
+    cp_qs = CSBalanceCheckpoint.objects.order_by('user_id', '-last_transaction_id')
+    tx_qs = CSTransaction.objects.filter(status__in=EFFECTIVE_STATUSES)
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        cp_qs = cp_qs.filter(user_id__in=user_ids)
+        tx_qs = tx_qs.filter(user_id__in=user_ids)
+    for checkpoint in cp_qs:
+        checkpoints.setdefault(checkpoint.user_id, checkpoint)
+
+    latest = CSBalanceCheckpoint.objects.filter(user=OuterRef('user')).order_by('-last_transaction_id')
+    rows = (
+        tx_qs.annotate(checkpoint_id=Coalesce(Subquery(latest.values('last_transaction_id')[:1]), Value(0)))
+        .filter(id__gt=F('checkpoint_id'))
+        .values('user_id')
+        .annotate(**_signed_sums())
+        .order_by()
+    )
+
+    result: Dict[int, Dict[str, Decimal]] = {}
+    for uid, checkpoint in checkpoints.items():
+        result[uid] = {'credits': checkpoint.total_credits, 'debits': checkpoint.total_debits}
+    for row in rows:
+        totals = result.setdefault(row['user_id'], {'credits': ZERO, 'debits': ZERO})
+        totals['credits'] += row['credits']
+        totals['debits'] += row['debits']
+    for totals in result.values():
+        totals['balance'] = totals['credits'] + totals['debits']
+    return result
+
+
+def create_checkpoint(user) -> Optional[CSBalanceCheckpoint]:
+    """Grava um checkpoint cobrindo as transações já definitivas do usuário.
+
+    Transações ainda pendentes podem virar aprovadas depois; por isso o
+    checkpoint para antes da primeira pendente, que continua sendo somada.
+    Retorna None quando não há nada novo a cobrir.
+    """
+    last_id = CSTransaction.objects.filter(user_id=user.pk).order_by('-id').values_list('id', flat=True).first()
+    if not last_id:
+        return None
+    first_pending = (
+        CSTransaction.objects.filter(user_id=user.pk, status='PENDING')
+        .order_by('id').values_list('id', flat=True).first()
+    )
+    if first_pending:
+        last_id = first_pending - 1
+
+    previous = _latest_checkpoint(user.pk)
+    if previous and previous.last_transaction_id >= last_id:
+        return None
+
+    base_id = previous.last_transaction_id if previous else 0
+    since = CSTransaction.objects.filter(
+        user_id=user.pk, status__in=EFFECTIVE_STATUSES, id__gt=base_id, id__lte=last_id
+    ).aggregate(**_signed_sums())
+    credits = since['credits'] + (previous.total_credits if previous else ZERO)
+    debits = since['debits'] + (previous.total_debits if previous else ZERO)
+
+    return CSBalanceCheckpoint.objects.create(
+        user=user,
+        last_transaction_id=last_id,
+        balance=credits + debits,
+        total_credits=credits,
+        total_debits=debits,
+    )
@@ -0,0 +1,74 @@
+"""
+Reconciliação do saldo C$ armazenado (User.balance_cs) com o ledger de
+transações, e gravação periódica de checkpoints de saldo.
+
+Sugestão de cron (madrugada):
+    python manage.py reconcile_cs_balances --checkpoint
+"""
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from prizes.ledger import create_checkpoint, ledger_totals_by_user
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Compara balance_cs com o ledger de transações C$ e grava checkpoints de saldo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            help='ID do usuário a reconciliar (pode repetir). Padrão: todos.'
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Ajusta balance_cs para o valor do ledger nos usuários divergentes'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            action='store_true',
+            help='Grava um checkpoint de saldo para os usuários com transações'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['user']:
+            users = users.filter(pk__in=options['user'])
+        stored = dict(users.values_list('pk', 'balance_cs'))
+
+        totals = ledger_totals_by_user(stored.keys() if options['user'] else None)
+
+        divergent = []
+        for user_id, balance_cs in stored.items():
+            ledger_balance = totals.get(user_id, {}).get('balance', Decimal('0.00'))
+            if (balance_cs or Decimal('0.00')) != ledger_balance:
+                divergent.append((user_id, balance_cs, ledger_balance))
+
+        for user_id, balance_cs, ledger_balance in divergent:
+            self.stdout.write(
+                f'Usuário #{user_id}: saldo armazenado C$ {balance_cs} / ledger C$ {ledger_balance} '
+                f'(diferença C$ {ledger_balance - (balance_cs or 0)})'
+            )
+            if options['fix']:
+                # Aplica só a diferença: um movimento concorrente não é perdido.
+                User.objects.filter(pk=user_id).update(
+                    balance_cs=F('balance_cs') + (ledger_balance - (balance_cs or 0))
+                )
+
+        checkpoints = 0
+        if options['checkpoint']:
+            for user in users.filter(pk__in=list(totals)).only('pk'):
+                if create_checkpoint(user):
+                    checkpoints += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(stored)} usuário(s) verificados, {len(divergent)} divergente(s)'
+            + (' ajustados' if options['fix'] and divergent else '')
+            + (f', {checkpoints} checkpoint(s) gravados' if options['checkpoint'] else '')
+            + '.'
+        ))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:09
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prizes', '0013_redemption_pickup_fields'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CSBalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_transaction_id', models.BigIntegerField(default=0, verbose_name='Última transação coberta')),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Saldo')),
+                ('total_credits', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Total de créditos')),
+                ('total_debits', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Total de débitos')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cs_checkpoints', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Checkpoint de Saldo C$',
+                'verbose_name_plural': 'Checkpoints de Saldo C$',
+                'ordering': ['-last_transaction_id'],
+                'indexes': [models.Index(fields=['user', '-last_transaction_id'], name='cs_checkpoint_user_last_idx')],
+            },
+        ),
+    ]
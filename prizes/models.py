@@ -300,3 +300,33 @@ class CSTransaction(models.Model):
         from django.utils import timezone
         delta = self.expiration_date - timezone.now().date()
         return delta.days
+
+
+class CSBalanceCheckpoint(models.Model):
+    """Fotografia do saldo C$ de um usuário até uma transação.
+
+    O saldo do ledger passa a ser ``checkpoint + transações com id maior``, em
+    vez de somar todo o histórico a cada consulta (ver prizes/ledger.py).
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='cs_checkpoints',
+        verbose_name="Usuário"
+    )
+    last_transaction_id = models.BigIntegerField(default=0, verbose_name="Última transação coberta")
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'), verbose_name="Saldo")
+    total_credits = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'), verbose_name="Total de créditos")
+    total_debits = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'), verbose_name="Total de débitos")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
+
+    class Meta:
+        verbose_name = "Checkpoint de Saldo C$"
+        verbose_name_plural = "Checkpoints de Saldo C$"
+        ordering = ['-last_transaction_id']
+        indexes = [
+            models.Index(fields=['user', '-last_transaction_id'], name='cs_checkpoint_user_last_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - C$ {self.balance} até #{self.last_transaction_id}"
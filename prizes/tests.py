@@ -1,3 +1,117 @@
+from decimal import Decimal
+from unittest import mock
+
 from django.test import TestCase
+from django.urls import reverse
+
+from users.models import User
+
+from . import ledger
+from .models import CSTransaction, Prize, Redemption
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass123', hierarchy='SUPERADMIN',
+        )
+        self.user = User.objects.create_user(
+            username='colab', email='colab@example.com', password='pass123', hierarchy='PADRAO',
+        )
+
+    def test_debit_requiring_funds_is_refused_without_writing(self):
+        ledger.apply_movement(self.user, Decimal('50'), 'CREDIT', 'Crédito', created_by=self.admin)
+
+        with self.assertRaises(ledger.InsufficientBalance):
+            ledger.apply_movement(
+                self.user, Decimal('-80'), 'REDEMPTION', 'Resgate', created_by=self.user, require_funds=True,
+            )
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.balance_cs, Decimal('50.00'))
+        self.assertFalse(CSTransaction.objects.filter(transaction_type='REDEMPTION').exists())
+
+    def test_bulk_credit_updates_every_balance(self):
+        other = User.objects.create_user(
+            username='outro', email='outro@example.com', password='pass123', hierarchy='PADRAO',
+        )
+
+        created = ledger.bulk_credit(
+            [(self.user.pk, Decimal('10')), (other.pk, Decimal('25')), (self.user.pk, Decimal('5'))],
+            description='Campanha', created_by=self.admin,
+        )
+
+        self.assertEqual(len(created), 2)
+        self.user.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.user.balance_cs, Decimal('15.00'))
+        self.assertEqual(other.balance_cs, Decimal('25.00'))
+
+    def test_checkpoint_keeps_ledger_totals_and_skips_pending(self):
+        ledger.apply_movement(self.user, Decimal('100'), 'CREDIT', 'Crédito', created_by=self.admin)
+        pending = CSTransaction.objects.create(
+            user=self.user, amount=Decimal('40'), transaction_type='CREDIT',
+            description='Pendente', status='PENDING', created_by=self.admin,
+        )
+        ledger.apply_movement(self.user, Decimal('-30'), 'REDEMPTION', 'Resgate', created_by=self.user)
+
+        checkpoint = ledger.create_checkpoint(self.user)
+        self.assertEqual(checkpoint.last_transaction_id, pending.pk - 1)
+
+        ledger.approve_pending(pending, self.admin)
+
+        totals = ledger.ledger_totals(self.user)
+        self.assertEqual(totals['balance'], Decimal('110.00'))
+        self.assertEqual(totals['debits'], Decimal('-30.00'))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.balance_cs, totals['balance'])
+        self.assertEqual(ledger.ledger_totals_by_user([self.user.pk])[self.user.pk]['balance'], totals['balance'])
+
+
+class RedemptionRefundTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass123', hierarchy='SUPERADMIN',
+        )
+        self.user = User.objects.create_user(
+            username='colab', email='colab@example.com', password='pass123', hierarchy='PADRAO',
+        )
+        prize = Prize.objects.create(name='Caneca', value_cs=Decimal('30'), created_by=self.admin)
+        self.redemption = Redemption.objects.create(user=self.user, prize=prize)
+        self.client.force_login(self.admin)
+
+    def _refunds(self):
+        return CSTransaction.objects.filter(related_redemption=self.redemption).count()
+
+    def test_stale_cancel_does_not_refund_twice(self):
+        stale = Redemption.objects.get(pk=self.redemption.pk)
+        self.client.post(reverse('cancel_redemption', args=[self.redemption.pk]))
+
+        # Segundo cancelamento que leu o resgate antes do primeiro gravar.
+        with mock.patch('prizes.views.get_object_or_404', return_value=stale):
+            response = self.client.post(reverse('cancel_redemption', args=[self.redemption.pk]))
+        self.assertFalse(response.json()['success'])
+
+        response = self.client.post(
+            reverse('update_redemption_status', args=[self.redemption.pk]), {'status': 'CANCELADO'},
+        )
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(self._refunds(), 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.balance_cs, Decimal('30.00'))
+
+    def test_api_debit_goes_through_the_ledger(self):
+        ledger.apply_movement(self.user, Decimal('50'), 'CREDIT', 'Crédito', created_by=self.admin)
+        url = f'/api/users/{self.user.pk}/update_balance/'
+
+        response = self.client.post(url, {'amount': '80', 'operation': 'subtract'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, {'amount': '20', 'operation': 'subtract'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(url, {'amount': '15', 'operation': 'add'})
+        self.assertEqual(response.status_code, 200)
 
-# Create your tests here.
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.balance_cs, Decimal('30.00'))
+        self.assertEqual(ledger.ledger_totals(self.user)['balance'], Decimal('30.00'))
+        self.assertTrue(CSTransaction.objects.filter(user=self.user, transaction_type='CREDIT', status='PENDING').exists())
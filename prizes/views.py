@@ -9,6 +9,7 @@ from django.utils import timezone
 from decimal import Decimal
 from datetime import timedelta
 
+from . import ledger
 from .models import Prize, PrizeCategory, Redemption, CSTransaction, PrizeDiscount
 from users.models import User
 
@@ -84,24 +85,24 @@ def redeem_prize(request, prize_id):
                 final_value=final_value
             )
             
-            # Debitar saldo (usar valor final)
-            request.user.balance_cs -= final_value
-            request.user.save()
-            
-            # Registrar transação
-            CSTransaction.objects.create(
-                user=request.user,
-                amount=-final_value,
-                transaction_type='REDEMPTION',
-                description=f'Resgate: {prize.name}',
+            # Debitar saldo (usar valor final) e registrar a transação. O débito
+            # é condicional no banco: dois resgates simultâneos não passam do saldo.
+            ledger.apply_movement(
+                request.user,
+                -final_value,
+                'REDEMPTION',
+                f'Resgate: {prize.name}',
+                created_by=request.user,
+                require_funds=True,
                 related_redemption=redemption,
                 status='APPROVED',  # Resgates são aprovados automaticamente
-                created_by=request.user
             )
             
             messages.success(request, f'Prêmio "{prize.name}" resgatado com sucesso! Aguardando aprovação.')
             return JsonResponse({'success': True})
             
+    except ledger.InsufficientBalance:
+        return JsonResponse({'success': False, 'error': 'Saldo insuficiente'})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
@@ -441,40 +442,40 @@ def update_redemption_status(request, redemption_id):
         return JsonResponse({'success': False, 'error': 'Status inválido'})
     
     try:
-        old_status = redemption.status
-        redemption.status = new_status
-        redemption.approved_by = request.user
-        
-        if new_status == 'APROVADO':
-            redemption.approved_at = timezone.now()
-            if delivery_notes:
-                redemption.delivery_notes = delivery_notes
-        elif new_status == 'ENTREGUE':
-            redemption.delivered_at = timezone.now()
-            if delivery_notes:
-                redemption.delivery_notes = delivery_notes
-        elif new_status == 'CANCELADO':
-            if delivery_notes:
-                redemption.notes = delivery_notes
-        
-        redemption.save()
-        
-        # Gerenciar estoque baseado no status
-        if new_status == 'CANCELADO' and old_status != 'CANCELADO':
-            # Se cancelado, devolver o C$ para o usuário
-            redemption.user.balance_cs += redemption.prize.value_cs
-            redemption.user.save()
+        with transaction.atomic():
+            # Trava o resgate: duas mudanças simultâneas para CANCELADO não
+            # podem ver ambas o status antigo e devolver o C$ duas vezes.
+            redemption = Redemption.objects.select_for_update().get(pk=redemption.pk)
+            old_status = redemption.status
+            redemption.status = new_status
+            redemption.approved_by = request.user
             
-            # Registrar transação de devolução
-            CSTransaction.objects.create(
-                user=redemption.user,
-                amount=redemption.prize.value_cs,
-                transaction_type='CREDIT',
-                description=f'Devolução por cancelamento: {redemption.prize.name}',
-                related_redemption=redemption,
-                status='APPROVED',  # Devoluções são aprovadas automaticamente
-                created_by=request.user
-            )
+            if new_status == 'APROVADO':
+                redemption.approved_at = timezone.now()
+                if delivery_notes:
+                    redemption.delivery_notes = delivery_notes
+            elif new_status == 'ENTREGUE':
+                redemption.delivered_at = timezone.now()
+                if delivery_notes:
+                    redemption.delivery_notes = delivery_notes
+            elif new_status == 'CANCELADO':
+                if delivery_notes:
+                    redemption.notes = delivery_notes
+            
+            redemption.save()
+            
+            # Gerenciar estoque baseado no status
+            if new_status == 'CANCELADO' and old_status != 'CANCELADO':
+                # Se cancelado, devolver o C$ para o usuário (saldo + transação)
+                ledger.apply_movement(
+                    redemption.user,
+                    redemption.prize.value_cs,
+                    'CREDIT',
+                    f'Devolução por cancelamento: {redemption.prize.name}',
+                    created_by=request.user,
+                    related_redemption=redemption,
+                    status='APPROVED',  # Devoluções são aprovadas automaticamente
+                )
         
         # Log da ação
         from core.middleware import log_action
@@ -574,6 +575,11 @@ def cancel_redemption(request, redemption_id):
     
     try:
         with transaction.atomic():
+            # Relê o status com a linha travada: outro cancelamento (ou mudança
+            # de status) concorrente já pode ter devolvido o C$.
+            redemption = Redemption.objects.select_for_update().get(pk=redemption.pk)
+            if redemption.status not in ['PENDENTE', 'APROVADO']:
+                return JsonResponse({'success': False, 'error': 'Este resgate não pode ser cancelado'})
             old_status = redemption.status
             redemption.status = 'CANCELADO'
             redemption.approved_by = request.user
@@ -586,19 +592,15 @@ def cancel_redemption(request, redemption_id):
             
             redemption.save()
             
-            # Devolver o C$ para o usuário
-            redemption.user.balance_cs += redemption.prize.value_cs
-            redemption.user.save()
-            
-            # Registrar transação de devolução
-            CSTransaction.objects.create(
-                user=redemption.user,
-                amount=redemption.prize.value_cs,
-                transaction_type='REFUND',
-                description=f'Devolução por cancelamento: {redemption.prize.name}',
+            # Devolver o C$ para o usuário (saldo + transação de devolução)
+            ledger.apply_movement(
+                redemption.user,
+                redemption.prize.value_cs,
+                'REFUND',
+                f'Devolução por cancelamento: {redemption.prize.name}',
+                created_by=request.user,
                 related_redemption=redemption,
                 status='APPROVED',
-                created_by=request.user
             )
             
             # Log da ação
@@ -10,6 +10,7 @@ from django.db import models
 from .models import Activity
 from .models_chat import TaskChat, TaskChatMessage, SupportChat, SupportChatMessage, SupportAgent, SupportCategory, SupportChatRating, SupportChatFile, SupportTransferRequest
 from users.models import User
+from core.polling import conditional_poll
 
 
 def _user_is_supervisor_or_higher(user):
@@ -3207,6 +3208,7 @@ def poll_chat_updates(request, chat_id):
 
 
 @login_required
+@conditional_poll(lambda request, *args, **kwargs: [('support_queue', None)])
 def get_queue_status(request):
     """Retorna status da fila de chats por setor"""
     from users.models import Sector
@@ -3218,23 +3220,23 @@ def get_queue_status(request):
     else:
         sectors = Sector.objects.all()
     
+    # Contagens de todos os setores numa consulta só (antes eram duas por setor).
+    counts = {
+        row['sector_id']: row
+        for row in SupportChat.objects.filter(sector__in=sectors).values('sector_id').annotate(
+            waiting=models.Count('id', filter=Q(status__in=['AGUARDANDO', 'ABERTO'])),
+            in_progress=models.Count('id', filter=Q(status='EM_ANDAMENTO')),
+        ).order_by()
+    }
+    
     queue_data = []
     for sector in sectors:
-        waiting_count = SupportChat.objects.filter(
-            sector=sector,
-            status__in=['AGUARDANDO', 'ABERTO']
-        ).count()
-        
-        in_progress_count = SupportChat.objects.filter(
-            sector=sector,
-            status='EM_ANDAMENTO'
-        ).count()
-        
+        row = counts.get(sector.id, {})
         queue_data.append({
             'sector_id': sector.id,
             'sector_name': sector.name,
-            'waiting': waiting_count,
-            'in_progress': in_progress_count
+            'waiting': row.get('waiting', 0),
+            'in_progress': row.get('in_progress', 0)
         })
     
     return JsonResponse({
@@ -3244,6 +3246,7 @@ def get_queue_status(request):
 
 
 @login_required
+@conditional_poll(lambda request, *args, **kwargs: [('support_queue', None)])
 def get_user_queue_position(request, chat_id):
     """Retorna a posição do usuário na fila para um chat específico"""
     chat = get_object_or_404(SupportChat, id=chat_id)
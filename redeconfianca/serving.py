@@ -0,0 +1,91 @@
+"""Perfil de execução do Gunicorn: pools de workers e religação pós-fork.
+
+Com ``--worker-class sync`` e 3 workers, bastavam três requisições lentas
+para o portal inteiro parar. Exemplos: download do OneDrive na comissão,
+importação de contracheques, upload de transcrição, páginas que consultam o
+Tangerino e exportações grandes. Agora (gunicorn.conf.py) são dois pools da
+mesma imagem:
+
+* ``web``: workers ``gthread``. Enquanto uma thread espera banco ou API, as
+  outras atendem, e o polling e os contadores de notificação não fazem fila;
+* ``heavy``: poucos workers, timeout longo. Recebe só as rotas abaixo.
+
+Quem separa as rotas é o proxy (nginx.conf, bloco ``map``). As listas daqui
+são a fonte: ``manage.py pool_routes`` imprime o bloco e o teste confere se o
+nginx.conf está em dia. Sem proxy (dev, um pool só), tudo cai no ``web``.
+"""
+import os
+import re
+from typing import Tuple
+
+# Rotas que seguram o worker por segundos ou minutos.
+HEAVY_PREFIXES: Tuple[str, ...] = (
+    '/commission/',                      # planilha de comissão no OneDrive
+    '/users/commission/',
+    '/contracheque/admin/',              # importação de contracheques e informes
+    '/contracheque/api/',
+    '/folha-ponto/admin/',
+    '/folha-ponto/api/',
+    '/agenda/api/transcricoes/upload',   # upload de áudio para transcrição
+    '/ponto/',                           # páginas do Tangerino
+    '/ferias/',
+    '/power-bi/manage/metas/',           # upload e sync de metas
+    '/contestacao/sincronizar/',
+    '/fibras/sync/',
+    '/fibras/importar/',
+    '/validad1/sync/',
+    '/vendas/precos/importar/',
+    '/_loadtest/',
+)
+# Exportações ficam espalhadas pelos apps; casam pelo trecho do caminho.
+HEAVY_KEYWORDS: Tuple[str, ...] = ('/export', 'excel', 'csv/')
+
+POOLS = ('web', 'heavy')
+
+_HEAVY_RE = re.compile(
+    '|'.join(['^' + re.escape(p) for p in HEAVY_PREFIXES] + [re.escape(k) for k in HEAVY_KEYWORDS])
+)
+
+
+def current_pool() -> str:
+    pool = os.environ.get('GUNICORN_POOL', 'web')
+    return pool if pool in POOLS else 'web'
+
+
+def is_heavy_path(path: str) -> bool:
+    return bool(_HEAVY_RE.search(path or ''))
+
+
+def nginx_map() -> str:
+    """Bloco ``map`` do nginx.conf que escolhe o upstream pelo caminho."""
+    lines = ['map $uri $portal_pool {', '    default portal_web;']
+    lines += [f'    ~^{re.escape(prefix)} portal_heavy;' for prefix in HEAVY_PREFIXES]
+    lines += [f'    ~{re.escape(keyword)} portal_heavy;' for keyword in HEAVY_KEYWORDS]
+    lines.append('}')
+    return '\n'.join(lines)
+
+
+def reset_connections_after_fork() -> None:
+    """Descarta conexões herdadas do processo mestre (``preload_app``).
+
+    Socket de banco ou de Redis compartilhado entre processos embaralha as
+    respostas. Cada worker abre as suas na primeira requisição.
+    """
+    from django.db import connections
+
+    connections.close_all()
+
+    try:
+        from django_redis.pool import ConnectionFactory
+        ConnectionFactory._pools.clear()
+    except ImportError:
+        pass
+    from django.core.cache import caches
+
+    for cache in caches.all(initialized_only=True):
+        client = getattr(cache, '_client', None)
+        if client is not None and hasattr(client, '_clients'):
+            client._clients = [None] * len(client._clients)
+
+    from core import heartbeats
+    heartbeats._store_instance = None
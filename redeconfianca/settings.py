@@ -91,6 +91,7 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.PerformanceMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -168,7 +169,7 @@ REDIS_URL = config(
 )
 CACHES = {
     'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
+        'BACKEND': 'core.perf.InstrumentedRedisCache',
         'LOCATION': REDIS_URL,
         'KEY_PREFIX': 'rc',
         'TIMEOUT': 900,
@@ -180,7 +181,7 @@ CACHES = {
         },
     },
     'local': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.perf.InstrumentedLocMemCache',
         'LOCATION': 'simulator-local',
         'TIMEOUT': 300,
     },
@@ -188,6 +189,15 @@ CACHES = {
 # Loga (em vez de silenciar totalmente) as exceções de Redis ignoradas.
 DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
 
+# Instrumentação de desempenho (core.perf): fração das requisições medidas,
+# repetições da mesma consulta que contam como N+1 e dias guardados no Redis.
+# O header X-Perf-Sample (forçar a medição) só vale com a flag ligada.
+PERF_INSTRUMENTATION_ENABLED = config('PERF_INSTRUMENTATION_ENABLED', default=True, cast=bool)
+PERF_SAMPLE_RATE = config('PERF_SAMPLE_RATE', default=0.05, cast=float)
+PERF_SAMPLE_HEADER_ENABLED = config('PERF_SAMPLE_HEADER_ENABLED', default=False, cast=bool)
+PERF_NPLUS1_THRESHOLD = config('PERF_NPLUS1_THRESHOLD', default=5, cast=int)
+PERF_RETENTION_DAYS = config('PERF_RETENTION_DAYS', default=7, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -380,7 +390,51 @@ BASE_URL = config('BASE_URL', default='https://chamados.redeconfianca.com.br')
 # OpenAI Configuration (para transcrição de reuniões e IA)
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
 
+# Transcrição de áudios longos (agenda/transcription_pipeline.py): quantas partes
+# vão ao modelo ao mesmo tempo, quantas análises de texto rodam em paralelo e a
+# classe que transcreve cada parte (recebe o client; expõe transcribe(caminho)).
+TRANSCRIPTION_CHUNK_WORKERS = config('TRANSCRIPTION_CHUNK_WORKERS', default=4, cast=int)
+TRANSCRIPTION_ANALYSIS_WORKERS = config('TRANSCRIPTION_ANALYSIS_WORKERS', default=3, cast=int)
+TRANSCRIPTION_BACKEND = config(
+    'TRANSCRIPTION_BACKEND', default='agenda.transcription_pipeline.WhisperTranscriber'
+)
+
 # Token do endpoint programático de Cartões (POST /cartoes/api/gasto/).
 # Vazio desliga o endpoint (retorna 401). Enviar no header Authorization: Bearer
 # <token> ou X-API-Key: <token>.
 CARTOES_API_TOKEN = config('CARTOES_API_TOKEN', default='')
+
+# Derivados de imagem (miniatura/exibição em WebP) gerados em segundo plano após
+# o upload de fotos — ver core/images.py. Desligue para não processar uploads.
+IMAGE_DERIVATIVES_ENABLED = config('IMAGE_DERIVATIVES_ENABLED', default=True, cast=bool)
+
+# Empacotamento HLS (escada 360p/540p/720p + miniatura) dos vídeos de
+# treinamento, gerado em segundo plano após o upload — ver trainings/media.py.
+# Precisa de ffmpeg/ffprobe no servidor; sem eles o original continua servido.
+TRAINING_HLS_ENABLED = config('TRAINING_HLS_ENABLED', default=True, cast=bool)
+
+# Progresso de vídeo (treinamentos, Conectar) fica no buffer de heartbeats e vai
+# para o banco em lote — ver core/heartbeats.py. Intervalo máximo entre lotes
+# quando o cron (flush_video_progress) não roda.
+VIDEO_PROGRESS_FLUSH_SECONDS = config('VIDEO_PROGRESS_FLUSH_SECONDS', default=60, cast=int)
+
+# Por quantos segundos o resultado de um checker de popup (Pesquisa de Clima,
+# documentos pendentes…) fica memorizado por usuário — ver
+# portal_popups/eligibility.py. Gravações nos modelos observados esquecem antes.
+PORTAL_POPUP_CHECKER_TTL = config('PORTAL_POPUP_CHECKER_TTL', default=300, cast=int)
+
+# Liga /_loadtest/slow/ (resposta que só espera N segundos) para o cenário de
+# `manage.py loadtest_pools`, que mostra o pool web atendendo enquanto o heavy
+# está lotado — ver redeconfianca/serving.py. Deixe desligado fora de homologação.
+LOADTEST_ENDPOINTS_ENABLED = config('LOADTEST_ENDPOINTS_ENABLED', default=False, cast=bool)
+
+# Orçamento de boot (django.setup + import das URLs) conferido por
+# `manage.py benchmark_startup` no CI — ver core/startup.py. Bibliotecas pesadas
+# (pandas, openpyxl) entram pelo core/lazy.py, só quando usadas.
+STARTUP_BUDGET_MS = config('STARTUP_BUDGET_MS', default=2500, cast=float)
+STARTUP_BUDGET_RSS_MB = config('STARTUP_BUDGET_RSS_MB', default=160, cast=float)
+
+# Quanto tempo um resultado do simulador fica no cache de resultados — ver
+# simulator/result_cache.py. A chave já muda quando fatores, metas ou realizado
+# mudam; o prazo só limita o que não entra nela.
+SIMULATOR_RESULT_CACHE_SECONDS = config('SIMULATOR_RESULT_CACHE_SECONDS', default=3600, cast=int)
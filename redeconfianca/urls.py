@@ -24,7 +24,9 @@ from rest_framework.routers import DefaultRouter
 from users.views import UserViewSet, SectorViewSet, login_view, logout_view
 from tickets.views import TicketViewSet, CategoryViewSet
 from communications.views import home_feed
+from redeconfianca.serving import current_pool
 import os
+import time
 
 # Router para API REST (com autenticação)
 router = DefaultRouter()
@@ -86,8 +88,30 @@ def onesignal_worker_view(request):
     else:
         raise Http404("OneSignal Service worker not found")
 
+# Verificação de saúde leve (sem sessão, sem banco): healthcheck e teste de carga.
+def healthz_view(request):
+    response = HttpResponse('ok', content_type='text/plain')
+    response['X-Pool'] = current_pool()
+    response['Cache-Control'] = 'no-store'
+    return response
+
+# Resposta que só espera: simula uma importação para o cenário de loadtest_pools.
+def loadtest_slow_view(request):
+    if not getattr(settings, 'LOADTEST_ENDPOINTS_ENABLED', False):
+        raise Http404()
+    try:
+        seconds = min(max(float(request.GET.get('seconds', 10)), 0), 120)
+    except ValueError:
+        seconds = 10
+    time.sleep(seconds)
+    response = HttpResponse('ok', content_type='text/plain')
+    response['X-Pool'] = current_pool()
+    return response
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('healthz/', healthz_view, name='healthz'),
+    path('_loadtest/slow/', loadtest_slow_view, name='loadtest_slow'),
     path('sw.js', service_worker_view, name='service_worker'),  # Service Worker na raiz
     path('OneSignalSDKWorker.js', onesignal_worker_view, name='onesignal_worker'),  # OneSignal Service Worker
     path('', home_feed, name='home'),  # Home feed como página inicial
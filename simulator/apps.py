@@ -5,3 +5,10 @@ class SimulatorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'simulator'
     verbose_name = 'Simulador'
+
+
+    def ready(self):
+        # Fatores de pessoas (lojas do coordenador, sniper, "A parte") mudaram:
+        # os resultados em cache do simulador deixam de valer.
+        from . import result_cache
+        result_cache.connect_signals()
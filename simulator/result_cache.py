@@ -0,0 +1,176 @@
+"""Cache de resultados do simulador por impressão digital das entradas.
+
+O fragmento de resultados de ``simulator_dashboard`` recalculava tudo a cada
+carga: planilhas, fatores, metas do Power BI e realizado do MySQL. Gestores
+alternam entre projeção, realizado e simulador das mesmas pessoas o dia
+inteiro, e quase sempre nada disso mudou entre um clique e outro.
+
+O resultado pronto (simulação, pré-preenchimento e metas diárias) fica no
+cache sob uma chave que junta tudo o que entra no cálculo:
+
+* alvo (id, nome, loja) e papel resolvido;
+* versão dos fatores do papel (``SimulatorFactorSet.updated_at`` e a data da
+  planilha) ou da configuração "A parte";
+* versão da carga de metas do Power BI (id e ``updated_at``);
+* impressão digital do realizado do mês (muda quando os números mudam);
+* geração de configurações de pessoas (lojas do coordenador, sniper), que
+  sobe por signal a cada gravação;
+* dia (dias úteis), modo, níveis de hunter e os valores digitados,
+  normalizados (``"1.000,00"`` e ``"1000"`` dão a mesma chave).
+
+Mudou qualquer um, a chave muda e o cálculo roda de novo. Sem realizado
+(MySQL fora) nada vai para o cache. Acertos e erros por dia aparecem em
+``simulator_admin_factors``.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import SimulatorFactorSet
+from .services import ROLE_APART, get_workbook_path, to_float
+from .sql_realizado import realized_version
+
+KEY_PREFIX = 'simulator_result'
+GENERATION_KEY = 'simulator_result_generation'
+STATS_DAYS = 7
+
+
+def _generation() -> int:
+    return cache.get(GENERATION_KEY) or 0
+
+
+def bump_generation() -> None:
+    """Invalida todos os resultados (configuração de pessoas mudou)."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
+
+
+def normalize_inputs(simulator_inputs: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """Valores digitados como números, sem os campos vazios."""
+    return {
+        key: to_float(value)
+        for key, value in sorted((simulator_inputs or {}).items())
+        if value not in (None, '')
+    }
+
+
+def _factor_version(role: str, target_user) -> str:
+    if role == ROLE_APART:
+        from users.models import AParteCommissionConfig
+        stamp = AParteCommissionConfig.objects.filter(user=target_user).values_list('updated_at', flat=True).first()
+        return f'aparte:{stamp.timestamp() if stamp else 0}'
+    stamp = SimulatorFactorSet.objects.filter(role=role).values_list('updated_at', flat=True).first()
+    try:
+        workbook = os.path.getmtime(get_workbook_path(role))
+    except (OSError, ValueError):
+        workbook = 0
+    return f'{role}:{stamp.timestamp() if stamp else 0}:{workbook}'
+
+
+def _goal_version() -> str:
+    from .services import _latest_goal_upload
+
+    upload = _latest_goal_upload()
+    return f'{upload.id}:{upload.updated_at.timestamp()}' if upload else 'none'
+
+
+def fingerprint(target_user, role: str, view_mode: str, compute_view: str,
+                hunter_levels: Dict[str, int], simulator_inputs: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Chave do resultado, ou ``None`` se ele não deve ir para o cache."""
+    realized = realized_version()
+    if realized is None:
+        return None
+    parts = {
+        'user': [target_user.id, target_user.get_full_name(), target_user.email, target_user.sector_id],
+        'role': role,
+        'factors': _factor_version(role, target_user),
+        'goals': _goal_version(),
+        'realized': realized,
+        'generation': _generation(),
+        'day': timezone.localdate().isoformat(),
+        'view': [view_mode, compute_view],
+        'hunter': sorted((hunter_levels or {}).items()),
+        'inputs': normalize_inputs(simulator_inputs),
+    }
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _count(outcome: str) -> None:
+    key = f'{KEY_PREFIX}:{outcome}:{timezone.localdate().isoformat()}'
+    try:
+        cache.add(key, 0, (STATS_DAYS + 1) * 86400)
+        cache.incr(key)
+    except Exception:
+        pass  # estatística nunca derruba a tela
+
+
+def get_or_compute(key: Optional[str], compute: Callable[[], Any]) -> Any:
+    """Resultado em cache para ``key``; sem ele, calcula e guarda."""
+    if key is None:
+        _count('skips')
+        return compute()
+    cache_key = f'{KEY_PREFIX}:{key}'
+    cached = cache.get(cache_key)
+    if cached is not None:
+        _count('hits')
+        return cached
+    _count('misses')
+    value = compute()
+    cache.set(cache_key, value, settings.SIMULATOR_RESULT_CACHE_SECONDS)
+    return value
+
+
+def stats(days: int = STATS_DAYS) -> Dict[str, Any]:
+    """Acertos, erros e cálculos sem cache por dia (mais recente primeiro)."""
+    today = timezone.localdate()
+    dates = [(today - timedelta(days=offset)).isoformat() for offset in range(days)]
+    keys = [f'{KEY_PREFIX}:{outcome}:{day}' for day in dates for outcome in ('hits', 'misses', 'skips')]
+    values = cache.get_many(keys)
+    rows: List[Dict[str, Any]] = []
+    for day in dates:
+        row = {'day': day}
+        for outcome in ('hits', 'misses', 'skips'):
+            row[outcome] = values.get(f'{KEY_PREFIX}:{outcome}:{day}', 0)
+        lookups = row['hits'] + row['misses']
+        row['hit_rate'] = round(row['hits'] / lookups * 100) if lookups else None
+        rows.append(row)
+    hits = sum(row['hits'] for row in rows)
+    lookups = hits + sum(row['misses'] for row in rows)
+    return {
+        'rows': rows,
+        'hits': hits,
+        'misses': lookups - hits,
+        'skips': sum(row['skips'] for row in rows),
+        'hit_rate': round(hits / lookups * 100) if lookups else None,
+    }
+
+
+def _on_people_config_change(sender, **kwargs):
+    bump_generation()
+
+
+def connect_signals() -> None:
+    from django.db.models.signals import m2m_changed, post_delete, post_save
+
+    from users.models import AParteCommissionConfig
+
+    from .models import CoordinatorStoreAccess, SniperAssignment
+
+    for model in (CoordinatorStoreAccess, SniperAssignment, AParteCommissionConfig):
+        post_save.connect(_on_people_config_change, sender=model,
+                          dispatch_uid=f'simulator-result-save-{model.__name__}')
+        post_delete.connect(_on_people_config_change, sender=model,
+                            dispatch_uid=f'simulator-result-delete-{model.__name__}')
+    m2m_changed.connect(_on_people_config_change, sender=CoordinatorStoreAccess.sectors.through,
+                        dispatch_uid='simulator-result-store-access-sectors')
@@ -1,24 +1,30 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import date, timedelta
 import calendar
 import functools
 import logging
 import os
+import threading
 import unicodedata
 from typing import Any, Dict, List, Optional, Tuple
 
-import pandas as pd
 from django.conf import settings
 from django.core.cache import cache, caches
 from django.db import transaction
 from django.utils import timezone
-from openpyxl import load_workbook
 
 from communications.models import CommunicationGroup
+from core.lazy import lazy_attr, lazy_import
 from users.models import User, Sector
 from .models import SimulatorFactorSet, CoordinatorStoreAccess
 from .sql_realizado import get_realized_sales_from_mysql, get_network_realized_sales_from_mysql
 
+pd = lazy_import('pandas')
+load_workbook = lazy_attr('openpyxl', 'load_workbook')
+
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +68,48 @@ def _ttl_cache(ttl: int):
     return decorator
 
 
+# Durante uma varredura (ver simulator/sweep.py) o mesmo alvo é calculado
+# centenas de vezes mudando só os valores digitados. As leituras abaixo de
+# ``_sweep_memo`` (planilhas, metas do Power BI, loja, dias úteis) não dependem
+# desses valores; dentro de ``sweep_scope`` cada uma roda uma vez só.
+_SWEEP = threading.local()
+
+
+@contextmanager
+def sweep_scope():
+    """Memoriza as leituras que não dependem dos valores do simulador."""
+    previous = getattr(_SWEEP, 'memo', None)
+    _SWEEP.memo = {} if previous is None else previous
+    try:
+        yield
+    finally:
+        _SWEEP.memo = previous
+
+
+def _memo_arg(value):
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return ('id', id(value))  # DataFrame: o mesmo objeto dentro do escopo
+
+
+def _sweep_memo(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        memo = getattr(_SWEEP, 'memo', None)
+        if memo is None:
+            return fn(*args, **kwargs)
+        key = (fn.__name__, tuple(_memo_arg(a) for a in args),
+               tuple(sorted((k, _memo_arg(v)) for k, v in kwargs.items())))
+        if key not in memo:
+            # Guarda os argumentos junto: um DataFrame liberado poderia ter o
+            # id reaproveitado por outro dentro do mesmo escopo.
+            memo[key] = (fn(*args, **kwargs), args, kwargs)
+        return memo[key][0]
+    return wrapper
+
+
 ROLE_CONSULTOR = 'consultor'
 ROLE_GERENTE = 'gerente'
 ROLE_COORDENADOR = 'coordenador'
@@ -542,6 +590,7 @@ def get_factor_set(role: str, updated_by: Optional[User] = None) -> SimulatorFac
     return factor_set
 
 
+@_sweep_memo
 def load_dataframe(role: str, sheet_name: str) -> pd.DataFrame:
     cache_key = f"simulator_df_{role}_{sheet_name}"
     df = cache.get(cache_key)
@@ -551,6 +600,7 @@ def load_dataframe(role: str, sheet_name: str) -> pd.DataFrame:
     return df
 
 
+@_sweep_memo
 def find_row_by_name(df: pd.DataFrame, col: str, name: str) -> Optional[pd.Series]:
     if col not in df.columns:
         return None
@@ -566,6 +616,7 @@ def find_row_by_name(df: pd.DataFrame, col: str, name: str) -> Optional[pd.Serie
     return None
 
 
+@_sweep_memo
 def sumifs(df: pd.DataFrame, sum_col: str, filter_col: str, filter_value: str) -> float:
     if sum_col not in df.columns or filter_col not in df.columns:
         return 0.0
@@ -578,6 +629,7 @@ def sumifs(df: pd.DataFrame, sum_col: str, filter_col: str, filter_value: str) -
     return total
 
 
+@_sweep_memo
 def get_pdvs_of_coord(df: pd.DataFrame, coord_name: str) -> List[str]:
     """Lista PDVs únicos (normalizados) da planilha que pertencem a uma COORDENAÇÃO."""
     if not coord_name or 'COORDENAÇÃO' not in df.columns or 'PDV' not in df.columns:
@@ -807,6 +859,7 @@ def is_sniper_user(user: User) -> bool:
         return False
 
 
+@_sweep_memo
 def get_sniper_coordinator(user: User) -> Optional[User]:
     """Retorna o coordenador atribuído ao sniper (ou None)."""
     from .models import SniperAssignment
@@ -830,6 +883,7 @@ CARTEIRA_COORDINATOR_GROUPS = [
 ]
 
 
+@_sweep_memo
 def get_coordinator_from_carteira_group(user: User) -> str:
     """Resolve o coordenador de um consultor pelos grupos 'CN CARTEIRA <nome>'.
 
@@ -925,6 +979,7 @@ def _br_national_holidays(year: int) -> set:
     }
 
 
+@_sweep_memo
 def get_business_days_info(reference_date: Optional[date] = None) -> Tuple[int, int]:
     """Retorna (dias_uteis_passados_ate_ontem, dias_uteis_totais_no_mes).
 
@@ -1020,6 +1075,7 @@ POWER_BI_PILAR_MAP = {
 }
 
 
+@_sweep_memo
 def get_store_name_from_user(user) -> str:
     """Extrai o nome da loja a partir do setor do usuário.
 
@@ -1050,49 +1106,31 @@ def _latest_goal_upload():
     return GoalUpload.objects.order_by('-year', '-month').first()
 
 
-def _power_bi_goal_maps() -> Dict[str, Dict[str, Dict[str, float]]]:
-    """Índices ``{nome_normalizado: {pilar: meta}}`` da carga mais recente.
-
-    Evita uma varredura de GoalEntry por usuário: telas que calculam muita
-    gente (ex.: médias da rede) fariam centenas de consultas idênticas.
-    A chave inclui ``updated_at``, então reimportar a carga invalida o cache.
-    """
-    from power_bi.models import GoalEntry
+def _simulator_metas(by_pilar) -> Dict[str, float]:
+    """``{pilar_key da carga: meta}`` → ``{pilar do simulador: meta}``."""
+    result: Dict[str, float] = {}
+    for pilar, value in (by_pilar or {}).items():
+        pilar_key = POWER_BI_PILAR_MAP.get(pilar)
+        if pilar_key:
+            result[pilar_key] = result.get(pilar_key, 0.0) + float(value or 0)
+    return result
 
-    upload = _latest_goal_upload()
-    if not upload:
-        return {'cn': {}, 'pdv': {}}
 
-    cache_key = f'simulator_pb_goal_maps_{upload.id}_{upload.updated_at.timestamp()}'
-    cached = cache.get(cache_key)
-    if cached is not None:
-        return cached
+def _power_bi_goal_maps(upload=None) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Metas por pessoa, loja e coordenação da carga (a mais recente, por padrão).
 
-    cn: Dict[str, Dict[str, float]] = {}
-    pdv: Dict[str, Dict[str, float]] = {}
-    for entry in GoalEntry.objects.filter(upload=upload).only(
-        'sheet_type', 'user_name', 'store_name', 'pilar', 'goal_value'
-    ):
-        pilar_key = POWER_BI_PILAR_MAP.get((entry.pilar or '').upper().strip())
-        if not pilar_key:
-            continue
-        if entry.sheet_type == 'METAS_CN_REAL':
-            bucket = cn.setdefault(normalize_text(entry.user_name), {})
-        elif entry.sheet_type == 'META_PDV_REAL':
-            bucket = pdv.setdefault(normalize_text(entry.store_name), {})
-        else:
-            continue
-        try:
-            value = float(entry.goal_value or 0)
-        except (TypeError, ValueError):
-            value = 0.0
-        bucket[pilar_key] = bucket.get(pilar_key, 0.0) + value
+    O índice da carga (power_bi/goal_index.py) soma as metas com um
+    ``GROUP BY`` e fica em memória por versão da carga; reimportar invalida.
+    """
+    from power_bi import goal_index
 
-    maps = {'cn': cn, 'pdv': pdv}
-    cache.set(cache_key, maps, 300)
-    return maps
+    upload = upload or _latest_goal_upload()
+    if not upload:
+        return {'cn': {}, 'pdv': {}, 'coord': {}}
+    return goal_index.goal_maps(upload)
 
 
+@_sweep_memo
 def get_metas_from_power_bi(user_name: str = '', store_name: str = '') -> Dict[str, float]:
     """Devolve metas (chave: pilar do simulador) para o consultor ou para o PDV.
 
@@ -1100,38 +1138,22 @@ def get_metas_from_power_bi(user_name: str = '', store_name: str = '') -> Dict[s
     - Se ``store_name`` for fornecido, busca em META_PDV_REAL.
     - Pilares ausentes ficam em 0.0.
     """
+    from power_bi.goal_index import normalize_text as goal_key
+
     maps = _power_bi_goal_maps()
     if user_name:
-        return dict(maps['cn'].get(normalize_text(user_name), {}))
+        return _simulator_metas(maps['cn'].get(goal_key(user_name)))
     if store_name:
-        return dict(maps['pdv'].get(normalize_text(store_name), {}))
+        return _simulator_metas(maps['pdv'].get(goal_key(store_name)))
     return {}
 
 
+@_sweep_memo
 def get_pdv_metas_for_coordinator(coord_name: str) -> Dict[str, float]:
     """Soma metas de PDV (META_PDV_REAL) para todos os PDVs do coordenador."""
-    from power_bi.models import GoalEntry
+    from power_bi.goal_index import normalize_text as goal_key
 
-    upload = _latest_goal_upload()
-    if not upload:
-        return {}
-
-    target = normalize_text(coord_name)
-    result: Dict[str, float] = {}
-    qs = GoalEntry.objects.filter(upload=upload, sheet_type='META_PDV_REAL')
-    for entry in qs:
-        coord_in_row = normalize_text((entry.row_data or {}).get('COORDENAÇÃO') or '')
-        if coord_in_row != target:
-            continue
-        pilar_key = POWER_BI_PILAR_MAP.get((entry.pilar or '').upper().strip())
-        if not pilar_key:
-            continue
-        try:
-            value = float(entry.goal_value or 0)
-        except (TypeError, ValueError):
-            value = 0.0
-        result[pilar_key] = result.get(pilar_key, 0.0) + value
-    return result
+    return _simulator_metas(_power_bi_goal_maps()['coord'].get(goal_key(coord_name)))
 
 
 def _goal_upload_for(year: Optional[int], month: Optional[int]):
@@ -1151,23 +1173,14 @@ def get_network_metas_from_power_bi(year: Optional[int] = None, month: Optional[
     Usada pelo comissionamento "A parte" (atingimento medido sobre a meta total
     da rede). Fallback para o upload de metas mais recente.
     """
-    from power_bi.models import GoalEntry
-
     upload = _goal_upload_for(year, month)
     if not upload:
         return {}
 
     result: Dict[str, float] = {}
-    qs = GoalEntry.objects.filter(upload=upload, sheet_type='META_PDV_REAL')
-    for entry in qs:
-        pilar_key = POWER_BI_PILAR_MAP.get((entry.pilar or '').upper().strip())
-        if not pilar_key:
-            continue
-        try:
-            value = float(entry.goal_value or 0)
-        except (TypeError, ValueError):
-            value = 0.0
-        result[pilar_key] = result.get(pilar_key, 0.0) + value
+    for by_pilar in _power_bi_goal_maps(upload)['pdv'].values():
+        for pilar_key, value in _simulator_metas(by_pilar).items():
+            result[pilar_key] = result.get(pilar_key, 0.0) + value
     return result
 
 
@@ -1663,6 +1676,18 @@ def compute_consultor_simulation(
     }
 
 
+@_sweep_memo
+def _coordination_of_pdv(df: pd.DataFrame, pdv: str) -> str:
+    """COORDENAÇÃO da primeira linha da planilha com esse PDV."""
+    target_pdv = normalize_text(pdv)
+    for _, row in df.iterrows():
+        if normalize_text(row.get('PDV', '')) == target_pdv:
+            coord_name = str(row.get('COORDENAÇÃO') or '').strip()
+            if coord_name:
+                return coord_name
+    return ''
+
+
 def compute_gerente_simulation(
     user: User,
     factor_data: Dict[str, Any],
@@ -1684,19 +1709,10 @@ def compute_gerente_simulation(
 
     coord_name = ''
     if pdv:
-        target_pdv = normalize_text(pdv)
-        for _, row in realized.iterrows():
-            if normalize_text(row.get('PDV', '')) == target_pdv:
-                coord_name = str(row.get('COORDENAÇÃO') or '').strip()
-                if coord_name:
-                    break
+        coord_name = _coordination_of_pdv(realized, pdv)
         # Fallback: tenta na planilha de PROJEÇÃO se não achou em REALIZADO.
         if not coord_name:
-            for _, row in projection.iterrows():
-                if normalize_text(row.get('PDV', '')) == target_pdv:
-                    coord_name = str(row.get('COORDENAÇÃO') or '').strip()
-                    if coord_name:
-                        break
+            coord_name = _coordination_of_pdv(projection, pdv)
 
     meta_map = {
         'movel': sumifs(realized, 'META_MOVEL', 'PDV', pdv),
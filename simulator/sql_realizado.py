@@ -6,6 +6,8 @@ returns aggregated values per simulator pillar key.
 
 from __future__ import annotations
 
+import hashlib
+import json
 import os
 import threading
 import unicodedata
@@ -246,7 +248,16 @@ def build_realized_maps(year: Optional[int] = None, month: Optional[int] = None)
         except Exception:
             pass
 
-    return {'year': year, 'month': month, 'vendors': vendors, 'pdvs': pdvs, 'ok': True}
+    # Muda só quando os números mudam (o corte é D-1): o cache de resultados
+    # do simulador usa isto na chave, não o horário da leitura.
+    digest = hashlib.sha1(
+        json.dumps([vendors, pdvs], sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()
+    return {'year': year, 'month': month, 'vendors': vendors, 'pdvs': pdvs, 'ok': True, 'digest': digest}
+
+
+def _digest_key(year: int, month: int) -> str:
+    return f'simulator_realized_digest_{year}_{month:02d}'
 
 
 def get_realized_maps(year: Optional[int] = None, month: Optional[int] = None,
@@ -266,9 +277,24 @@ def get_realized_maps(year: Optional[int] = None, month: Optional[int] = None,
     # Falha de conexão não é cacheada: a próxima requisição tenta de novo.
     if maps.get('ok'):
         cache.set(cache_key, maps, ttl)
+        cache.set(_digest_key(year, month), maps['digest'], ttl)
     return maps
 
 
+def realized_version(year: Optional[int] = None, month: Optional[int] = None) -> Optional[str]:
+    """Impressão digital do realizado do mês, sem trazer os mapas do cache.
+
+    ``None`` quando o MySQL está fora: nada calculado assim deve ir para cache.
+    """
+    now = timezone.now()
+    year = year or now.year
+    month = month or now.month
+    digest = cache.get(_digest_key(year, month))
+    if digest is None:
+        digest = get_realized_maps(year, month).get('digest')
+    return digest
+
+
 @contextmanager
 def realized_prefetch(year: Optional[int] = None, month: Optional[int] = None,
                       force_refresh: bool = False):
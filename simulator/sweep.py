@@ -0,0 +1,156 @@
+"""Varredura "e se" do simulador: uma grade de valores em uma chamada.
+
+Para descobrir quanto ganha vendendo 80%, 90% ou 110% da meta de Móvel, o
+gestor reenviava o formulário do Simulador a cada valor — e cada envio
+recarregava planilhas, metas do Power BI e realizado antes do cálculo.
+
+``run_sweep`` calcula a grade inteira (um eixo, ou dois: ex. Móvel × Fixa)
+com o mesmo motor de ``compute_*_simulation``, dentro de um único
+``realized_prefetch`` e de ``sweep_scope``: as leituras que não dependem dos
+valores digitados rodam uma vez, e cada ponto da grade custa só a aritmética
+da comissão. Devolve a superfície (ganho total por ponto) e os pontos de
+virada — onde a taxa do pilar varrido muda de faixa —, tanto os observados na
+grade quanto os limites exatos das tabelas de fatores.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from .services import (
+    ROLE_CONSULTOR,
+    ROLE_COORDENADOR,
+    ROLE_GERENTE,
+    VIEW_REALIZADO,
+    VIEW_SIMULADOR,
+    _PREFILL_DISPLAY_TO_ROW,
+    build_simulador_prefill,
+    compute_consultor_simulation,
+    compute_coordenador_simulation,
+    compute_gerente_simulation,
+    sweep_scope,
+    to_float,
+)
+from .sql_realizado import realized_prefetch
+
+MAX_POINTS = 600
+MAX_STEPS_PER_AXIS = 201
+
+COMPUTE_BY_ROLE = {
+    ROLE_CONSULTOR: compute_consultor_simulation,
+    ROLE_GERENTE: compute_gerente_simulation,
+    ROLE_COORDENADOR: compute_coordenador_simulation,
+}
+
+# Campo varrido por pilar (os mesmos do formulário). Fixa é por quantidade, como a meta.
+SWEEP_FIELDS = {
+    'movel': 'real', 'fixa': 'qty', 'smartphones': 'real', 'eletronicos_a': 'real',
+    'essenciais_a': 'real', 'seguros': 'real', 'sva': 'real',
+}
+
+
+class SweepError(ValueError):
+    """Grade inválida (pilar desconhecido, passo zero, pontos demais)."""
+
+
+def parse_axis(spec: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """``{'pillar', 'from', 'to', 'step'}`` em % da meta → eixo validado."""
+    if not spec:
+        return None
+    pillar = str(spec.get('pillar') or '')
+    if pillar not in SWEEP_FIELDS:
+        raise SweepError(f'Pilar inválido: {pillar or "(vazio)"}')
+    start, stop, step = (to_float(spec.get(k)) for k in ('from', 'to', 'step'))
+    if step <= 0 or stop < start:
+        raise SweepError('Use de ≤ até e passo maior que zero.')
+    count = int(round((stop - start) / step)) + 1
+    if count > MAX_STEPS_PER_AXIS:
+        raise SweepError(f'No máximo {MAX_STEPS_PER_AXIS} valores por eixo.')
+    percents = [round(start + i * step, 6) for i in range(count)]
+    return {'pillar': pillar, 'field': SWEEP_FIELDS[pillar], 'percents': percents}
+
+
+def _row(simulation: Dict[str, Any], pillar: str) -> Dict[str, Any]:
+    key = _PREFILL_DISPLAY_TO_ROW[pillar]
+    return next((r for r in simulation.get('rows', []) if r.get('key') == key), {})
+
+
+def _base_inputs(baseline: Dict[str, Any], target_role: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Valores digitados; na falta deles, o realizado do mês (o mesmo pré-preenchimento do formulário)."""
+    merged: Dict[str, Any] = dict(build_simulador_prefill(baseline, target_role))
+    merged.update({k: v for k, v in inputs.items() if v not in (None, '')})
+    return merged
+
+
+def _rates(row: Dict[str, Any]) -> tuple:
+    return tuple(round(row.get(k) or 0.0, 6) for k in ('commission_rate', 'premium_rate', 'pdv_premium_rate'))
+
+
+def table_thresholds(factor_data: Dict[str, Any], pillar: str) -> List[float]:
+    """Atingimentos (%) em que as tabelas de comissão/premiação do pilar mudam de faixa."""
+    base = _PREFILL_DISPLAY_TO_ROW[pillar]
+    ranges = factor_data.get('ranges', {})
+    found = set()
+    for suffix in ('commission', 'premium_individual'):
+        if base == 'sva':
+            continue  # SVA: taxa fixa e premiação por quantidade, não por atingimento
+        for row in ranges.get(f'{base}_{suffix}', []):
+            if row and row[0] is not None:
+                found.add(round(to_float(row[0]) * 100, 4))
+    return sorted(found)
+
+
+def run_sweep(target_user, target_role: str, factor_data: Dict[str, Any], hunter_levels: Dict[str, int],
+              inputs: Dict[str, Any], x_axis: Dict[str, Any], y_axis: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Ganho total em cada ponto da grade ``x`` (× ``y``), em % da meta de cada pilar."""
+    compute = COMPUTE_BY_ROLE.get(target_role)
+    if compute is None:
+        raise SweepError('A varredura vale para consultor, gerente e coordenador.')
+    points = len(x_axis['percents']) * (len(y_axis['percents']) if y_axis else 1)
+    if points > MAX_POINTS:
+        raise SweepError(f'Grade com {points} pontos; o máximo é {MAX_POINTS}.')
+
+    with realized_prefetch(), sweep_scope():
+        baseline = compute(target_user, factor_data, hunter_levels, view_mode=VIEW_REALIZADO)
+        if baseline.get('error'):
+            raise SweepError(baseline['error'])
+        base = _base_inputs(baseline, target_role, inputs)
+
+        def _meta(axis):
+            # Meta digitada vale sobre a oficial, como no formulário.
+            override = to_float(base.get(f"{axis['pillar']}__meta"))
+            return override or _row(baseline, axis['pillar']).get('meta') or 0.0
+
+        metas = {'x': _meta(x_axis), 'y': _meta(y_axis) if y_axis else None}
+        if not metas['x'] or (y_axis and not metas['y']):
+            raise SweepError('Pilar sem meta: não há % da meta para varrer.')
+
+        surface: List[List[float]] = []
+        jumps: List[Dict[str, Any]] = []
+        for y_percent in (y_axis['percents'] if y_axis else [None]):
+            line: List[float] = []
+            previous = None
+            for x_percent in x_axis['percents']:
+                values = dict(base)
+                values[f"{x_axis['pillar']}__{x_axis['field']}"] = metas['x'] * x_percent / 100
+                if y_axis:
+                    values[f"{y_axis['pillar']}__{y_axis['field']}"] = metas['y'] * y_percent / 100
+                simulation = compute(target_user, factor_data, hunter_levels,
+                                     view_mode=VIEW_SIMULADOR, simulator_inputs=values)
+                line.append(round(simulation['totals']['ganho_total'], 2))
+                rates = _rates(_row(simulation, x_axis['pillar']))
+                if previous is not None and rates != previous[1]:
+                    jumps.append({
+                        'y': y_percent, 'from': previous[0], 'to': x_percent,
+                        'rates_before': previous[1], 'rates_after': rates,
+                    })
+                previous = (x_percent, rates)
+            surface.append(line)
+
+    return {
+        'x': {**x_axis, 'meta': metas['x']},
+        'y': {**y_axis, 'meta': metas['y']} if y_axis else None,
+        'surface': surface,
+        'jumps': jumps,
+        'thresholds': table_thresholds(factor_data, x_axis['pillar']),
+        'baseline_total': round(baseline['totals']['ganho_total'], 2),
+    }
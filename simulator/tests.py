@@ -0,0 +1,131 @@
+from unittest import mock
+
+import pandas
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from users.models import Sector, User
+
+from . import result_cache, sweep, views
+from .models import CoordinatorStoreAccess
+from .services import ROLE_CONSULTOR, VIEW_SIMULADOR, compute_consultor_simulation, get_factor_set
+
+
+# Resultados, contadores e realizado ficam no cache padrão (Redis em
+# produção); os testes não dependem do que estiver configurado.
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'simulator-default'},
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'simulator-local'},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SimulatorResultCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['local'].clear()
+        now = timezone.now()
+        # Realizado do mês já no cache, como o warm_realized_cache deixa.
+        cache.set(f'simulator_realized_maps_{now.year}_{now.month:02d}',
+                  {'year': now.year, 'month': now.month, 'vendors': {}, 'pdvs': {}, 'ok': True, 'digest': 'd1'})
+        cache.set(f'simulator_realized_digest_{now.year}_{now.month:02d}', 'd1')
+        self.sector = Sector.objects.create(name='Loja Centro')
+        self.consultor = User.objects.create_user('consultor', 'consultor@example.com', password='pass123',
+                                                  hierarchy='PADRAO', sector=self.sector, first_name='Ana')
+        self.url = reverse('simulator:dashboard')
+        get_factor_set(ROLE_CONSULTOR)  # o primeiro cálculo do papel cria a linha (e muda a versão)
+
+    def _fragment(self, **params):
+        return self.client.get(self.url, {'fragment': 'results', **params})
+
+    def test_repeated_views_are_served_until_an_input_changes(self):
+        self.client.force_login(self.consultor)
+        with mock.patch.object(views, 'compute_consultor_simulation',
+                               wraps=views.compute_consultor_simulation) as compute:
+            first = self._fragment()
+            again = self._fragment()
+            self.assertEqual(compute.call_count, 1)
+            self.assertEqual(first.context['simulation']['totals'], again.context['simulation']['totals'])
+
+            # Mesmo valor digitado de outro jeito: mesma chave.
+            self._fragment(view='simulador', **{'sim__movel__proj': '1.000,00'})
+            self._fragment(view='simulador', **{'sim__movel__proj': '1000', 'sim__fixa__proj': ''})
+            self.assertEqual(compute.call_count, 2)
+
+            factor_set = get_factor_set(ROLE_CONSULTOR)
+            factor_set.save()
+            self._fragment()
+            self.assertEqual(compute.call_count, 3)
+
+        admin = User.objects.create_user('admin', 'admin@example.com', password='pass123', hierarchy='SUPERADMIN')
+        self.client.force_login(admin)
+        stats = self.client.get(reverse('simulator:admin_factors')).context['result_cache_stats']
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (2, 3, 40))
+
+    def test_people_config_and_realized_changes_invalidate(self):
+        key = lambda: result_cache.fingerprint(self.consultor, ROLE_CONSULTOR, 'projecao', 'projecao', {}, {})
+        before = key()
+        self.assertEqual(before, key())
+
+        coordenador = User.objects.create_user('coord', 'coord@example.com', password='pass123')
+        access = CoordinatorStoreAccess.objects.create(coordinator=coordenador)
+        after_access = key()
+        self.assertNotEqual(before, after_access)
+        access.sectors.add(self.sector)
+        self.assertNotEqual(after_access, key())
+
+        now = timezone.now()
+        cache.delete(f'simulator_realized_digest_{now.year}_{now.month:02d}')
+        cache.delete(f'simulator_realized_maps_{now.year}_{now.month:02d}')
+        with mock.patch('simulator.sql_realizado.build_realized_maps', return_value={'ok': False}):
+            self.assertIsNone(key())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SimulatorSweepTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        cache.set(f'simulator_realized_maps_{now.year}_{now.month:02d}',
+                  {'year': now.year, 'month': now.month, 'vendors': {}, 'pdvs': {}, 'ok': True, 'digest': 'd1'})
+        self.sector = Sector.objects.create(name='Loja Centro')
+        self.consultor = User.objects.create_user('consultor', 'consultor@example.com', password='pass123',
+                                                  hierarchy='PADRAO', sector=self.sector, first_name='Ana')
+        self.url = reverse('simulator:sweep')
+        self.params = {'x_pillar': 'movel', 'x_from': '50', 'x_to': '150', 'x_step': '5',
+                       'sim__movel__meta': '10000'}
+
+    def test_grid_matches_single_simulations_and_reads_workbooks_once(self):
+        self.client.force_login(self.consultor)
+        with mock.patch.object(pandas, 'read_excel', wraps=pandas.read_excel) as read_excel:
+            data = self.client.get(self.url, self.params).json()
+        self.assertEqual(len(data['x']['percents']), 21)
+        self.assertEqual(data['x']['meta'], 10000)
+        self.assertLessEqual(read_excel.call_count, 2)  # planilha do papel, uma vez por aba
+
+        # Cada ponto é o mesmo cálculo do Simulador, só que sem reler nada.
+        factor_data = get_factor_set(ROLE_CONSULTOR).data
+        for percent in (50, 100, 150):
+            single = compute_consultor_simulation(
+                self.consultor, factor_data, {}, view_mode=VIEW_SIMULADOR,
+                simulator_inputs={'movel__meta': '10000', 'movel__real': 100 * percent})
+            index = data['x']['percents'].index(percent)
+            self.assertEqual(data['surface'][0][index], round(single['totals']['ganho_total'], 2))
+
+        # Os pontos de virada caem nos limites das tabelas de Móvel.
+        self.assertTrue(data['jumps'])
+        for jump in data['jumps']:
+            self.assertTrue(any(jump['from'] < t <= jump['to'] for t in data['thresholds']), jump)
+
+    def test_rejects_other_sectors_and_oversized_grids(self):
+        outro = User.objects.create_user('outro', 'outro@example.com', password='pass123', hierarchy='PADRAO',
+                                         sector=Sector.objects.create(name='Loja Norte'))
+        self.client.force_login(outro)
+        self.assertEqual(self.client.get(self.url, {**self.params, 'user_id': self.consultor.id}).status_code, 403)
+        response = self.client.get(self.url, {**self.params, 'x_step': '0.01'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('por eixo', response.json()['error'])
+        self.assertEqual(sweep.parse_axis({'pillar': 'fixa', 'from': 90, 'to': 110, 'step': 10})['percents'],
+                         [90, 100, 110])
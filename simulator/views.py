@@ -1,5 +1,6 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
 from users.models import Sector, User
@@ -38,6 +39,7 @@ from .services import (
     build_simulador_prefill,
     build_simulador_metas,
 )
+from . import result_cache, sweep
 from .sql_realizado import realized_prefetch
 
 
@@ -248,18 +250,19 @@ def simulator_dashboard(request):
         }
         return render(request, 'simulator/dashboard.html', context)
 
-    # FRAGMENTO: calcula dentro do prefetch (colapsa as chamadas MySQL
-    # redundantes e cacheia o mês inteiro por 15 min).
-    simulation = None
-    prefill = None
-    daily_metas = {}
+    # FRAGMENTO: serve do cache de resultados quando nada que entra no
+    # cálculo mudou (ver result_cache.py); senão calcula dentro do prefetch
+    # (colapsa as chamadas MySQL redundantes e cacheia o mês inteiro por 15 min).
     standard_role = target_role in (ROLE_CONSULTOR, ROLE_GERENTE, ROLE_COORDENADOR)
     # 1ª entrada no Simulador (sem valores digitados): calcula o REALIZADO — ele
     # serve tanto para exibir quanto para pré-preencher os campos (editáveis).
     first_sim_load = view_mode == VIEW_SIMULADOR and not simulator_inputs and standard_role
     compute_view = VIEW_REALIZADO if first_sim_load else view_mode
 
-    if has_target:
+    def _compute():
+        simulation = None
+        prefill = None
+        daily_metas = {}
         with realized_prefetch():
             if target_role == ROLE_APART:
                 from users.models import AParteCommissionConfig
@@ -290,6 +293,13 @@ def simulator_dashboard(request):
             daily_metas = build_simulador_metas(simulation)
             if first_sim_load:
                 prefill = build_simulador_prefill(simulation, target_role)
+        return simulation, prefill, daily_metas
+
+    simulation, prefill, daily_metas = None, None, {}
+    if has_target:
+        key = result_cache.fingerprint(target_user, target_role, view_mode, compute_view,
+                                       hunter_levels, simulator_inputs)
+        simulation, prefill, daily_metas = result_cache.get_or_compute(key, _compute)
 
     context = {
         'role': role,
@@ -306,6 +316,57 @@ def simulator_dashboard(request):
     return render(request, 'simulator/_results.html', context)
 
 
+@login_required
+def simulator_sweep(request):
+    """Varredura "e se" em JSON: ganho total numa grade de % da meta (ver sweep.py).
+
+    GET: ``user_id`` (opcional), ``x_pillar``/``x_from``/``x_to``/``x_step`` e,
+    para a grade 2D, ``y_*``; ``sim__<pilar>__<campo>`` fixa os demais valores e
+    os seletores de Hunter valem como no dashboard. Mesmas regras de alvo do
+    dashboard; A parte não tem tabelas de faixa e fica de fora.
+    """
+    current_user = request.user
+    role = get_user_role(current_user)
+    target_user = current_user
+    target_user_id = request.GET.get('user_id')
+    if target_user_id:
+        target_user = get_object_or_404(User, id=target_user_id, is_active=True)
+
+    if role == ROLE_SUPERADMIN:
+        allowed = True
+        target_role = ROLE_COORDENADOR if is_sniper_user(target_user) else get_user_role(target_user)
+    elif role == ROLE_COORDENADOR:
+        allowed = target_user.id == current_user.id or target_user.sector in get_coordinator_sectors(current_user)
+        target_role = ROLE_COORDENADOR if target_user.id == current_user.id else get_user_role(target_user)
+    elif role in (ROLE_GERENTE, ROLE_CONSULTOR):
+        allowed = target_user.sector == current_user.sector
+        target_role = get_user_role(target_user) if role == ROLE_GERENTE else ROLE_CONSULTOR
+    else:
+        allowed, target_role = target_user.id == current_user.id, role
+    if not allowed:
+        return JsonResponse({'error': 'Este usuário não pertence às suas lojas.'}, status=403)
+    if target_role not in sweep.COMPUTE_BY_ROLE:
+        return JsonResponse({'error': 'A varredura vale para consultor, gerente e coordenador.'}, status=400)
+
+    def _axis(prefix):
+        if not request.GET.get(f'{prefix}_pillar'):
+            return None
+        return sweep.parse_axis({k: request.GET.get(f'{prefix}_{k}') for k in ('pillar', 'from', 'to', 'step')})
+
+    inputs = {key[len('sim__'):]: request.GET.get(key) for key in request.GET if key.startswith('sim__')}
+    try:
+        x_axis = _axis('x')
+        if x_axis is None:
+            raise sweep.SweepError('Informe o pilar a varrer (x_pillar).')
+        result = sweep.run_sweep(
+            target_user, target_role, get_factor_set(target_role).data,
+            get_hunter_levels_from_request(request), inputs, x_axis, _axis('y'),
+        )
+    except sweep.SweepError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(result)
+
+
 @login_required
 def simulator_admin_factors(request):
     if not is_superadmin(request.user):
@@ -327,6 +388,7 @@ def simulator_admin_factors(request):
         'factor_sets': factor_sets,
         'range_specs': FACTOR_RANGE_SPECS,
         'meta_specs': DEFAULT_META_BY_ROLE,
+        'result_cache_stats': result_cache.stats(),
     }
     return render(request, 'simulator/admin_factors.html', context)
 
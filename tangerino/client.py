@@ -10,14 +10,21 @@ caiu**. Toda função de leitura devolve um valor neutro em caso de falha e
 registra no log. Só as ações de escrita (bater ponto) propagam o erro, porque
 aí o usuário precisa saber que não foi registrado.
 """
+import hashlib
 import logging
+import re
+import threading
+import time as _time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, time, timedelta
 from datetime import timezone as dt_timezone
 
 import requests
 from django.conf import settings
-from django.core.cache import cache
+from django.core.cache import cache, caches
 from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +34,20 @@ PUNCH_BASE = 'https://api.tangerino.com.br/api/punch'
 TIMEOUT = (5, 25)          # (conexão, leitura) em segundos
 MOTIVO_FERIAS_ID = 1       # "FÉRIAS" em /adjustment-reason/find-all
 
+# Páginas buscadas em paralelo depois que a primeira diz quantas são. O
+# Tangerino devolve 429 se apertar demais; seis conexões ficaram abaixo disso.
+PAGINAS_EM_PARALELO = 6
+# Só leituras são repetidas: repetir um POST de marcação poderia bater o ponto
+# duas vezes. Timeout de leitura não é repetido (read=0): o middleware de
+# bloqueio chama o cliente no caminho da requisição, e quatro leituras de 25 s
+# prenderiam o worker por quase dois minutos. Repete-se só falha de conexão e
+# 429/5xx.
+RETENTATIVAS = Retry(
+    total=3, read=0, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset({'GET'}), respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
 
 class TangerinoError(Exception):
     """Falha ao falar com a API do Tangerino."""
@@ -50,25 +71,116 @@ def _headers():
     return {'Authorization': token, 'Content-Type': 'application/json'}
 
 
+_sessao = None
+_sessao_lock = threading.Lock()
+
+
+def _session():
+    """Sessão HTTP compartilhada pelo processo: reaproveita a conexão TLS
+    (antes cada página pagava um handshake novo) e repete leituras que
+    voltam 429/5xx, respeitando o ``Retry-After``."""
+    global _sessao
+    if _sessao is None:
+        with _sessao_lock:
+            if _sessao is None:
+                sessao = requests.Session()
+                adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=PAGINAS_EM_PARALELO * 2,
+                                        max_retries=RETENTATIVAS)
+                sessao.mount('https://', adaptador)
+                sessao.mount('http://', adaptador)
+                _sessao = sessao
+    return _sessao
+
+
+# ─── Métricas por endpoint ───────────────────────────────────────────────────
+# Ficam na memória do processo; a tela de configuração e o comando de sync
+# mostram o resumo. Ids no caminho viram {id} para agrupar o mesmo endpoint.
+
+_metricas = {}
+_metricas_lock = threading.Lock()
+_ID_NO_CAMINHO = re.compile(r'/\d+(?=/|$)')
+
+
+def _registrar_metrica(metodo, caminho, segundos, erro=False, nao_modificado=False):
+    chave = f"{metodo} {_ID_NO_CAMINHO.sub('/{id}', caminho)}"
+    with _metricas_lock:
+        m = _metricas.setdefault(chave, {'chamadas': 0, 'erros': 0, 'nao_modificado': 0,
+                                         'total_ms': 0.0, 'max_ms': 0.0})
+        ms = segundos * 1000
+        m['chamadas'] += 1
+        m['erros'] += int(erro)
+        m['nao_modificado'] += int(nao_modificado)
+        m['total_ms'] += ms
+        m['max_ms'] = max(m['max_ms'], ms)
+
+
+def metricas():
+    """{endpoint: chamadas, erros, 304, média e máximo em ms} deste processo."""
+    with _metricas_lock:
+        return {
+            chave: {**m, 'media_ms': round(m['total_ms'] / m['chamadas'], 1) if m['chamadas'] else 0.0,
+                    'total_ms': round(m['total_ms'], 1), 'max_ms': round(m['max_ms'], 1)}
+            for chave, m in sorted(_metricas.items())
+        }
+
+
+def zerar_metricas():
+    with _metricas_lock:
+        _metricas.clear()
+
+
+# ─── ETag ────────────────────────────────────────────────────────────────────
+# Quando o endpoint devolve ETag, a resposta fica guardada na memória do
+# processo e a próxima leitura vai com If-None-Match: um 304 não traz corpo.
+
+ETAG_TTL = 60 * 60
+
+
+def _chave_etag(url, params):
+    bruto = url + '?' + '&'.join(f'{k}={params[k]}' for k in sorted(params or {}))
+    return 'tangerino:etag:' + hashlib.sha1(bruto.encode('utf-8')).hexdigest()
+
+
 def _request(metodo, base, caminho, **kwargs):
     if not integracao_ativa():
         raise TangerinoDesligado('Integração com o Tangerino está desligada.')
     url = f"{base}{caminho}"
+    headers = _headers()
+
+    guardado = chave_etag = None
+    if metodo == 'GET':
+        chave_etag = _chave_etag(url, kwargs.get('params'))
+        guardado = caches['local'].get(chave_etag)
+        if guardado:
+            headers['If-None-Match'] = guardado[0]
+
+    inicio = _time.monotonic()
     try:
-        resp = requests.request(metodo, url, headers=_headers(), timeout=TIMEOUT, **kwargs)
+        resp = _session().request(metodo, url, headers=headers, timeout=TIMEOUT, **kwargs)
     except requests.RequestException as exc:
+        _registrar_metrica(metodo, caminho, _time.monotonic() - inicio, erro=True)
         raise TangerinoError(f'Não foi possível falar com o Tangerino: {exc}') from exc
 
+    nao_modificado = resp.status_code == 304 and guardado is not None
+    _registrar_metrica(metodo, caminho, _time.monotonic() - inicio,
+                       erro=resp.status_code >= 400, nao_modificado=nao_modificado)
+    if nao_modificado:
+        return guardado[1]
     if resp.status_code >= 400:
         raise TangerinoError(f'Tangerino respondeu {resp.status_code} em {caminho}: '
                              f'{resp.text[:300]}')
     if not resp.content:
         return None
     try:
-        return resp.json()
+        dados = resp.json()
     except ValueError as exc:
         raise TangerinoError(f'Resposta inválida do Tangerino em {caminho}.') from exc
 
+    etag = resp.headers.get('ETag')
+    if chave_etag and etag:
+        caches['local'].set(chave_etag, (etag, dados), ETAG_TTL)
+    return dados
+
 
 def _get(base, caminho, params=None):
     return _request('GET', base, caminho, params=params or {})
@@ -78,17 +190,36 @@ def _post(base, caminho, corpo):
     return _request('POST', base, caminho, json=corpo)
 
 
+class Paginas(list):
+    """Itens de um endpoint paginado. ``completo`` é falso quando o limite de
+    páginas cortou a lista — quem apaga "o que não veio" precisa saber disso."""
+
+    completo = True
+
+
 def _paginar(base, caminho, params=None, tamanho=200, limite_paginas=40):
-    """Percorre um endpoint paginado (padrão Spring: content/totalPages)."""
+    """Percorre um endpoint paginado (padrão Spring: content/totalPages).
+
+    A primeira página diz quantas são; as demais vêm em paralelo, até
+    ``PAGINAS_EM_PARALELO`` de cada vez, e são juntadas na ordem das páginas.
+    """
     params = dict(params or {})
-    itens, pagina = [], 0
-    while pagina < limite_paginas:
-        params.update({'page': pagina, 'size': tamanho})
-        dados = _get(base, caminho, params) or {}
-        itens.extend(dados.get('content') or [])
-        if dados.get('last') is True or pagina + 1 >= (dados.get('totalPages') or 1):
-            break
-        pagina += 1
+
+    def pagina(numero):
+        return _get(base, caminho, {**params, 'page': numero, 'size': tamanho}) or {}
+
+    primeira = pagina(0)
+    itens = Paginas(primeira.get('content') or [])
+    if primeira.get('last') is True:
+        return itens
+
+    total_paginas = primeira.get('totalPages') or 1
+    itens.completo = total_paginas <= limite_paginas
+    restantes = range(1, min(total_paginas, limite_paginas))
+    if restantes:
+        with ThreadPoolExecutor(max_workers=min(PAGINAS_EM_PARALELO, len(restantes))) as pool:
+            for dados in pool.map(pagina, restantes):
+                itens.extend(dados.get('content') or [])
     return itens
 
 
@@ -246,7 +377,7 @@ def enviar_foto(foto_base64):
 
     token = getattr(settings, 'TANGERINO_TOKEN', '')
     try:
-        resp = requests.post(
+        resp = _session().post(
             f'{PUNCH_BASE}/upload-pic-files',
             headers={'Authorization': token, 'Content-Type': 'text/plain;charset=UTF-8'},
             data=conteudo.encode('utf-8'), timeout=TIMEOUT)
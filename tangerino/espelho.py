@@ -0,0 +1,262 @@
+"""Espelho local do Tangerino para os bloqueios de navegação.
+
+Os bloqueios de férias e de jornada rodam em toda página. Sem espelho, cada
+decisão que não estava no cache de um minuto virava chamadas à API
+(``listar_marcacoes`` do dia, dos últimos 30 dias e ``listar_ferias``), com
+paginação de até 40 páginas — o portal ficava tão rápido quanto o Tangerino.
+
+Aqui as respostas saem do que ``tangerino.sync`` já grava no banco:
+
+* **Marcações**: ``sincronizar_espelho`` (cron de poucos minutos, via
+  ``sync_tangerino --espelho``) traz só a janela que muda — ontem e hoje. A
+  marcação feita pelo portal entra na hora no espelho (``registrar_no_espelho``),
+  sem esperar a próxima rodada.
+* **Férias**: índice em memória do processo, {funcionário: intervalos
+  aprovados}, refeito só quando a sincronização grava uma versão nova.
+
+O espelho só é usado enquanto está **em dia**: se a última sincronização bem
+sucedida for mais velha que ``*_IDADE_MAXIMA``, tudo volta a ir à API como
+antes. Um cron parado nunca deixa o portal decidindo com dado velho.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_right
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .client import TangerinoError, para_millis
+
+logger = logging.getLogger(__name__)
+
+CHAVE_PONTO = 'tangerino:espelho:ponto'
+CHAVE_FERIAS = 'tangerino:espelho:ferias'
+
+# Com o cron a cada 2 minutos, 10 minutos são quatro rodadas perdidas seguidas.
+PONTO_IDADE_MAXIMA = 10 * 60
+# Férias mudam pouco e não passam pelo portal; meia hora entre rodadas basta.
+FERIAS_IDADE_MAXIMA = 2 * 60 * 60
+FERIAS_INTERVALO_SYNC = 30 * 60
+
+# O Redis é remoto: a versão do espelho é relida no máximo a cada 30 s por processo.
+RELER_VERSAO_SEGUNDOS = 30
+
+DIAS_PENDENCIA = 30
+
+
+# ─── Versões (quando cada parte foi sincronizada) ────────────────────────────
+
+class _Versao:
+    """Instante da última sincronização, relido do cache compartilhado aos poucos."""
+
+    def __init__(self, chave):
+        self.chave = chave
+        self.valor = None
+        self.lido_em = 0.0
+        self.lock = threading.Lock()
+
+    def atual(self):
+        agora = time.monotonic()
+        if agora - self.lido_em > RELER_VERSAO_SEGUNDOS:
+            with self.lock:
+                try:
+                    self.valor = cache.get(self.chave)
+                except Exception:                      # cache fora: espelho "velho"
+                    self.valor = None
+                self.lido_em = agora
+        return self.valor
+
+    def marcar(self, instante):
+        cache.set(self.chave, instante, None)
+        with self.lock:
+            self.valor, self.lido_em = instante, time.monotonic()
+
+    def esquecer(self):
+        with self.lock:
+            self.lido_em = 0.0
+
+
+_versao_ponto = _Versao(CHAVE_PONTO)
+_versao_ferias = _Versao(CHAVE_FERIAS)
+
+
+def _em_dia(versao, idade_maxima):
+    instante = versao.atual()
+    return bool(instante) and time.time() - instante < idade_maxima
+
+
+def ponto_em_dia():
+    return _em_dia(_versao_ponto, PONTO_IDADE_MAXIMA)
+
+
+def ferias_em_dia():
+    return _em_dia(_versao_ferias, FERIAS_IDADE_MAXIMA)
+
+
+# ─── Sincronização incremental ───────────────────────────────────────────────
+
+def sincronizar_espelho(dias=1, forcar_ferias=False):
+    """Rodada curta do espelho: marcações de ontem e hoje; férias de tempos em tempos.
+
+    Não recalcula o previsto do histórico nem o saldo — isso continua na
+    sincronização completa (``sync_tangerino --dados``).
+    """
+    from .sync import sincronizar_ferias, sincronizar_marcacoes
+
+    resultado = {'ponto': sincronizar_marcacoes(dias=dias, recalcular=False)}
+    _versao_ponto.marcar(time.time())
+
+    ultima_ferias = _versao_ferias.atual()
+    if forcar_ferias or not ultima_ferias or time.time() - ultima_ferias > FERIAS_INTERVALO_SYNC:
+        resultado['ferias'] = sincronizar_ferias()
+    return resultado
+
+
+def marcar_ferias_sincronizadas():
+    """Chamado por ``sincronizar_ferias``: publica a versão nova do índice."""
+    _versao_ferias.marcar(time.time())
+
+
+def atualizar_funcionario(employee_id):
+    """Relê a janela de pendências de UMA pessoa na API (ela diz que acertou o ponto).
+
+    Não só hoje e ontem: um ponto esquecido de dias atrás, corrigido no
+    Tangerino, só destrava a pessoa se a linha antiga for relida. Para um
+    funcionário, 30 dias ainda são poucas páginas.
+    """
+    from .sync import sincronizar_marcacoes
+    try:
+        sincronizar_marcacoes(dias=DIAS_PENDENCIA, employee_id=employee_id, recalcular=False)
+    except TangerinoError as exc:
+        logger.warning('Não deu para atualizar o espelho de %s: %s', employee_id, exc)
+
+
+# ─── Marcações a partir do banco ─────────────────────────────────────────────
+
+def _pares_da_linha(linha):
+    """Linha de MarcacaoPonto -> pares no formato da API (dateIn/dateOut em ms)."""
+    ids = linha.tangerino_ids or []
+    pares = []
+    for i in (1, 2, 3):
+        entrada, saida = getattr(linha, f'entrada{i}'), getattr(linha, f'saida{i}')
+        if not entrada:
+            continue
+        pares.append({
+            'id': ids[i - 1] if i <= len(ids) else None,
+            'employeeId': linha.employee_id,
+            'dateIn': para_millis(entrada),
+            'dateOut': para_millis(saida) if saida else None,
+        })
+    return pares
+
+
+def pares_do_funcionario(employee_id, dia=None):
+    """Pares do dia e os pontos em aberto dos últimos 30 dias, numa consulta.
+
+    É o que ``ponto.status_do_dia`` e ``ponto.pendencias`` precisam.
+    """
+    from django.db.models import Q
+
+    from .models import MarcacaoPonto
+
+    dia = dia or timezone.localdate()
+    inicio = timezone.localdate() - timedelta(days=DIAS_PENDENCIA)
+    linhas = MarcacaoPonto.objects.filter(employee_id=employee_id).filter(
+        Q(data=dia) | Q(em_aberto=True, data__gte=inicio)
+    )
+    pares = []
+    for linha in linhas:
+        pares.extend(_pares_da_linha(linha))
+    return pares
+
+
+def registrar_no_espelho(usuario, momento):
+    """Aplica no espelho, na hora, uma marcação que o portal acabou de enviar.
+
+    Fecha o par aberto anterior à marcação ou abre um novo. A próxima rodada
+    do espelho substitui a linha pelo que o Tangerino gravou de fato.
+    """
+    from .models import MarcacaoPonto
+
+    eid = getattr(usuario, 'tangerino_employee_id', None)
+    if not eid:
+        return
+    momento = timezone.localtime(momento)
+    linha = MarcacaoPonto.objects.filter(employee_id=eid, data=momento.date()).first()
+    if linha is None:
+        linha = MarcacaoPonto(employee_id=eid, usuario=usuario, data=momento.date(),
+                              nome=(usuario.get_full_name() or '')[:200],
+                              sincronizado_em=timezone.now())
+
+    pares = [[getattr(linha, f'entrada{i}'), getattr(linha, f'saida{i}')]
+             for i in (1, 2, 3) if getattr(linha, f'entrada{i}')]
+    aberto = next((p for p in reversed(pares) if p[1] is None and p[0] <= momento), None)
+    if aberto:
+        aberto[1] = momento
+    else:
+        pares.append([momento, None])
+        pares.sort(key=lambda p: p[0])
+
+    for i in (1, 2, 3):
+        entrada, saida = pares[i - 1] if i <= len(pares) else (None, None)
+        setattr(linha, f'entrada{i}', entrada)
+        setattr(linha, f'saida{i}', saida)
+    for entrada, saida in pares[3:]:
+        linha.marcacoes_extras = list(linha.marcacoes_extras or []) + [
+            d.strftime('%H:%M') for d in (entrada, saida) if d]
+    linha.em_aberto = any(saida is None for _, saida in pares)
+    linha.total_segundos = sum(max(0, int((saida - entrada).total_seconds()))
+                               for entrada, saida in pares if saida)
+    linha.save()
+
+
+# ─── Índice de férias ────────────────────────────────────────────────────────
+
+class _IndiceFerias:
+    """{funcionário: (inícios ordenados, lançamentos)} das férias aprovadas."""
+
+    def __init__(self):
+        self.versao = None
+        self.por_funcionario = {}
+        self.lock = threading.Lock()
+
+    def _montar(self):
+        from .models import FeriasLancamento
+
+        por_funcionario = {}
+        for lanc in FeriasLancamento.objects.filter(status__iexact='APROVADO').order_by('inicio'):
+            por_funcionario.setdefault(lanc.employee_id, []).append({
+                'id': lanc.tangerino_id,
+                'employee_id': lanc.employee_id,
+                'nome': lanc.nome,
+                'inicio': lanc.inicio,
+                'fim': lanc.fim,
+                'status': lanc.status.upper(),
+                'observacao': lanc.observacao,
+                'origem': lanc.origem,
+            })
+        return {eid: ([l['inicio'] for l in lista], lista) for eid, lista in por_funcionario.items()}
+
+    def em_curso(self, employee_id, dia):
+        versao = _versao_ferias.atual()
+        if versao != self.versao:
+            with self.lock:
+                if versao != self.versao:
+                    self.por_funcionario = self._montar()
+                    self.versao = versao
+        inicios, lancamentos = self.por_funcionario.get(employee_id, ((), ()))
+        # Intervalos que começaram até o dia; confere do mais recente para trás.
+        for lanc in reversed(lancamentos[:bisect_right(inicios, dia)]):
+            if lanc['fim'] >= dia:
+                return lanc
+        return None
+
+
+_indice_ferias = _IndiceFerias()
+
+
+def ferias_em_curso(employee_id, dia=None):
+    """Lançamento de férias aprovado em curso no dia, lido do índice local."""
+    return _indice_ferias.em_curso(employee_id, dia or timezone.localdate())
@@ -212,12 +212,20 @@ def esta_de_ferias(usuario, hoje=None):
 
     Conservador de propósito: qualquer falha de leitura devolve None (libera o
     portal). Ninguém fica trancado do lado de fora por instabilidade da API.
+
+    Com o espelho de férias em dia, a resposta sai do índice em memória
+    (espelho.py) e a API nem é consultada.
     """
+    from . import espelho
+
     eid = getattr(usuario, 'tangerino_employee_id', None)
     if not eid:
         return None
     hoje = hoje or timezone.localdate()
 
+    if espelho.ferias_em_dia():
+        return espelho.ferias_em_curso(eid, hoje)
+
     chave = f'tangerino:de-ferias:{eid}:{hoje}'
     guardado = caches['local'].get(chave)
     if guardado is not None:
@@ -4,6 +4,7 @@ Uso:
     python manage.py sync_tangerino            # só quem ainda não tem vínculo
     python manage.py sync_tangerino --revincular   # refaz todos
     python manage.py sync_tangerino --simular      # mostra sem gravar
+    python manage.py sync_tangerino --espelho      # rodada curta do espelho (cron de 2 min)
 """
 from django.core.management.base import BaseCommand
 
@@ -24,6 +25,9 @@ class Command(BaseCommand):
                             help='Sincroniza marcações e férias para as tabelas locais.')
         parser.add_argument('--dias', type=int, default=30,
                             help='Janela de dias de ponto para trás (padrão: 30).')
+        parser.add_argument('--espelho', action='store_true',
+                            help='Atualiza só ontem e hoje (e as férias, se velhas) '
+                                 'para os bloqueios lerem do banco.')
 
     def handle(self, *args, **opcoes):
         if not integracao_ativa():
@@ -31,8 +35,13 @@ class Command(BaseCommand):
                 'Integração desligada: configure TANGERINO_TOKEN e TANGERINO_ENABLED.'))
             return
 
-        if opcoes['dados']:
-            self._sincronizar_dados(opcoes['dias'])
+        if opcoes['dados'] or opcoes['espelho']:
+            if opcoes['dados']:
+                self._sincronizar_dados(opcoes['dias'])
+            else:
+                self._sincronizar_espelho()
+            if opcoes['verbosity'] >= 2:
+                self._mostrar_metricas()
             return
 
         try:
@@ -85,3 +94,26 @@ class Command(BaseCommand):
                 registro.detalhe = str(exc)[:2000]
                 registro.save()
                 self.stderr.write(self.style.ERROR(f'{rotulo}: {exc}'))
+
+    def _sincronizar_espelho(self):
+        """Rodada curta e frequente; não grava SincronizacaoTangerino (seria uma
+        linha a cada dois minutos) — a falha fica no log e o espelho envelhece."""
+        from tangerino.espelho import sincronizar_espelho
+
+        try:
+            resultado = sincronizar_espelho()
+        except TangerinoError as exc:
+            self.stderr.write(self.style.ERROR(f'Espelho: {exc}'))
+            return
+        ponto = resultado['ponto']
+        self.stdout.write(self.style.SUCCESS(
+            f"Espelho: {ponto['lidos']} pares lidos, {ponto['dias']} dias gravados"
+            + (f", férias: {resultado['ferias']['lidos']} lançamentos" if 'ferias' in resultado else '')
+            + '.'))
+
+    def _mostrar_metricas(self):
+        from tangerino.client import metricas
+
+        for endpoint, m in metricas().items():
+            self.stdout.write(f"  {endpoint}: {m['chamadas']} chamadas, média {m['media_ms']} ms, "
+                              f"máx. {m['max_ms']} ms, {m['nao_modificado']} × 304, {m['erros']} erros")
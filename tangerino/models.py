@@ -96,6 +96,8 @@ class ConfiguracaoTangerino(models.Model):
     def save(self, *args, **kwargs):
         self.pk = 1                       # singleton
         super().save(*args, **kwargs)
+        from core.polling import bump
+        bump('ponto')
 
     @classmethod
     def get(cls):
@@ -145,12 +145,20 @@ def pendencias(employee_id, dias=DIAS_PARA_TRAS_PENDENCIA, pares=None):
 
 def resumo_para_usuario(usuario, dia=None):
     """Payload do widget da home. Nunca levanta exceção: se o Tangerino falhar,
-    devolve ``disponivel=False`` e a home segue normalmente."""
-    if not getattr(usuario, 'tangerino_employee_id', None):
+    devolve ``disponivel=False`` e a home segue normalmente.
+
+    Com o espelho em dia (ver espelho.py) tudo sai do banco, sem chamar a API.
+    """
+    from . import espelho
+
+    eid = getattr(usuario, 'tangerino_employee_id', None)
+    if not eid:
         return {'disponivel': False, 'motivo': 'sem_vinculo'}
     try:
-        status = status_do_dia(usuario.tangerino_employee_id, dia=dia)
-        status['pendencias'] = pendencias(usuario.tangerino_employee_id)
+        pares = espelho.pares_do_funcionario(eid, dia) if espelho.ponto_em_dia() else None
+        status = status_do_dia(eid, dia=dia, pares=pares)
+        status['pendencias'] = pendencias(eid, pares=pares)
+        status['fonte'] = 'espelho' if pares is not None else 'api'
         status['disponivel'] = True
         return status
     except TangerinoError as exc:
@@ -21,6 +21,9 @@ from django.contrib.auth import get_user_model
 from django.db.models import Max, Min, Sum
 from django.utils import timezone
 
+from core.polling import bump
+
+from . import espelho
 from . import jornada as jornada_svc
 from .client import (MOTIVO_FERIAS_ID, de_millis, listar_ferias, listar_funcionarios,
                      listar_marcacoes, listar_saldo_horas)
@@ -214,12 +217,15 @@ def _grades_por_funcionario():
     return grades
 
 
-def sincronizar_marcacoes(dias=30, employee_id=None):
+def sincronizar_marcacoes(dias=30, employee_id=None, recalcular=True):
     """Traz as marcações dos últimos N dias para a tabela MarcacaoPonto.
 
     A janela padrão volta 30 dias porque marcação antiga ainda pode mudar
     (ajuste do gestor, marcação retroativa). Como a chave é o id do par no
     Tangerino, reprocessar o mesmo período só atualiza — nunca duplica.
+
+    ``recalcular=False`` pula o acerto do previsto das linhas fora da janela:
+    é o que a rodada curta do espelho usa (ver espelho.py).
     """
     hoje = timezone.localdate()
     inicio = hoje - timedelta(days=dias)
@@ -305,7 +311,8 @@ def sincronizar_marcacoes(dias=30, employee_id=None):
     # Linhas de sincronizações anteriores ficaram fora da janela e sem previsto.
     # O cálculo é local e barato, então elas são acertadas junto.
     resultado['previsto_recalculado'] = recalcular_previsto(
-        grades=grades, ate=inicio - timedelta(days=1))
+        grades=grades, ate=inicio - timedelta(days=1)) if recalcular else 0
+    bump('ponto')
     return resultado
 
 
@@ -456,4 +463,14 @@ def sincronizar_ferias():
         'employee_id', 'usuario', 'nome', 'inicio', 'fim', 'status',
         'observacao', 'origem', 'dia_inteiro', 'sincronizado_em'])
     resultado['lidos'] = len(itens)
+    # Lançamentos apagados no Tangerino não voltam na lista; some com eles aqui
+    # também, senão o índice do espelho continuaria trancando a pessoa. Só com
+    # a lista inteira: cortada pelo limite de páginas, "não veio" não quer
+    # dizer "foi apagado".
+    vistos = [r.tangerino_id for r in registros]
+    if vistos and getattr(itens, 'completo', True):
+        resultado['removidos'] = FeriasLancamento.objects.exclude(tangerino_id__in=vistos).delete()[0]
+    elif vistos:
+        logger.warning('Lista de férias do Tangerino veio incompleta (%s itens); nada foi removido.', len(itens))
+    espelho.marcar_ferias_sincronizadas()
     return resultado
@@ -0,0 +1,190 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from users.models import User
+
+from . import client, espelho
+from .ferias import esta_de_ferias
+from .models import FeriasLancamento
+from .ponto import resumo_para_usuario
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tangerino-default'},
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tangerino-local'},
+})
+class EspelhoTests(TestCase):
+    """Com o espelho em dia os bloqueios respondem sem a API (aqui desligada)."""
+
+    def setUp(self):
+        cache.clear()
+        for versao in (espelho._versao_ponto, espelho._versao_ferias):
+            versao.esquecer()
+        self.user = User.objects.create_user(
+            username='colab', email='colab@example.com', password='pass123', hierarchy='PADRAO',
+        )
+        self.user.tangerino_employee_id = 77
+        self.user.save(update_fields=['tangerino_employee_id'])
+
+    def test_punch_written_through_is_read_back_from_mirror(self):
+        self.assertFalse(resumo_para_usuario(self.user)['disponivel'])
+
+        espelho._versao_ponto.marcar(time.time())
+        entrada = timezone.localtime().replace(hour=8, minute=0, second=0, microsecond=0)
+        espelho.registrar_no_espelho(self.user, entrada)
+
+        resumo = resumo_para_usuario(self.user)
+        self.assertEqual(resumo['fonte'], 'espelho')
+        self.assertTrue(resumo['bateu_entrada'])
+        self.assertTrue(resumo['dentro'])
+
+        espelho.registrar_no_espelho(self.user, entrada + timedelta(hours=4))
+        resumo = resumo_para_usuario(self.user)
+        self.assertEqual(resumo['situacao'], 'EM_INTERVALO')
+
+    def test_stale_mirror_is_not_used(self):
+        espelho._versao_ponto.marcar(time.time() - espelho.PONTO_IDADE_MAXIMA - 1)
+        self.assertFalse(resumo_para_usuario(self.user)['disponivel'])
+
+    def test_vacation_gate_reads_interval_index(self):
+        hoje = timezone.localdate()
+        FeriasLancamento.objects.create(
+            tangerino_id=1, employee_id=77, inicio=hoje - timedelta(days=3),
+            fim=hoje + timedelta(days=5), status='APROVADO')
+        FeriasLancamento.objects.create(
+            tangerino_id=2, employee_id=77, inicio=hoje + timedelta(days=30),
+            fim=hoje + timedelta(days=40), status='APROVADO')
+        espelho.marcar_ferias_sincronizadas()
+
+        with self.assertNumQueries(1):           # monta o índice uma vez
+            self.assertEqual(esta_de_ferias(self.user)['id'], 1)
+        with self.assertNumQueries(0):
+            self.assertIsNone(esta_de_ferias(self.user, hoje + timedelta(days=10)))
+
+
+    def test_recheck_rereads_the_whole_pending_window(self):
+        with mock.patch('tangerino.sync.sincronizar_marcacoes') as sincronizar:
+            espelho.atualizar_funcionario(77)
+        sincronizar.assert_called_once_with(dias=espelho.DIAS_PENDENCIA, employee_id=77, recalcular=False)
+
+
+    def test_truncated_vacation_list_does_not_delete_rows(self):
+        from . import sync
+
+        hoje = timezone.localdate()
+        FeriasLancamento.objects.create(tangerino_id=1, employee_id=77, inicio=hoje, fim=hoje, status='APROVADO')
+        veio = client.Paginas([{'id': 2, 'startDate': client.para_millis(hoje), 'employeeDTO': {'id': 78}}])
+        veio.completo = False
+        with mock.patch.object(sync, 'listar_ferias', return_value=veio), self.assertLogs('tangerino.sync'):
+            sync.sincronizar_ferias()
+        self.assertEqual(set(FeriasLancamento.objects.values_list('tangerino_id', flat=True)), {1, 2})
+
+        veio.completo = True
+        with mock.patch.object(sync, 'listar_ferias', return_value=veio):
+            sync.sincronizar_ferias()
+        self.assertEqual(list(FeriasLancamento.objects.values_list('tangerino_id', flat=True)), [2])
+
+
+class _FakeTangerino(BaseHTTPRequestHandler):
+    """Imita a API: paginação Spring, um 503 passageiro e ETag na escala."""
+
+    protocol_version = 'HTTP/1.1'           # keep-alive, como o servidor real
+    total_paginas = 5
+    falhou_uma_vez = False
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status, corpo=None, headers=None):
+        dados = json.dumps(corpo).encode() if corpo is not None else b''
+        self.send_response(status)
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        self.server.chamadas.append((url.path, self.client_address[1]))
+        if url.path == '/employee/find-all':
+            pagina = int(parse_qs(url.query)['page'][0])
+            if pagina == 2 and not _FakeTangerino.falhou_uma_vez:
+                _FakeTangerino.falhou_uma_vez = True
+                return self._responder(503, {'erro': 'ocupado'})
+            with self.server.lock:
+                self.server.simultaneas += 1
+                self.server.pico = max(self.server.pico, self.server.simultaneas)
+            time.sleep(0.05)
+            with self.server.lock:
+                self.server.simultaneas -= 1
+            return self._responder(200, {
+                'content': [{'id': pagina * 10 + i} for i in range(3)],
+                'totalPages': self.total_paginas, 'last': pagina + 1 == self.total_paginas,
+            })
+        if url.path == '/work-schedule/lenta':
+            time.sleep(0.5)
+            try:
+                return self._responder(200, {'id': 'lenta'})
+            except OSError:
+                return None  # o cliente já desistiu pelo timeout de leitura
+        if url.path == '/work-schedule/7':
+            if self.headers.get('If-None-Match') == '"v1"':
+                return self._responder(304)
+            return self._responder(200, {'id': 7}, {'ETag': '"v1"'})
+        return self._responder(404, {})
+
+
+@override_settings(TANGERINO_ENABLED=True, TANGERINO_TOKEN='token-teste')
+class ClienteTangerinoTests(SimpleTestCase):
+    def setUp(self):
+        _FakeTangerino.falhou_uma_vez = False
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _FakeTangerino)
+        self.servidor.chamadas = []
+        self.servidor.lock = threading.Lock()
+        self.servidor.simultaneas = self.servidor.pico = 0
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.addCleanup(self.servidor.server_close)
+        self.addCleanup(self.servidor.shutdown)
+        base = f'http://127.0.0.1:{self.servidor.server_address[1]}'
+        patcher = mock.patch.object(client, 'EMPLOYER_BASE', base)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        caches['local'].clear()
+        client.zerar_metricas()
+
+    def test_pages_are_fetched_in_parallel_over_reused_connections(self):
+        itens = client.listar_funcionarios(usar_cache=False)
+
+        # Ordem das páginas preservada, inclusive a que levou um 503 e foi repetida.
+        self.assertEqual([i['id'] for i in itens], [p * 10 + i for p in range(5) for i in range(3)])
+        self.assertGreater(self.servidor.pico, 1)
+        portas = {porta for _, porta in self.servidor.chamadas}
+        self.assertLess(len(portas), len(self.servidor.chamadas))
+        self.assertEqual(client.metricas()['GET /employee/find-all']['chamadas'], 5)
+        self.assertTrue(itens.completo)
+
+    def test_page_limit_marks_the_list_incomplete(self):
+        itens = client._paginar(client.EMPLOYER_BASE, '/employee/find-all', limite_paginas=3)
+        self.assertEqual(len(itens), 9)
+        self.assertFalse(itens.completo)
+
+    def test_conditional_get_reuses_payload_on_304(self):
+        self.assertEqual(client.jornada(7, usar_cache=False), {'id': 7})
+        self.assertEqual(client.jornada(7, usar_cache=False), {'id': 7})
+        self.assertEqual(client.metricas()['GET /work-schedule/{id}']['nao_modificado'], 1)
+
+    def test_read_timeouts_are_not_retried(self):
+        with mock.patch.object(client, 'TIMEOUT', (1, 0.1)), self.assertRaises(client.TangerinoError):
+            client.jornada('lenta', usar_cache=False)
+        self.assertEqual([c for c, _ in self.servidor.chamadas], ['/work-schedule/lenta'])
@@ -13,14 +13,16 @@ from django.utils import timezone
 from django.utils.dateparse import parse_time
 from django.views.decorators.http import require_POST
 
+from . import espelho
 from . import ferias as ferias_svc
 from . import jornada as jornada_svc
 from . import ponto as ponto_svc
 from . import regras_jornada as regras
 from .middleware import limpar_decisao
+from core.polling import bump, conditional_poll
 from .client import (TangerinoError, de_millis, integracao_ativa, listar_funcionarios,
                      listar_marcacoes, invalidar_cache_marcacoes, justificativas_edicao,
-                     registrar_ponto, registrar_ponto_atrasado, testar_conexao)
+                     registrar_ponto, registrar_ponto_atrasado, testar_conexao, metricas)
 from .models import (ConfiguracaoTangerino, FeriasLancamento, JornadaTrabalho,
                      MarcacaoPonto, RegistroPontoPortal, SaldoHoras,
                      SincronizacaoTangerino)
@@ -286,6 +288,8 @@ def bloqueado(request):
         # A pessoa diz que bateu: derruba o cache e olha de novo na API.
         limpar_decisao(request.user)
         invalidar_cache_marcacoes(request.user.tangerino_employee_id)
+        espelho.atualizar_funcionario(request.user.tangerino_employee_id)
+        bump('ponto', request.user.pk)
         # O portal libera na hora, sem esperar o cache da decisão expirar.
         limpar_decisao(request.user)
 
@@ -375,6 +379,8 @@ def ponto_equipe(request):
 
 @modulo_liberado
 @login_required
+# Horas trabalhadas andam com o relógio: o ETag vira a cada minuto mesmo sem batida.
+@conditional_poll(lambda request: [('ponto', None), ('ponto', request.user.pk)], time_bucket=60)
 def api_ponto_status(request):
     """JSON do widget da home. Sempre 200: a home não pode quebrar por causa disto."""
     resumo = ponto_svc.resumo_para_usuario(request.user)
@@ -495,6 +501,11 @@ def api_bater_ponto(request):
         registro.retorno = json.dumps(resposta, ensure_ascii=False)[:2000]
         registro.save()
         invalidar_cache_marcacoes(request.user.tangerino_employee_id)
+        try:
+            espelho.registrar_no_espelho(request.user, registro.momento)
+        except Exception as exc:                  # o ponto já entrou; o espelho se acerta
+            logger.warning('Espelho não registrou o ponto de %s: %s', request.user, exc)
+        bump('ponto', request.user.pk)
 
         # Avisos honestos: o ponto entrou, mas se a foto ou a localização não
         # foram junto a pessoa precisa saber na hora, não no fim do mês.
@@ -701,6 +712,7 @@ def vinculos(request):
         'sem_vinculo': sem_vinculo,
         'total_vinculados': User.objects.exclude(tangerino_employee_id__isnull=True).count(),
         'ultimas': SincronizacaoTangerino.objects.all()[:5],
+        'metricas_api': metricas(),
         'e_gestor': True,
     }
     if ok:
@@ -16,9 +16,15 @@ from users.models import Sector, User
 from core.middleware import log_action
 import csv
 import io
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+from core.lazy import lazy_attr
+
+Workbook = lazy_attr('openpyxl', 'Workbook')
+Font = lazy_attr('openpyxl.styles', 'Font')
+PatternFill = lazy_attr('openpyxl.styles', 'PatternFill')
+Alignment = lazy_attr('openpyxl.styles', 'Alignment')
+Border = lazy_attr('openpyxl.styles', 'Border')
+Side = lazy_attr('openpyxl.styles', 'Side')
+get_column_letter = lazy_attr('openpyxl.utils', 'get_column_letter')
 
 
 # Extensões de vídeo aceitas nos anexos (mesma lista usada na abertura do chamado).
@@ -6,7 +6,9 @@ class TrainingAdmin(admin.ModelAdmin):
     list_display = ('title', 'uploaded_by', 'is_active', 'views_count', 'get_duration_display', 'created_at')
     list_filter = ('is_active', 'created_at', 'uploaded_by')
     search_fields = ('title', 'description')
-    readonly_fields = ('views_count', 'created_at', 'updated_at', 'file_size')
+    readonly_fields = ('views_count', 'created_at', 'updated_at', 'file_size',
+                       'media_status', 'media_error', 'hls_playlist')
+    actions = ['reprocess_media']
     
     fieldsets = (
         ('Informações Básicas', {
@@ -15,6 +17,10 @@ class TrainingAdmin(admin.ModelAdmin):
         ('Arquivo', {
             'fields': ('video_file', 'thumbnail', 'duration_seconds', 'file_size')
         }),
+        ('Empacotamento HLS', {
+            'fields': ('media_status', 'media_error', 'hls_playlist'),
+            'classes': ('collapse',)
+        }),
         ('Configurações', {
             'fields': ('uploaded_by', 'is_active')
         }),
@@ -23,6 +29,17 @@ class TrainingAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
+    
+    def save_model(self, request, obj, form, change):
+        # Vídeo trocado: o sinal de post_save reempacota o HLS
+        obj._video_changed = change and 'video_file' in form.changed_data
+        super().save_model(request, obj, form, change)
+    
+    @admin.action(description='Reprocessar vídeo (HLS e miniatura)')
+    def reprocess_media(self, request, queryset):
+        from .media import schedule
+        count = sum(1 for pk in queryset.values_list('pk', flat=True) if schedule(pk))
+        self.message_user(request, f'{count} treinamento(s) enviado(s) para reprocessamento.')
 
 @admin.register(TrainingView)
 class TrainingViewAdmin(admin.ModelAdmin):
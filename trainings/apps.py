@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TrainingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'trainings'
+
+    def ready(self):
+        # Registra o buffer de progresso de vídeo (flush_video_progress).
+        from . import progress  # noqa: F401
@@ -0,0 +1,42 @@
+"""
+Empacota em HLS (escada de bitrates + miniatura) os vídeos de treinamento.
+
+O upload já agenda o empacotamento em segundo plano (trainings/media.py).
+Este comando serve para o acervo anterior e para refazer o que deu erro
+(por exemplo, vídeos enviados antes de instalar o ffmpeg no servidor).
+Roda em série, no próprio processo.
+"""
+from django.core.management.base import BaseCommand
+
+from trainings.media import process_training
+from trainings.models import Training
+
+
+class Command(BaseCommand):
+    help = 'Gera o HLS e a miniatura dos vídeos de treinamento'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--id', type=int, action='append', help='Treinamento específico. Pode repetir.')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Reprocessa também os que já estão prontos'
+        )
+
+    def handle(self, *args, **options):
+        trainings = Training.objects.exclude(video_file='').order_by('pk')
+        if options.get('id'):
+            trainings = trainings.filter(pk__in=options['id'])
+        elif not options['force']:
+            trainings = trainings.exclude(media_status='ready')
+
+        done = failed = 0
+        for pk, title in trainings.values_list('pk', 'title'):
+            if process_training(pk):
+                done += 1
+                self.stdout.write(f'OK  {pk} {title}')
+            else:
+                failed += 1
+                error = Training.objects.filter(pk=pk).values_list('media_error', flat=True).first()
+                self.stderr.write(f'ERRO {pk} {title}: {error}')
+        self.stdout.write(f'{done} empacotado(s), {failed} com erro')
@@ -0,0 +1,302 @@
+"""Empacotamento HLS dos vídeos de treinamento, em segundo plano.
+
+O treinamento guardava só o arquivo enviado. Quem abria pelo celular, na
+loja, baixava o original inteiro (centenas de MB) antes de conseguir assistir
+com fluidez. Depois do upload, este módulo:
+
+1. lê a duração com ffprobe (preenche ``duration_seconds`` quando vazio);
+2. gera uma escada HLS (360p/540p/720p, nunca acima da resolução original) em
+   segmentos de 6 s e um ``master.m3u8``, com uma única decodificação;
+3. tira um quadro como miniatura quando não foi enviada nenhuma;
+4. grava os segmentos sob o prefixo do treinamento (``trainings/videos/<id>/hls/``).
+
+O player (templates/trainings/detail.html) usa o HLS quando está pronto e
+escolhe a variante pela banda disponível; até lá, e em qualquer falha, o
+arquivo original continua sendo servido.
+
+``move_object`` troca o caminho de um arquivo sem trafegar o conteúdo: no S3
+é uma cópia do lado do servidor seguida de delete, no disco é um rename.
+"""
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class Rendition(NamedTuple):
+    height: int
+    video_bitrate: str
+    max_rate: str
+    buffer_size: str
+    audio_bitrate: str
+
+
+# Escada pensada para 3G/4G de loja: a de 360p cabe em ~1 Mbps.
+RENDITIONS: List[Rendition] = [
+    Rendition(360, '700k', '750k', '1050k', '96k'),
+    Rendition(540, '1400k', '1500k', '2100k', '128k'),
+    Rendition(720, '2600k', '2800k', '3900k', '128k'),
+]
+SEGMENT_SECONDS = 6
+POSTER_HEIGHT = 720
+UPLOAD_WORKERS = 8
+
+# Um vídeo por vez: o ffmpeg ocupa a CPU e o processo web continua atendendo.
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='training-media')
+
+
+def hls_enabled() -> bool:
+    return getattr(settings, 'TRAINING_HLS_ENABLED', True)
+
+
+# ─── Storage ─────────────────────────────────────────────────────────────────
+
+def move_object(storage, old_name: str, new_name: str) -> str:
+    """Renomeia um arquivo no storage sem baixar e reenviar o conteúdo."""
+    bucket = getattr(storage, 'bucket', None)
+    if bucket is not None:
+        old_key, new_key = storage._normalize_name(old_name), storage._normalize_name(new_name)
+        extra = {}
+        acl = getattr(storage, 'default_acl', None)
+        if acl:
+            extra['ACL'] = acl
+        bucket.Object(new_key).copy_from(
+            CopySource={'Bucket': bucket.name, 'Key': old_key}, MetadataDirective='COPY', **extra,
+        )
+        bucket.Object(old_key).delete()
+        return new_name
+
+    try:
+        old_path, new_path = storage.path(old_name), storage.path(new_name)
+    except NotImplementedError:
+        # Storage sem caminho local nem bucket: cópia pela API do Django.
+        with storage.open(old_name, 'rb') as old_file:
+            saved = storage.save(new_name, old_file)
+        storage.delete(old_name)
+        return saved
+    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+    os.replace(old_path, new_path)
+    return new_name
+
+
+def _local_copy(fieldfile) -> Tuple[str, bool]:
+    """Caminho local do arquivo; baixa para um temporário quando é remoto."""
+    try:
+        return fieldfile.path, False
+    except NotImplementedError:
+        pass
+    suffix = os.path.splitext(fieldfile.name)[1] or '.mp4'
+    tmp = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+    with tmp, fieldfile.storage.open(fieldfile.name, 'rb') as src:
+        shutil.copyfileobj(src, tmp, length=8 * 1024 * 1024)
+    return tmp.name, True
+
+
+# ─── ffmpeg ──────────────────────────────────────────────────────────────────
+
+def probe(path: str) -> dict:
+    """Duração (s), altura do vídeo e se há faixa de áudio."""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path],
+        capture_output=True, text=True, timeout=120, check=True,
+    )
+    data = json.loads(result.stdout or '{}')
+    streams = data.get('streams') or []
+    video = next((s for s in streams if s.get('codec_type') == 'video'), {})
+    try:
+        duration = float((data.get('format') or {}).get('duration') or 0)
+    except (TypeError, ValueError):
+        duration = 0.0
+    return {
+        'duration': duration,
+        'height': int(video.get('height') or 0),
+        'has_audio': any(s.get('codec_type') == 'audio' for s in streams),
+    }
+
+
+def select_renditions(source_height: int) -> List[Rendition]:
+    """Degraus até a altura original (sempre ao menos o menor)."""
+    chosen = [r for r in RENDITIONS if not source_height or r.height <= source_height]
+    return chosen or RENDITIONS[:1]
+
+
+def hls_command(source: str, out_dir: str, renditions: List[Rendition], has_audio: bool) -> List[str]:
+    """Um ffmpeg só: decodifica uma vez, divide e codifica cada degrau."""
+    count = len(renditions)
+    splits = ''.join(f'[s{i}]' for i in range(count))
+    filters = [f'[0:v]split={count}{splits}'] + [
+        f'[s{i}]scale=-2:{r.height}[v{i}]' for i, r in enumerate(renditions)
+    ]
+    cmd = ['ffmpeg', '-y', '-i', source, '-filter_complex', ';'.join(filters)]
+    for i, r in enumerate(renditions):
+        cmd += ['-map', f'[v{i}]']
+        if has_audio:
+            cmd += ['-map', '0:a:0']
+        cmd += [
+            f'-c:v:{i}', 'libx264', f'-b:v:{i}', r.video_bitrate,
+            f'-maxrate:v:{i}', r.max_rate, f'-bufsize:v:{i}', r.buffer_size,
+        ]
+        if has_audio:
+            cmd += [f'-c:a:{i}', 'aac', f'-b:a:{i}', r.audio_bitrate, f'-ac:a:{i}', '2']
+    # Keyframe a cada segmento: troca de variante sem engasgo.
+    cmd += [
+        '-preset', 'veryfast', '-profile:v', 'main', '-pix_fmt', 'yuv420p',
+        '-force_key_frames', f'expr:gte(t,n_forced*{SEGMENT_SECONDS})', '-sc_threshold', '0',
+        '-f', 'hls', '-hls_time', str(SEGMENT_SECONDS), '-hls_playlist_type', 'vod',
+        '-hls_segment_filename', os.path.join(out_dir, '%v', 'seg_%04d.ts'),
+        '-master_pl_name', 'master.m3u8',
+        '-var_stream_map', ' '.join(
+            f'v:{i},a:{i},name:{r.height}p' if has_audio else f'v:{i},name:{r.height}p'
+            for i, r in enumerate(renditions)
+        ),
+        os.path.join(out_dir, '%v', 'index.m3u8'),
+    ]
+    return cmd
+
+
+def _poster(source: str, out_path: str, duration: float) -> Optional[str]:
+    at = min(3.0, duration / 10) if duration else 1.0
+    try:
+        subprocess.run(
+            ['ffmpeg', '-y', '-ss', f'{at:.2f}', '-i', source, '-frames:v', '1',
+             '-vf', f'scale=-2:min({POSTER_HEIGHT}\\,ih)', '-q:v', '3', out_path],
+            capture_output=True, timeout=120, check=True,
+        )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return None
+    return out_path if os.path.exists(out_path) else None
+
+
+def _upload_tree(storage, local_dir: str, prefix: str) -> None:
+    files = []
+    for root, _, names in os.walk(local_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            files.append((path, f'{prefix}/{os.path.relpath(path, local_dir).replace(os.sep, "/")}'))
+
+    def _save(item):
+        path, name = item
+        with open(path, 'rb') as fh:
+            storage.save(name, File(fh))
+
+    # Playlists por último: o master só existe quando todos os segmentos subiram.
+    files.sort(key=lambda item: item[1].endswith('.m3u8'))
+    segments = [f for f in files if not f[1].endswith('.m3u8')]
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix='training-media-upload') as pool:
+        list(pool.map(_save, segments))
+    for item in sorted((f for f in files if f[1].endswith('.m3u8')), key=lambda f: f[1].endswith('master.m3u8')):
+        _save(item)
+
+
+# ─── Pipeline ────────────────────────────────────────────────────────────────
+
+def _set(training_id, **fields):
+    from .models import Training
+
+    # update() e não save(): não dispara o post_save que agenda este pipeline.
+    Training.objects.filter(pk=training_id).update(**fields)
+
+
+def process_training(training_id: int) -> bool:
+    """Gera HLS e miniatura de um treinamento. True quando o HLS ficou pronto."""
+    from .models import Training
+
+    training = Training.objects.filter(pk=training_id).first()
+    if training is None or not training.video_file:
+        return False
+    if shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None:
+        _set(training_id, media_status='error', media_error='ffmpeg indisponível no servidor')
+        return False
+
+    _set(training_id, media_status='processing', media_error='')
+    storage = training.video_file.storage
+    source, downloaded = _local_copy(training.video_file)
+    work_dir = tempfile.mkdtemp(prefix='training-hls-')
+    try:
+        info = probe(source)
+        renditions = select_renditions(info['height'])
+        subprocess.run(
+            hls_command(source, work_dir, renditions, info['has_audio']),
+            capture_output=True, check=True,
+            timeout=max(1800, int(info['duration'] * 4)),
+        )
+
+        # Pasta nova a cada processamento: nenhum player pega metade antiga, metade nova.
+        prefix = f'trainings/videos/{training.pk}/hls/{uuid.uuid4().hex[:12]}'
+        old_playlist = training.hls_playlist
+        _upload_tree(storage, work_dir, prefix)
+        fields = {
+            'hls_playlist': f'{prefix}/master.m3u8',
+            'media_status': 'ready',
+            'media_error': '',
+        }
+        if info['duration'] and not training.duration_seconds:
+            fields['duration_seconds'] = int(round(info['duration']))
+
+        if not training.thumbnail:
+            poster = _poster(source, os.path.join(tempfile.gettempdir(), f'poster-{uuid.uuid4().hex}.jpg'),
+                             info['duration'])
+            if poster:
+                try:
+                    with open(poster, 'rb') as fh:
+                        fields['thumbnail'] = training.thumbnail.storage.save(
+                            f'trainings/thumbnails/{training.pk}/poster.jpg', File(fh))
+                finally:
+                    os.unlink(poster)
+
+        _set(training_id, **fields)
+        if old_playlist:
+            delete_hls(storage, old_playlist)
+        return True
+    except Exception as err:
+        logger.exception('Falha ao empacotar o vídeo do treinamento %s', training_id)
+        stderr = getattr(err, 'stderr', b'') or b''
+        if isinstance(stderr, bytes):
+            stderr = stderr.decode('utf-8', 'replace')
+        _set(training_id, media_status='error', media_error=(stderr.strip()[-500:] or str(err))[:500])
+        return False
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if downloaded and os.path.exists(source):
+            os.unlink(source)
+
+
+def delete_hls(storage, playlist_name: str) -> None:
+    """Remove a pasta HLS de um processamento anterior."""
+    prefix = playlist_name.rsplit('/', 1)[0]
+    try:
+        directories, files = storage.listdir(prefix)
+        for name in files:
+            storage.delete(f'{prefix}/{name}')
+        for directory in directories:
+            delete_hls(storage, f'{prefix}/{directory}/index.m3u8')
+    except Exception:
+        logger.warning('Não foi possível remover o HLS antigo %s', prefix, exc_info=True)
+
+
+def _run_job(training_id: int) -> None:
+    try:
+        process_training(training_id)
+    finally:
+        # Thread própria abre suas conexões de banco; precisa devolvê-las.
+        close_old_connections()
+
+
+def schedule(training_id: int) -> bool:
+    """Agenda o empacotamento para depois do commit."""
+    if not hls_enabled():
+        return False
+    _set(training_id, media_status='pending', media_error='')
+    transaction.on_commit(lambda: _EXECUTOR.submit(_run_job, training_id))
+    return True
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trainings', '0005_trainingcategory_trainingview_completion_date_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='training',
+            name='hls_playlist',
+            field=models.CharField(blank=True, help_text='Caminho do master.m3u8 no storage de treinamentos', max_length=255, verbose_name='Playlist HLS'),
+        ),
+        migrations.AddField(
+            model_name='training',
+            name='media_error',
+            field=models.CharField(blank=True, max_length=500, verbose_name='Erro do empacotamento'),
+        ),
+        migrations.AddField(
+            model_name='training',
+            name='media_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Aguardando'), ('processing', 'Processando'), ('ready', 'Pronto'), ('error', 'Erro')], max_length=12, verbose_name='Status do empacotamento'),
+        ),
+    ]
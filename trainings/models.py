@@ -125,6 +125,32 @@ class Training(models.Model):
         help_text="Duração do vídeo em segundos"
     )
     
+    # Empacotamento HLS gerado em segundo plano (trainings/media.py).
+    hls_playlist = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="Playlist HLS",
+        help_text="Caminho do master.m3u8 no storage de treinamentos"
+    )
+    
+    media_status = models.CharField(
+        max_length=12,
+        choices=[
+            ('pending', 'Aguardando'),
+            ('processing', 'Processando'),
+            ('ready', 'Pronto'),
+            ('error', 'Erro'),
+        ],
+        blank=True,
+        verbose_name="Status do empacotamento"
+    )
+    
+    media_error = models.CharField(
+        max_length=500,
+        blank=True,
+        verbose_name="Erro do empacotamento"
+    )
+    
     file_size = models.PositiveIntegerField(
         blank=True,
         null=True,
@@ -208,6 +234,15 @@ class Training(models.Model):
             pass
         return None
     
+    def get_hls_url(self):
+        """URL do master.m3u8 quando o empacotamento terminou"""
+        if self.media_status != 'ready' or not self.hls_playlist:
+            return None
+        try:
+            return self.video_file.storage.url(self.hls_playlist)
+        except Exception:
+            return None
+    
     def get_thumbnail_url(self):
         """Retorna a URL da thumbnail de forma segura"""
         try:
@@ -218,64 +253,46 @@ class Training(models.Model):
         return None
 
 
+def _move_to_training_folder(fieldfile, folder, training_id):
+    """Leva o arquivo do path temporário para a pasta do treinamento.
+
+    Renomeia no próprio storage (cópia no servidor S3 / rename no disco):
+    o vídeo não é baixado e reenviado só para trocar de pasta.
+    """
+    from .media import move_object
+
+    current_path = fieldfile.name
+    if '/temp/' not in current_path and f'/{training_id}/' in current_path:
+        return False
+    filename = os.path.basename(current_path)
+    name, ext = os.path.splitext(filename)
+    safe_name = "".join(c for c in name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+    new_path = f'trainings/{folder}/{training_id}/{safe_name}{ext}'
+    storage = fieldfile.storage
+    if not storage.exists(current_path):
+        return False
+    try:
+        fieldfile.name = move_object(storage, current_path, new_path)
+        return True
+    except Exception as e:
+        print(f"Erro ao mover {folder}: {e}")
+        return False
+
+
 @receiver(post_save, sender=Training)
-def move_training_files_after_save(sender, instance, created, **kwargs):
+def move_training_files_after_save(sender, instance, created, update_fields=None, **kwargs):
     """
-    Move arquivos para o path correto após salvar com ID definido
+    Move arquivos para o path correto após salvar com ID definido e agenda o
+    empacotamento HLS quando o vídeo é novo ou foi trocado
     """
+    from . import media
+
     if created and instance.id:
-        # Verifica se precisa mover arquivos do path temporário
         updated = False
-        
-        # Verificar e mover vídeo
-        if instance.video_file:
-            current_path = instance.video_file.name
-            if '/temp/' in current_path or not f'/{instance.id}/' in current_path:
-                # Gerar novo path correto
-                filename = os.path.basename(current_path)
-                name, ext = os.path.splitext(filename)
-                safe_name = "".join(c for c in name if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                new_path = f'trainings/videos/{instance.id}/{safe_name}{ext}'
-                
-                # Mover arquivo no storage
-                storage = instance.video_file.storage
-                if storage.exists(current_path):
-                    try:
-                        # Copiar conteúdo para novo path
-                        with storage.open(current_path, 'rb') as old_file:
-                            storage.save(new_path, old_file)
-                        # Remover arquivo antigo
-                        storage.delete(current_path)
-                        # Atualizar campo
-                        instance.video_file.name = new_path
-                        updated = True
-                    except Exception as e:
-                        print(f"Erro ao mover vídeo: {e}")
-        
-        # Verificar e mover thumbnail
-        if instance.thumbnail:
-            current_path = instance.thumbnail.name
-            if '/temp/' in current_path or not f'/{instance.id}/' in current_path:
-                # Gerar novo path correto
-                filename = os.path.basename(current_path)
-                name, ext = os.path.splitext(filename)
-                safe_name = "".join(c for c in name if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                new_path = f'trainings/thumbnails/{instance.id}/{safe_name}{ext}'
-                
-                # Mover arquivo no storage
-                storage = instance.thumbnail.storage
-                if storage.exists(current_path):
-                    try:
-                        # Copiar conteúdo para novo path
-                        with storage.open(current_path, 'rb') as old_file:
-                            storage.save(new_path, old_file)
-                        # Remover arquivo antigo
-                        storage.delete(current_path)
-                        # Atualizar campo
-                        instance.thumbnail.name = new_path
-                        updated = True
-                    except Exception as e:
-                        print(f"Erro ao mover thumbnail: {e}")
+        if instance.video_file and _move_to_training_folder(instance.video_file, 'videos', instance.id):
+            updated = True
+        if instance.thumbnail and _move_to_training_folder(instance.thumbnail, 'thumbnails', instance.id):
+            updated = True
         
         # Salvar alterações se necessário (sem trigger do signal novamente)
         if updated:
@@ -283,6 +300,11 @@ def move_training_files_after_save(sender, instance, created, **kwargs):
                 video_file=instance.video_file.name,
                 thumbnail=instance.thumbnail.name if instance.thumbnail else None
             )
+    
+    if not instance.video_file:
+        return
+    if created or getattr(instance, '_video_changed', False):
+        media.schedule(instance.pk)
 
 
 class TrainingView(models.Model):
@@ -0,0 +1,92 @@
+"""Progresso de vídeo dos treinamentos via buffer de heartbeats (core/heartbeats.py).
+
+Os avisos só sobem "assistido até" e a porcentagem; vão para o buffer e são
+gravados em lote. A conclusão (fim do vídeo) continua síncrona em
+``views.update_training_progress``.
+"""
+from typing import Dict, Tuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+from core.heartbeats import ProgressBuffer
+
+from .models import TrainingProgress, TrainingView
+
+
+def progress_percentage(watched, duration_seconds, completed=False):
+    if duration_seconds and duration_seconds > 0:
+        return min((int(watched) / duration_seconds) * 100, 100)
+    # Se não temos duração, usar 100% quando completed
+    return 100 if completed else 0
+
+
+def _pairs_filter(pairs):
+    condition = Q()
+    for user_id, training_id in pairs:
+        condition |= Q(user_id=user_id, training_id=training_id)
+    return condition
+
+
+def _flush(states: Dict[Tuple[int, int], dict]) -> None:
+    """Grava o lote: só avança, nunca desfaz conclusão nem recua o assistido."""
+    pairs = list(states)
+    views = {(v.user_id, v.training_id): v for v in TrainingView.objects.filter(_pairs_filter(pairs))}
+    progresses = {(p.user_id, p.training_id): p for p in TrainingProgress.objects.filter(_pairs_filter(pairs))}
+
+    now = timezone.now()
+    views_changed, progresses_changed, new_views, new_progresses = [], [], [], []
+    for (user_id, training_id), state in states.items():
+        watched, pct = int(state['watched']), float(state['pct'])
+        view = views.get((user_id, training_id))
+        if view is None:
+            new_views.append(TrainingView(training_id=training_id, user_id=user_id,
+                                          viewed_at=now, duration_watched=watched))
+        elif watched > view.duration_watched:
+            view.duration_watched = watched
+            views_changed.append(view)
+
+        progress = progresses.get((user_id, training_id))
+        if progress is None:
+            new_progresses.append(TrainingProgress(training_id=training_id, user_id=user_id,
+                                                   progress_percentage=pct))
+        elif not progress.is_completed and pct > progress.progress_percentage:
+            progress.progress_percentage = pct
+            progresses_changed.append(progress)
+
+    TrainingView.objects.bulk_update(views_changed, ['duration_watched'], batch_size=500)
+    TrainingProgress.objects.bulk_update(progresses_changed, ['progress_percentage'], batch_size=500)
+    # ignore_conflicts: a página de detalhe pode ter criado a linha no meio do lote.
+    TrainingView.objects.bulk_create(new_views, batch_size=500, ignore_conflicts=True)
+    TrainingProgress.objects.bulk_create(new_progresses, batch_size=500, ignore_conflicts=True)
+
+
+buffer = ProgressBuffer('training', _flush)
+
+
+def heartbeat(user_id, training, watched):
+    """Aceita um aviso de posição; devolve o estado acumulado do par.
+
+    Assistido e porcentagem só sobem: o buffer guarda o máximo sem ler antes
+    (uma ida ao Redis por aviso).
+    """
+    watched = int(watched)
+    state = {'watched': watched, 'pct': progress_percentage(watched, training.duration_seconds)}
+    merged = buffer.merge_max(user_id, training.pk, state)
+    if merged is not None:
+        state, existed = merged
+        if existed:
+            return {'watched': int(state['watched']), 'pct': state['pct']}
+
+    # Primeiro aviso do par (ou buffer fora): o banco pode já ter mais, e o
+    # buffer passa a partir dele.
+    state = {'watched': int(state['watched']), 'pct': state['pct']}
+    view = TrainingView.objects.filter(user_id=user_id, training=training).only('duration_watched').first()
+    if view and view.duration_watched > state['watched']:
+        state = {'watched': view.duration_watched,
+                 'pct': progress_percentage(view.duration_watched, training.duration_seconds)}
+        if merged is not None:
+            buffer.merge_max(user_id, training.pk, state)
+    if merged is None:
+        _flush({(user_id, training.pk): state})
+    return state
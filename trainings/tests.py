@@ -1,3 +1,120 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
 from django.test import TestCase
+from django.urls import reverse
+
+from core import heartbeats
+from users.models import User
+
+from . import media
+from . import progress as video_progress
+from .models import Training, TrainingProgress, TrainingView
+
+
+class VideoHeartbeatTests(TestCase):
+    def setUp(self):
+        # Buffer em memória, qualquer que seja o cache configurado.
+        self.store = heartbeats._MemoryStore()
+        self._previous_store, heartbeats._store_instance = heartbeats._store_instance, self.store
+        self.user = User.objects.create_user(
+            username='aluno', email='aluno@example.com', password='pass123', hierarchy='PADRAO',
+        )
+        # bulk_create: sem o signal que move o vídeo no storage.
+        Training.objects.bulk_create([Training(
+            title='Integração', description='Obrigatório', video_file='trainings/videos/integracao.mp4',
+            duration_seconds=600, uploaded_by=self.user,
+        )])
+        self.training = Training.objects.get()
+        self.client.force_login(self.user)
+        # O primeiro aviso do processo grava o lote; os testes controlam quando.
+        self.store.flush_locks['training'] = time.time() + 300
+
+    def tearDown(self):
+        heartbeats._store_instance = self._previous_store
+
+    def _ping(self, seconds, completed=False):
+        return self.client.post(reverse('update_training_progress'), {
+            'training_id': self.training.pk,
+            'duration_watched': seconds,
+            'completed': 'true' if completed else 'false',
+        }).json()
+
+    def test_heartbeats_are_buffered_and_flushed_in_bulk(self):
+        for seconds in (5, 10, 15, 12):
+            data = self._ping(seconds)
+        self.assertEqual(data['duration_watched'], 15)
+        self.assertFalse(TrainingView.objects.exists())
+
+        self.assertEqual(heartbeats.flush_all(['training']), {'training': 1})
+        view = TrainingView.objects.get(user=self.user, training=self.training)
+        self.assertEqual(view.duration_watched, 15)
+        self.assertAlmostEqual(TrainingProgress.objects.get().progress_percentage, 2.5)
+
+    def test_first_heartbeat_does_not_report_less_than_the_database(self):
+        TrainingView.objects.create(training=self.training, user=self.user, duration_watched=120)
+
+        self.assertEqual(self._ping(30)['duration_watched'], 120)
+        self.assertEqual(self._ping(60)['duration_watched'], 120)
+        self.assertEqual(self._ping(150)['duration_watched'], 150)
+        heartbeats.flush_all(['training'])
+        self.assertEqual(TrainingView.objects.get().duration_watched, 150)
+
+    def test_completion_is_written_synchronously(self):
+        self._ping(300)
+        data = self._ping(600, completed=True)
+
+        self.assertTrue(data['completed'])
+        progress = TrainingProgress.objects.get(user=self.user, training=self.training)
+        self.assertTrue(progress.is_completed)
+        self.assertEqual(progress.progress_percentage, 100)
+        self.assertIsNone(video_progress.buffer.get(self.user.pk, self.training.pk))
+        self.assertEqual(heartbeats.flush_all(['training']), {'training': 0})
+
+
+class TrainingMediaTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.storage = FileSystemStorage(location=self.root)
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+
+    def test_move_object_renames_without_copying(self):
+        old = self.storage.save('trainings/videos/tmp1234/aula.mp4', ContentFile(b'video'))
+        inode = os.stat(self.storage.path(old)).st_ino
+
+        new = media.move_object(self.storage, old, 'trainings/videos/7/aula.mp4')
+
+        self.assertFalse(self.storage.exists(old))
+        self.assertEqual(os.stat(self.storage.path(new)).st_ino, inode)
+
+    def test_ladder_never_upscales(self):
+        self.assertEqual([r.height for r in media.select_renditions(1080)], [360, 540, 720])
+        self.assertEqual([r.height for r in media.select_renditions(480)], [360])
+        self.assertEqual([r.height for r in media.select_renditions(240)], [360])
+
+        cmd = media.hls_command('in.mp4', '/out', media.select_renditions(720), has_audio=False)
+        self.assertIn('v:0,name:360p v:1,name:540p v:2,name:720p', cmd)
+        self.assertIn('[0:v]split=3[s0][s1][s2];[s0]scale=-2:360[v0];[s1]scale=-2:540[v1];'
+                      '[s2]scale=-2:720[v2]', cmd)
+
+    def test_missing_ffmpeg_keeps_original_video(self):
+        user = User.objects.create_user(
+            username='rh', email='rh@example.com', password='pass123', hierarchy='SUPERADMIN',
+        )
+        Training.objects.bulk_create([Training(
+            title='Boas-vindas', video_file='trainings/videos/1/boas-vindas.mp4', uploaded_by=user,
+        )])
+        training = Training.objects.get()
+
+        with mock.patch('trainings.media.shutil.which', return_value=None):
+            self.assertFalse(media.process_training(training.pk))
 
-# Create your tests here.
+        training.refresh_from_db()
+        self.assertEqual(training.media_status, 'error')
+        self.assertIsNone(training.get_hls_url())
+        self.assertTrue(training.get_video_url())
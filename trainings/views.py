@@ -5,6 +5,7 @@ from django.http import JsonResponse, Http404
 from django.core.paginator import Paginator
 from django.db import transaction, models
 from django.utils import timezone
+from . import progress as video_progress
 from .models import Training, TrainingView, TrainingCategory, TrainingProgress
 import os
 
@@ -57,6 +58,8 @@ def trainings_list_view(request):
 def training_detail_view(request, pk):
     """Visualiza detalhes de um treinamento específico"""
     training = get_object_or_404(Training, pk=pk, is_active=True)
+    # O que ainda está no buffer de progresso entra antes de a página ler.
+    video_progress.buffer.persist(request.user.pk, training.pk)
     
     # Registrar visualização
     training_view, created = TrainingView.objects.get_or_create(
@@ -246,6 +249,9 @@ def training_delete_view(request, pk):
         title = training.title
         
         # Remover arquivos físicos
+        if training.hls_playlist:
+            from .media import delete_hls
+            delete_hls(training.video_file.storage, training.hls_playlist)
         try:
             if training.video_file and os.path.exists(training.video_file.path):
                 os.remove(training.video_file.path)
@@ -266,15 +272,28 @@ def training_delete_view(request, pk):
 
 @login_required
 def update_training_progress(request):
-    """API para atualizar progresso de visualização do treinamento"""
+    """API para atualizar progresso de visualização do treinamento.
+
+    Avisos de posição vão para o buffer de progresso (gravados em lote); só a
+    conclusão é gravada na hora.
+    """
     if request.method == 'POST':
         training_id = request.POST.get('training_id')
         duration_watched = request.POST.get('duration_watched', 0)
         completed = request.POST.get('completed', 'false').lower() == 'true'
         
         try:
-            training = Training.objects.get(pk=training_id, is_active=True)
-            
+            training = Training.objects.only('pk', 'duration_seconds').get(pk=training_id, is_active=True)
+
+            if not completed:
+                state = video_progress.heartbeat(request.user.pk, training, duration_watched)
+                return JsonResponse({
+                    'success': True,
+                    'duration_watched': state['watched'],
+                    'completed': False,
+                    'progress_percentage': state['pct'],
+                })
+
             # Atualizar TrainingView
             training_view, created = TrainingView.objects.get_or_create(
                 training=training,
@@ -283,8 +302,8 @@ def update_training_progress(request):
             
             # Atualizar progresso
             training_view.duration_watched = max(int(duration_watched), training_view.duration_watched)
-            training_view.completed = completed
-            if completed and not training_view.completion_date:
+            training_view.completed = True
+            if not training_view.completion_date:
                 training_view.completion_date = timezone.now()
             training_view.save()
             
@@ -293,23 +312,14 @@ def update_training_progress(request):
                 training=training,
                 user=request.user
             )
-            
-            # Calcular porcentagem de progresso
-            if training.duration_seconds and training.duration_seconds > 0:
-                progress_percentage = min((int(duration_watched) / training.duration_seconds) * 100, 100)
-            else:
-                # Se não temos duração, usar 100% quando completed
-                progress_percentage = 100 if completed else 0
-            
-            training_progress.progress_percentage = progress_percentage
-            training_progress.is_completed = completed
-            
-            if completed and not training_progress.completed_at:
+            training_progress.progress_percentage = video_progress.progress_percentage(
+                duration_watched, training.duration_seconds, completed=True
+            )
+            training_progress.is_completed = True
+            if not training_progress.completed_at:
                 training_progress.completed_at = timezone.now()
-            elif not completed:
-                training_progress.completed_at = None
-                
             training_progress.save()
+            video_progress.buffer.discard(request.user.pk, training.pk)
             
             return JsonResponse({
                 'success': True,
@@ -21,13 +21,19 @@ from django.db.models import Q
 from django.utils import timezone
 import json
 import hashlib
-import pandas as pd
+from core.lazy import lazy_attr, lazy_import
+
+pd = lazy_import('pandas')
 from io import BytesIO
 import unicodedata
 from users.models import User, Sector, SystemConfig, CommissionSpreadsheetVersion
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+Workbook = lazy_attr('openpyxl', 'Workbook')
+Font = lazy_attr('openpyxl.styles', 'Font')
+PatternFill = lazy_attr('openpyxl.styles', 'PatternFill')
+Alignment = lazy_attr('openpyxl.styles', 'Alignment')
+Border = lazy_attr('openpyxl.styles', 'Border')
+Side = lazy_attr('openpyxl.styles', 'Side')
+get_column_letter = lazy_attr('openpyxl.utils', 'get_column_letter')
 
 
 # ============================================================================
@@ -805,28 +805,14 @@ class User(AbstractUser):
     
     @property
     def calculated_balance_cs(self):
-        """Calcula o saldo C$ baseado apenas em transações aprovadas"""
-        from prizes.models import CSTransaction
-        from django.db.models import Sum, Q
-        
-        # Somar créditos aprovados
-        credits = CSTransaction.objects.filter(
-            user=self,
-            transaction_type__in=['CREDIT', 'ADJUSTMENT'],
-            status='APPROVED',
-            amount__gt=0
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Somar débitos aprovados (valores negativos ou tipos DEBIT/REDEMPTION)
-        debits = CSTransaction.objects.filter(
-            user=self,
-            status='APPROVED'
-        ).filter(
-            Q(transaction_type__in=['DEBIT', 'REDEMPTION']) |
-            Q(amount__lt=0)
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        return abs(credits) - abs(debits)
+        """Saldo C$ recalculado a partir das transações efetivadas (ledger).
+
+        Parte do último checkpoint do usuário e soma só as transações
+        posteriores — ver prizes/ledger.py.
+        """
+        from prizes.ledger import ledger_totals
+
+        return ledger_totals(self)['balance']
 
     def can_manage_prizes(self):
         return self.hierarchy in ['ADMINISTRATIVO', 'SUPERVISOR', 'ADMIN', 'SUPERADMIN']
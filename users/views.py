@@ -13,14 +13,18 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils import get_column_letter
+from core.lazy import lazy_attr, lazy_import
 from .models import User, Sector, UserSession, normalize_cpf, RequiredDocument, UserDocument, EmergencyContact
 from .serializers import UserSerializer, SectorSerializer
 from core.middleware import log_action
 import json
 
+openpyxl = lazy_import('openpyxl')
+Font = lazy_attr('openpyxl.styles', 'Font')
+Alignment = lazy_attr('openpyxl.styles', 'Alignment')
+PatternFill = lazy_attr('openpyxl.styles', 'PatternFill')
+get_column_letter = lazy_attr('openpyxl.utils', 'get_column_letter')
+
 
 def _parse_bool_excel(value, default=False):
     if value is None or value == '':
@@ -2427,25 +2431,23 @@ def remove_cs_view(request, user_id):
                 messages.error(request, 'Valor deve ser maior que zero.')
                 return redirect('manage_cs')
             
-            if target_user.balance_cs < amount:
+            # Remover diretamente do saldo (sem aprovação) e registrar a
+            # transação como concluída. O débito é condicional no banco.
+            from prizes.ledger import InsufficientBalance, apply_movement
+            try:
+                apply_movement(
+                    target_user,
+                    -amount,  # Valor negativo para indicar remoção
+                    'DEBIT',
+                    description or f'Remoção manual de C$',
+                    created_by=request.user,
+                    require_funds=True,
+                    status='COMPLETED',
+                )
+            except InsufficientBalance:
                 messages.error(request, f'Saldo insuficiente. Saldo atual: C$ {target_user.balance_cs}')
                 return redirect('manage_cs')
             
-            # Remover diretamente do saldo (sem aprovação)
-            target_user.balance_cs -= amount
-            target_user.save()
-            
-            # Registrar transação como concluída
-            from prizes.models import CSTransaction
-            transaction = CSTransaction.objects.create(
-                user=target_user,
-                amount=-amount,  # Valor negativo para indicar remoção
-                transaction_type='DEBIT',
-                description=description or f'Remoção manual de C$',
-                status='COMPLETED',
-                created_by=request.user
-            )
-            
             log_action(
                 request.user, 
                 'CS_REMOVE', 
@@ -2941,62 +2943,72 @@ class UserViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        from decimal import InvalidOperation
+        from prizes.ledger import InsufficientBalance, apply_movement
+        from prizes.models import CSTransaction
+
         try:
-            amount = float(amount)
-            if operation == 'add':
-                user.balance_cs += amount
-            elif operation == 'subtract':
-                user.balance_cs -= amount
-            else:
-                return Response(
-                    {'error': 'Operação inválida'}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Para débitos e ajustes, ainda aplicamos diretamente
-            # Para créditos, deixamos pendente de aprovação
-            transaction_status = 'APPROVED'  # Padrão para débitos e ajustes
-            
-            if operation == 'add':
-                # Créditos ficam pendentes de aprovação - reverter a mudança no saldo
-                user.balance_cs -= amount  # Desfaz a adição
-                transaction_status = 'PENDING'
-            
-            user.save()
-            
-            # Registrar transação
-            from prizes.models import CSTransaction
-            transaction = CSTransaction.objects.create(
-                user=user,
-                amount=amount if operation == 'add' else amount,
-                transaction_type='CREDIT' if operation == 'add' else 'DEBIT',
-                description=description or f'Ajuste manual - {operation}',
-                status=transaction_status,
-                created_by=target_user
+            amount = Decimal(str(amount))
+        except InvalidOperation:
+            return Response(
+                {'error': 'Valor inválido'}, 
+                status=status.HTTP_400_BAD_REQUEST
             )
-            
+        if amount <= 0:
+            return Response(
+                {'error': 'Valor inválido'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if operation not in ('add', 'subtract'):
+            return Response(
+                {'error': 'Operação inválida'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
             if operation == 'add':
-                message = f'Solicitação de C$ {amount} para {user.full_name} enviada para aprovação'
-                action = 'CS_ADD_REQUEST'
+                # Créditos ficam pendentes de aprovação: o saldo só muda quando
+                # o ledger aprova a transação (approve_pending).
+                CSTransaction.objects.create(
+                    user=user,
+                    amount=amount,
+                    transaction_type='CREDIT',
+                    description=description or f'Ajuste manual - {operation}',
+                    status='PENDING',
+                    created_by=target_user
+                )
             else:
-                message = f'C$ {amount} removido de {user.full_name}'
-                action = 'CS_DEBIT'
-            
-            log_action(
-                target_user, 
-                action, 
-                message,
-                request
-            )
-            
-            return Response({'message': 'Operação realizada com sucesso' if operation != 'add' else 'Solicitação enviada para aprovação'})
-            
-        except ValueError:
+                # Débito condicional no banco, com a transação na mesma operação.
+                apply_movement(
+                    user,
+                    -amount,
+                    'DEBIT',
+                    description or f'Ajuste manual - {operation}',
+                    created_by=target_user,
+                    require_funds=True,
+                )
+        except InsufficientBalance:
             return Response(
-                {'error': 'Valor inválido'}, 
+                {'error': f'Saldo insuficiente. Saldo atual: C$ {user.balance_cs}'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        if operation == 'add':
+            message = f'Solicitação de C$ {amount} para {user.full_name} enviada para aprovação'
+            action = 'CS_ADD_REQUEST'
+        else:
+            message = f'C$ {amount} removido de {user.full_name}'
+            action = 'CS_DEBIT'
+        
+        log_action(
+            target_user, 
+            action, 
+            message,
+            request
+        )
+        
+        return Response({'message': 'Operação realizada com sucesso' if operation != 'add' else 'Solicitação enviada para aprovação'})
+
 
 class SectorViewSet(viewsets.ModelViewSet):
     queryset = Sector.objects.all()
@@ -5010,17 +5022,14 @@ def approve_cs_transaction(request, transaction_id):
                     'error': 'Apenas usuários com hierarquia SUPERADMIN podem aprovar transações C$.'
                 }, status=403)
             
-            # Aprovar a transação
-            cs_transaction.status = 'APPROVED'
-            cs_transaction.approved_by = request.user
-            cs_transaction.approved_at = timezone.now()
-            cs_transaction.save()
+            # Aprovar a transação; o ledger adiciona o valor ao saldo do
+            # usuário (APENAS para créditos) na mesma transação, via F().
+            from prizes.ledger import approve_pending
+            approve_pending(cs_transaction, request.user)
             
-            # Adicionar o valor ao saldo do usuário APENAS se for uma transação de crédito
             if cs_transaction.transaction_type == 'CREDIT':
                 user = cs_transaction.user
-                user.balance_cs += cs_transaction.amount
-                user.save()
+                user.refresh_from_db(fields=['balance_cs'])
                 
                 log_action(
                     request.user,
@@ -5841,115 +5850,97 @@ def manage_checklists_view(request):
     return render(request, 'admin_panel/manage_checklists.html', context)
 
 
-def create_recurring_checklists(parent_checklist, template=None):
-    """Cria checklists recorrentes baseado no tipo de repetição"""
-    from core.models import ChecklistItem, DailyChecklist
-    from datetime import date, timedelta
+def _recurring_checklist_dates(parent_checklist):
+    """Datas das instâncias de um checklist recorrente, calculadas em memória."""
+    from datetime import timedelta
     
-    created_count = 0
     start_date = parent_checklist.date + timedelta(days=1)  # Começa no dia seguinte
+    dates = []
     
     if parent_checklist.repeat_type == 'DAILY':
         # Repetir todos os dias por 30 dias
         end_date = parent_checklist.repeat_end_date or (start_date + timedelta(days=29))
         current_date = start_date
-        
         while current_date <= end_date:
-            recurring_checklist = DailyChecklist.objects.create(
-                user=parent_checklist.user,
-                template=parent_checklist.template,
-                title=parent_checklist.title,
-                date=current_date,
-                repeat_type='NONE',  # Instâncias não repetem
-                is_recurring_instance=True,
-                parent_checklist=parent_checklist,
-                created_by=parent_checklist.created_by
-            )
-            
-            # Copiar itens
-            for item in parent_checklist.items.all():
-                ChecklistItem.objects.create(
-                    checklist=recurring_checklist,
-                    title=item.title,
-                    description=item.description,
-                    order=item.order,
-                    is_required=item.is_required
-                )
-            
-            created_count += 1
+            dates.append(current_date)
             current_date += timedelta(days=1)
     
     elif parent_checklist.repeat_type == 'WEEKDAYS':
         # Repetir por 30 dias exceto finais de semana
         end_date = parent_checklist.repeat_end_date or (start_date + timedelta(days=42))  # Mais dias para compensar fins de semana
         current_date = start_date
-        weekdays_created = 0
-        
-        while current_date <= end_date and weekdays_created < 30:
+        while current_date <= end_date and len(dates) < 30:
             # Pular fins de semana (5=sábado, 6=domingo)
             if current_date.weekday() < 5:
-                recurring_checklist = DailyChecklist.objects.create(
-                    user=parent_checklist.user,
-                    template=parent_checklist.template,
-                    title=parent_checklist.title,
-                    date=current_date,
-                    repeat_type='NONE',
-                    is_recurring_instance=True,
-                    parent_checklist=parent_checklist,
-                    created_by=parent_checklist.created_by
-                )
-                
-                # Copiar itens
-                for item in parent_checklist.items.all():
-                    ChecklistItem.objects.create(
-                        checklist=recurring_checklist,
-                        title=item.title,
-                        description=item.description,
-                        order=item.order,
-                        is_required=item.is_required
-                    )
-                
-                created_count += 1
-                weekdays_created += 1
-            
+                dates.append(current_date)
             current_date += timedelta(days=1)
     
     elif parent_checklist.repeat_type == 'CUSTOM_DAYS':
         # Repetir em dias específicos da semana
         end_date = parent_checklist.repeat_end_date or (start_date + timedelta(days=90))  # 3 meses por padrão
-        current_date = start_date
         
         # Converter dias selecionados para inteiros
         selected_days = [int(day) for day in parent_checklist.repeat_days if day.isdigit()]
-        
+        current_date = start_date
         while current_date <= end_date:
             if current_date.weekday() in selected_days:
-                recurring_checklist = DailyChecklist.objects.create(
-                    user=parent_checklist.user,
-                    template=parent_checklist.template,
-                    title=parent_checklist.title,
-                    date=current_date,
-                    repeat_type='NONE',
-                    is_recurring_instance=True,
-                    parent_checklist=parent_checklist,
-                    created_by=parent_checklist.created_by
-                )
-                
-                # Copiar itens
-                for item in parent_checklist.items.all():
-                    ChecklistItem.objects.create(
-                        checklist=recurring_checklist,
-                        title=item.title,
-                        description=item.description,
-                        order=item.order,
-                        is_required=item.is_required
-                    )
-                
-                created_count += 1
-            
+                dates.append(current_date)
             current_date += timedelta(days=1)
     
-    return created_count
+    return dates
+
+
+def create_recurring_checklists(parent_checklist, template=None):
+    """Cria checklists recorrentes baseado no tipo de repetição.
+
+    Datas calculadas em memória, uma consulta para as instâncias que já
+    existem e ``bulk_create`` dos checklists e dos itens copiados.
+    """
+    from core.models import ChecklistItem, DailyChecklist
+    
+    dates = _recurring_checklist_dates(parent_checklist)
+    if not dates:
+        return 0
+    
+    # Instâncias já existentes (unique: usuário + título + data) não são recriadas.
+    existing_dates = set(
+        DailyChecklist.objects.filter(
+            user=parent_checklist.user,
+            title=parent_checklist.title,
+            date__in=dates,
+        ).values_list('date', flat=True)
+    )
+    
+    recurring_checklists = DailyChecklist.objects.bulk_create([
+        DailyChecklist(
+            user=parent_checklist.user,
+            template=parent_checklist.template,
+            title=parent_checklist.title,
+            date=current_date,
+            repeat_type='NONE',  # Instâncias não repetem
+            is_recurring_instance=True,
+            parent_checklist=parent_checklist,
+            created_by=parent_checklist.created_by
+        )
+        for current_date in dates
+        if current_date not in existing_dates
+    ], batch_size=500)
+    
+    # Copiar itens
+    items = list(parent_checklist.items.all())
+    ChecklistItem.objects.bulk_create([
+        ChecklistItem(
+            checklist=recurring_checklist,
+            title=item.title,
+            description=item.description,
+            order=item.order,
+            is_required=item.is_required
+        )
+        for recurring_checklist in recurring_checklists
+        for item in items
+    ], batch_size=500)
+    
+    return len(recurring_checklists)
 
 
 @login_required
@@ -7262,16 +7253,12 @@ def _build_cs_statement_context(request, statement_user, is_admin_view=False):
     page_number = request.GET.get('page')
     transactions_page = paginator.get_page(page_number)
 
-    # Calcular totais (apenas transações aprovadas)
-    approved_transactions = CSTransaction.objects.filter(user=statement_user, status='APPROVED')
-
-    total_credits = approved_transactions.filter(
-        transaction_type__in=['CREDIT', 'ADJUSTMENT', 'REFUND']
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-    total_debits = approved_transactions.filter(
-        transaction_type__in=['DEBIT', 'REDEMPTION']
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    # Totais do ledger: último checkpoint + transações efetivadas depois dele,
+    # sem reler todo o histórico do usuário.
+    from prizes.ledger import ledger_totals
+    totals = ledger_totals(statement_user)
+    total_credits = totals['credits']
+    total_debits = totals['debits']
 
     # Transações pendentes
     pending_count = CSTransaction.objects.filter(user=statement_user, status='PENDING').count()
@@ -23,5 +23,6 @@ class Command(BaseCommand):
         stats = sync_d1(target_date=d)
         self.stdout.write(self.style.SUCCESS(
             f"Sync D-1 {stats['target_date']}: {stats['created']} importadas, "
-            f"{stats['expired']} expiradas (fonte: {stats['total_in_source']})."
+            f"{stats['skipped']} já existentes, {stats['expired']} expiradas "
+            f"(fonte: {stats['total_in_source']}; {stats['queries']} consultas ao banco)."
         ))
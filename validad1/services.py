@@ -10,6 +10,7 @@ from django.contrib.auth import get_user_model
 from django.db.models import Q
 from django.utils import timezone
 
+from core.bulk_upsert import bulk_upsert
 from simulator.sql_realizado import _mysql_config
 
 from .models import VendaD1
@@ -17,6 +18,9 @@ from .models import VendaD1
 
 User = get_user_model()
 
+# Combo que identifica uma venda no D-1 (a mesma venda pode ter vários serviços).
+D1_NATURAL_KEY = ['numero_da_venda', 'cpf', 'produto', 'data_da_venda', 'numero_acesso', 'servicos']
+
 
 def _norm(value) -> str:
     if value is None:
@@ -118,64 +122,40 @@ def sync_d1(*, target_date: Optional[date] = None) -> dict:
         target_dates = [ontem, hoje]
 
     raw = fetch_d1_from_mysql(target_dates=target_dates)
-    created = 0
-    skipped = 0
-    seen: dict[tuple, VendaD1] = {}
 
     def _s(value) -> str:
         return (str(value).strip() if value is not None else '')
 
+    rows = []
     for r in raw:
-        numero = _s(r.get('numero_da_venda'))
-        if not numero:
-            continue
-
-        cpf = _s(r.get('cpf'))
-        produto = _s(r.get('produto'))
-        numero_acesso = _s(r.get('numero_acesso'))
-        servicos = _s(r.get('servicos'))
-        data_venda = r.get('data_da_venda')
-
-        key = (numero, cpf, produto, str(data_venda), numero_acesso, servicos)
-
-        # Já existe localmente? → pula (idempotente).
-        existing = VendaD1.objects.filter(
-            numero_da_venda=numero,
-            cpf=cpf,
-            produto=produto,
-            data_da_venda=data_venda,
-            numero_acesso=numero_acesso,
-            servicos=servicos,
-        ).first()
-        if existing:
-            seen.setdefault(key, existing)
-            skipped += 1
-            continue
-
-        # Segunda ocorrência do mesmo combo no fetch atual → duplicata.
-        parent = seen.get(key)
-        obj = VendaD1.objects.create(
-            numero_da_venda=numero,
-            produto=produto,
-            valor=Decimal(str(r.get('valor') or 0)),
-            cpf=cpf,
-            numero_acesso=numero_acesso,
-            data_da_venda=data_venda,
-            pilar=_s(r.get('pilar')),
-            vendedor=_s(r.get('vendedor')),
-            pdv=_s(r.get('pdv')),
-            servicos=servicos,
-            is_duplicate=bool(parent),
-            duplicate_of=parent,
-        )
-        seen.setdefault(key, obj)
-        created += 1
+        rows.append({
+            'numero_da_venda': _s(r.get('numero_da_venda')),
+            'cpf': _s(r.get('cpf')),
+            'produto': _s(r.get('produto')),
+            'data_da_venda': r.get('data_da_venda'),
+            'numero_acesso': _s(r.get('numero_acesso')),
+            'servicos': _s(r.get('servicos')),
+            'valor': Decimal(str(r.get('valor') or 0)),
+            'pilar': _s(r.get('pilar')),
+            'vendedor': _s(r.get('vendedor')),
+            'pdv': _s(r.get('pdv')),
+        })
+
+    # Uma consulta de existência por lote e inserts em lote (core/bulk_upsert.py).
+    # A partir da segunda ocorrência do mesmo combo na fonte, a venda entra
+    # como duplicata apontando para a primeira.
+    stats = bulk_upsert(
+        VendaD1, rows,
+        key=D1_NATURAL_KEY,
+        skip_existing=True,
+        chain=('is_duplicate', 'duplicate_of'),
+        scope=VendaD1.objects.filter(data_da_venda__in=target_dates),
+    )
 
     expired = expire_deadlines()
 
     return {
-        'created': created,
-        'skipped': skipped,
+        **stats.as_dict(),
         'total_in_source': len(raw),
         'expired': expired,
         'target_date': ', '.join(str(d) for d in target_dates),
@@ -15,10 +15,8 @@ from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
 from django.utils.dateparse import parse_date, parse_datetime
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Font, PatternFill
-from openpyxl.utils import get_column_letter
 
+from core.lazy import lazy_attr
 from users.models import Sector, User
 
 from .models import ItemPreco, Venda, VendaProduto, VendaServico
@@ -27,6 +25,12 @@ from .permissions import (can_access_vendas, is_superadmin, pode_gerenciar_preco
 from .clientes import buscar_historico
 from .services import importar_tabela_precos
 
+Workbook = lazy_attr('openpyxl', 'Workbook')
+Alignment = lazy_attr('openpyxl.styles', 'Alignment')
+Font = lazy_attr('openpyxl.styles', 'Font')
+PatternFill = lazy_attr('openpyxl.styles', 'PatternFill')
+get_column_letter = lazy_attr('openpyxl.utils', 'get_column_letter')
+
 
 def _deny(request):
     messages.error(request, 'Acesso restrito.')